@@ -0,0 +1,116 @@
+"""Benchmark list-endpoint serialization for 100-item pages.
+
+Compares the previous path (``Ad(**doc)`` for every document, then FastAPI
+re-validating the result through ``response_model`` and encoding it with the
+stdlib ``json``) with the trusted-document fast path used by ``routes/ads.py``
+(project, fill defaults, encode with orjson). Only serialization is measured,
+so no database is needed.
+
+Usage (from the CrossPostMe directory):
+    python benchmarks/bench_list_serialization.py --items 100 --rounds 2000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+from models import (  # noqa: E402
+    Ad,
+    PaginatedAdsResponse,
+    PaginatedPostedAdsResponse,
+    PaginationInfo,
+    PostedAd,
+)
+from services.serialization import TrustedDocuments  # noqa: E402
+
+
+def make_docs(n: int):
+    ads, posted = [], []
+    for i in range(n):
+        ad = Ad(
+            title=f"Listing {i}",
+            description="A reasonably sized description " * 4,
+            price=10.0 + i,
+            category="electronics",
+            location="Austin, TX",
+            images=[f"https://cdn.example.com/{i}/{j}.jpg" for j in range(3)],
+            platforms=["facebook", "craigslist"],
+            owner_id="user-1",
+        )
+        ads.append({"_id": i, **ad.model_dump()})
+        pa = PostedAd(ad_id=ad.id, platform="facebook", metrics={"views": i})
+        posted.append({"_id": i, **pa.model_dump()})
+    return ads, posted
+
+
+def validated(model, response_model, docs, pagination) -> bytes:
+    """Previous behaviour: model per document, then response_model validation."""
+    response = response_model(
+        items=[model(**doc) for doc in docs], pagination=pagination
+    )
+    content = response_model.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(content)).encode("utf-8")
+
+
+def trusted(converter, docs, pagination) -> bytes:
+    """Current behaviour: trusted documents encoded with orjson."""
+    return ORJSONResponse(
+        {"items": converter(docs), "pagination": pagination.model_dump()}
+    ).body
+
+
+def timed(fn, rounds: int, docs, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        # The routes own the documents they fetch, so hand each round fresh dicts
+        fn(*args, [dict(d) for d in docs], PAGINATION)
+    return time.perf_counter() - start
+
+
+PAGINATION = PaginationInfo(
+    page=1,
+    per_page=100,
+    total_items=1000,
+    total_pages=10,
+    has_next=True,
+    has_prev=False,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    ads, posted = make_docs(args.items)
+    cases = [
+        ("ads", ads, (Ad, PaginatedAdsResponse), (TrustedDocuments(Ad),)),
+        (
+            "posted_ads",
+            posted,
+            (PostedAd, PaginatedPostedAdsResponse),
+            (TrustedDocuments(PostedAd),),
+        ),
+    ]
+    print(f"items per page: {args.items}, rounds: {args.rounds}")
+    for name, docs, old_args, new_args in cases:
+        before = timed(validated, args.rounds, docs, *old_args)
+        after = timed(trusted, args.rounds, docs, *new_args)
+        per_before = before / args.rounds * 1000
+        per_after = after / args.rounds * 1000
+        print(
+            f"{name:11s} validated: {per_before:6.2f} ms/page  "
+            f"trusted: {per_after:6.2f} ms/page  speedup: {before / after:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark scheduled-post task throughput with and without a persistent DB client.
+
+Compares the previous pattern (``asyncio.run`` plus a new AsyncIOMotorClient for
+every task) with the worker-lifetime loop and client used by ``tasks.py``. Runs
+the task bodies in-process against a real MongoDB, so no broker is needed.
+
+Usage (from the CrossPostMe directory):
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=crosspostme_bench \
+        python benchmarks/bench_worker_db.py --tasks 200
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+import tasks  # noqa: E402
+
+POST = {"content": "benchmark", "platforms": ["twitter"], "media_urls": []}
+SCHEDULED_TIME = "2030-01-01T00:00:00+00:00"
+
+
+def per_task_client(n: int) -> float:
+    """Previous behaviour: a fresh event loop and Motor client per task."""
+
+    async def one():
+        client = AsyncIOMotorClient(tasks.mongo_url)
+        try:
+            await tasks.store_scheduled_post(
+                POST, SCHEDULED_TIME, db=client[tasks.db_name]
+            )
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    for _ in range(n):
+        asyncio.run(one())
+    return time.perf_counter() - start
+
+
+def persistent_client(n: int) -> float:
+    """Current behaviour: worker-lifetime loop and client shared by all tasks."""
+    tasks.init_worker_db()
+    try:
+        # Warm the pool once, as the first task in a worker would
+        tasks.run_async(tasks.worker_db().command("ping"))
+        start = time.perf_counter()
+        for _ in range(n):
+            tasks.schedule_post(POST, SCHEDULED_TIME)
+        return time.perf_counter() - start
+    finally:
+        tasks.close_worker_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    if not tasks.mongo_url or not tasks.db_name:
+        sys.exit("MONGO_URL and DB_NAME must be set")
+
+    before = per_task_client(args.tasks)
+    after = persistent_client(args.tasks)
+
+    print(f"tasks: {args.tasks}")
+    print(f"per-task client:   {args.tasks / before:8.1f} tasks/s ({before:.2f}s)")
+    print(f"persistent client: {args.tasks / after:8.1f} tasks/s ({after:.2f}s)")
+    print(f"speedup:           {before / after:8.1f}x")
+
+    cleanup = AsyncIOMotorClient(tasks.mongo_url)
+    asyncio.run(
+        cleanup[tasks.db_name].scheduled_posts.delete_many({"content": "benchmark"})
+    )
+    cleanup.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ from motor.motor_asyncio import AsyncIOMotorClient
 
 # Import routers so the lightweight app exposes the same API surface as server.py
 from routes import ads, ai, auth, platforms
+from routes.dependencies import close_rate_limiter
+from services.indexes import ensure_indexes
+from services.mermaid_render import close_mermaid_renderer
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +49,9 @@ async def startup():
     app.state.db = _client[config.get_db_name()]
     logger.info(f"Connected to MongoDB database: {config.get_db_name()}")
 
+    # Create indexes backing the paginated listings
+    await ensure_indexes(app.state.db)
+
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
@@ -55,6 +61,9 @@ async def shutdown_db_client():
         _client.close()
         logger.info("MongoDB connection closed")
 
+    await close_rate_limiter()
+    await close_mermaid_renderer()
+
 
 @app.get("/health")
 async def health_check():
@@ -37,6 +37,8 @@ class Ad(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     scheduled_time: Optional[datetime] = None
     auto_renew: bool = False
+    version: int = 1  # Incremented on every content update
+    posted_platforms: List[str] = []  # Platforms this ad has been posted to
 
 
 class AdCreate(BaseModel):
@@ -72,6 +74,7 @@ class PostedAd(BaseModel):
     platform: str
     platform_ad_id: Optional[str] = None
     post_url: Optional[str] = None
+    owner_id: Optional[str] = None
     posted_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = "active"  # active, expired, removed, flagged
     views: int = 0
@@ -88,6 +91,28 @@ class PostedAdCreate(BaseModel):
     metrics: Optional[Dict[str, Any]] = None
 
 
+# Bulk import Models
+class AdImportRowError(BaseModel):
+    row: int  # NDJSON line number or CSV data row number
+    error: str
+
+
+class AdImportJob(BaseModel):
+    id: str
+    format: str  # ndjson, csv
+    status: str  # running, completed, failed
+    processed: int = 0
+    inserted: int = 0
+    duplicates: int = 0  # Rows already written by an earlier attempt
+    failed: int = 0
+    errors: List[AdImportRowError] = []
+    errors_truncated: bool = False
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+
 # Analytics Models
 class AdAnalytics(BaseModel):
     ad_id: str
@@ -129,10 +154,12 @@ class AIAdResponse(BaseModel):
 class PaginationInfo(BaseModel):
     page: int
     per_page: int
-    total_items: int
-    total_pages: int
+    # Totals are optional in cursor mode, where counting is opt-in
+    total_items: Optional[int] = None
+    total_pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
 
 
 class PaginatedAdsResponse(BaseModel):
@@ -1,14 +1,25 @@
+import json
 import math
-import os
 import random
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from models import (
     Ad,
     AdAnalytics,
     AdCreate,
+    AdImportJob,
     AdUpdate,
     DashboardStats,
     PaginatedAdsResponse,
@@ -18,10 +29,75 @@ from models import (
     PostedAdCreate,
 )
 from routes.dependencies import get_current_user, get_db, rate_limit_dependency
-from services.diagram import generate_ad_mermaid
+from services.ad_import import (
+    AdImport,
+    ImportInProgress,
+    UploadTooLarge,
+    get_import_job,
+    get_import_job_by_key,
+    spool_upload,
+)
+from services.diagram import diagram_cache, iter_ad_diagrams, load_ad_diagram
+from services.mermaid_render import (
+    MermaidRendererBusy,
+    MermaidRenderError,
+    MermaidRenderTimeout,
+    get_mermaid_renderer,
+)
+from services.pagination import cached_count, fetch_keyset_page
+from services.serialization import TrustedDocuments
+from services.sharding import shard_key
+from services.stats import increment_stats, load_dashboard_stats
 
 router = APIRouter(prefix="/api/ads", tags=["ads"])
 
+# List endpoints serialize stored documents directly (see services.serialization)
+trusted_ads = TrustedDocuments(Ad)
+trusted_posted_ads = TrustedDocuments(PostedAd)
+
+
+def _page_response(items: list, pagination: PaginationInfo) -> ORJSONResponse:
+    return ORJSONResponse({"items": items, "pagination": pagination.model_dump()})
+
+
+async def _keyset_page(
+    collection,
+    query: dict,
+    sort_field: str,
+    page: int,
+    per_page: int,
+    cursor: str,
+    include_total: bool,
+    projection: Optional[dict] = None,
+):
+    """Fetch a cursor-mode page and its PaginationInfo.
+
+    An empty cursor starts from the first page. The total is only counted when
+    requested, and then served from a short-lived cache.
+    """
+    try:
+        docs, next_cursor = await fetch_keyset_page(
+            collection, query, sort_field, per_page, cursor or None, projection
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    total_items = total_pages = None
+    if include_total:
+        total_items = await cached_count(collection, query)
+        total_pages = math.ceil(total_items / per_page)
+
+    pagination = PaginationInfo(
+        page=page,
+        per_page=per_page,
+        total_items=total_items,
+        total_pages=total_pages,
+        has_next=next_cursor is not None,
+        has_prev=bool(cursor),
+        next_cursor=next_cursor,
+    )
+    return docs, pagination
+
 
 # Create Ad
 @router.post("/", response_model=Ad)
@@ -36,9 +112,98 @@ async def create_ad(
         ad_dict["owner_id"] = current_user
     ad_obj = Ad(**ad_dict)
     await database.ads.insert_one(ad_obj.dict())
+    await increment_stats(
+        database,
+        ad_obj.owner_id,
+        total_ads=1,
+        active_ads=1 if ad_obj.status == "posted" else 0,
+    )
     return ad_obj
 
 
+# Bulk import ads from an NDJSON or CSV upload. Answers 202 with the job id (and
+# a Location to poll) once the upload is received; rows are imported afterwards.
+@router.post("/import", response_model=AdImportJob, status_code=202)
+async def import_ads(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    format: Optional[str] = Query(
+        None,
+        pattern="^(ndjson|csv)$",
+        description="Upload format; defaults from Content-Type (text/csv or NDJSON)",
+    ),
+    idempotency_key: Optional[str] = Header(None, max_length=200),
+    current_user: Optional[str] = Depends(get_current_user),
+    database=Depends(get_db),
+    _rl=Depends(rate_limit_dependency(capacity=5, per_seconds=60)),
+):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    job = AdImport(database, current_user, format, idempotency_key)
+    location = request.url.path.rstrip("/") + "/" + job.job_id
+    try:
+        existing = await job.start()
+    except ImportInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "An import with this Idempotency-Key is already running",
+                "job_id": job.job_id,
+            },
+            headers={"Location": location},
+        )
+    response.headers["Location"] = location
+    if existing is not None:
+        # Completed earlier with the same key; the upload is not re-processed
+        response.status_code = 200
+        return AdImportJob(**existing)
+
+    try:
+        spool = await spool_upload(request.stream())
+    except UploadTooLarge as e:
+        await job.fail(e)
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        await job.fail(e)
+        raise
+    background_tasks.add_task(job.run_spooled, spool)
+    return AdImportJob(**await get_import_job(database, job.job_id))
+
+
+# Look up a bulk import job by the Idempotency-Key it was started with. The job
+# exists as soon as the import request arrives, before the upload is received.
+@router.get("/import", response_model=AdImportJob)
+async def get_import_status_by_key(
+    idempotency_key: str = Header(..., max_length=200),
+    current_user: Optional[str] = Depends(get_current_user),
+    database=Depends(get_db),
+):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    job = await get_import_job_by_key(database, current_user, idempotency_key)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return AdImportJob(**job)
+
+
+# Poll a bulk import job
+@router.get("/import/{job_id}", response_model=AdImportJob)
+async def get_import_status(
+    job_id: str,
+    current_user: Optional[str] = Depends(get_current_user),
+    database=Depends(get_db),
+):
+    job = await get_import_job(database, job_id)
+    if not job or job.get("owner_id") != current_user:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return AdImportJob(**job)
+
+
 # Get All Ads with Pagination
 @router.get("/", response_model=PaginatedAdsResponse)
 async def get_ads(
@@ -46,6 +211,10 @@ async def get_ads(
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     status: str = Query(None, description="Filter by status"),
     platform: str = Query(None, description="Filter by platform"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor; pass an empty value to start cursor mode"
+    ),
+    include_total: bool = Query(False, description="Count total items (cursor mode)"),
     database=Depends(get_db),
 ):
     query = {}
@@ -54,6 +223,19 @@ async def get_ads(
     if platform:
         query["platforms"] = platform
 
+    if cursor is not None:
+        ads, pagination = await _keyset_page(
+            database.ads,
+            query,
+            "created_at",
+            page,
+            per_page,
+            cursor,
+            include_total,
+            trusted_ads.projection,
+        )
+        return _page_response(trusted_ads(ads), pagination)
+
     # Calculate pagination
     skip = (page - 1) * per_page
     total_items = await database.ads.count_documents(query)
@@ -61,7 +243,7 @@ async def get_ads(
 
     # Get paginated results
     ads = (
-        await database.ads.find(query)
+        await database.ads.find(query, trusted_ads.projection)
         .sort("created_at", -1)
         .skip(skip)
         .limit(per_page)
@@ -78,7 +260,7 @@ async def get_ads(
         has_prev=page > 1,
     )
 
-    return PaginatedAdsResponse(items=[Ad(**ad) for ad in ads], pagination=pagination)
+    return _page_response(trusted_ads(ads), pagination)
 
 
 # Get Ad by ID
@@ -107,7 +289,19 @@ async def update_ad(
 
     update_data = ad_update.dict(exclude_unset=True)
     if update_data:
-        await database.ads.update_one({"id": ad_id}, {"$set": update_data})
+        previous = await database.ads.find_one_and_update(
+            {"id": ad_id}, {"$set": update_data, "$inc": {"version": 1}}
+        )
+        diagram_cache.invalidate(ad_id)
+        if previous and "status" in update_data:
+            was_active = previous.get("status") == "posted"
+            is_active = update_data["status"] == "posted"
+            if was_active != is_active:
+                await increment_stats(
+                    database,
+                    previous.get("owner_id"),
+                    active_ads=1 if is_active else -1,
+                )
 
     updated_ad = await database.ads.find_one({"id": ad_id})
     return Ad(**updated_ad)
@@ -125,9 +319,16 @@ async def delete_ad(
         raise HTTPException(status_code=404, detail="Ad not found")
     if ad.get("owner_id") and current_user != ad.get("owner_id"):
         raise HTTPException(status_code=403, detail="Not authorized to delete this ad")
-    result = await database.ads.delete_one({"id": ad_id})
-    if result.deleted_count == 0:
+    deleted = await database.ads.find_one_and_delete({"id": ad_id})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Ad not found")
+    diagram_cache.invalidate(ad_id)
+    await increment_stats(
+        database,
+        deleted.get("owner_id"),
+        total_ads=-1,
+        active_ads=-1 if deleted.get("status") == "posted" else 0,
+    )
     return {"message": "Ad deleted successfully"}
 
 
@@ -153,6 +354,7 @@ async def post_ad(
         "platform": platform,
         "platform_ad_id": f"{platform}_{random.randint(100000, 999999)}",
         "post_url": f"https://{platform}.com/listing/{random.randint(100000, 999999)}",
+        "owner_id": ad.get("owner_id"),
         "metrics": {},
     }
     # merge provided posted metrics if present
@@ -160,10 +362,34 @@ async def post_ad(
         posted_ad_dict["metrics"].update(posted.metrics)
 
     posted_ad = PostedAd(**posted_ad_dict)
-    await database.posted_ads.insert_one(posted_ad.dict())
-
-    # Update ad status
-    await database.ads.update_one({"id": ad_id}, {"$set": {"status": "posted"}})
+    posted_doc = posted_ad.dict()
+    # Lets metrics poller replicas select their share server-side
+    posted_doc["shard_key"] = shard_key(posted_ad.id)
+    await database.posted_ads.insert_one(posted_doc)
+
+    # Update ad status and its posted platform set (used to key cached diagrams)
+    previous = await database.ads.find_one_and_update(
+        {"id": ad_id},
+        {"$set": {"status": "posted"}, "$addToSet": {"posted_platforms": platform}},
+    )
+    if previous is not None and previous.get("posted_platforms") is None:
+        # Ads posted before posted_platforms existed: backfill from posted_ads
+        platforms = await database.posted_ads.distinct("platform", {"ad_id": ad_id})
+        await database.ads.update_one(
+            {"id": ad_id}, {"$addToSet": {"posted_platforms": {"$each": platforms}}}
+        )
+    diagram_cache.invalidate(ad_id)
+
+    # Only a transition into "posted" counts as a new active ad
+    became_active = previous is not None and previous.get("status") != "posted"
+    await increment_stats(
+        database,
+        ad.get("owner_id"),
+        total_posts=1,
+        active_ads=1 if became_active else 0,
+        total_views=posted_ad.views,
+        total_leads=posted_ad.leads,
+    )
 
     return posted_ad
 
@@ -182,13 +408,13 @@ async def get_user_ads(
         raise HTTPException(status_code=403, detail="Not authorized to view these ads")
     skip = (page - 1) * per_page
     ads = (
-        await database.ads.find({"owner_id": user_id})
+        await database.ads.find({"owner_id": user_id}, trusted_ads.projection)
         .sort("created_at", -1)
         .skip(skip)
         .limit(per_page)
         .to_list(per_page)
     )
-    return [Ad(**a) for a in ads]
+    return ORJSONResponse(trusted_ads(ads))
 
 
 # Generate diagrams for all ads owned by a user
@@ -197,6 +423,11 @@ async def get_user_diagrams(
     user_id: str,
     page: int = Query(1, ge=1, description="Page number for diagrams"),
     per_page: int = Query(25, ge=1, le=100, description="Diagrams per page"),
+    format: str = Query(
+        "json",
+        pattern="^(json|ndjson)$",
+        description="`ndjson` streams one diagram per line as it is ready",
+    ),
     current_user: Optional[str] = Depends(get_current_user),
     database=Depends(get_db),
     _rl=Depends(rate_limit_dependency(capacity=10, per_seconds=60)),
@@ -211,52 +442,31 @@ async def get_user_diagrams(
     skip = (page - 1) * per_page
     limit = min(per_page, MAX_ADS_PER_REQUEST)
     ads = (
-        await database.ads.find({"owner_id": user_id})
+        database.ads.find({"owner_id": user_id})
         .sort("created_at", -1)
         .skip(skip)
         .limit(limit)
-        .to_list(limit)
     )
-    if not ads:
-        return {}
-
-    # Batch fetch all posted_ads for these ads in a single query to avoid N+1
-    ad_ids = [a.get("id") for a in ads if a.get("id")]
-    posted_cursor = database.posted_ads.find({"ad_id": {"$in": ad_ids}})
-    posted_list = await posted_cursor.to_list(length=2000)
 
-    # Group posted ads by ad_id
-    from collections import defaultdict
+    # Diagrams are memoized per ad; only misses are regenerated
+    diagrams = iter_ad_diagrams(database, ads)
 
-    posted_by_ad = defaultdict(list)
-    for pa in posted_list:
-        posted_by_ad[pa.get("ad_id")].append(pa)
+    if format == "ndjson":
 
-    # Generate diagrams concurrently for responsiveness
-    import asyncio
+        async def stream():
+            async for pid, mermaid in diagrams:
+                yield json.dumps({"ad_id": pid, "mermaid": mermaid}) + "\n"
 
-    async def make_diagram(ad):
-        pid = ad.get("id")
-        posted = posted_by_ad.get(pid, [])
-        # generate_ad_mermaid is CPU/lightweight; if it becomes heavy consider offloading
-        return pid, generate_ad_mermaid(ad, posted)
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-    tasks = [make_diagram(a) for a in ads]
-    results = await asyncio.gather(*tasks)
+    return {pid: mermaid async for pid, mermaid in diagrams}
 
-    diagrams = {pid: mer for pid, mer in results}
-    return diagrams
 
-
-# Render Mermaid to SVG (requires `mmdc` to be installed and available in PATH)
+# Render Mermaid to SVG (requires Mermaid CLI; see ENVIRONMENT_CONFIG.md)
 @router.post("/render/svg")
 async def render_mermaid_svg(mermaid_text: str):
-    import asyncio
-    import shutil
-    import tempfile
-
-    mmdc = shutil.which("mmdc")
-    if not mmdc:
+    renderer = get_mermaid_renderer()
+    if renderer is None:
         raise HTTPException(
             status_code=501,
             detail="Mermaid CLI (mmdc) not installed on server. Install it to use SVG rendering.",
@@ -273,44 +483,17 @@ async def render_mermaid_svg(mermaid_text: str):
             detail=f"Mermaid input too large (max {MAX_INPUT_SIZE} bytes)",
         )
 
-    # Use asyncio subprocess to avoid blocking the event loop and apply a timeout
-    src = None
-    dst = None
+    # Cached by content hash; misses are rendered by the bounded worker pool
     try:
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mmd", delete=False) as f:
-            f.write(mermaid_text)
-            src = f.name
-        dst = src + ".svg"
-
-        proc = await asyncio.create_subprocess_exec(mmdc, "-i", src, "-o", dst)
-
-        try:
-            await asyncio.wait_for(proc.wait(), timeout=10)
-        except asyncio.TimeoutError:
-            proc.kill()
-            raise HTTPException(status_code=504, detail="SVG rendering timed out")
-
-        if proc.returncode != 0:
-            raise HTTPException(
-                status_code=500, detail="Mermaid CLI failed to render SVG"
-            )
-
-        # Read resulting file safely
-        loop = asyncio.get_running_loop()
-        with open(dst, "rb") as svgf:
-            data = await loop.run_in_executor(None, svgf.read)
+        data = await renderer.render(mermaid_text)
+    except MermaidRendererBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except MermaidRenderTimeout:
+        raise HTTPException(status_code=504, detail="SVG rendering timed out")
+    except MermaidRenderError:
+        raise HTTPException(status_code=500, detail="Mermaid CLI failed to render SVG")
 
-        return Response(content=data, media_type="image/svg+xml")
-
-    finally:
-        # Best-effort cleanup
-        try:
-            if src and os.path.exists(src):
-                os.remove(src)
-            if dst and os.path.exists(dst):
-                os.remove(dst)
-        except Exception:
-            pass
+    return Response(content=data, media_type="image/svg+xml")
 
 
 # Get Posted Ads with Pagination
@@ -319,17 +502,34 @@ async def get_posted_ads(
     ad_id: str,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor; pass an empty value to start cursor mode"
+    ),
+    include_total: bool = Query(False, description="Count total items (cursor mode)"),
     database=Depends(get_db),
 ):
+    query = {"ad_id": ad_id}
+    if cursor is not None:
+        posted_ads, pagination = await _keyset_page(
+            database.posted_ads,
+            query,
+            "posted_at",
+            page,
+            per_page,
+            cursor,
+            include_total,
+            trusted_posted_ads.projection,
+        )
+        return _page_response(trusted_posted_ads(posted_ads), pagination)
+
     # Calculate pagination
     skip = (page - 1) * per_page
-    query = {"ad_id": ad_id}
     total_items = await database.posted_ads.count_documents(query)
     total_pages = math.ceil(total_items / per_page)
 
     # Get paginated results
     posted_ads = (
-        await database.posted_ads.find(query)
+        await database.posted_ads.find(query, trusted_posted_ads.projection)
         .sort("posted_at", -1)
         .skip(skip)
         .limit(per_page)
@@ -346,9 +546,7 @@ async def get_posted_ads(
         has_prev=page > 1,
     )
 
-    return PaginatedPostedAdsResponse(
-        items=[PostedAd(**pa) for pa in posted_ads], pagination=pagination
-    )
+    return _page_response(trusted_posted_ads(posted_ads), pagination)
 
 
 # Get All Posted Ads with Pagination
@@ -357,12 +555,29 @@ async def get_all_posted_ads(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     platform: str = Query(None, description="Filter by platform"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor; pass an empty value to start cursor mode"
+    ),
+    include_total: bool = Query(False, description="Count total items (cursor mode)"),
     database=Depends(get_db),
 ):
     query = {}
     if platform:
         query["platform"] = platform
 
+    if cursor is not None:
+        posted_ads, pagination = await _keyset_page(
+            database.posted_ads,
+            query,
+            "posted_at",
+            page,
+            per_page,
+            cursor,
+            include_total,
+            trusted_posted_ads.projection,
+        )
+        return _page_response(trusted_posted_ads(posted_ads), pagination)
+
     # Calculate pagination
     skip = (page - 1) * per_page
     total_items = await database.posted_ads.count_documents(query)
@@ -370,7 +585,7 @@ async def get_all_posted_ads(
 
     # Get paginated results
     posted_ads = (
-        await database.posted_ads.find(query)
+        await database.posted_ads.find(query, trusted_posted_ads.projection)
         .sort("posted_at", -1)
         .skip(skip)
         .limit(per_page)
@@ -387,35 +602,23 @@ async def get_all_posted_ads(
         has_prev=page > 1,
     )
 
-    return PaginatedPostedAdsResponse(
-        items=[PostedAd(**pa) for pa in posted_ads], pagination=pagination
-    )
+    return _page_response(trusted_posted_ads(posted_ads), pagination)
 
 
 # Get Dashboard Stats
 @router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(database=Depends(get_db)):
-    total_ads = await database.ads.count_documents({})
-    active_ads = await database.ads.count_documents({"status": "posted"})
-    total_posts = await database.posted_ads.count_documents({})
-
-    # Calculate total views and leads
-    posted_ads = await database.posted_ads.find({}).to_list(1000)
-    total_views = sum(pa.get("views", 0) for pa in posted_ads)
-    total_leads = sum(pa.get("leads", 0) for pa in posted_ads)
-
-    # Count unique platforms
-    platforms = await database.platform_accounts.distinct("platform")
-    platforms_connected = len(platforms)
-
-    return DashboardStats(
-        total_ads=total_ads,
-        active_ads=active_ads,
-        total_posts=total_posts,
-        total_views=total_views,
-        total_leads=total_leads,
-        platforms_connected=platforms_connected,
-    )
+async def get_dashboard_stats(
+    current_user: Optional[str] = Depends(get_current_user),
+    database=Depends(get_db),
+):
+    """Serve counters from the incrementally maintained stats documents.
+
+    Authenticated callers get their own totals; anonymous callers get the
+    global totals. A missing or never rebuilt stats document is rebuilt with
+    $group pipelines.
+    """
+    stats = await load_dashboard_stats(database, current_user)
+    return DashboardStats(**stats)
 
 
 # Get Ad Analytics
@@ -479,10 +682,7 @@ async def get_ad_diagram(
             status_code=403, detail="Not authorized to view this diagram"
         )
 
-    # Get recent posted_ads for the ad (limit to 1000)
-    posted_ads = await database.posted_ads.find({"ad_id": ad_id}).to_list(1000)
-
-    mermaid = generate_ad_mermaid(ad, posted_ads)
+    mermaid = await load_ad_diagram(database, ad)
 
     # Return raw Mermaid markdown (caller can wrap in triple backticks if needed)
     return mermaid
@@ -1,9 +1,12 @@
-import asyncio
-import time
 from typing import Any, Optional
 
 from fastapi import Header, HTTPException, Request
-from services.auth import verify_token
+from services.auth import token_digest, verify_token
+from services.rate_limit import (
+    InMemoryRateLimiter,
+    RateLimiterBackend,
+    create_rate_limiter,
+)
 
 
 async def get_db(request: Request) -> Any:
@@ -16,73 +19,85 @@ async def get_db(request: Request) -> Any:
     return db
 
 
+def _bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    parts = authorization.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None
+    return parts[1]
+
+
+def resolve_user(request: Request, token: str) -> Optional[str]:
+    """Verify `token` at most once per request, memoizing on request.state."""
+    memo = getattr(request.state, "auth_memo", None)
+    if memo is None:
+        memo = request.state.auth_memo = {}
+    if token not in memo:
+        memo[token] = verify_token(token)
+    return memo[token]
+
+
 async def get_current_user(
+    request: Request,
     authorization: Optional[str] = Header(None),
 ) -> Optional[str]:
     """Extract the user id from a Bearer token using services.auth.verify_token.
 
     Returns None if no valid Authorization header or token.
     """
-    if not authorization:
-        return None
-    parts = authorization.split()
-    if len(parts) != 2 or parts[0].lower() != "bearer":
+    token = _bearer_token(authorization)
+    if token is None:
         return None
-    token = parts[1]
-    return verify_token(token)
+    return resolve_user(request, token)
 
 
-class RateLimiter:
-    """Very small in-memory token-bucket rate limiter for single-process dev use.
+# Kept for backwards compatibility with imports of the original dev limiter
+RateLimiter = InMemoryRateLimiter
+
+_GLOBAL_RATE_LIMITER: Optional[RateLimiterBackend] = None
 
-    For production use a centralized store (Redis) keyed by user or IP.
-    """
 
-    def __init__(self) -> None:
-        self._buckets: dict[str, tuple[float, float]] = {}
-        self._lock = asyncio.Lock()
+def get_rate_limiter() -> RateLimiterBackend:
+    """Return the process-wide limiter, creating the configured backend lazily."""
+    global _GLOBAL_RATE_LIMITER
+    if _GLOBAL_RATE_LIMITER is None:
+        _GLOBAL_RATE_LIMITER = create_rate_limiter()
+    return _GLOBAL_RATE_LIMITER
 
-    async def allow(self, key: str, capacity: int, per_seconds: int) -> bool:
-        now = time.time()
-        async with self._lock:
-            tokens, last = self._buckets.get(key, (float(capacity), now))
-            elapsed = now - last
-            if elapsed > 0:
-                refill = (elapsed / per_seconds) * capacity
-                tokens = min(float(capacity), tokens + refill)
-            if tokens >= 1.0:
-                tokens -= 1.0
-                self._buckets[key] = (tokens, now)
-                return True
-            self._buckets[key] = (tokens, now)
-            return False
 
+def set_rate_limiter(limiter: Optional[RateLimiterBackend]) -> None:
+    """Replace the process-wide limiter (used by tests and app startup)."""
+    global _GLOBAL_RATE_LIMITER
+    _GLOBAL_RATE_LIMITER = limiter
 
-_GLOBAL_RATE_LIMITER = RateLimiter()
+
+async def close_rate_limiter() -> None:
+    """Release the limiter's backend connections during shutdown."""
+    global _GLOBAL_RATE_LIMITER
+    if _GLOBAL_RATE_LIMITER is not None:
+        await _GLOBAL_RATE_LIMITER.close()
+        _GLOBAL_RATE_LIMITER = None
 
 
 def rate_limit_dependency(capacity: int = 10, per_seconds: int = 60):
     """Factory that returns a FastAPI dependency enforcing a per-key rate limit.
 
-    Keying: if Authorization Bearer token present, use `user:{token}`, otherwise `ip:{ip}`.
+    Keying: if Authorization Bearer token present, use `user:{sha256(token)}`,
+    otherwise `ip:{ip}`.
     """
 
     async def _dep(request: Request, authorization: Optional[str] = Header(None)):
-        if authorization:
-            parts = authorization.split()
-            token = (
-                parts[1] if len(parts) == 2 and parts[0].lower() == "bearer" else None
-            )
-        else:
-            token = None
+        token = _bearer_token(authorization)
         if token:
-            key = f"user:{token}"
+            # Hash the token so raw credentials never end up as limiter keys
+            key = "user:" + token_digest(token)[:32]
         else:
             client = getattr(request, "client", None)
             ip = client.host if client is not None else "unknown"
             key = f"ip:{ip}"
 
-        allowed = await _GLOBAL_RATE_LIMITER.allow(key, capacity, per_seconds)
+        allowed = await get_rate_limiter().allow(key, capacity, per_seconds)
         if not allowed:
             raise HTTPException(status_code=429, detail="Too many requests")
 
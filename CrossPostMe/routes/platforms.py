@@ -4,6 +4,7 @@ from config import AVAILABLE_PLATFORMS
 from fastapi import APIRouter, Depends, HTTPException
 from models import PlatformAccount, PlatformAccountCreate
 from routes.dependencies import get_db
+from services.stats import increment_platform_accounts
 
 router = APIRouter(prefix="/api/platforms", tags=["platforms"])
 
@@ -19,6 +20,7 @@ async def create_platform_account(
     account_dict = account.dict()
     account_obj = PlatformAccount(**account_dict)
     await database.platform_accounts.insert_one(account_obj.dict())
+    await increment_platform_accounts(database, account_obj.platform, 1)
     return account_obj
 
 
@@ -58,9 +60,10 @@ async def update_account_status(account_id: str, status: str, database=Depends(g
 # Delete Platform Account
 @router.delete("/accounts/{account_id}")
 async def delete_platform_account(account_id: str, database=Depends(get_db)):
-    result = await database.platform_accounts.delete_one({"id": account_id})
-    if result.deleted_count == 0:
+    deleted = await database.platform_accounts.find_one_and_delete({"id": account_id})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Account not found")
+    await increment_platform_accounts(database, deleted.get("platform"), -1)
     return {"message": "Account deleted successfully"}
 
 
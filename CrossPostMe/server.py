@@ -13,6 +13,9 @@ from models import (
 )
 from motor.motor_asyncio import AsyncIOMotorClient
 from routes import ads, ai, auth, platforms
+from routes.dependencies import close_rate_limiter
+from services.indexes import ensure_indexes
+from services.mermaid_render import close_mermaid_renderer
 from starlette.middleware.cors import CORSMiddleware
 
 # Global client variable for shutdown; database is stored on app.state
@@ -138,6 +141,9 @@ async def startup():
     app.state.db = client[config.get_db_name()]
     logger.info(f"Connected to MongoDB database: {config.get_db_name()}")
 
+    # Create indexes backing the paginated listings
+    await ensure_indexes(app.state.db)
+
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
@@ -145,3 +151,6 @@ async def shutdown_db_client():
     if client:
         client.close()
         logger.info("MongoDB connection closed")
+
+    await close_rate_limiter()
+    await close_mermaid_renderer()
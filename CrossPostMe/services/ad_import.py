@@ -0,0 +1,376 @@
+import codecs
+import csv
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from models import Ad, AdCreate
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from services.stats import increment_stats
+
+logger = logging.getLogger(__name__)
+
+# Bulk ad import. The job document is created before the upload is read, and the
+# upload is spooled (in memory, or a temporary file once large) so the request
+# can answer 202 with the job id as soon as it has been received. The rows are
+# then parsed (NDJSON or CSV) and validated with AdCreate in the background, and
+# valid rows are written with unordered insert_many batches. Progress is
+# recorded on the job document after every batch so it can be polled.
+#
+# With an idempotency key the job id and every ad id are derived from the key,
+# so the job can be looked up by key while the upload is still being sent, and
+# retrying an interrupted import resumes it: rows already written are rejected
+# by the unique index on ads.id and reported as duplicates.
+
+JOBS_COLLECTION = "ad_import_jobs"
+BATCH_SIZE = int(os.environ.get("AD_IMPORT_BATCH_SIZE", "1000"))
+MAX_ROWS = int(os.environ.get("AD_IMPORT_MAX_ROWS", "100000"))
+MAX_REPORTED_ERRORS = int(os.environ.get("AD_IMPORT_MAX_ERRORS", "1000"))
+# A running job not updated for this long is assumed dead and may be retried
+STALE_SECONDS = float(os.environ.get("AD_IMPORT_STALE_SECONDS", "600"))
+MAX_UPLOAD_BYTES = int(os.environ.get("AD_IMPORT_MAX_BYTES", str(256 * 1024 * 1024)))
+# Uploads larger than this are spooled to a temporary file instead of memory
+SPOOL_MEMORY_BYTES = int(
+    os.environ.get("AD_IMPORT_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024))
+)
+SPOOL_CHUNK_BYTES = 64 * 1024
+
+FORMATS = ("ndjson", "csv")
+LIST_FIELDS = ("images", "platforms")
+_DUPLICATE_KEY = 11000
+
+
+class ImportInProgress(Exception):
+    """Another request is already running the import for this idempotency key."""
+
+
+class UploadTooLarge(Exception):
+    """The upload is larger than AD_IMPORT_MAX_BYTES."""
+
+
+def job_id_for(owner_id: str, idempotency_key: Optional[str]) -> str:
+    if not idempotency_key:
+        return str(uuid.uuid4())
+    return str(
+        uuid.uuid5(uuid.NAMESPACE_URL, f"ad-import:{owner_id}:{idempotency_key}")
+    )
+
+
+def _row_ad_id(job_id: str, row: int, keyed: bool) -> str:
+    if not keyed:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job_id}:{row}"))
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}"
+        for err in e.errors()
+    )
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, keeping their line endings."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        lines = (buffer + decoder.decode(chunk)).splitlines(keepends=True)
+        # Hold back an unterminated tail until the rest of it arrives, and a
+        # trailing "\r" in case the chunk split a "\r\n"
+        if lines and not lines[-1].endswith("\n"):
+            buffer = lines.pop()
+        else:
+            buffer = ""
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def parse_ndjson(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (line number, row, error) for each non-blank line."""
+    number = 0
+    async for line in _lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "row must be a JSON object"
+            continue
+        yield number, row, None
+
+
+def _csv_row(header: List[str], values: List[str]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {}
+    for name, value in zip(header, values):
+        value = value.strip()
+        if not value:
+            # Empty cells fall back to the model default
+            continue
+        if name in LIST_FIELDS:
+            row[name] = [v.strip() for v in value.split("|") if v.strip()]
+        else:
+            row[name] = value
+    return row
+
+
+async def parse_csv(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (data row number, row, error) for each CSV record after the header.
+
+    List columns (images, platforms) hold `|`-separated values. Quoted fields may
+    span lines; a record is complete once its quotes are balanced.
+    """
+    header: Optional[List[str]] = None
+    number = 0
+    record = ""
+    async for line in _lines(chunks):
+        record += line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]), [])
+        if header is None:
+            header = [h.strip().lstrip("\ufeff") for h in values]
+            continue
+        number += 1
+        if len(values) > len(header):
+            yield number, None, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield number, _csv_row(header, values), None
+    if record.strip():
+        yield number + 1, None, "unterminated quoted field"
+
+
+PARSERS = {"ndjson": parse_ndjson, "csv": parse_csv}
+
+
+async def spool_upload(
+    chunks: AsyncIterator[bytes], max_bytes: int = MAX_UPLOAD_BYTES
+) -> IO[bytes]:
+    """Buffer an upload so it can be imported after the response is sent."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+async def _read_spool(spool: IO[bytes]) -> AsyncIterator[bytes]:
+    while True:
+        chunk = spool.read(SPOOL_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+class AdImport:
+    """One import run: validates rows, batches inserts and records progress."""
+
+    def __init__(
+        self,
+        db: Any,
+        owner_id: str,
+        fmt: str,
+        idempotency_key: Optional[str] = None,
+        batch_size: int = BATCH_SIZE,
+        max_rows: int = MAX_ROWS,
+        max_errors: int = MAX_REPORTED_ERRORS,
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.db = db
+        self.owner_id = owner_id
+        self.format = fmt
+        self.idempotency_key = idempotency_key
+        self.job_id = job_id_for(owner_id, idempotency_key)
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.max_errors = max_errors
+        self.counts = {"processed": 0, "inserted": 0, "duplicates": 0, "failed": 0}
+        self._errors: List[Dict[str, Any]] = []
+        self._errors_truncated = False
+
+    @property
+    def jobs(self) -> Any:
+        return self.db[JOBS_COLLECTION]
+
+    async def start(self) -> Optional[Dict[str, Any]]:
+        """Create (or take over) the job document.
+
+        Returns the existing job when this idempotency key already completed, in
+        which case the upload must not be processed again. Raises
+        ImportInProgress when another request is still running it.
+        """
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": self.job_id,
+            "id": self.job_id,
+            "owner_id": self.owner_id,
+            "idempotency_key": self.idempotency_key,
+            "format": self.format,
+            "status": "running",
+            **self.counts,
+            "errors": [],
+            "errors_truncated": False,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+        }
+        try:
+            await self.jobs.insert_one(job)
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Retry of a keyed import: resume failed or abandoned runs only
+        stale = now - timedelta(seconds=STALE_SECONDS)
+        for immutable in ("_id", "created_at"):
+            job.pop(immutable)
+        claimed = await self.jobs.find_one_and_update(
+            {
+                "_id": self.job_id,
+                "$or": [
+                    {"status": "failed"},
+                    {"status": "running", "updated_at": {"$lt": stale}},
+                ],
+            },
+            {"$set": job},
+        )
+        if claimed is not None:
+            return None
+        existing = await self.jobs.find_one({"_id": self.job_id})
+        if existing is None or existing.get("status") == "running":
+            raise ImportInProgress(self.job_id)
+        return existing
+
+    def _row_error(self, row: int, message: str) -> None:
+        self.counts["failed"] += 1
+        if len(self._errors) < self.max_errors:
+            self._errors.append({"row": row, "error": message})
+        else:
+            self._errors_truncated = True
+
+    async def _flush(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        if not batch:
+            return
+        inserted = len(batch)
+        try:
+            await self.db.ads.insert_many([doc for _, doc in batch], ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            inserted -= len(write_errors)
+            for err in write_errors:
+                if err.get("code") == _DUPLICATE_KEY:
+                    self.counts["duplicates"] += 1
+                else:
+                    self._row_error(batch[err["index"]][0], err.get("errmsg", ""))
+        self.counts["inserted"] += inserted
+        await increment_stats(self.db, self.owner_id, total_ads=inserted)
+        await self._save()
+
+    async def _save(self, **fields: Any) -> None:
+        await self.jobs.update_one(
+            {"_id": self.job_id},
+            {
+                "$set": {
+                    **self.counts,
+                    "errors": self._errors,
+                    "errors_truncated": self._errors_truncated,
+                    "updated_at": datetime.now(timezone.utc),
+                    **fields,
+                }
+            },
+        )
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """Consume the upload and return the finished job document."""
+        keyed = bool(self.idempotency_key)
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        error = None
+        try:
+            async for number, row, parse_error in PARSERS[self.format](chunks):
+                if self.counts["processed"] >= self.max_rows:
+                    error = f"Import stopped after the {self.max_rows} row limit"
+                    break
+                self.counts["processed"] += 1
+                if parse_error is not None:
+                    self._row_error(number, parse_error)
+                    continue
+                try:
+                    ad = AdCreate.model_validate(row)
+                except ValidationError as e:
+                    self._row_error(number, _validation_message(e))
+                    continue
+                fields = ad.model_dump()
+                fields["owner_id"] = self.owner_id
+                fields["id"] = _row_ad_id(self.job_id, number, keyed)
+                batch.append((number, Ad(**fields).model_dump()))
+                if len(batch) >= self.batch_size:
+                    await self._flush(batch)
+                    batch = []
+            await self._flush(batch)
+        except Exception as e:
+            await self.fail(e)
+            raise
+        await self._save(
+            status="failed" if error else "completed",
+            error=error,
+            finished_at=datetime.now(timezone.utc),
+        )
+        return await self.jobs.find_one({"_id": self.job_id})
+
+    async def run_spooled(self, spool: IO[bytes]) -> None:
+        """Import a spooled upload; failures are recorded on the job document."""
+        try:
+            await self.run(_read_spool(spool))
+        except Exception:
+            # run() has already recorded and logged the failure
+            pass
+        finally:
+            spool.close()
+
+    async def fail(self, error: Exception) -> None:
+        """Mark the job failed, e.g. when the upload could not be received."""
+        logger.warning("Ad import %s failed: %s", self.job_id, error)
+        await self._save(
+            status="failed",
+            error=str(error) or type(error).__name__,
+            finished_at=datetime.now(timezone.utc),
+        )
+
+
+async def get_import_job(db: Any, job_id: str) -> Optional[Dict[str, Any]]:
+    return await db[JOBS_COLLECTION].find_one({"_id": job_id})
+
+
+async def get_import_job_by_key(
+    db: Any, owner_id: str, idempotency_key: str
+) -> Optional[Dict[str, Any]]:
+    """Find an owner's import by the Idempotency-Key it was started with."""
+    return await get_import_job(db, job_id_for(owner_id, idempotency_key))
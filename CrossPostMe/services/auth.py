@@ -1,12 +1,17 @@
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
 import jwt
 
 # Simple JWT-based auth utilities. For production, use a robust library and rotate secrets.
 JWT_SECRET = os.environ.get("JWT_SECRET", "dev-secret")
 JWT_ALGORITHM = "HS256"
+TOKEN_CACHE_SIZE = int(os.environ.get("JWT_CACHE_SIZE", "10000"))
 
 
 def create_token(user_id: str, expires_minutes: int = 60) -> str:
@@ -17,10 +22,81 @@ def create_token(user_id: str, expires_minutes: int = 60) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
-def verify_token(token: str) -> Optional[str]:
+def token_digest(token: str) -> str:
+    """SHA-256 of a token, used to key caches without storing the raw token."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """Bounded LRU of verified token claims, each kept until the token's `exp`.
+
+    Only successfully verified tokens are cached, so a hit is as trustworthy as
+    a fresh decode until the token expires.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    def put(self, digest: str, claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[digest] = (claims, float(exp))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+_TOKEN_CACHE = TokenCache()
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Return verified claims for `token`, or None if it is invalid or expired."""
+    digest = token_digest(token)
+    claims = _TOKEN_CACHE.get(digest)
+    if claims is not None:
+        return claims
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        sub = payload.get("sub")
-        return str(sub) if sub is not None else None
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except Exception:
         return None
+    _TOKEN_CACHE.put(digest, claims)
+    return claims
+
+
+def verify_token(token: str) -> Optional[str]:
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    sub = payload.get("sub")
+    return str(sub) if sub is not None else None
+
+
+def token_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters and current size of the verified-token cache."""
+    return _TOKEN_CACHE.stats()
@@ -1,4 +1,14 @@
-from typing import Dict, List
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
 
 
 def generate_ad_mermaid(ad: Dict, posted: List[Dict]) -> str:
@@ -33,3 +43,112 @@ def generate_ad_mermaid(ad: Dict, posted: List[Dict]) -> str:
     lines.append("    end")
 
     return "\n".join(lines)
+
+
+class DiagramCache:
+    """Per-process LRU of generated diagrams, one entry per ad.
+
+    Entries are validated against the ad's version and posted platform set, so a
+    stale diagram is never served even if another process changed the ad; the
+    write paths also invalidate explicitly to free the entry early.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Hashable, str]]" = OrderedDict()
+
+    @staticmethod
+    def key_for(ad: Dict) -> Optional[Hashable]:
+        """Cache key for an ad, or None for legacy ads without posted_platforms."""
+        platforms = ad.get("posted_platforms")
+        if platforms is None:
+            return None
+        return (ad.get("version", 0), tuple(sorted(platforms)))
+
+    def get(self, ad: Dict) -> Optional[str]:
+        ad_id = ad.get("id")
+        entry = self._entries.get(ad_id)
+        if entry is None:
+            return None
+        key, mermaid = entry
+        if key is None or key != self.key_for(ad):
+            return None
+        self._entries.move_to_end(ad_id)
+        return mermaid
+
+    def put(self, ad: Dict, mermaid: str) -> None:
+        key = self.key_for(ad)
+        ad_id = ad.get("id")
+        if key is None or not ad_id:
+            return
+        self._entries[ad_id] = (key, mermaid)
+        self._entries.move_to_end(ad_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, ad_id: str) -> None:
+        self._entries.pop(ad_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+diagram_cache = DiagramCache()
+
+
+async def iter_ad_diagrams(
+    database: Any, ads: AsyncIterable[Dict], chunk_size: int = 50
+) -> AsyncIterator[Tuple[str, str]]:
+    """Yield (ad_id, mermaid) for each ad, generating only cache misses.
+
+    Ads are processed in chunks as they arrive so callers can stream results.
+    Ads that record posted_platforms need no extra query; legacy ads have
+    their platforms fetched with one grouped posted_ads query per chunk.
+    """
+    chunk: List[Dict] = []
+    async for ad in ads:
+        cached = diagram_cache.get(ad)
+        if cached is not None:
+            yield ad.get("id"), cached
+            continue
+        chunk.append(ad)
+        if len(chunk) >= chunk_size:
+            for item in await _generate_chunk(database, chunk):
+                yield item
+            chunk = []
+    if chunk:
+        for item in await _generate_chunk(database, chunk):
+            yield item
+
+
+async def _generate_chunk(database: Any, ads: List[Dict]) -> List[Tuple[str, str]]:
+    legacy_ids = [a.get("id") for a in ads if a.get("posted_platforms") is None]
+    platforms_by_ad: Dict[str, List[str]] = {}
+    if legacy_ids:
+        rows = await database.posted_ads.aggregate(
+            [
+                {"$match": {"ad_id": {"$in": legacy_ids}}},
+                {"$group": {"_id": "$ad_id", "platforms": {"$push": "$platform"}}},
+            ]
+        ).to_list(None)
+        platforms_by_ad = {r["_id"]: r.get("platforms") or [] for r in rows}
+
+    results = []
+    for ad in ads:
+        ad_id = ad.get("id")
+        platforms = ad.get("posted_platforms")
+        if platforms is None:
+            platforms = platforms_by_ad.get(ad_id, [])
+        mermaid = generate_ad_mermaid(ad, [{"platform": p} for p in platforms])
+        diagram_cache.put(ad, mermaid)
+        results.append((ad_id, mermaid))
+    return results
+
+
+async def load_ad_diagram(database: Any, ad: Dict) -> str:
+    """Return the (possibly memoized) diagram for a single ad."""
+    cached = diagram_cache.get(ad)
+    if cached is not None:
+        return cached
+    [(_, mermaid)] = await _generate_chunk(database, [ad])
+    return mermaid
@@ -0,0 +1,43 @@
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Compound indexes created at startup. The ad listings sort by (timestamp, id)
+# descending, optionally behind an equality filter. An entry may be a
+# (keys, options) tuple to pass index options such as unique.
+INDEXES = {
+    "ads": [
+        # Bulk import relies on this to skip rows already written by a retry
+        ([("id", 1)], {"unique": True}),
+        [("created_at", -1), ("id", -1)],
+        [("owner_id", 1), ("created_at", -1), ("id", -1)],
+        [("status", 1), ("created_at", -1), ("id", -1)],
+    ],
+    "posted_ads": [
+        [("posted_at", -1), ("id", -1)],
+        [("ad_id", 1), ("posted_at", -1), ("id", -1)],
+        [("platform", 1), ("posted_at", -1), ("id", -1)],
+        # Metrics poller: select ads due for polling
+        [("last_polled", 1)],
+    ],
+    # Due-time dispatcher: range scans of upcoming posts and expired leases
+    "scheduled_posts": [
+        [("status", 1), ("scheduled_time", 1)],
+        [("status", 1), ("lease_expires_at", 1)],
+    ],
+}
+
+
+async def ensure_indexes(db: Any) -> None:
+    """Create the indexes the API relies on. Safe to call on every startup."""
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        for spec in specs:
+            keys, options = spec if isinstance(spec, tuple) else (spec, {})
+            try:
+                await collection.create_index(keys, **options)
+            except Exception as e:
+                logger.warning(
+                    "Failed to create index %s on %s: %s", keys, collection_name, e
+                )
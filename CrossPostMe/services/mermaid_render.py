@@ -0,0 +1,341 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Server-side Mermaid -> SVG rendering. Results are cached on disk by the SHA-256
+# of the diagram text, and misses are rendered by a fixed pool of workers fed
+# from a bounded queue. Each worker either keeps a Node renderer (with its
+# headless Chromium) alive across requests, or falls back to spawning `mmdc`.
+
+CACHE_DIR = os.environ.get(
+    "MERMAID_CACHE_DIR", os.path.join(tempfile.gettempdir(), "crosspostme-mermaid")
+)
+CACHE_MAX_BYTES = int(os.environ.get("MERMAID_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RENDER_WORKERS = int(os.environ.get("MERMAID_RENDER_WORKERS", "2"))
+RENDER_QUEUE_SIZE = int(os.environ.get("MERMAID_RENDER_QUEUE", "32"))
+RENDER_TIMEOUT = float(os.environ.get("MERMAID_RENDER_TIMEOUT", "10"))
+
+WORKER_SCRIPT = Path(__file__).with_name("mermaid_worker.mjs")
+# Warm workers need the Node packages installed next to the app (see docs)
+NODE_MODULES = Path(__file__).resolve().parent.parent / "node_modules"
+
+
+class MermaidRenderError(Exception):
+    """Raised when a diagram cannot be rendered."""
+
+
+class MermaidRenderTimeout(MermaidRenderError):
+    """Raised when rendering exceeds the configured timeout."""
+
+
+class MermaidRendererBusy(MermaidRenderError):
+    """Raised when the render queue is full."""
+
+
+def cache_key(mermaid_text: str) -> str:
+    return hashlib.sha256(mermaid_text.encode("utf-8")).hexdigest()
+
+
+class SvgDiskCache:
+    """Size-bounded, content-addressed SVG cache on disk with LRU eviction.
+
+    The directory is the only state: recency is the file mtime, refreshed on
+    every hit, and each put evicts by a scan of the directory. Every process
+    sharing the directory therefore sees the others' entries, and max_bytes
+    bounds the directory as a whole. A scan is cheap next to the render that
+    precedes a put.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.svg"
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        # Explicit nanoseconds: "now" from the kernel is too coarse to order hits
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def get_sync(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            self._touch(path)
+        except OSError:
+            return None
+        return data
+
+    def put_sync(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Unique per writer, so concurrent puts of one key never share a file
+        tmp = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        self._touch(tmp)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.svg"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            # Another process may have evicted it already; it is gone either way
+            path.unlink(missing_ok=True)
+            total -= size
+
+    async def get(self, key: str) -> Optional[bytes]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_sync, key)
+
+    async def put(self, key: str, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.put_sync, key, data)
+
+
+class CliRenderer:
+    """Renders each diagram with a fresh `mmdc` process (cold Chromium start)."""
+
+    def __init__(self, mmdc: str) -> None:
+        self._mmdc = mmdc
+
+    async def render(self, mermaid_text: str, timeout: float) -> bytes:
+        src = dst = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                mode="w", suffix=".mmd", delete=False
+            ) as f:
+                f.write(mermaid_text)
+                src = f.name
+            dst = src + ".svg"
+            proc = await asyncio.create_subprocess_exec(
+                self._mmdc, "-i", src, "-o", dst
+            )
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                raise MermaidRenderTimeout("SVG rendering timed out")
+            if proc.returncode != 0:
+                raise MermaidRenderError("Mermaid CLI failed to render SVG")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, Path(dst).read_bytes)
+        finally:
+            for path in (src, dst):
+                try:
+                    if path and os.path.exists(path):
+                        os.remove(path)
+                except Exception:
+                    pass
+
+    async def close(self) -> None:
+        pass
+
+
+class WarmRenderer:
+    """Keeps one long-lived Node renderer process and talks JSON lines to it.
+
+    The process is (re)started on demand, and killed if a render times out so
+    a wedged browser never blocks the worker.
+    """
+
+    def __init__(self, command: List[str]) -> None:
+        self._command = command
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._seq = 0
+
+    async def _start(self, timeout: float) -> asyncio.subprocess.Process:
+        proc = await asyncio.create_subprocess_exec(
+            *self._command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024,
+        )
+        try:
+            line = await asyncio.wait_for(proc.stdout.readline(), timeout=timeout * 3)
+            if not json.loads(line or b"{}").get("ready"):
+                raise MermaidRenderError("Mermaid worker failed to start")
+        except asyncio.TimeoutError:
+            proc.kill()
+            raise MermaidRenderError("Mermaid worker did not start in time")
+        except Exception:
+            proc.kill()
+            raise
+        return proc
+
+    async def render(self, mermaid_text: str, timeout: float) -> bytes:
+        if self._proc is None or self._proc.returncode is not None:
+            self._proc = await self._start(timeout)
+        self._seq += 1
+        request = {"id": self._seq, "text": mermaid_text}
+        try:
+            self._proc.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            await self._proc.stdin.drain()
+            line = await asyncio.wait_for(self._proc.stdout.readline(), timeout)
+            if not line:
+                raise MermaidRenderError("Mermaid worker exited unexpectedly")
+            reply = json.loads(line)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise MermaidRenderTimeout("SVG rendering timed out")
+        except (OSError, ValueError) as e:
+            await self.close()
+            raise MermaidRenderError(f"Mermaid worker failed: {e}")
+        if reply.get("id") != self._seq:
+            await self.close()
+            raise MermaidRenderError("Mermaid worker returned an unexpected reply")
+        if "error" in reply:
+            raise MermaidRenderError("Mermaid failed to render SVG")
+        return reply["svg"].encode("utf-8")
+
+    async def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+_Job = Tuple[str, "asyncio.Future[bytes]"]
+
+
+def default_renderer_factory() -> Optional[Callable[[], object]]:
+    """Pick the best available renderer, or None if Mermaid is not installed."""
+    override = os.environ.get("MERMAID_WORKER_CMD")
+    if override:
+        command = shlex.split(override)
+        return lambda: WarmRenderer(command)
+    node = shutil.which("node")
+    if node and (NODE_MODULES / "@mermaid-js" / "mermaid-cli").exists():
+        return lambda: WarmRenderer([node, str(WORKER_SCRIPT)])
+    mmdc = shutil.which("mmdc")
+    if mmdc:
+        return lambda: CliRenderer(mmdc)
+    return None
+
+
+class MermaidRendererPool:
+    """Cache-first renderer backed by a fixed number of workers and a bounded queue.
+
+    Identical concurrent misses share one render, and at most `workers`
+    diagrams are rendered at once; when the queue is full callers get
+    MermaidRendererBusy instead of piling up.
+    """
+
+    def __init__(
+        self,
+        renderer_factory: Callable[[], object],
+        cache: Optional[SvgDiskCache] = None,
+        workers: int = RENDER_WORKERS,
+        queue_size: int = RENDER_QUEUE_SIZE,
+        timeout: float = RENDER_TIMEOUT,
+    ) -> None:
+        self._renderer_factory = renderer_factory
+        self._cache = cache or SvgDiskCache()
+        self._workers = max(1, workers)
+        self._queue_size = queue_size
+        self._timeout = timeout
+        self._queue: Optional["asyncio.Queue[_Job]"] = None
+        self._tasks: List[asyncio.Task] = []
+        self._renderers: List[object] = []
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    def _ensure_started(self) -> "asyncio.Queue[_Job]":
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+            for _ in range(self._workers):
+                renderer = self._renderer_factory()
+                self._renderers.append(renderer)
+                self._tasks.append(asyncio.create_task(self._worker(renderer)))
+        return self._queue
+
+    async def _worker(self, renderer) -> None:
+        queue = self._queue
+        while True:
+            text, job = await queue.get()
+            try:
+                if not job.done():
+                    job.set_result(await renderer.render(text, self._timeout))
+            except Exception as e:
+                if not job.done():
+                    job.set_exception(e)
+            finally:
+                queue.task_done()
+
+    async def _render_uncached(self, key: str, mermaid_text: str) -> bytes:
+        queue = self._ensure_started()
+        job: "asyncio.Future[bytes]" = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((mermaid_text, job))
+        except asyncio.QueueFull:
+            raise MermaidRendererBusy("Renderer is busy, try again later")
+        svg = await job
+        await self._cache.put(key, svg)
+        return svg
+
+    async def render(self, mermaid_text: str) -> bytes:
+        key = cache_key(mermaid_text)
+        cached = await self._cache.get(key)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render_uncached(key, mermaid_text))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for renderer in self._renderers:
+            await renderer.close()
+        self._tasks.clear()
+        self._renderers.clear()
+        self._queue = None
+
+
+_POOL: Optional[MermaidRendererPool] = None
+
+
+def get_mermaid_renderer() -> Optional[MermaidRendererPool]:
+    """Return the process-wide renderer pool, or None if Mermaid is unavailable."""
+    global _POOL
+    if _POOL is None:
+        factory = default_renderer_factory()
+        if factory is None:
+            return None
+        _POOL = MermaidRendererPool(factory)
+    return _POOL
+
+
+async def close_mermaid_renderer() -> None:
+    global _POOL
+    if _POOL is not None:
+        await _POOL.close()
+        _POOL = None
@@ -0,0 +1,32 @@
+// Long-lived Mermaid renderer used by services/mermaid_render.py.
+//
+// Launches headless Chromium once and renders diagrams on demand. Protocol:
+// one JSON object per line on stdin ({"id", "text"}), one reply per line on
+// stdout ({"id", "svg"} or {"id", "error"}). Prints {"ready": true} on start.
+//
+// Requires `npm install @mermaid-js/mermaid-cli puppeteer` in the app directory.
+import { createInterface } from "node:readline";
+
+import { renderMermaid } from "@mermaid-js/mermaid-cli";
+import puppeteer from "puppeteer";
+
+const args = process.env.PUPPETEER_NO_SANDBOX ? ["--no-sandbox"] : [];
+const browser = await puppeteer.launch({ headless: "new", args });
+
+const write = (obj) => process.stdout.write(JSON.stringify(obj) + "\n");
+write({ ready: true });
+
+const lines = createInterface({ input: process.stdin });
+for await (const line of lines) {
+  let id = null;
+  try {
+    const request = JSON.parse(line);
+    id = request.id;
+    const { data } = await renderMermaid(browser, request.text, "svg");
+    write({ id, svg: Buffer.from(data).toString("utf8") });
+  } catch (err) {
+    write({ id, error: String((err && err.message) || err) });
+  }
+}
+
+await browser.close();
@@ -0,0 +1,144 @@
+import base64
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Keyset ("cursor") pagination helpers. A cursor encodes the sort value and id of
+# the last item on a page so the next page can seek with an indexed range query
+# instead of skipping over every preceding document.
+
+COUNT_CACHE_TTL = float(os.environ.get("PAGINATION_COUNT_TTL", "30"))
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def encode_cursor(sort_value: Any, item_id: str) -> str:
+    """Encode the (sort_value, id) pair of the last item into an opaque cursor."""
+    if isinstance(sort_value, datetime):
+        payload = {"t": "dt", "v": sort_value.isoformat(), "id": item_id}
+    else:
+        payload = {"t": "raw", "v": sort_value, "id": item_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode a cursor produced by encode_cursor.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        if payload.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+        item_id = payload["id"]
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if not isinstance(item_id, str):
+        raise ValueError("Invalid pagination cursor")
+    return value, item_id
+
+
+def keyset_query(
+    query: Dict[str, Any], sort_field: str, cursor: Optional[str]
+) -> Dict[str, Any]:
+    """Return `query` narrowed to documents strictly after `cursor`.
+
+    Pages are ordered by (sort_field, id) descending, so "after" means an older
+    sort value, or the same sort value with a smaller id.
+    """
+    if not cursor:
+        return dict(query)
+    value, item_id = decode_cursor(cursor)
+    seek = {
+        "$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "id": {"$lt": item_id}},
+        ]
+    }
+    if not query:
+        return seek
+    return {"$and": [query, seek]}
+
+
+class CountCache:
+    """Small TTL cache for `count_documents` totals keyed by collection and query.
+
+    Totals are only an estimate in cursor mode, so serving a value that is a few
+    seconds old is preferable to a full count on every page request.
+    """
+
+    def __init__(
+        self, ttl: float = COUNT_CACHE_TTL, max_entries: int = COUNT_CACHE_MAX_ENTRIES
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[int, float]] = {}
+
+    @staticmethod
+    def make_key(collection_name: str, query: Dict[str, Any]) -> str:
+        return collection_name + ":" + json.dumps(query, sort_keys=True, default=str)
+
+    def get(self, key: str) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value: int) -> None:
+        if len(self._entries) >= self.max_entries and key not in self._entries:
+            # Drop the entry closest to expiry to stay bounded
+            oldest = min(self._entries, key=lambda k: self._entries[k][1])
+            self._entries.pop(oldest, None)
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_COUNT_CACHE = CountCache()
+
+
+async def cached_count(collection: Any, query: Dict[str, Any]) -> int:
+    """Return count_documents(query) for `collection`, served from the TTL cache."""
+    key = CountCache.make_key(getattr(collection, "name", ""), query)
+    total = _COUNT_CACHE.get(key)
+    if total is None:
+        total = await collection.count_documents(query)
+        _COUNT_CACHE.set(key, total)
+    return total
+
+
+async def fetch_keyset_page(
+    collection: Any,
+    query: Dict[str, Any],
+    sort_field: str,
+    per_page: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page ordered by (sort_field, id) descending.
+
+    Returns the documents and the cursor for the next page (None on the last page).
+    Raises ValueError for an invalid cursor. A projection must keep sort_field
+    and id.
+    """
+    docs = (
+        await collection.find(keyset_query(query, sort_field, cursor), projection)
+        .sort([(sort_field, -1), ("id", -1)])
+        .limit(per_page + 1)
+        .to_list(per_page + 1)
+    )
+    next_cursor = None
+    if len(docs) > per_page:
+        docs = docs[:per_page]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last.get("id"))
+    return docs, next_cursor
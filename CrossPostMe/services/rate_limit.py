@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Token-bucket rate limiting with pluggable backends. The in-memory backend is
+# per-process and meant for development; the Redis backend shares buckets across
+# every API worker.
+
+
+class RateLimiterBackend:
+    """Interface for rate limiter backends."""
+
+    async def allow(self, key: str, capacity: int, per_seconds: int) -> bool:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryRateLimiter(RateLimiterBackend):
+    """In-process token-bucket limiter with sharded locks and idle-key eviction.
+
+    Keys hash to one of `shards` buckets, each with its own lock, so unrelated
+    keys do not contend. A bucket left idle for a full refill period is
+    indistinguishable from a new one, so it is dropped by a periodic sweep.
+    """
+
+    def __init__(self, shards: int = 64, sweep_interval: float = 60.0) -> None:
+        self._shards = shards
+        self._sweep_interval = sweep_interval
+        self._locks = [asyncio.Lock() for _ in range(shards)]
+        # key -> (tokens, last_seen, per_seconds)
+        self._buckets: list[Dict[str, Tuple[float, float, float]]] = [
+            {} for _ in range(shards)
+        ]
+        self._next_sweep = [0.0] * shards
+
+    def _shard(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self._shards
+
+    def _sweep(self, index: int, now: float) -> None:
+        buckets = self._buckets[index]
+        idle = [k for k, (_, last, per) in buckets.items() if now - last >= per]
+        for k in idle:
+            del buckets[k]
+        self._next_sweep[index] = now + self._sweep_interval
+
+    async def allow(self, key: str, capacity: int, per_seconds: int) -> bool:
+        index = self._shard(key)
+        async with self._locks[index]:
+            now = time.monotonic()
+            if now >= self._next_sweep[index]:
+                self._sweep(index, now)
+            buckets = self._buckets[index]
+            tokens, last, _ = buckets.get(key, (float(capacity), now, per_seconds))
+            elapsed = now - last
+            if elapsed > 0 and per_seconds > 0:
+                refill = (elapsed / per_seconds) * capacity
+                tokens = min(float(capacity), tokens + refill)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            buckets[key] = (tokens, now, float(per_seconds))
+            return allowed
+
+    def __len__(self) -> int:
+        return sum(len(b) for b in self._buckets)
+
+
+# Refill, consume and persist one bucket atomically. Uses the Redis server clock
+# so workers with skewed clocks agree, and expires the key once it would be full
+# again so idle buckets cost nothing.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local per_seconds = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+local elapsed = now - ts
+if elapsed > 0 and per_seconds > 0 then
+    tokens = math.min(capacity, tokens + (elapsed / per_seconds) * capacity)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(per_seconds) + 1)
+return allowed
+"""
+
+
+class RedisRateLimiter(RateLimiterBackend):
+    """Token-bucket limiter shared across processes through a Redis Lua script.
+
+    If Redis is unreachable requests are allowed (fail open) and a warning is
+    logged, so an outage of the limiter does not take the API down with it.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:") -> None:
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisRateLimiter":
+        import redis.asyncio as aioredis
+
+        return cls(aioredis.from_url(url), **kwargs)
+
+    async def allow(self, key: str, capacity: int, per_seconds: int) -> bool:
+        try:
+            result = await self._script(
+                keys=[self._prefix + key], args=[capacity, per_seconds]
+            )
+        except Exception as e:
+            logger.warning("Rate limiter backend unavailable, allowing request: %s", e)
+            return True
+        return int(result) == 1
+
+    async def close(self) -> None:
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
+
+
+def create_rate_limiter(
+    backend: Optional[str] = None, redis_url: Optional[str] = None
+) -> RateLimiterBackend:
+    """Build the configured backend.
+
+    `RATE_LIMIT_BACKEND` selects `memory` or `redis`; when unset, Redis is used
+    if `REDIS_URL` is configured.
+    """
+    redis_url = redis_url or os.environ.get("REDIS_URL")
+    backend = (
+        backend
+        or os.environ.get("RATE_LIMIT_BACKEND")
+        or ("redis" if redis_url else "memory")
+    ).lower()
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("RATE_LIMIT_BACKEND=redis requires REDIS_URL")
+        return RedisRateLimiter.from_url(redis_url)
+    if backend == "memory":
+        return InMemoryRateLimiter()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
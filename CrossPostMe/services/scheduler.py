@@ -0,0 +1,238 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Dispatches scheduled_posts when they become due. Upcoming posts are loaded with
+# an indexed (status, scheduled_time) range query into an in-memory min-heap, so
+# the dispatcher sleeps until the next due time instead of polling the whole
+# collection. Each post is claimed with a find_one_and_update lease before it is
+# dispatched, so several dispatcher replicas can run without double-posting.
+
+LOOKAHEAD_SECONDS = float(os.environ.get("SCHEDULER_LOOKAHEAD", "60"))
+REFILL_INTERVAL = float(os.environ.get("SCHEDULER_REFILL_INTERVAL", "15"))
+LEASE_SECONDS = float(os.environ.get("SCHEDULER_LEASE_SECONDS", "300"))
+CLAIM_CONCURRENCY = int(os.environ.get("SCHEDULER_CLAIM_CONCURRENCY", "32"))
+REFILL_BATCH_SIZE = int(os.environ.get("SCHEDULER_BATCH_SIZE", "5000"))
+MAX_ATTEMPTS = int(os.environ.get("SCHEDULER_MAX_ATTEMPTS", "5"))
+
+Dispatch = Callable[[Dict[str, Any]], Awaitable[Optional[str]]]
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Motor returns naive datetimes that are already UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def parse_scheduled_time(value: Any) -> datetime:
+    """Normalize a scheduled time (datetime or ISO-8601 string) to aware UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid scheduled_time: {value!r}")
+    return _as_utc(value)
+
+
+async def dispatch_to_celery(post: Dict[str, Any]) -> Optional[str]:
+    """Hand a claimed post to the Celery fan-out task and return its task id."""
+    from tasks import process_social_post
+
+    payload = {
+        # The scheduled post id doubles as the publish idempotency key
+        "id": str(post["_id"]),
+        "content": post.get("content"),
+        "platforms": post.get("platforms", []),
+        "media_urls": post.get("media_urls", []),
+    }
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(None, process_social_post.delay, payload)
+    return getattr(result, "id", None)
+
+
+class ScheduledPostDispatcher:
+    """Claims and dispatches due scheduled posts."""
+
+    def __init__(
+        self,
+        db: Any,
+        dispatch: Dispatch = dispatch_to_celery,
+        replica_id: Optional[str] = None,
+        lookahead: float = LOOKAHEAD_SECONDS,
+        refill_interval: float = REFILL_INTERVAL,
+        lease_seconds: float = LEASE_SECONDS,
+        claim_concurrency: int = CLAIM_CONCURRENCY,
+        batch_size: int = REFILL_BATCH_SIZE,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> None:
+        self.db = db
+        self.dispatch = dispatch
+        self.replica_id = replica_id or f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self.lookahead = lookahead
+        self.refill_interval = refill_interval
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._claim_slots = asyncio.Semaphore(claim_concurrency)
+        self._heap: List[Tuple[datetime, str, Any]] = []
+        self._queued: Set[Any] = set()
+
+    async def migrate_legacy_times(self) -> int:
+        """Convert scheduled_time strings written by older code to datetimes."""
+        migrated = 0
+        cursor = self.db.scheduled_posts.find(
+            {"status": "scheduled", "scheduled_time": {"$type": "string"}},
+            {"scheduled_time": 1},
+        )
+        async for doc in cursor:
+            try:
+                when = parse_scheduled_time(doc["scheduled_time"])
+            except ValueError:
+                logger.warning("Skipping scheduled post %s: bad time", doc["_id"])
+                continue
+            await self.db.scheduled_posts.update_one(
+                {"_id": doc["_id"], "scheduled_time": doc["scheduled_time"]},
+                {"$set": {"scheduled_time": when}},
+            )
+            migrated += 1
+        return migrated
+
+    async def refill(self, now: datetime) -> int:
+        """Load unclaimed posts due within the lookahead window into the heap."""
+        horizon = now + timedelta(seconds=self.lookahead)
+        cursor = (
+            self.db.scheduled_posts.find(
+                {"status": "scheduled", "scheduled_time": {"$lte": horizon}},
+                {"scheduled_time": 1},
+            )
+            .sort("scheduled_time", 1)
+            .limit(self.batch_size)
+        )
+        added = 0
+        async for doc in cursor:
+            if doc["_id"] in self._queued:
+                continue
+            when = _as_utc(doc["scheduled_time"])
+            heapq.heappush(self._heap, (when, str(doc["_id"]), doc["_id"]))
+            self._queued.add(doc["_id"])
+            added += 1
+        return added
+
+    async def reclaim_expired(self, now: datetime) -> int:
+        """Return posts whose lease expired (crashed replica) to the queue."""
+        result = await self.db.scheduled_posts.update_many(
+            {"status": "dispatching", "lease_expires_at": {"$lt": now}},
+            {
+                "$set": {"status": "scheduled"},
+                "$unset": {"lease_owner": "", "lease_expires_at": ""},
+            },
+        )
+        return result.modified_count
+
+    async def claim(self, post_id: Any, now: datetime) -> Optional[Dict[str, Any]]:
+        """Atomically lease one post; None if another replica already claimed it."""
+        return await self.db.scheduled_posts.find_one_and_update(
+            {"_id": post_id, "status": "scheduled"},
+            {
+                "$set": {
+                    "status": "dispatching",
+                    "lease_owner": self.replica_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                }
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _claim_and_dispatch(self, post_id: Any, now: datetime) -> bool:
+        async with self._claim_slots:
+            post = await self.claim(post_id, now)
+            if post is None:
+                return False
+            lease = {"_id": post_id, "lease_owner": self.replica_id}
+            try:
+                task_id = await self.dispatch(post)
+            except Exception as e:
+                attempts = post.get("attempts", 0) + 1
+                status = "failed" if attempts >= self.max_attempts else "scheduled"
+                logger.warning("Dispatch of scheduled post %s failed: %s", post_id, e)
+                await self.db.scheduled_posts.update_one(
+                    lease,
+                    {
+                        "$set": {"status": status, "last_error": str(e)},
+                        "$inc": {"attempts": 1},
+                        "$unset": {"lease_owner": "", "lease_expires_at": ""},
+                    },
+                )
+                return False
+            await self.db.scheduled_posts.update_one(
+                lease,
+                {
+                    "$set": {
+                        "status": "dispatched",
+                        "dispatched_at": datetime.now(timezone.utc),
+                        "task_id": task_id,
+                    },
+                    "$unset": {"lease_owner": "", "lease_expires_at": ""},
+                },
+            )
+            return True
+
+    async def dispatch_due(self, now: datetime) -> int:
+        """Claim and dispatch every heap entry due at `now`, concurrently."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, post_id = heapq.heappop(self._heap)
+            self._queued.discard(post_id)
+            due.append(post_id)
+        if not due:
+            return 0
+        results = await asyncio.gather(
+            *(self._claim_and_dispatch(post_id, now) for post_id in due)
+        )
+        return sum(1 for ok in results if ok)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """One refill + dispatch pass; returns the number of posts dispatched."""
+        now = now or datetime.now(timezone.utc)
+        await self.reclaim_expired(now)
+        await self.refill(now)
+        return await self.dispatch_due(now)
+
+    def _next_due(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None) -> None:
+        stop = stop or asyncio.Event()
+        await self.migrate_legacy_times()
+        loop = asyncio.get_running_loop()
+        next_refill = 0.0
+        while not stop.is_set():
+            now = datetime.now(timezone.utc)
+            if loop.time() >= next_refill:
+                await self.reclaim_expired(now)
+                await self.refill(now)
+                next_refill = loop.time() + self.refill_interval
+            dispatched = await self.dispatch_due(now)
+            if dispatched:
+                logger.info("Dispatched %d scheduled posts", dispatched)
+
+            # Sleep until the next post is due or the next refill, whichever is first
+            delay = max(0.0, next_refill - loop.time())
+            next_due = self._next_due()
+            if next_due is not None:
+                delay = min(
+                    delay, (next_due - datetime.now(timezone.utc)).total_seconds()
+                )
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,55 @@
+import copy
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type
+
+from pydantic import BaseModel
+
+# Fast path for list endpoints that return documents read from our own
+# collections. Those documents were written through the same pydantic models, so
+# instead of validating each one into a model (and letting FastAPI validate the
+# result again through response_model) we project only the model's fields, fill
+# in defaults for fields older documents may lack, and hand plain dicts to
+# ORJSONResponse. The response_model stays on the route for the OpenAPI schema.
+
+_Filler = Tuple[str, Callable[[], Any]]
+
+
+def projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection selecting exactly the fields of `model`."""
+    fields = {name: 1 for name in model.model_fields}
+    fields["_id"] = 0
+    return fields
+
+
+def _defaults(model: Type[BaseModel]) -> List[_Filler]:
+    fillers: List[_Filler] = []
+    for name, field in model.model_fields.items():
+        if field.is_required():
+            continue
+        if field.default_factory is not None:
+            fillers.append((name, field.default_factory))
+        else:
+            default = field.default
+            if isinstance(default, (list, dict, set)):
+                fillers.append((name, lambda d=default: copy.copy(d)))
+            else:
+                fillers.append((name, lambda d=default: d))
+    return fillers
+
+
+class TrustedDocuments:
+    """Turn trusted Mongo documents into response dicts shaped like `model`."""
+
+    def __init__(self, model: Type[BaseModel]) -> None:
+        self.model = model
+        self.projection = projection(model)
+        self._fillers = _defaults(model)
+
+    def __call__(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = []
+        for doc in docs:
+            doc.pop("_id", None)
+            for name, default in self._fillers:
+                if name not in doc:
+                    doc[name] = default()
+            items.append(doc)
+        return items
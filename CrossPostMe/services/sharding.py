@@ -0,0 +1,32 @@
+import zlib
+from typing import Any, Dict
+
+
+def shard_key(value: str) -> int:
+    """Stable 32-bit hash used to split work across replicas.
+
+    Stored on documents at write time so a replica can select its share with a
+    server-side `$mod` filter instead of reading everyone's documents.
+    """
+    return zlib.crc32(str(value).encode("utf-8"))
+
+
+def owns(value: str, shard_count: int, shard_index: int) -> bool:
+    """Whether `value` belongs to replica `shard_index` of `shard_count`."""
+    return shard_count <= 1 or shard_key(value) % shard_count == shard_index
+
+
+def shard_filter(shard_count: int, shard_index: int) -> Dict[str, Any]:
+    """Mongo filter selecting one replica's share of documents.
+
+    Documents written before shard_key existed are matched by every replica
+    and must be checked with `owns()` on the client side.
+    """
+    if shard_count <= 1:
+        return {}
+    return {
+        "$or": [
+            {"shard_key": {"$mod": [shard_count, shard_index]}},
+            {"shard_key": None},
+        ]
+    }
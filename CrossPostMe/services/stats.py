@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Dashboard counters are kept in one document per owner (keyed by owner id) plus a
+# global document, and maintained with $inc by the write paths. The $group
+# rebuild below recomputes them from source collections when a document is
+# missing, has never been rebuilt, or is suspected to have drifted.
+#
+# Every delta is also added to "pending" and bumps "seq". A rebuild claims a
+# lease on the document ("rebuilding"), so only one runs per document and other
+# readers wait for its result instead of recomputing the same totals. As soon
+# as a $group pipeline returns, the pending deltas of the counters it
+# recomputed are dropped: write paths change the source before applying the
+# delta, so the source changes behind them are part of what it read. Deltas
+# recorded after that are not, so the rebuild $sets the recomputed counters
+# plus what is then pending, conditional on "seq" being unchanged since it read
+# them, and retries if a delta landed in between. The one case this cannot
+# order is a single write whose source change and $inc straddle the moment a
+# pipeline returns.
+STATS_COLLECTION = "ad_stats"
+GLOBAL_STATS_ID = "__global__"
+
+# A lease older than this is treated as abandoned (crashed worker) and taken over
+REBUILD_LEASE_SECONDS = 60
+REBUILD_POLL_SECONDS = 0.05
+
+COUNTER_FIELDS = (
+    "total_ads",
+    "active_ads",
+    "total_posts",
+    "total_views",
+    "total_leads",
+)
+
+
+def _platform_key(platform: str) -> str:
+    # Platform names become sub-document keys; keep them free of operators/paths
+    return platform.replace(".", "_").replace("$", "_")
+
+
+async def increment_stats(
+    db: Any, owner_id: Optional[str] = None, **deltas: int
+) -> None:
+    """Apply counter deltas to the owner's stats document and the global one."""
+    inc = {k: v for k, v in deltas.items() if v}
+    if not inc:
+        return
+    unknown = set(inc) - set(COUNTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown stats counters: {sorted(unknown)}")
+    update = {
+        "$inc": {**inc, **{"pending." + k: v for k, v in inc.items()}, "seq": 1},
+        "$set": {"updated_at": datetime.now(timezone.utc)},
+    }
+    # Upsert so no delta is lost. A document without rebuilt_at only holds
+    # deltas, so its first read rebuilds it from the source collections.
+    ops = [UpdateOne({"_id": GLOBAL_STATS_ID}, update, upsert=True)]
+    if owner_id:
+        ops.append(UpdateOne({"_id": owner_id}, update, upsert=True))
+    try:
+        await db[STATS_COLLECTION].bulk_write(ops, ordered=False)
+    except Exception as e:
+        # Counters can be rebuilt; never fail the user's write because of them
+        logger.warning("Failed to update dashboard stats: %s", e)
+
+
+async def increment_platform_accounts(db: Any, platform: str, delta: int) -> None:
+    """Track connected platform accounts on the global stats document."""
+    if not platform:
+        return
+    try:
+        await db[STATS_COLLECTION].update_one(
+            {"_id": GLOBAL_STATS_ID},
+            {
+                "$inc": {
+                    "platform_accounts." + _platform_key(platform): delta,
+                    "pending.platform_accounts." + _platform_key(platform): delta,
+                    "seq": 1,
+                },
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        logger.warning("Failed to update platform account stats: %s", e)
+
+
+def _owner_match(owner_id: Optional[str]) -> list:
+    return [{"$match": {"owner_id": owner_id}}] if owner_id else []
+
+
+async def _claim_rebuild(
+    db: Any, doc_id: str, token: str, only_unbuilt: bool = False
+) -> bool:
+    """Take the rebuild lease on a stats document; False if another holds it.
+
+    With only_unbuilt the claim also fails once the document has been rebuilt.
+    """
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=REBUILD_LEASE_SECONDS)
+    query: Dict[str, Any] = {
+        "_id": doc_id,
+        "$or": [
+            {"rebuilding": {"$exists": False}},
+            {"rebuilding.started_at": {"$lt": stale}},
+        ],
+    }
+    if only_unbuilt:
+        query["rebuilt_at"] = {"$exists": False}
+    try:
+        await db[STATS_COLLECTION].update_one(
+            query,
+            {"$set": {"rebuilding": {"token": token, "started_at": now}}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The document exists and did not match: the upsert collided on _id
+        return False
+    return True
+
+
+async def _wait_for_rebuild(db: Any, doc_id: str) -> Optional[Dict[str, Any]]:
+    """Wait for the rebuild holding the lease; None if it was abandoned."""
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=REBUILD_LEASE_SECONDS)
+    while datetime.now(timezone.utc) < deadline:
+        doc = await db[STATS_COLLECTION].find_one({"_id": doc_id})
+        if doc and "rebuilding" not in doc and "rebuilt_at" in doc:
+            return doc
+        await asyncio.sleep(REBUILD_POLL_SECONDS)
+    return None
+
+
+async def _count_sources(
+    db: Any, owner_id: Optional[str], reset: Callable[..., Awaitable[None]]
+) -> Dict[str, Any]:
+    # reset(*fields) drops the pending deltas of the counters a pipeline has just
+    # recomputed: their source changes were written before it returned
+    ads_pipeline = _owner_match(owner_id) + [
+        {
+            "$group": {
+                "_id": None,
+                "total_ads": {"$sum": 1},
+                "active_ads": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "posted"]}, 1, 0]}
+                },
+            }
+        }
+    ]
+
+    posts_pipeline: list = []
+    if owner_id:
+        # Older posted_ads rows have no owner_id; match them through the owner's ads
+        ad_ids = await db.ads.distinct("id", {"owner_id": owner_id})
+        posts_pipeline.append(
+            {"$match": {"$or": [{"owner_id": owner_id}, {"ad_id": {"$in": ad_ids}}]}}
+        )
+    posts_pipeline.append(
+        {
+            "$group": {
+                "_id": None,
+                "total_posts": {"$sum": 1},
+                "total_views": {"$sum": {"$ifNull": ["$views", 0]}},
+                "total_leads": {"$sum": {"$ifNull": ["$leads", 0]}},
+            }
+        }
+    )
+
+    counts: Dict[str, Any] = {field: 0 for field in COUNTER_FIELDS}
+    rows = await db.ads.aggregate(ads_pipeline).to_list(1)
+    await reset("total_ads", "active_ads")
+    for row in rows:
+        counts["total_ads"] = row.get("total_ads", 0)
+        counts["active_ads"] = row.get("active_ads", 0)
+    rows = await db.posted_ads.aggregate(posts_pipeline).to_list(1)
+    await reset("total_posts", "total_views", "total_leads")
+    for row in rows:
+        counts["total_posts"] = row.get("total_posts", 0)
+        counts["total_views"] = row.get("total_views", 0)
+        counts["total_leads"] = row.get("total_leads", 0)
+
+    if not owner_id:
+        platforms = await db.platform_accounts.aggregate(
+            [{"$group": {"_id": "$platform", "count": {"$sum": 1}}}]
+        ).to_list(None)
+        await reset("platform_accounts")
+        counts["platform_accounts"] = {
+            _platform_key(p["_id"]): p["count"] for p in platforms if p.get("_id")
+        }
+    return counts
+
+
+async def rebuild_stats(
+    db: Any, owner_id: Optional[str] = None, only_unbuilt: bool = False
+) -> Dict[str, Any]:
+    """Recompute a stats document from source collections with $group pipelines.
+
+    With no owner_id the global document is rebuilt, including the connected
+    platform account counts. Deltas recorded while the pipelines run are added
+    on top of the recomputed counters. Concurrent calls for the same document
+    share one rebuild; with only_unbuilt a document another call has already
+    rebuilt is returned as is.
+    """
+    doc_id = owner_id or GLOBAL_STATS_ID
+    token = uuid.uuid4().hex
+    while not await _claim_rebuild(db, doc_id, token, only_unbuilt):
+        doc = await _wait_for_rebuild(db, doc_id)
+        if doc is not None:
+            return doc
+
+    async def reset(*fields: str) -> None:
+        await db[STATS_COLLECTION].update_one(
+            {"_id": doc_id, "rebuilding.token": token},
+            {"$unset": {"pending." + field: "" for field in fields}},
+        )
+
+    counts = await _count_sources(db, owner_id, reset)
+    while True:
+        stored = await db[STATS_COLLECTION].find_one({"_id": doc_id}) or {}
+        if (stored.get("rebuilding") or {}).get("token") != token:
+            # The lease expired and another rebuild took over; use its result
+            doc = await _wait_for_rebuild(db, doc_id)
+            if doc is not None:
+                return doc
+            return await rebuild_stats(db, owner_id, only_unbuilt)
+
+        pending = stored.get("pending") or {}
+        values = {
+            field: counts[field] + (pending.get(field) or 0) for field in COUNTER_FIELDS
+        }
+        if "platform_accounts" in counts:
+            pending_accounts = pending.get("platform_accounts") or {}
+            accounts = dict(counts["platform_accounts"])
+            for key, delta in pending_accounts.items():
+                accounts[key] = accounts.get(key, 0) + (delta or 0)
+            values["platform_accounts"] = accounts
+        now = datetime.now(timezone.utc)
+        values.update(updated_at=now, rebuilt_at=now, pending={})
+
+        # Only applies if no delta landed since "pending" was read
+        result = await db[STATS_COLLECTION].update_one(
+            {"_id": doc_id, "rebuilding.token": token, "seq": stored.get("seq")},
+            {"$set": values, "$unset": {"rebuilding": ""}},
+        )
+        if result.matched_count:
+            stored.pop("rebuilding", None)
+            return {**stored, **values, "_id": doc_id}
+
+
+def platforms_connected(global_doc: Optional[Dict[str, Any]]) -> int:
+    """Number of distinct platforms with at least one connected account."""
+    accounts = (global_doc or {}).get("platform_accounts") or {}
+    return sum(1 for count in accounts.values() if count and count > 0)
+
+
+async def load_dashboard_stats(
+    db: Any, owner_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Read the owner's (or global) counters in one indexed query on _id."""
+    doc_id = owner_id or GLOBAL_STATS_ID
+    ids = [doc_id] if doc_id == GLOBAL_STATS_ID else [doc_id, GLOBAL_STATS_ID]
+    docs = await db[STATS_COLLECTION].find({"_id": {"$in": ids}}).to_list(len(ids))
+    by_id = {d["_id"]: d for d in docs}
+
+    global_doc = by_id.get(GLOBAL_STATS_ID)
+    if global_doc is None or "rebuilt_at" not in global_doc:
+        global_doc = await rebuild_stats(db, only_unbuilt=True)
+    doc = by_id.get(doc_id) if owner_id else global_doc
+    if doc is None or "rebuilt_at" not in doc:
+        doc = await rebuild_stats(db, owner_id, only_unbuilt=True)
+
+    stats = {field: max(int(doc.get(field, 0) or 0), 0) for field in COUNTER_FIELDS}
+    stats["platforms_connected"] = platforms_connected(global_doc)
+    return stats
@@ -1,47 +1,198 @@
 import asyncio
+import json
+import logging
 import os
+import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+import redis
+from celery import chord, group
+from celery.signals import worker_process_init, worker_process_shutdown
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from services.scheduler import parse_scheduled_time
+from worker import PLATFORM_CONCURRENCY, celery_app, platform_queue
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database connection
 mongo_url = os.environ.get("MONGO_URL")
 db_name = os.environ.get("DB_NAME")
 
+# Per-platform publish results, used to skip platforms that already succeeded.
+# Before publishing, a task claims the key with PUBLISH_IN_PROGRESS so a second
+# delivery of the same task waits for the first instead of posting again. The
+# claim outlives any publish attempt; if the result cannot be recorded it still
+# blocks re-posting until it expires.
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+PUBLISH_RESULT_TTL = int(os.environ.get("PUBLISH_RESULT_TTL", str(7 * 24 * 3600)))
+PUBLISH_CLAIM_TTL = int(os.environ.get("PUBLISH_CLAIM_TTL", "900"))
+PUBLISH_IN_PROGRESS = b"in-progress"
+_redis_client = None
+
+
+# Worker-lifetime event loop and Motor client. Each worker process creates them
+# once (worker_process_init) and every task reuses them, instead of paying for a
+# new loop, TCP/TLS handshake and pool warm-up per task. Tasks in one process
+# run one at a time (prefork/solo pools), so a single loop is sufficient.
+_worker_loop = None
+_worker_client = None
+
+
+def init_worker_db(**_kwargs):
+    """Create the process's event loop and Motor client (worker_process_init)."""
+    global _worker_loop, _worker_client
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    if _worker_client is None:
+        _worker_client = AsyncIOMotorClient(mongo_url, io_loop=_worker_loop)
+
+
+def close_worker_db(**_kwargs):
+    """Close the Motor client and event loop (worker_process_shutdown)."""
+    global _worker_loop, _worker_client
+    if _worker_client is not None:
+        _worker_client.close()
+        _worker_client = None
+    if _worker_loop is not None and not _worker_loop.is_closed():
+        _worker_loop.run_until_complete(_worker_loop.shutdown_asyncgens())
+        _worker_loop.close()
+    _worker_loop = None
+
+
+worker_process_init.connect(init_worker_db)
+worker_process_shutdown.connect(close_worker_db)
+
+
+def run_async(coro):
+    """Run a coroutine on the worker's persistent event loop."""
+    if _worker_loop is None or _worker_loop.is_closed():
+        init_worker_db()
+    return _worker_loop.run_until_complete(coro)
+
+
+def worker_db():
+    """Database handle backed by the worker's persistent Motor client."""
+    if _worker_client is None:
+        init_worker_db()
+    return _worker_client[db_name]
+
 
 async def get_db():
-    client = AsyncIOMotorClient(mongo_url)
-    return client[db_name]
+    return worker_db()
 
 
 # Social media posting tasks
+@celery_app.task(name="tasks.process_social_post")
 def process_social_post(post_data: Dict[str, Any]):
-    """Process and distribute a post to multiple social media platforms"""
+    """Fan a post out to one publish subtask per platform.
+
+    Each platform runs on its own queue (see worker.platform_queue) with its own
+    retries, and a chord callback aggregates the per-platform results. Platforms
+    without a queue fail at once and are reported alongside the others.
+    """
     try:
         platforms = post_data.get("platforms", [])
         content = post_data.get("content", "")
         media_urls = post_data.get("media_urls", [])
+        post_id = str(post_data.get("id") or uuid.uuid4())
 
-        results = {}
+        if not platforms:
+            return {"status": "completed", "post_id": post_id, "results": {}}
 
-        for platform in platforms:
-            # Adapt content for platform-specific requirements
-            adapted_content = adapt_content_for_platform(content, platform)
+        supported = [p for p in platforms if p.lower() in PLATFORM_CONCURRENCY]
+        rejected = [
+            {"platform": p, "status": "failed", "error": f"Unsupported platform: {p}"}
+            for p in platforms
+            if p.lower() not in PLATFORM_CONCURRENCY
+        ]
+        if not supported:
+            return aggregate_social_post_results(rejected, post_id)
 
-            # Post to platform
-            result = post_to_platform(platform, adapted_content, media_urls)
-            results[platform] = result
-
-        return {"status": "completed", "results": results}
+        header = group(
+            publish_to_platform.s(post_id, platform, content, media_urls).set(
+                queue=platform_queue(platform)
+            )
+            for platform in supported
+        )
+        result = chord(header)(aggregate_social_post_results.s(post_id, rejected))
+        return {"status": "dispatched", "post_id": post_id, "chord_id": result.id}
 
     except Exception as e:
         return {"status": "failed", "error": str(e)}
 
 
+def _publish_key(post_id: str, platform: str) -> str:
+    return f"social_post:{post_id}:{platform.lower()}"
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+@celery_app.task(name="tasks.publish_to_platform", bind=True, max_retries=3)
+def publish_to_platform(
+    self, post_id: str, platform: str, content: str, media_urls: list
+) -> Dict[str, Any]:
+    """Publish one post to one platform, retrying only this platform on failure.
+
+    The (post_id, platform) key is claimed before publishing and then holds the
+    successful result, so a retry, a redelivery or a re-dispatched post never
+    publishes twice to a platform that already succeeded or is publishing now.
+    """
+    key = _publish_key(post_id, platform)
+    try:
+        if not _redis().set(key, PUBLISH_IN_PROGRESS, nx=True, ex=PUBLISH_CLAIM_TTL):
+            previous = _redis().get(key)
+            if previous != PUBLISH_IN_PROGRESS:
+                return json.loads(previous)
+            raise RuntimeError(f"Publish to {platform} already in progress")
+        try:
+            adapted_content = adapt_content_for_platform(content, platform)
+            result = post_to_platform(platform, adapted_content, media_urls)
+        except Exception:
+            # Nothing was published; let the retry claim the key again
+            _redis().delete(key)
+            raise
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2**self.request.retries * 5)
+        # Report the failure instead of raising so the chord still aggregates
+        return {"platform": platform, "status": "failed", "error": str(e)}
+
+    try:
+        _redis().set(key, json.dumps(result), ex=PUBLISH_RESULT_TTL)
+    except Exception as e:
+        # Published already: retrying would post again. The claim keeps
+        # blocking re-posts until PUBLISH_CLAIM_TTL.
+        logger.warning("Failed to record publish result for %s: %s", key, e)
+    return result
+
+
+@celery_app.task(name="tasks.aggregate_social_post_results")
+def aggregate_social_post_results(
+    results: list, post_id: str, rejected: Optional[list] = None
+) -> Dict[str, Any]:
+    """Chord callback combining the per-platform publish results."""
+    results = list(results) + list(rejected or [])
+    by_platform = {r.get("platform"): r for r in results if isinstance(r, dict)}
+    failed = [p for p, r in by_platform.items() if r.get("status") == "failed"]
+    if not failed:
+        status = "completed"
+    elif len(failed) == len(by_platform):
+        status = "failed"
+    else:
+        status = "partial"
+    return {"status": status, "post_id": post_id, "results": by_platform}
+
+
 def adapt_content_for_platform(content: str, platform: str) -> str:
     """Adapt content based on platform-specific requirements"""
     adaptations = {
@@ -67,11 +218,12 @@ def post_to_platform(platform: str, content: str, media_urls: list) -> Dict[str,
     }
 
 
+@celery_app.task(name="tasks.schedule_post")
 def schedule_post(post_data: Dict[str, Any], scheduled_time: str):
     """Schedule a post for future publication"""
     try:
         # Store scheduled post in database
-        asyncio.run(store_scheduled_post(post_data, scheduled_time))
+        run_async(store_scheduled_post(post_data, scheduled_time, db=worker_db()))
         return {"status": "scheduled", "scheduled_time": scheduled_time}
     except Exception as e:
         return {"status": "failed", "error": str(e)}
@@ -88,9 +240,10 @@ async def store_scheduled_post(post_data: Dict[str, Any], scheduled_time: str, d
         "content": post_data.get("content"),
         "platforms": post_data.get("platforms", []),
         "media_urls": post_data.get("media_urls", []),
-        "scheduled_time": scheduled_time,
+        # Stored as a datetime so the dispatcher can range-scan it by index
+        "scheduled_time": parse_scheduled_time(scheduled_time),
         "status": "scheduled",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
     }
 
     await db.scheduled_posts.insert_one(scheduled_post)
@@ -99,6 +252,7 @@ async def store_scheduled_post(post_data: Dict[str, Any], scheduled_time: str, d
         own_client.close()
 
 
+@celery_app.task(name="tasks.validate_platforms")
 def validate_platforms(platforms: list) -> Dict[str, Any]:
     """Validate platform connections and credentials"""
     try:
@@ -0,0 +1,193 @@
+import asyncio
+import json
+
+import pytest
+from services.ad_import import AdImport, ImportInProgress, parse_csv
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def _row(i, **overrides):
+    row = {
+        "title": f"Item {i}",
+        "description": "desc",
+        "price": 10 + i,
+        "category": "misc",
+        "location": "Austin",
+    }
+    row.update(overrides)
+    return row
+
+
+async def _chunks(data: bytes, size: int = 7):
+    # Small chunks so rows and multi-byte characters straddle chunk boundaries
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+async def _db():
+    db = mongomock_motor.AsyncMongoMockClient()["import_test"]
+    await db.ads.create_index([("id", 1)], unique=True)
+    return db
+
+
+def test_ndjson_import_batches_rows_and_reports_errors():
+    lines = [json.dumps(_row(i)) for i in range(25)]
+    lines[3] = "{not json"
+    lines[7] = json.dumps(_row(7, price="free"))
+    data = ("\n".join(lines) + "\n").encode()
+
+    async def run():
+        db = await _db()
+        job = AdImport(db, "u1", "ndjson", batch_size=10)
+        assert await job.start() is None
+        result = await job.run(_chunks(data))
+        owners = await db.ads.distinct("owner_id")
+        return result, await db.ads.count_documents({}), owners
+
+    result, stored, owners = asyncio.run(run())
+    assert result["status"] == "completed"
+    assert (result["processed"], result["inserted"], result["failed"]) == (25, 23, 2)
+    assert [e["row"] for e in result["errors"]] == [4, 8]
+    assert stored == 23
+    assert owners == ["u1"]
+
+
+def test_csv_rows_support_quoted_newlines_and_list_columns():
+    data = (
+        "title,description,price,category,location,platforms\n"
+        'Chair,"Solid oak,\nbarely used",45,home,Austin,facebook|offerup\n'
+        "Désk,Standing desk,120.5,home,Austin,\n"
+    ).encode()
+
+    async def rows():
+        return [r async for r in parse_csv(_chunks(data, size=5))]
+
+    rows = asyncio.run(rows())
+    assert [n for n, _, _ in rows] == [1, 2]
+    assert rows[0][1]["description"] == "Solid oak,\nbarely used"
+    assert rows[0][1]["platforms"] == ["facebook", "offerup"]
+    assert rows[1][1]["title"] == "Désk"
+    assert "platforms" not in rows[1][1]
+
+
+def test_crlf_split_across_chunks_keeps_row_numbers():
+    lines = [json.dumps(_row(i)) for i in range(6)]
+    lines[2] = "{not json"
+    data = ("\r\n".join(lines) + "\r\n").encode()
+
+    async def split_crlf():
+        # Every chunk ends between the "\r" and the "\n" of a line ending
+        start = 0
+        for end in [i + 1 for i, byte in enumerate(data) if byte == ord("\r")]:
+            yield data[start:end]
+            start = end
+        yield data[start:]
+
+    async def run():
+        db = await _db()
+        first = AdImport(db, "u1", "ndjson", idempotency_key="k1", batch_size=2)
+        await first.start()
+        result = await first.run(split_crlf())
+        # A rerun with the same key and other chunking maps rows to the same ids
+        await first.jobs.update_one(
+            {"_id": first.job_id}, {"$set": {"status": "failed"}}
+        )
+        retry = AdImport(db, "u1", "ndjson", idempotency_key="k1", batch_size=2)
+        await retry.start()
+        rerun = await retry.run(_chunks(data))
+        return result, rerun, await db.ads.count_documents({})
+
+    result, rerun, stored = asyncio.run(run())
+    assert (result["processed"], result["inserted"], result["failed"]) == (6, 5, 1)
+    assert [e["row"] for e in result["errors"]] == [3]
+    assert (rerun["inserted"], rerun["duplicates"]) == (0, 5)
+    assert stored == 5
+
+
+def test_idempotency_key_resumes_failed_import_and_replays_completed_one():
+    data = "".join(json.dumps(_row(i)) + "\n" for i in range(12)).encode()
+
+    async def run():
+        db = await _db()
+        first = AdImport(db, "u1", "ndjson", idempotency_key="k1", batch_size=5)
+        await first.start()
+        # Upload drops after the first batch
+        with pytest.raises(ConnectionError):
+
+            async def broken():
+                async for chunk in _chunks(data[: len(data) // 2]):
+                    yield chunk
+                raise ConnectionError("client went away")
+
+            await first.run(broken())
+
+        retry = AdImport(db, "u1", "ndjson", idempotency_key="k1", batch_size=5)
+        assert retry.job_id == first.job_id
+        assert await retry.start() is None
+        result = await retry.run(_chunks(data))
+
+        replay = AdImport(db, "u1", "ndjson", idempotency_key="k1")
+        existing = await replay.start()
+        return result, existing, await db.ads.count_documents({})
+
+    result, existing, stored = asyncio.run(run())
+    assert result["status"] == "completed"
+    assert result["inserted"] + result["duplicates"] == 12
+    assert result["duplicates"] > 0
+    assert stored == 12
+    assert existing["id"] == result["id"]
+
+
+def test_running_import_with_same_key_is_rejected():
+    async def run():
+        db = await _db()
+        await AdImport(db, "u1", "csv", idempotency_key="k").start()
+        await AdImport(db, "u1", "csv", idempotency_key="k").start()
+
+    with pytest.raises(ImportInProgress):
+        asyncio.run(run())
+
+
+def test_import_route_answers_with_the_job_id_before_importing(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routes import ads
+    from routes.dependencies import get_current_user, get_db
+
+    db = asyncio.run(_db())
+    seen_by_import = []
+    run_spooled = AdImport.run_spooled
+
+    async def recording(self, spool):
+        # The job is already visible, still untouched, when the import starts
+        seen_by_import.append(await db.ad_import_jobs.find_one({"_id": self.job_id}))
+        await run_spooled(self, spool)
+
+    monkeypatch.setattr(AdImport, "run_spooled", recording)
+    app = FastAPI()
+    app.include_router(ads.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: "u1"
+    client = TestClient(app)
+    data = "".join(json.dumps(_row(i)) + "\n" for i in range(3))
+
+    accepted = client.post("/api/ads/import", content=data)
+    assert accepted.status_code == 202
+    job_id = accepted.json()["id"]
+    assert accepted.json()["status"] == "running"
+    assert accepted.headers["location"] == f"/api/ads/import/{job_id}"
+    assert seen_by_import[0]["processed"] == 0
+    finished = client.get(accepted.headers["location"]).json()
+    assert (finished["status"], finished["inserted"]) == ("completed", 3)
+
+    # A keyed job can be found by its key, and a concurrent retry names it
+    asyncio.run(AdImport(db, "u1", "ndjson", idempotency_key="k").start())
+    by_key = client.get("/api/ads/import", headers={"Idempotency-Key": "k"})
+    assert by_key.json()["status"] == "running"
+    conflict = client.post(
+        "/api/ads/import", content=data, headers={"Idempotency-Key": "k"}
+    )
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"]["job_id"] == by_key.json()["id"]
+    assert conflict.headers["location"] == f"/api/ads/import/{by_key.json()['id']}"
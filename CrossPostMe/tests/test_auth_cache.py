@@ -0,0 +1,38 @@
+import asyncio
+from types import SimpleNamespace
+
+from routes.dependencies import get_current_user
+from services import auth
+
+
+def test_verified_tokens_are_cached_until_expiry():
+    auth._TOKEN_CACHE.clear()
+    token = auth.create_token("user-1")
+    assert auth.verify_token(token) == "user-1"
+    assert auth.verify_token(token) == "user-1"
+    assert auth.token_cache_stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    assert auth.verify_token("not-a-token") is None
+    assert auth.token_cache_stats()["size"] == 1
+
+
+def test_expired_entries_are_not_served():
+    auth._TOKEN_CACHE.clear()
+    auth._TOKEN_CACHE.put("digest", {"sub": "user-1", "exp": 1})
+    assert auth._TOKEN_CACHE.get("digest") is None
+    assert auth.token_cache_stats()["size"] == 0
+
+
+def test_current_user_is_verified_once_per_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "routes.dependencies.verify_token", lambda token: calls.append(token) or "u"
+    )
+    request = SimpleNamespace(state=SimpleNamespace())
+
+    async def run():
+        for _ in range(3):
+            assert await get_current_user(request, "Bearer abc") == "u"
+
+    asyncio.run(run())
+    assert calls == ["abc"]
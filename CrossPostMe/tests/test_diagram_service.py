@@ -1,4 +1,4 @@
-from services.diagram import generate_ad_mermaid
+from services.diagram import DiagramCache, generate_ad_mermaid
 
 
 def test_generate_basic_mermaid():
@@ -19,3 +19,26 @@ def test_generate_with_marketplace_nodes():
     # Expect eBay and Craigslist nodes
     assert "eBay" in mermaid
     assert "Craigslist" in mermaid
+
+
+def test_diagram_cache_keys_on_version_and_platforms():
+    cache = DiagramCache(max_entries=2)
+    ad = {"id": "ad3", "version": 1, "posted_platforms": ["eBay"]}
+    cache.put(ad, "diagram-v1")
+    assert cache.get(ad) == "diagram-v1"
+    assert cache.get({**ad, "version": 2}) is None
+    assert cache.get({**ad, "posted_platforms": ["eBay", "OfferUp"]}) is None
+
+    cache.invalidate("ad3")
+    assert cache.get(ad) is None
+
+
+def test_diagram_cache_skips_legacy_ads_and_stays_bounded():
+    cache = DiagramCache(max_entries=2)
+    cache.put({"id": "legacy"}, "diagram")
+    assert cache.get({"id": "legacy"}) is None
+
+    for i in range(3):
+        cache.put({"id": f"ad{i}", "posted_platforms": []}, f"d{i}")
+    assert cache.get({"id": "ad0", "posted_platforms": []}) is None
+    assert cache.get({"id": "ad2", "posted_platforms": []}) == "d2"
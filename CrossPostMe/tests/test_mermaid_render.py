@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from services.mermaid_render import (
+    MermaidRendererBusy,
+    MermaidRendererPool,
+    SvgDiskCache,
+    cache_key,
+)
+
+
+class FakeRenderer:
+    def __init__(self, calls, delay=0.0):
+        self.calls = calls
+        self.delay = delay
+
+    async def render(self, text, timeout):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        return f"<svg>{text}</svg>".encode("utf-8")
+
+    async def close(self):
+        pass
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = SvgDiskCache(str(tmp_path), max_bytes=10)
+    cache.put_sync("a", b"1234")
+    cache.put_sync("b", b"1234")
+    assert cache.get_sync("a") == b"1234"  # "a" is now most recently used
+    cache.put_sync("c", b"1234")
+    assert cache.get_sync("b") is None
+    assert cache.get_sync("a") == b"1234"
+    assert not (tmp_path / "b.svg").exists()
+
+    # A fresh instance reads the directory as it is
+    reloaded = SvgDiskCache(str(tmp_path), max_bytes=10)
+    assert reloaded.get_sync("c") == b"1234"
+
+
+def test_disk_cache_is_shared_between_workers(tmp_path):
+    # One instance per worker process, all on the same directory
+    first = SvgDiskCache(str(tmp_path), max_bytes=10)
+    second = SvgDiskCache(str(tmp_path), max_bytes=10)
+    assert first.get_sync("a") is None
+    second.put_sync("a", b"1234")
+    assert first.get_sync("a") == b"1234"
+
+    first.put_sync("b", b"1234")
+    # A hit through one instance counts as recent use for the other
+    first.get_sync("a")
+    second.put_sync("c", b"1234")
+    # The bound holds for the directory, not per instance
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.svg")) <= 10
+    assert second.get_sync("b") is None
+    assert second.get_sync("a") == b"1234"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_pool_caches_and_deduplicates_renders(tmp_path):
+    calls = []
+    pool = MermaidRendererPool(
+        lambda: FakeRenderer(calls, delay=0.01), cache=SvgDiskCache(str(tmp_path))
+    )
+
+    async def run():
+        try:
+            first = await asyncio.gather(*[pool.render("graph TD") for _ in range(5)])
+            second = await pool.render("graph TD")
+            return first, second
+        finally:
+            await pool.close()
+
+    first, second = asyncio.run(run())
+    assert calls == ["graph TD"]
+    assert set(first) == {b"<svg>graph TD</svg>"}
+    assert second == b"<svg>graph TD</svg>"
+    assert (tmp_path / f"{cache_key('graph TD')}.svg").exists()
+
+
+def test_pool_rejects_work_when_queue_is_full(tmp_path):
+    calls = []
+    pool = MermaidRendererPool(
+        lambda: FakeRenderer(calls, delay=0.05),
+        cache=SvgDiskCache(str(tmp_path)),
+        workers=1,
+        queue_size=1,
+    )
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                *[pool.render(f"graph {i}") for i in range(4)],
+                return_exceptions=True,
+            )
+        finally:
+            await pool.close()
+
+    results = asyncio.run(run())
+    assert any(isinstance(r, MermaidRendererBusy) for r in results)
+    assert any(isinstance(r, bytes) for r in results)
+
+
+def test_pool_propagates_render_errors(tmp_path):
+    class FailingRenderer(FakeRenderer):
+        async def render(self, text, timeout):
+            raise RuntimeError("boom")
+
+    pool = MermaidRendererPool(
+        lambda: FailingRenderer([]), cache=SvgDiskCache(str(tmp_path))
+    )
+
+    async def run():
+        try:
+            await pool.render("graph TD")
+        finally:
+            await pool.close()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
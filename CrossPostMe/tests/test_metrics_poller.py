@@ -0,0 +1,112 @@
+import asyncio
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from services.sharding import shard_key
+from services.stats import GLOBAL_STATS_ID, STATS_COLLECTION
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+# worker/ sits next to worker.py, so it is loaded by path rather than as a package
+_spec = importlib.util.spec_from_file_location(
+    "metrics_poller",
+    Path(__file__).resolve().parent.parent / "worker" / "metrics_poller.py",
+)
+metrics_poller = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(metrics_poller)
+
+NOW = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class Client:
+    """mongomock client recording the size of every posted_ads bulk_write"""
+
+    def __init__(self):
+        self.db = mongomock_motor.AsyncMongoMockClient()["poller_test"]
+        self.bulk_writes = []
+
+    def __getitem__(self, name):
+        return Database(self)
+
+
+class Database:
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        return self[name]
+
+    def __getitem__(self, name):
+        collection = self.client.db[name]
+        if name == "posted_ads":
+            bulk_write = collection.bulk_write
+
+            async def recording(ops, **kwargs):
+                self.client.bulk_writes.append(len(ops))
+                return await bulk_write(ops, **kwargs)
+
+            collection.bulk_write = recording
+        return collection
+
+
+async def _seed(client, due=1200, fresh=50):
+    await client.db.ads.insert_one({"id": "ad-legacy", "owner_id": "u2"})
+    rows = [
+        {
+            "id": f"pa-{i}",
+            "ad_id": "ad-legacy" if i % 10 == 0 else f"ad-{i}",
+            # Older rows have neither owner_id nor shard_key
+            "owner_id": None if i % 10 == 0 else "u1",
+            "platform": ("facebook", "ebay")[i % 2],
+            "views": 0,
+            "leads": 0,
+            "last_polled": None if i % 3 else NOW - timedelta(hours=1),
+        }
+        for i in range(due)
+    ]
+    rows += [
+        {
+            "id": f"pa-fresh-{i}",
+            "owner_id": "u1",
+            "platform": "facebook",
+            "views": 0,
+            "leads": 0,
+            "shard_key": shard_key(f"pa-fresh-{i}"),
+            "last_polled": NOW - timedelta(seconds=10),
+        }
+        for i in range(fresh)
+    ]
+    await client.db.posted_ads.insert_many(rows)
+
+
+def test_every_due_ad_is_polled_in_batched_writes(monkeypatch):
+    async def one_view(pa):
+        return {"views": pa["views"] + 1, "leads": pa["leads"]}
+
+    monkeypatch.setattr(metrics_poller, "fetch_platform_metrics", one_view)
+    monkeypatch.setattr(metrics_poller, "BATCH_SIZE", 500)
+
+    async def run():
+        client = Client()
+        await _seed(client)
+        updated = await metrics_poller.poll_metrics_once(client, now=NOW)
+        polled = await client.db.posted_ads.count_documents({"last_polled": NOW})
+        missing_key = await client.db.posted_ads.count_documents({"shard_key": None})
+        sample = await client.db.posted_ads.find_one({"id": "pa-1034"})
+        stats = {
+            d["_id"]: d.get("total_views")
+            async for d in client.db[STATS_COLLECTION].find()
+        }
+        return client, updated, polled, missing_key, sample, stats
+
+    client, updated, polled, missing_key, sample, stats = asyncio.run(run())
+    # More than 1000 due ads, none left out; recently polled ones are skipped
+    assert updated == polled == 1200
+    assert client.bulk_writes == [500, 500, 200]
+    assert missing_key == 0
+    assert sample["shard_key"] == shard_key("pa-1034")
+    assert sample["views"] == 1
+    # Rows without owner_id are attributed through their ad
+    assert stats == {GLOBAL_STATS_ID: 1200, "u1": 1080, "u2": 120}
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+from services.pagination import CountCache, decode_cursor, encode_cursor, keyset_query
+
+
+def test_cursor_round_trip_datetime():
+    ts = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    cursor = encode_cursor(ts, "ad-42")
+    value, item_id = decode_cursor(cursor)
+    assert value == ts
+    assert item_id == "ad-42"
+
+
+def test_invalid_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_query_combines_filter_and_seek():
+    ts = datetime(2024, 5, 1)
+    cursor = encode_cursor(ts, "ad-1")
+    query = keyset_query({"status": "posted"}, "created_at", cursor)
+    assert query["$and"][0] == {"status": "posted"}
+    seek = query["$and"][1]["$or"]
+    assert seek[0] == {"created_at": {"$lt": ts}}
+    assert seek[1] == {"created_at": ts, "id": {"$lt": "ad-1"}}
+
+
+def test_keyset_query_without_cursor_is_unchanged():
+    assert keyset_query({"platform": "ebay"}, "posted_at", None) == {"platform": "ebay"}
+
+
+def test_count_cache_expires_and_stays_bounded():
+    cache = CountCache(ttl=0, max_entries=2)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+    cache = CountCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("c") == 3
+    assert len(cache._entries) == 2
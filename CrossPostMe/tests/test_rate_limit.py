@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from services.rate_limit import InMemoryRateLimiter, RedisRateLimiter
+
+
+def test_in_memory_limiter_enforces_capacity():
+    limiter = InMemoryRateLimiter()
+
+    async def run():
+        return [await limiter.allow("ip:1", 3, 60) for _ in range(5)]
+
+    assert asyncio.run(run()) == [True, True, True, False, False]
+
+
+def test_in_memory_limiter_keys_are_independent():
+    limiter = InMemoryRateLimiter(shards=4)
+
+    async def run():
+        assert await limiter.allow("ip:1", 1, 60)
+        assert not await limiter.allow("ip:1", 1, 60)
+        assert await limiter.allow("ip:2", 1, 60)
+
+    asyncio.run(run())
+
+
+def test_in_memory_limiter_evicts_idle_keys():
+    limiter = InMemoryRateLimiter(shards=1, sweep_interval=0)
+
+    async def run():
+        await limiter.allow("ip:1", 5, 0)
+        await limiter.allow("ip:2", 5, 0)
+        return len(limiter)
+
+    # A zero refill period means every bucket is idle by the next sweep
+    assert asyncio.run(run()) == 1
+
+
+def test_redis_limiter_shares_buckets_between_instances():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    async def run():
+        server = fakeredis.FakeServer()
+        first = RedisRateLimiter(fakeredis.FakeAsyncRedis(server=server))
+        second = RedisRateLimiter(fakeredis.FakeAsyncRedis(server=server))
+        results = [
+            await first.allow("user:a", 2, 60),
+            await second.allow("user:a", 2, 60),
+            await first.allow("user:a", 2, 60),
+        ]
+        ttl = await fakeredis.FakeAsyncRedis(server=server).ttl("ratelimit:user:a")
+        return results, ttl
+
+    results, ttl = asyncio.run(run())
+    assert results == [True, True, False]
+    assert 0 < ttl <= 61
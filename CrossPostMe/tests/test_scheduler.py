@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from services.scheduler import ScheduledPostDispatcher, parse_scheduled_time
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+async def _seed(db, count, when):
+    await db.scheduled_posts.insert_many(
+        [
+            {
+                "content": f"post {i}",
+                "platforms": ["twitter"],
+                "scheduled_time": when,
+                "status": "scheduled",
+            }
+            for i in range(count)
+        ]
+    )
+
+
+def test_parse_scheduled_time_normalizes_to_utc():
+    parsed = parse_scheduled_time("2030-01-01T13:00:00+01:00")
+    assert parsed == NOW
+    assert parse_scheduled_time(datetime(2030, 1, 1, 12)) == NOW
+
+
+def test_replicas_never_dispatch_the_same_post_twice():
+    db = mongomock_motor.AsyncMongoMockClient()["scheduler_test"]
+    dispatched = []
+
+    async def dispatch(post):
+        dispatched.append(post["_id"])
+        return "task-id"
+
+    async def run():
+        await _seed(db, 200, NOW - timedelta(seconds=5))
+        await _seed(db, 10, NOW + timedelta(hours=1))
+        replicas = [
+            ScheduledPostDispatcher(db, dispatch, replica_id=f"r{i}") for i in range(3)
+        ]
+        counts = await asyncio.gather(*(r.run_once(NOW) for r in replicas))
+        remaining = await db.scheduled_posts.count_documents({"status": "scheduled"})
+        return counts, remaining
+
+    counts, remaining = asyncio.run(run())
+    assert sum(counts) == 200
+    assert len(dispatched) == len(set(dispatched)) == 200
+    assert remaining == 10
+
+
+def test_failed_dispatch_is_released_for_retry():
+    db = mongomock_motor.AsyncMongoMockClient()["scheduler_test"]
+
+    async def failing_dispatch(post):
+        raise RuntimeError("broker down")
+
+    async def run():
+        await _seed(db, 1, NOW)
+        dispatcher = ScheduledPostDispatcher(db, failing_dispatch, max_attempts=2)
+        await dispatcher.run_once(NOW)
+        first = await db.scheduled_posts.find_one({})
+        await dispatcher.run_once(NOW)
+        second = await db.scheduled_posts.find_one({})
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["status"] == "scheduled"
+    assert first["attempts"] == 1
+    assert "lease_owner" not in first
+    assert second["status"] == "failed"
+
+
+def test_expired_leases_are_reclaimed():
+    db = mongomock_motor.AsyncMongoMockClient()["scheduler_test"]
+
+    async def run():
+        await db.scheduled_posts.insert_one(
+            {
+                "scheduled_time": NOW,
+                "status": "dispatching",
+                "lease_owner": "crashed",
+                "lease_expires_at": NOW - timedelta(seconds=1),
+            }
+        )
+        dispatcher = ScheduledPostDispatcher(db, lambda post: None)
+        return await dispatcher.reclaim_expired(NOW)
+
+    assert asyncio.run(run()) == 1
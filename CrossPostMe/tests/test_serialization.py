@@ -0,0 +1,51 @@
+import json
+
+import orjson
+from models import Ad, PostedAd
+from services.serialization import TrustedDocuments, projection
+
+
+def _stored(model):
+    # What Mongo hands back for a document inserted through the model
+    doc = model.model_dump()
+    doc["_id"] = "object-id"
+    return doc
+
+
+def test_trusted_documents_match_validated_output():
+    ad = Ad(
+        title="Bike",
+        description="Road bike",
+        price=120.0,
+        category="sports",
+        location="Austin",
+        platforms=["facebook"],
+    )
+    posted = PostedAd(ad_id=ad.id, platform="facebook", metrics={"views": 3})
+
+    for model, instance in ((Ad, ad), (PostedAd, posted)):
+        fast = orjson.loads(orjson.dumps(TrustedDocuments(model)([_stored(instance)])))
+        assert fast == [json.loads(instance.model_dump_json())]
+
+
+def test_legacy_documents_get_model_defaults():
+    legacy = {
+        "id": "a1",
+        "title": "Lamp",
+        "description": "Desk lamp",
+        "price": 10.0,
+        "category": "home",
+        "location": "Austin",
+        "status": "draft",
+        "created_at": "2024-01-01T00:00:00",
+    }
+    [item] = TrustedDocuments(Ad)([legacy])
+    assert item["version"] == 1
+    assert item["posted_platforms"] == []
+    assert item["images"] is not Ad.model_fields["images"].default
+
+
+def test_projection_selects_model_fields_only():
+    fields = projection(PostedAd)
+    assert fields.pop("_id") == 0
+    assert set(fields) == set(PostedAd.model_fields)
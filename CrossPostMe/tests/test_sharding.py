@@ -0,0 +1,17 @@
+from services.sharding import owns, shard_filter, shard_key
+
+
+def test_every_id_belongs_to_exactly_one_shard():
+    ids = [f"posted-{i}" for i in range(500)]
+    for shard_count in (1, 3, 8):
+        owners = [
+            [i for i in range(shard_count) if owns(pid, shard_count, i)] for pid in ids
+        ]
+        assert all(len(o) == 1 for o in owners)
+
+
+def test_shard_filter_matches_client_side_ownership():
+    assert shard_filter(1, 0) == {}
+    mod_clause = shard_filter(4, 2)["$or"][0]["shard_key"]["$mod"]
+    assert mod_clause == [4, 2]
+    assert owns("ad-1", 4, shard_key("ad-1") % 4)
@@ -0,0 +1,239 @@
+import asyncio
+
+import pytest
+from models import AdCreate, AdUpdate
+from routes.ads import create_ad, delete_ad, update_ad
+from services.stats import (
+    GLOBAL_STATS_ID,
+    STATS_COLLECTION,
+    increment_stats,
+    load_dashboard_stats,
+    rebuild_stats,
+)
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def _ad(title="Chair"):
+    return AdCreate(
+        title=title,
+        description="desc",
+        price=10,
+        category="home",
+        location="Austin",
+    )
+
+
+async def _seeded_db():
+    db = mongomock_motor.AsyncMongoMockClient()["stats_test"]
+    await db.ads.insert_many(
+        [
+            {"id": "a1", "owner_id": "u1", "status": "posted"},
+            {"id": "a2", "owner_id": "u1", "status": "draft"},
+            {"id": "a3", "owner_id": "u2", "status": "posted"},
+        ]
+    )
+    await db.posted_ads.insert_many(
+        [
+            # Older rows have no owner_id and are matched through the ad
+            {"id": "p1", "ad_id": "a1", "views": 10, "leads": 1},
+            {"id": "p2", "ad_id": "a3", "owner_id": "u2", "views": 5},
+        ]
+    )
+    await db.platform_accounts.insert_many(
+        [{"platform": "facebook"}, {"platform": "facebook"}, {"platform": "ebay"}]
+    )
+    return db
+
+
+def test_ad_writes_apply_deltas_to_owner_and_global_counters():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["stats_test"]
+        await rebuild_stats(db)
+        await rebuild_stats(db, "u1")
+        chair = await create_ad(_ad(), current_user="u1", database=db)
+        await create_ad(_ad("Desk"), current_user="u1", database=db)
+        await update_ad(chair.id, AdUpdate(status="posted"), "u1", db)
+        # Unchanged status: no delta
+        await update_ad(chair.id, AdUpdate(status="posted"), "u1", db)
+        after_writes = await load_dashboard_stats(db, "u1")
+        await delete_ad(chair.id, current_user="u1", database=db)
+        return after_writes, await load_dashboard_stats(db, "u1"), db
+
+    after_writes, after_delete, db = asyncio.run(run())
+    assert (after_writes["total_ads"], after_writes["active_ads"]) == (2, 1)
+    assert (after_delete["total_ads"], after_delete["active_ads"]) == (1, 0)
+    global_doc = asyncio.run(db[STATS_COLLECTION].find_one({"_id": GLOBAL_STATS_ID}))
+    assert (global_doc["total_ads"], global_doc["active_ads"]) == (1, 0)
+
+
+def test_rebuild_recomputes_owner_and_global_documents():
+    async def run():
+        db = await _seeded_db()
+        # Drifted counters are corrected
+        await db[STATS_COLLECTION].insert_one(
+            {"_id": "u1", "total_ads": 40, "total_views": -3}
+        )
+        return await rebuild_stats(db, "u1"), await rebuild_stats(db)
+
+    owner, global_doc = asyncio.run(run())
+    assert owner["_id"] == "u1"
+    assert (owner["total_ads"], owner["active_ads"]) == (2, 1)
+    assert (owner["total_posts"], owner["total_views"], owner["total_leads"]) == (
+        1,
+        10,
+        1,
+    )
+    assert "platform_accounts" not in owner
+    assert (global_doc["total_ads"], global_doc["total_posts"]) == (3, 2)
+    assert global_doc["platform_accounts"] == {"facebook": 2, "ebay": 1}
+
+
+def test_deltas_written_during_a_rebuild_are_kept():
+    class Database:
+        """Applies a delta right after the rebuild aggregated posted_ads"""
+
+        def __init__(self, db):
+            self.db = db
+
+        def __getitem__(self, name):
+            return self.db[name]
+
+        def __getattr__(self, name):
+            collection = self.db[name]
+            if name == "posted_ads":
+                aggregate = collection.aggregate
+                increment = increment_stats(self.db, "u1", total_ads=1, active_ads=1)
+
+                class Cursor:
+                    def __init__(self, pipeline):
+                        self.cursor = aggregate(pipeline)
+
+                    async def to_list(self, length):
+                        rows = await self.cursor.to_list(length)
+                        await increment
+                        return rows
+
+                collection.aggregate = Cursor
+            return collection
+
+    async def run():
+        db = await _seeded_db()
+        await rebuild_stats(Database(db), "u1")
+        return await db[STATS_COLLECTION].find_one({"_id": "u1"})
+
+    doc = asyncio.run(run())
+    # 2 ads from the rebuild plus the delta it did not see
+    assert (doc["total_ads"], doc["active_ads"]) == (3, 2)
+
+
+def test_delta_for_missing_document_is_kept_until_rebuild():
+    async def run():
+        db = await _seeded_db()
+        await increment_stats(db, "u1", total_ads=1)
+        upserted = await db[STATS_COLLECTION].find_one({"_id": "u1"})
+        return upserted, await load_dashboard_stats(db, "u1")
+
+    upserted, stats = asyncio.run(run())
+    assert upserted["total_ads"] == 1
+    assert "rebuilt_at" not in upserted
+    # The partial document is not trusted: the first read rebuilds it
+    assert stats["total_ads"] == 2
+
+
+def test_dashboard_stats_per_owner_and_global():
+    async def run():
+        db = await _seeded_db()
+        return (
+            await load_dashboard_stats(db, "u1"),
+            await load_dashboard_stats(db, "u2"),
+            await load_dashboard_stats(db),
+        )
+
+    u1, u2, everyone = asyncio.run(run())
+    assert (u1["total_ads"], u1["total_views"]) == (2, 10)
+    assert (u2["total_ads"], u2["total_views"]) == (1, 5)
+    assert (everyone["total_ads"], everyone["total_views"]) == (3, 15)
+    assert u1["platforms_connected"] == everyone["platforms_connected"] == 2
+
+
+def test_concurrent_cold_reads_rebuild_once():
+    class Database:
+        """Yields to the other reader while the rebuild aggregates ads"""
+
+        def __init__(self, db):
+            self.db = db
+            self.ads_rebuilds = 0
+
+        def __getitem__(self, name):
+            return self.db[name]
+
+        def __getattr__(self, name):
+            collection = self.db[name]
+            if name == "ads":
+                aggregate = collection.aggregate
+                proxy = self
+
+                class Cursor:
+                    def __init__(self, pipeline):
+                        self.cursor = aggregate(pipeline)
+
+                    async def to_list(self, length):
+                        proxy.ads_rebuilds += 1
+                        await asyncio.sleep(0.01)
+                        return await self.cursor.to_list(length)
+
+                collection.aggregate = Cursor
+            return collection
+
+    async def run():
+        db = Database(await _seeded_db())
+        first, second = await asyncio.gather(
+            load_dashboard_stats(db, "u1"), load_dashboard_stats(db, "u1")
+        )
+        stored = await db[STATS_COLLECTION].find_one({"_id": "u1"})
+        return first, second, stored, db.ads_rebuilds
+
+    first, second, stored, ads_rebuilds = asyncio.run(run())
+    assert first["total_ads"] == second["total_ads"] == stored["total_ads"] == 2
+    assert first["active_ads"] == second["active_ads"] == 1
+    assert "rebuilding" not in stored
+    # One rebuild each for the owner and global documents
+    assert ads_rebuilds == 2
+
+
+def test_delta_before_the_pipeline_reads_is_not_counted_twice():
+    class Database:
+        """Creates an ad and applies its delta just before ads are aggregated"""
+
+        def __init__(self, db):
+            self.db = db
+
+        def __getitem__(self, name):
+            return self.db[name]
+
+        def __getattr__(self, name):
+            collection = self.db[name]
+            if name == "ads":
+                aggregate = collection.aggregate
+                db = self.db
+
+                class Cursor:
+                    def __init__(self, pipeline):
+                        self.pipeline = pipeline
+
+                    async def to_list(self, length):
+                        await db.ads.insert_one({"id": "a4", "owner_id": "u1"})
+                        await increment_stats(db, "u1", total_ads=1)
+                        return await aggregate(self.pipeline).to_list(length)
+
+                collection.aggregate = Cursor
+            return collection
+
+    async def run():
+        db = await _seeded_db()
+        await rebuild_stats(Database(db), "u1")
+        return await db[STATS_COLLECTION].find_one({"_id": "u1"})
+
+    doc = asyncio.run(run())
+    assert doc["total_ads"] == 3
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("celery")
+pytest.importorskip("motor")
+fakeredis = pytest.importorskip("fakeredis")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import tasks  # noqa: E402
+from worker import (  # noqa: E402
+    PLATFORM_CONCURRENCY,
+    celery_app,
+    platform_queue,
+    platform_worker_argv,
+)
+
+
+@pytest.fixture
+def eager(monkeypatch):
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery_app.conf, "task_eager_propagates", False)
+    monkeypatch.setattr(tasks, "_redis_client", fakeredis.FakeRedis())
+    calls = []
+    original = tasks.post_to_platform
+
+    def flaky_post(platform, content, media_urls):
+        calls.append(platform)
+        if platform == "linkedin" and calls.count("linkedin") == 1:
+            raise RuntimeError("temporary outage")
+        if platform == "down":
+            raise RuntimeError("platform down")
+        return original(platform, content, media_urls)
+
+    monkeypatch.setattr(tasks, "post_to_platform", flaky_post)
+    return calls
+
+
+def test_fan_out_retries_only_failing_platform(eager):
+    post = {"id": "post-1", "platforms": ["twitter", "linkedin"], "content": "hi"}
+    result = tasks.process_social_post.delay(post).get()
+    assert result["status"] == "dispatched"
+    assert eager == ["twitter", "linkedin", "linkedin"]
+
+    # Re-dispatching the same post does not publish again
+    tasks.process_social_post.delay(post).get()
+    assert eager == ["twitter", "linkedin", "linkedin"]
+
+
+def test_claimed_platform_is_not_published_twice(eager):
+    key = tasks._publish_key("post-5", "twitter")
+    # Another delivery of the same task is publishing right now
+    tasks._redis().set(key, tasks.PUBLISH_IN_PROGRESS)
+    args = ("post-5", "twitter", "hi", [])
+    busy = tasks.publish_to_platform.apply(args).get()
+    assert busy["status"] == "failed"
+    assert "already in progress" in busy["error"]
+
+    tasks._redis().set(key, '{"platform": "twitter", "status": "posted"}')
+    done = tasks.publish_to_platform.apply(args).get()
+    assert done == {"platform": "twitter", "status": "posted"}
+    assert eager == []
+
+
+def test_failure_to_record_a_publish_does_not_post_again(eager, monkeypatch):
+    class FlakyRedis(fakeredis.FakeRedis):
+        def set(self, name, value, *args, **kwargs):
+            if value != tasks.PUBLISH_IN_PROGRESS:
+                raise ConnectionError("redis went away")
+            return super().set(name, value, *args, **kwargs)
+
+    monkeypatch.setattr(tasks, "_redis_client", FlakyRedis())
+    result = tasks.publish_to_platform.apply(("post-6", "twitter", "hi", [])).get()
+    assert result["status"] == "posted"
+    assert eager == ["twitter"]
+    # The claim still blocks a redelivery
+    again = tasks.publish_to_platform.apply(("post-6", "twitter", "hi", [])).get()
+    assert again["status"] == "failed"
+    assert eager == ["twitter"]
+
+
+def test_aggregate_reports_partial_failures():
+    result = tasks.aggregate_social_post_results(
+        [
+            {"platform": "twitter", "status": "posted"},
+            {"platform": "down", "status": "failed", "error": "platform down"},
+        ],
+        "post-2",
+    )
+    assert result["status"] == "partial"
+    assert set(result["results"]) == {"twitter", "down"}
+
+
+def test_unknown_platforms_fail_without_a_queue(eager):
+    post = {"id": "post-3", "platforms": ["twitter", "twiter"], "content": "hi"}
+    chord_result = tasks.process_social_post.delay(post).get()
+    assert chord_result["status"] == "dispatched"
+    assert eager == ["twitter"]
+
+    only_unknown = {"id": "post-4", "platforms": ["myspace"], "content": "hi"}
+    result = tasks.process_social_post.delay(only_unknown).get()
+    assert result["status"] == "failed"
+    assert result["results"]["myspace"]["error"] == "Unsupported platform: myspace"
+
+    with pytest.raises(ValueError):
+        platform_queue("twiter")
+
+
+def test_platform_workers_use_their_concurrency_limit():
+    for platform, limit in PLATFORM_CONCURRENCY.items():
+        argv = platform_worker_argv(platform.upper())
+        assert argv[argv.index("-Q") + 1] == f"social_posts.{platform}"
+        assert argv[argv.index("-c") + 1] == str(limit)
+
+
+def test_worker_process_reuses_one_loop_and_client(monkeypatch):
+    clients = []
+
+    class Client:
+        def __init__(self, url, io_loop=None):
+            self.io_loop = io_loop
+            self.closed = False
+            self.db = mongomock_motor.AsyncMongoMockClient()
+            clients.append(self)
+
+        def __getitem__(self, name):
+            return self.db[name]
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(tasks, "AsyncIOMotorClient", Client)
+    monkeypatch.setattr(tasks, "db_name", "worker_test")
+    monkeypatch.setattr(tasks, "_worker_loop", None)
+    monkeypatch.setattr(tasks, "_worker_client", None)
+
+    tasks.init_worker_db()
+    loop = tasks._worker_loop
+    try:
+        for hour in (9, 10):
+            result = tasks.schedule_post(
+                {"content": "hi", "platforms": ["twitter"]},
+                f"2030-01-01T{hour:02d}:00:00Z",
+            )
+            assert result["status"] == "scheduled"
+            assert tasks._worker_loop is loop
+        stored = tasks.run_async(tasks.worker_db().scheduled_posts.count_documents({}))
+    finally:
+        tasks.close_worker_db()
+        asyncio.set_event_loop(None)
+
+    assert stored == 2
+    assert len(clients) == 1
+    assert clients[0].io_loop is loop
+    assert clients[0].closed
+    assert loop.is_closed()
+    assert tasks._worker_loop is None and tasks._worker_client is None
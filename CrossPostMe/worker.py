@@ -1,4 +1,5 @@
 import os
+import sys
 
 from celery import Celery
 from dotenv import load_dotenv
@@ -23,10 +24,56 @@ celery_app.conf.update(
     task_track_started=True,
     task_routes={
         "tasks.process_social_post": {"queue": "social_posts"},
+        "tasks.aggregate_social_post_results": {"queue": "social_posts"},
         "tasks.schedule_post": {"queue": "scheduler"},
         "tasks.validate_platforms": {"queue": "validation"},
     },
+    # Per-platform publish subtasks are routed explicitly to platform_queue();
+    # acknowledge late so a crashed worker's publish is redelivered, and fetch one
+    # at a time so a slow platform does not hoard prefetched work.
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
 )
 
+# Platforms with a publish queue, and the concurrency of the worker consuming
+# each one. Start one worker per platform with `python worker.py platform <name>`
+# so every platform is held to its own limit.
+PLATFORM_CONCURRENCY = {
+    "facebook": 4,
+    "instagram": 2,
+    "linkedin": 2,
+    "twitter": 4,
+}
+
+
+def platform_queue(platform: str) -> str:
+    """Name of the queue that carries publish subtasks for `platform`.
+
+    Raises ValueError for a platform without a queue: nothing consumes it, so a
+    subtask published there would never run.
+    """
+    name = platform.lower()
+    if name not in PLATFORM_CONCURRENCY:
+        raise ValueError(f"Unsupported platform: {platform}")
+    return f"social_posts.{name}"
+
+
+def platform_worker_argv(platform: str) -> list:
+    """Worker arguments consuming `platform`'s queue at its concurrency limit."""
+    name = platform.lower()
+    return [
+        "worker",
+        "-Q",
+        platform_queue(name),
+        "-c",
+        str(PLATFORM_CONCURRENCY[name]),
+        "-n",
+        f"{name}@%h",
+    ]
+
+
 if __name__ == "__main__":
-    celery_app.start()
+    if len(sys.argv) == 3 and sys.argv[1] == "platform":
+        celery_app.worker_main(platform_worker_argv(sys.argv[2]))
+    else:
+        celery_app.start()
@@ -1,29 +1,163 @@
 import asyncio
 import logging
 import os
-from datetime import datetime, timezone
-from typing import Any
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+# Allow `python worker/metrics_poller.py` to import the shared services package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.sharding import owns, shard_filter, shard_key  # noqa: E402
+from services.stats import increment_stats  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
 MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME")
 POLL_INTERVAL = int(os.environ.get("METRICS_POLL_INTERVAL", "300"))
+BATCH_SIZE = int(os.environ.get("METRICS_POLL_BATCH_SIZE", "500"))
+PLATFORM_CONCURRENCY = int(os.environ.get("METRICS_POLL_PLATFORM_CONCURRENCY", "4"))
+MAX_IN_FLIGHT = int(os.environ.get("METRICS_POLL_MAX_IN_FLIGHT", "100"))
+# Run N poller replicas by giving each a distinct index in [0, N)
+SHARD_COUNT = int(os.environ.get("METRICS_POLL_SHARDS", "1"))
+SHARD_INDEX = int(os.environ.get("METRICS_POLL_SHARD_INDEX", "0"))
+
+# Only the fields the poller needs from each posted ad
+PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "ad_id": 1,
+    "owner_id": 1,
+    "platform": 1,
+    "views": 1,
+    "leads": 1,
+    "shard_key": 1,
+}
+
+
+async def fetch_platform_metrics(pa: Dict[str, Any]) -> Dict[str, int]:
+    """Return the latest cumulative metrics for a posted ad.
+
+    Placeholder until platform adapters exist: reports the stored values, so
+    no deltas are applied.
+    """
+    return {"views": pa.get("views", 0), "leads": pa.get("leads", 0)}
+
+
+def due_filter(now: datetime, interval: int = POLL_INTERVAL) -> Dict[str, Any]:
+    """Select posted ads not polled within the last `interval` seconds."""
+    cutoff = now - timedelta(seconds=interval)
+    return {
+        "$or": [
+            {"last_polled": None},
+            {"last_polled": {"$lte": cutoff}},
+            # Written as ISO strings by earlier versions of the poller
+            {"last_polled": {"$type": "string"}},
+        ]
+    }
+
+
+def _empty_deltas() -> Dict[Optional[str], Dict[str, int]]:
+    return defaultdict(lambda: {"total_views": 0, "total_leads": 0})
 
 
-async def poll_metrics_once(db_client: Any):
+class _Batch:
+    """Accumulates posted_ads updates and stats deltas for one bulk_write."""
+
+    def __init__(self) -> None:
+        self.ops: List[UpdateOne] = []
+        self.deltas = _empty_deltas()
+
+    async def flush(self, db: Any) -> int:
+        if not self.ops:
+            return 0
+        ops, deltas = self.ops, self.deltas
+        self.ops, self.deltas = [], _empty_deltas()
+        await db.posted_ads.bulk_write(ops, ordered=False)
+        for owner_id, delta in deltas.items():
+            await increment_stats(db, owner_id, **delta)
+        return len(ops)
+
+
+async def poll_metrics_once(
+    db_client: Any,
+    now: Optional[datetime] = None,
+    shard_count: int = SHARD_COUNT,
+    shard_index: int = SHARD_INDEX,
+) -> int:
+    """Poll every due posted ad in this replica's shard; returns ads updated."""
     db = db_client[DB_NAME]
-    # Placeholder: scan posted_ads and update metrics by querying real platform adapters
-    posted = await db.posted_ads.find({}).to_list(1000)
-    logger.info(f"Found {len(posted)} posted ads while polling metrics")
-    now = datetime.now(timezone.utc).isoformat()
-    for pa in posted:
-        # Simulate a metrics update
-        await db.posted_ads.update_one(
-            {"id": pa.get("id")}, {"$set": {"last_polled": now}}
-        )
+    now = now or datetime.now(timezone.utc)
+    query = {"$and": [due_filter(now), shard_filter(shard_count, shard_index)]}
+    cursor = db.posted_ads.find(query, PROJECTION).batch_size(BATCH_SIZE)
+
+    limits: Dict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(PLATFORM_CONCURRENCY)
+    )
+    owners: Dict[str, Optional[str]] = {}
+    batch = _Batch()
+    in_flight: set = set()
+    updated = 0
+
+    async def poll_one(pa: Dict[str, Any]):
+        async with limits[pa.get("platform") or ""]:
+            return pa, await fetch_platform_metrics(pa)
+
+    async def collect(done):
+        nonlocal updated
+        missing = [
+            pa.get("ad_id")
+            for pa, _ in (t.result() for t in done if not t.exception())
+            if not pa.get("owner_id") and pa.get("ad_id") not in owners
+        ]
+        if missing:
+            # Older posted_ads rows have no owner_id; resolve them in one query
+            ads = await db.ads.find(
+                {"id": {"$in": missing}}, {"_id": 0, "id": 1, "owner_id": 1}
+            ).to_list(len(missing))
+            owners.update({a.get("id"): a.get("owner_id") for a in ads})
+        for task in done:
+            if task.exception():
+                logger.warning("Metrics fetch failed: %s", task.exception())
+                continue
+            pa, metrics = task.result()
+            views_delta = metrics.get("views", 0) - pa.get("views", 0)
+            leads_delta = metrics.get("leads", 0) - pa.get("leads", 0)
+            update: Dict[str, Any] = {"$set": {"last_polled": now}}
+            if pa.get("shard_key") is None:
+                update["$set"]["shard_key"] = shard_key(pa.get("id"))
+            if views_delta or leads_delta:
+                update["$inc"] = {"views": views_delta, "leads": leads_delta}
+                owner = pa.get("owner_id") or owners.get(pa.get("ad_id"))
+                batch.deltas[owner]["total_views"] += views_delta
+                batch.deltas[owner]["total_leads"] += leads_delta
+            batch.ops.append(UpdateOne({"id": pa.get("id")}, update))
+            if len(batch.ops) >= BATCH_SIZE:
+                updated += await batch.flush(db)
+
+    async for pa in cursor:
+        # Rows without a stored shard_key are matched by every replica
+        if not owns(pa.get("id"), shard_count, shard_index):
+            continue
+        in_flight.add(asyncio.create_task(poll_one(pa)))
+        if len(in_flight) >= MAX_IN_FLIGHT:
+            done, in_flight = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            await collect(done)
+
+    if in_flight:
+        done, _ = await asyncio.wait(in_flight)
+        await collect(done)
+    updated += await batch.flush(db)
+    logger.info("Polled metrics for %d posted ads", updated)
+    return updated
 
 
 async def main():
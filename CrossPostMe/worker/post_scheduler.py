@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Allow `python worker/post_scheduler.py` to import the shared services package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.indexes import ensure_indexes  # noqa: E402
+from services.scheduler import ScheduledPostDispatcher  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+MONGO_URL = os.environ.get("MONGO_URL")
+DB_NAME = os.environ.get("DB_NAME")
+
+
+async def main():
+    if not MONGO_URL or not DB_NAME:
+        logger.error("MONGO_URL or DB_NAME not set; post scheduler exiting")
+        return
+    client = AsyncIOMotorClient(MONGO_URL)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        db = client[DB_NAME]
+        await ensure_indexes(db)
+        dispatcher = ScheduledPostDispatcher(db)
+        logger.info("Post scheduler %s started", dispatcher.replica_id)
+        await dispatcher.run_forever(stop)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
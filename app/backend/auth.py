@@ -1,6 +1,10 @@
+import asyncio
 import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Annotated
+from typing import Annotated, Any, Callable, TypeVar
 
 from fastapi import Cookie, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -35,6 +39,15 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7  # Longer-lived refresh tokens
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt takes 100-300 ms per call, so async handlers hash in a bounded pool
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+
+T = TypeVar("T")
+
 # Security scheme
 security = HTTPBearer()
 
@@ -100,6 +113,14 @@ def _user_from_payload(payload: dict) -> User | None:
     return None
 
 
+def _truncate_password(password: str) -> str:
+    # Truncate password to 72 bytes for bcrypt compatibility
+    # (bcrypt has a 72-byte limit)
+    if len(password.encode('utf-8')) > 72:
+        password = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
+    return password
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash."""
     return bool(pwd_context.verify(plain_password, hashed_password))
@@ -107,11 +128,149 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storing."""
-    # Truncate password to 72 bytes for bcrypt compatibility
-    # (bcrypt has a 72-byte limit)
-    if len(password.encode('utf-8')) > 72:
-        password = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
-    return str(pwd_context.hash(password))
+    return str(pwd_context.hash(_truncate_password(password)))
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password; also return a new hash if pwd_context settings changed.
+
+    The new hash is None unless the stored one uses a deprecated scheme or
+    different rounds than pwd_context now has.
+    """
+    valid, new_hash = pwd_context.verify_and_update(
+        _truncate_password(plain_password), hashed_password
+    )
+    return bool(valid), (str(new_hash) if valid and new_hash else None)
+
+
+class PasswordHasher:
+    """Runs password hashing off the event loop in a bounded executor.
+
+    At most ``workers`` hashes run at once; further calls wait in a queue of at
+    most ``max_queue`` and are rejected with 503 beyond that, so a login burst
+    cannot pile up unbounded work. bcrypt releases the GIL, so the default
+    thread pool hashes in parallel; ``kind="process"`` uses processes instead.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        kind: str = PASSWORD_HASH_EXECUTOR,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waits: deque[float] = deque(maxlen=1000)
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run ``func(*args)`` in the pool once a worker is free"""
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self._waits.append(time.perf_counter() - queued_at)
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(), func, *args)
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_ms_p95": (
+                round(waits[max(int(len(waits) * 0.95) - 1, 0)] * 1000, 2)
+                if waits
+                else None
+            ),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_password_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Shared password hashing pool"""
+    global _password_hasher
+
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher()
+    return _password_hasher
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the password hashing pool (call on shutdown)"""
+    global _password_hasher
+
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
+        _password_hasher = None
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash() without blocking the event loop."""
+    return await get_password_hasher().run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() without blocking the event loop."""
+    return await get_password_hasher().run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """verify_and_update_password() without blocking the event loop."""
+    return await get_password_hasher().run(
+        verify_and_update_password, plain_password, hashed_password
+    )
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends
 
 from auth import get_current_user
 from models import AIAdRequest, AIAdResponse
+from services import bi_events
 
 # Feature flags
 USE_SUPABASE = os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes")
@@ -67,25 +68,18 @@ async def generate_ad(request: AIAdRequest, user_id: str = Depends(get_current_u
         keywords=keywords,
     )
 
-    # Log AI usage to Supabase
+    # Log AI usage to Supabase (buffered, written in batches off the request path)
     if USE_SUPABASE:
-        try:
-            from supabase_db import get_supabase
-            client = get_supabase()
-            if client:
-                bi_data = {
-                    "user_id": user_id,
-                    "event_type": "ai_ad_generated",
-                    "event_data": {
-                        "request": request.dict(),
-                        "response": response.dict(),
-                        "model": "mock_ai_v1"
-                    }
-                }
-                client.table("business_intelligence").insert(bi_data).execute()
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Failed to log AI usage to Supabase: {e}")
+        bi_data = {
+            "user_id": user_id,
+            "event_type": "ai_ad_generated",
+            "event_data": {
+                "request": request.dict(),
+                "response": response.dict(),
+                "model": "mock_ai_v1"
+            }
+        }
+        await bi_events.log(bi_data)
 
     return response
 
@@ -108,25 +102,19 @@ async def optimize_ad(title: str, description: str, user_id: str = Depends(get_c
         "estimated_leads": random.randint(5, 25),
     }
 
-    # Log AI usage to Supabase
+    # Log AI usage to Supabase (buffered, written in batches off the request path)
     if USE_SUPABASE:
-        try:
-            from supabase_db import get_supabase
-            client = get_supabase()
-            if client:
-                bi_data = {
-                    "user_id": user_id,
-                    "event_type": "ai_ad_optimized",
-                    "event_data": {
-                        "title": title,
-                        "description_length": len(description),
-                        "score": result["score"],
-                        "suggestions_count": len(result["suggestions"])
-                    }
-                }
-                client.table("business_intelligence").insert(bi_data).execute()
-        except Exception as e:
-            print(f"Failed to log AI optimization to Supabase: {e}")
+        bi_data = {
+            "user_id": user_id,
+            "event_type": "ai_ad_optimized",
+            "event_data": {
+                "title": title,
+                "description_length": len(description),
+                "score": result["score"],
+                "suggestions_count": len(result["suggestions"])
+            }
+        }
+        await bi_events.log(bi_data)
 
     return result
 
@@ -152,24 +140,18 @@ async def optimize_title(title: str, category: str = None, user_id: str = Depend
         "reasoning": "Added engaging emoji and power words to increase visibility"
     }
 
-    # Log AI usage to Supabase
+    # Log AI usage to Supabase (buffered, written in batches off the request path)
     if USE_SUPABASE:
-        try:
-            from supabase_db import get_supabase
-            client = get_supabase()
-            if client:
-                bi_data = {
-                    "user_id": user_id,
-                    "event_type": "ai_title_optimized",
-                    "event_data": {
-                        "original_title": title,
-                        "category": category,
-                        "improvement_score": result["improvement_score"]
-                    }
-                }
-                client.table("business_intelligence").insert(bi_data).execute()
-        except Exception as e:
-            print(f"Failed to log AI title optimization to Supabase: {e}")
+        bi_data = {
+            "user_id": user_id,
+            "event_type": "ai_title_optimized",
+            "event_data": {
+                "original_title": title,
+                "category": category,
+                "improvement_score": result["improvement_score"]
+            }
+        }
+        await bi_events.log(bi_data)
 
     return result
 
@@ -216,25 +198,19 @@ async def suggest_price(
         ]
     }
 
-    # Log AI usage to Supabase
+    # Log AI usage to Supabase (buffered, written in batches off the request path)
     if USE_SUPABASE:
-        try:
-            from supabase_db import get_supabase
-            client = get_supabase()
-            if client:
-                bi_data = {
-                    "user_id": user_id,
-                    "event_type": "ai_price_suggested",
-                    "event_data": {
-                        "product": product_name,
-                        "category": category,
-                        "condition": condition,
-                        "suggested_price": result["suggested_price"],
-                        "confidence": result["confidence"]
-                    }
-                }
-                client.table("business_intelligence").insert(bi_data).execute()
-        except Exception as e:
-            print(f"Failed to log AI price suggestion to Supabase: {e}")
+        bi_data = {
+            "user_id": user_id,
+            "event_type": "ai_price_suggested",
+            "event_data": {
+                "product": product_name,
+                "category": category,
+                "condition": condition,
+                "suggested_price": result["suggested_price"],
+                "confidence": result["confidence"]
+            }
+        }
+        await bi_events.log(bi_data)
 
     return result
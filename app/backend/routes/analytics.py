@@ -7,10 +7,10 @@ and platform metrics.
 
 import logging
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
 from auth import get_current_user
 from db import get_typed_db
@@ -47,62 +47,124 @@ async def get_dashboard_analytics(
     }
 
 
+def _date_range(start_date: str | None, end_date: str | None) -> tuple[datetime, datetime]:
+    """Parse YYYY-MM-DD bounds (default: last 30 days) into [start, end) datetimes.
+
+    end_date is inclusive, so the range runs to midnight after it.
+    """
+    today = datetime.now(timezone.utc).date()
+    try:
+        end = date.fromisoformat(end_date) if end_date else today
+        start = date.fromisoformat(start_date) if start_date else end - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    return (
+        datetime.combine(start, time.min, tzinfo=timezone.utc),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc),
+    )
+
+
+def _posted_between(range_start: datetime, range_end: datetime) -> Dict[str, Any]:
+    """Mongo filter for posted_at in [range_start, range_end).
+
+    posted_at is stored as a BSON date by some writers and as a UTC ISO string
+    (serialize_datetime_fields) by others, and range filters only match values of
+    the same type, so both forms are matched. Bounds are whole days, so the
+    string range compares date prefixes and accepts any offset suffix.
+    """
+    return {
+        "$or": [
+            {"posted_at": {"$gte": range_start, "$lt": range_end}},
+            {"posted_at": {
+                "$gte": range_start.date().isoformat(),
+                "$lt": range_end.date().isoformat(),
+            }},
+        ]
+    }
+
+
+def _listing_row(
+    listing_id: str, listing: Dict[str, Any], totals: Dict[str, Any], platform: str | None
+) -> Dict[str, Any]:
+    views = totals.get("views") or 0
+    clicks = totals.get("clicks") or 0
+    return {
+        "listing_id": listing_id,
+        "title": listing.get("title", ""),
+        "platform": platform or "all",
+        "views": views,
+        "clicks": clicks,
+        "leads": totals.get("leads") or 0,
+        "conversion_rate": (clicks / views * 100) if views > 0 else 0,
+        "status": listing.get("status", "draft"),
+        "created_at": listing.get("created_at"),
+    }
+
+
+def _set_pagination_headers(response: Response, total: int, page: int, per_page: int) -> None:
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Page"] = str(page)
+    response.headers["X-Per-Page"] = str(per_page)
+
+
 @router.get("/listings")
 async def get_listing_analytics(
+    response: Response,
     start_date: str = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(None, description="End date (YYYY-MM-DD)"),
+    end_date: str = Query(None, description="End date (YYYY-MM-DD), inclusive"),
     platform: str = Query(None, description="Filter by platform"),
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(50, ge=1, le=200, description="Listings per page"),
     user_id: str = Depends(get_current_user),
 ) -> List[Dict[str, Any]]:
     """
     Get detailed analytics for user's listings.
+
+    Totals cover posts made between start_date and end_date (default: the last
+    30 days). Listings are returned newest first, one page at a time; the total
+    number of listings is sent in the X-Total-Count header.
     """
     db = get_typed_db()
-
-    # Set default date range (last 30 days)
-    if not end_date:
-        end_date = datetime.now().date().isoformat()
-    if not start_date:
-        start_date = (datetime.now() - timedelta(days=30)).date().isoformat()
+    range_start, range_end = _date_range(start_date, end_date)
+    skip = (page - 1) * per_page
 
     analytics = []
+    total = 0
 
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
+        # One RPC returns the page of listings with their grouped posted_ads totals
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
-                # Get listings for user
-                listings_result = client.table("listings").select("*").eq("user_id", user_id).execute()
-
-                for listing in listings_result.data:
-                    listing_id = listing["id"]
-
-                    # Get posted ads for this listing
-                    posted_result = client.table("posted_ads").select("*").eq("ad_id", listing_id).execute()
-
-                    # Get analytics data from posted_ads (simplified)
-                    total_views = 0
-                    total_clicks = 0
-                    total_leads = 0
-
-                    for posted in posted_result.data:
-                        total_views += posted.get("views", 0)
-                        total_clicks += posted.get("clicks", 0)
-                        total_leads += posted.get("leads", 0)
-
-                    analytics.append({
-                        "listing_id": listing_id,
-                        "title": listing.get("title", ""),
-                        "platform": platform or "all",
-                        "views": total_views,
-                        "clicks": total_clicks,
-                        "leads": total_leads,
-                        "conversion_rate": (total_clicks / total_views * 100) if total_views > 0 else 0,
-                        "status": listing.get("status", "draft"),
-                        "created_at": listing.get("created_at"),
-                    })
+                result = await client.rpc(
+                    "listing_analytics",
+                    {
+                        "p_user_id": user_id,
+                        "p_start": range_start.isoformat(),
+                        "p_end": range_end.isoformat(),
+                        "p_platform": platform,
+                        "p_limit": per_page,
+                        "p_offset": skip,
+                    },
+                ).execute()
+
+                for row in result.data or []:
+                    total = row.get("total_count", total)
+                    analytics.append(_listing_row(row["listing_id"], row, row, platform))
+
+                if not analytics and skip:
+                    # Past the last page the RPC returns no row to carry total_count
+                    count = await (
+                        client.table("listings")
+                        .select("id", count="exact", head=True)
+                        .eq("user_id", user_id)
+                        .execute()
+                    )
+                    total = count.count or 0
 
                 logger.info(f"Retrieved listing analytics for {len(analytics)} listings from Supabase")
         except Exception as e:
@@ -110,89 +172,103 @@ async def get_listing_analytics(
             raise HTTPException(status_code=500, detail="Failed to get listing analytics")
     else:
         # --- MONGODB PATH (FALLBACK) ---
-        # Get listings from MongoDB
+        # One page of listings, then a single $in/$group over their posted ads
         query = {"user_id": user_id}
         if platform:
             query["platforms"] = {"$in": [platform]}
 
-        listings = await db["ads"].find(query).to_list(1000)
+        total = await db["ads"].count_documents(query)
+        listings = (
+            await db["ads"]
+            .find(query, {"_id": 0, "id": 1, "title": 1, "status": 1, "created_at": 1})
+            .sort([("created_at", -1), ("id", -1)])
+            .skip(skip)
+            .limit(per_page)
+            .to_list(per_page)
+        )
+
+        totals_by_listing: Dict[str, Dict[str, Any]] = {}
+        if listings:
+            match: Dict[str, Any] = {
+                "ad_id": {"$in": [listing["id"] for listing in listings]},
+                **_posted_between(range_start, range_end),
+            }
+            if platform:
+                match["platform"] = platform
+            pipeline = [
+                {"$match": match},
+                {"$group": {
+                    "_id": "$ad_id",
+                    "views": {"$sum": "$views"},
+                    "clicks": {"$sum": "$clicks"},
+                    "leads": {"$sum": "$leads"},
+                }},
+            ]
+            async for row in db["posted_ads"].aggregate(pipeline):
+                totals_by_listing[row["_id"]] = row
 
         for listing in listings:
-            listing_id = listing["id"]
-
-            # Get posted ads analytics
-            posted_ads = await db["posted_ads"].find({"ad_id": listing_id}).to_list(100)
-
-            total_views = sum(pa.get("views", 0) for pa in posted_ads)
-            total_clicks = sum(pa.get("clicks", 0) for pa in posted_ads)
-            total_leads = sum(pa.get("leads", 0) for pa in posted_ads)
-
-            analytics.append({
-                "listing_id": listing_id,
-                "title": listing.get("title", ""),
-                "platform": platform or "all",
-                "views": total_views,
-                "clicks": total_clicks,
-                "leads": total_leads,
-                "conversion_rate": (total_clicks / total_views * 100) if total_views > 0 else 0,
-                "status": listing.get("status", "draft"),
-                "created_at": listing.get("created_at"),
-            })
+            totals = totals_by_listing.get(listing["id"], {})
+            analytics.append(_listing_row(listing["id"], listing, totals, platform))
 
+    _set_pagination_headers(response, total, page, per_page)
     return analytics
 
 
+def _platform_row(platform: str, posts: int, views: int, clicks: int, leads: int) -> Dict[str, Any]:
+    return {
+        "platform": platform,
+        "total_posts": posts,
+        "total_views": views,
+        "total_clicks": clicks,
+        "total_leads": leads,
+        "success_rate": (leads / posts * 100) if posts > 0 else 0,
+    }
+
+
 @router.get("/platforms")
 async def get_platform_analytics(
     start_date: str = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(None, description="End date (YYYY-MM-DD)"),
+    end_date: str = Query(None, description="End date (YYYY-MM-DD), inclusive"),
     user_id: str = Depends(get_current_user),
 ) -> List[Dict[str, Any]]:
     """
     Get analytics broken down by platform.
+
+    Covers posts made between start_date and end_date (default: the last 30
+    days), most-posted platform first.
     """
     db = get_typed_db()
-
-    # Set default date range (last 30 days)
-    if not end_date:
-        end_date = datetime.now().date().isoformat()
-    if not start_date:
-        start_date = (datetime.now() - timedelta(days=30)).date().isoformat()
+    range_start, range_end = _date_range(start_date, end_date)
 
     platform_stats = []
 
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
+        # Read the trigger-maintained per-day rollup and merge the days in range
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
-                # Get all posted ads for user and group by platform
-                posted_result = client.table("posted_ads").select("*").execute()
-
-                # Group by platform
-                platform_data = {}
-                for posted in posted_result.data:
-                    platform = posted["platform"]
-                    if platform not in platform_data:
-                        platform_data[platform] = {
-                            "platform": platform,
-                            "total_posts": 0,
-                            "total_views": 0,
-                            "total_clicks": 0,
-                            "total_leads": 0,
-                            "success_rate": 0.0,
-                        }
-
-                    platform_data[platform]["total_posts"] += 1
-                    platform_data[platform]["total_views"] += posted.get("views", 0)
-                    platform_data[platform]["total_clicks"] += posted.get("clicks", 0)
-                    platform_data[platform]["total_leads"] += posted.get("leads", 0)
-
-                # Calculate success rates and convert to list
-                for platform, data in platform_data.items():
-                    data["success_rate"] = (data["total_leads"] / data["total_posts"] * 100) if data["total_posts"] > 0 else 0
-                    platform_stats.append(data)
+                rollup_result = (
+                    await client.table("platform_daily_stats")
+                    .select("platform,posts,views,clicks,leads")
+                    .eq("user_id", user_id)
+                    .gte("day", range_start.date().isoformat())
+                    .lt("day", range_end.date().isoformat())
+                    .execute()
+                )
+
+                platform_data: Dict[str, List[int]] = {}
+                for day in rollup_result.data or []:
+                    totals = platform_data.setdefault(day["platform"], [0, 0, 0, 0])
+                    totals[0] += day.get("posts") or 0
+                    totals[1] += day.get("views") or 0
+                    totals[2] += day.get("clicks") or 0
+                    totals[3] += day.get("leads") or 0
+
+                for platform, totals in sorted(platform_data.items(), key=lambda item: -item[1][0]):
+                    platform_stats.append(_platform_row(platform, *totals))
 
                 logger.info(f"Retrieved platform analytics for {len(platform_stats)} platforms from Supabase")
         except Exception as e:
@@ -202,7 +278,7 @@ async def get_platform_analytics(
         # --- MONGODB PATH (FALLBACK) ---
         # Aggregate posted ads by platform
         pipeline = [
-            {"$match": {"user_id": user_id}},
+            {"$match": {"user_id": user_id, **_posted_between(range_start, range_end)}},
             {"$group": {
                 "_id": "$platform",
                 "total_posts": {"$sum": 1},
@@ -216,14 +292,13 @@ async def get_platform_analytics(
         results = await db["posted_ads"].aggregate(pipeline).to_list(20)
 
         for result in results:
-            platform_stats.append({
-                "platform": result["_id"],
-                "total_posts": result["total_posts"],
-                "total_views": result.get("total_views", 0),
-                "total_clicks": result.get("total_clicks", 0),
-                "total_leads": result.get("total_leads", 0),
-                "success_rate": (result.get("total_leads", 0) / result["total_posts"] * 100) if result["total_posts"] > 0 else 0,
-            })
+            platform_stats.append(_platform_row(
+                result["_id"],
+                result["total_posts"],
+                result.get("total_views", 0),
+                result.get("total_clicks", 0),
+                result.get("total_leads", 0),
+            ))
 
     return platform_stats
 
@@ -17,14 +17,15 @@ from auth import (
     create_access_token,
     create_refresh_token,
     get_current_user_with_fallback,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_and_update_password_async,
 )
 from db import get_typed_db
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from jwt import PyJWTError as JWTError
 from models import EnhancedSignupRequest
-from supabase_db import db as supabase_db
+from services import replication_outbox, user_cache, user_lookup, user_search
+from supabase_db import async_db as supabase_db
 
 # Configure logger for authentication events
 logger = logging.getLogger(__name__)
@@ -34,6 +35,52 @@ USE_SUPABASE = os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes")
 PARALLEL_WRITE = os.getenv("PARALLEL_WRITE", "true").lower() in ("true", "1", "yes")
 
 
+async def _rehash_password(user_id: str, new_hash: str) -> None:
+    """Store a password hash recomputed with the current pwd_context settings.
+
+    Failures are logged only; the old hash keeps working and the next login
+    retries.
+    """
+    update = {"password_hash": new_hash, "hashed_password": new_hash}
+    try:
+        if USE_SUPABASE:
+            await supabase_db.update_user(user_id, {"password_hash": new_hash})
+            if PARALLEL_WRITE:
+                await replication_outbox.enqueue(
+                    replication_outbox.update(
+                        "users", user_id, {"id": user_id}, {"$set": update}
+                    )
+                )
+        else:
+            await db.users.update_one({"id": user_id}, {"$set": update})
+            user_lookup.invalidate(user_id)
+        logger.info(f"Password rehashed with current settings | user_id={user_id}")
+    except Exception as e:
+        logger.warning(f"Password rehash failed for user {user_id}: {e}")
+
+
+async def _fetch_user(user_id: str) -> dict | None:
+    """Load a user row by ID from Supabase, falling back to MongoDB."""
+    if USE_SUPABASE:
+        # --- SUPABASE PATH (PRIMARY) ---
+        try:
+            from supabase_db import get_async_supabase
+
+            client = get_async_supabase()
+            if client:
+                result = (
+                    await client.table("users").select("*").eq("id", user_id).execute()
+                )
+                if result.data and len(result.data) > 0:
+                    return result.data[0]
+        except Exception as e:
+            logger.error(f"Failed to fetch user from Supabase: {e}")
+            # Continue to MongoDB fallback
+
+    # MongoDB fallback (if Supabase disabled or failed)
+    return await db.users.find_one({"id": user_id})
+
+
 def _create_user_hash(identifier: str) -> str:
     """Create a non-reversible hash of a user identifier for logging.
 
@@ -152,15 +199,15 @@ async def register(request: Request, user_data: UserCreate):
     user_id = str(uuid.uuid4())
 
     # Hash password once for both databases
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
 
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            # Check if user exists in Supabase
-            existing_user = supabase_db.get_user_by_email(user_data.email)
-            if not existing_user:
-                existing_user = supabase_db.get_user_by_username(user_data.username)
+            # Check if user exists in Supabase (one query for email or username)
+            existing_user = await user_lookup.find_user(
+                supabase_db, email=user_data.email, username=user_data.username
+            )
 
             if existing_user:
                 user_hash = _create_user_hash(user_data.username)
@@ -186,7 +233,7 @@ async def register(request: Request, user_data: UserCreate):
                 "is_active": True,
             }
 
-            created_user = supabase_db.create_user(user_doc)
+            created_user = await supabase_db.create_user(user_doc)
 
             logger.info(
                 "Registration successful (Supabase) | "
@@ -196,28 +243,22 @@ async def register(request: Request, user_data: UserCreate):
                 f"user_id={user_id}",
             )
 
-            # PARALLEL WRITE: Also write to MongoDB for safety
+            # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
             if PARALLEL_WRITE:
-                try:
-                    mongo_doc = {
-                        "id": user_id,
-                        "username": user_data.username,
-                        "email": user_data.email,
-                        "hashed_password": hashed_password,
-                        "is_active": True,
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                        "supabase_id": user_id,  # Track Supabase ID
-                    }
-                    await db.users.insert_one(mongo_doc)
-                    logger.info(
-                        f"✅ Parallel write to MongoDB successful for user: {user_id}"
-                    )
-                except Exception as e:
-                    # Non-blocking: MongoDB failure doesn't fail the request
-                    logger.warning(
-                        f"⚠️  Parallel MongoDB write failed for user {user_id}: {e}"
-                    )
+                mongo_doc = {
+                    "id": user_id,
+                    "username": user_data.username,
+                    "email": user_data.email,
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                    "search_grams": user_search.search_grams(user_data.username, user_data.email),
+                    "supabase_id": user_id,  # Track Supabase ID
+                }
+                await replication_outbox.enqueue(
+                    replication_outbox.insert("users", user_id, mongo_doc)
+                )
 
             return User(
                 id=created_user["id"],
@@ -238,8 +279,10 @@ async def register(request: Request, user_data: UserCreate):
     else:
         # --- MONGODB PATH (FALLBACK/LEGACY) ---
         # Optional early check for better UX feedback
-        existing_user = await db.users.find_one(
-            {"$or": [{"username": user_data.username}, {"email": user_data.email}]},
+        existing_user = await user_lookup.find_user(
+            user_lookup.MongoUsers(db),
+            email=user_data.email,
+            username=user_data.username,
         )
 
         if existing_user:
@@ -266,10 +309,12 @@ async def register(request: Request, user_data: UserCreate):
             "is_active": True,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat(),
+            "search_grams": user_search.search_grams(user_data.username, user_data.email),
         }
 
         try:
             await db.users.insert_one(user_doc)
+            user_lookup.invalidate(email=user_data.email, username=user_data.username)
 
             logger.info(
                 "Registration successful (MongoDB) | "
@@ -307,12 +352,15 @@ async def login(request: Request, login_data: UserLogin, response: Response):
     """
     client_ip = request.client.host if request.client else "unknown"
     user_doc = None
+    new_hash = None
 
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            # Find user by username in Supabase
-            user_doc = supabase_db.get_user_by_username(login_data.username)
+            # Find user by username in Supabase (unknown usernames are cached)
+            user_doc = await user_lookup.find_user(
+                supabase_db, username=login_data.username
+            )
 
             if not user_doc:
                 user_hash = _create_user_hash(login_data.username)
@@ -334,9 +382,12 @@ async def login(request: Request, login_data: UserLogin, response: Response):
             password_hash = user_doc.get("password_hash") or user_doc.get(
                 "hashed_password"
             )
-            if not password_hash or not verify_password(
-                login_data.password, password_hash
-            ):
+            valid = False
+            if password_hash:
+                valid, new_hash = await verify_and_update_password_async(
+                    login_data.password, password_hash
+                )
+            if not valid:
                 user_hash = _create_user_hash(login_data.username)
                 logger.warning(
                     "Login failed - incorrect password (Supabase) | "
@@ -377,12 +428,17 @@ async def login(request: Request, login_data: UserLogin, response: Response):
 
     else:
         # --- MONGODB PATH (FALLBACK/LEGACY) ---
-        user_doc = await db.users.find_one({"username": login_data.username})
+        user_doc = await user_lookup.find_user(
+            user_lookup.MongoUsers(db), username=login_data.username
+        )
 
-        if not user_doc or not verify_password(
-            login_data.password,
-            user_doc["hashed_password"],
-        ):
+        valid = False
+        if user_doc:
+            valid, new_hash = await verify_and_update_password_async(
+                login_data.password,
+                user_doc["hashed_password"],
+            )
+        if not valid:
             user_hash = _create_user_hash(login_data.username)
             logger.warning(
                 "Login failed - incorrect credentials (MongoDB) | "
@@ -415,6 +471,9 @@ async def login(request: Request, login_data: UserLogin, response: Response):
     # Common token creation logic (works for both databases)
     user_id = user_doc["id"]
 
+    if new_hash:
+        await _rehash_password(user_id, new_hash)
+
     # Create access and refresh tokens
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -495,28 +554,8 @@ async def refresh_token(request: Request, response: Response):
                 detail="Invalid token type",
             )
 
-        # Get user data from Supabase or MongoDB
-        user_doc = None
-
-        if USE_SUPABASE:
-            # --- SUPABASE PATH (PRIMARY) ---
-            try:
-                from supabase_db import get_supabase
-
-                client = get_supabase()
-                if client:
-                    result = (
-                        client.table("users").select("*").eq("id", user_id).execute()
-                    )
-                    if result.data and len(result.data) > 0:
-                        user_doc = result.data[0]
-            except Exception as e:
-                logger.error(f"Failed to fetch user from Supabase: {e}")
-                # Continue to MongoDB fallback
-
-        # MongoDB fallback
-        if not user_doc:
-            user_doc = await db.users.find_one({"id": user_id})
+        # Get user data from Supabase or MongoDB (uncached: is_active must be current)
+        user_doc = await _fetch_user(user_id)
 
         if not user_doc:
             # Log user not found
@@ -635,27 +674,7 @@ async def get_current_user_info(
         return user_data
 
     # Fallback: query database for older tokens that don't contain full user data
-    user_doc = None
-
-    if USE_SUPABASE:
-        # --- SUPABASE PATH (PRIMARY) ---
-        try:
-            # Query Supabase by user ID
-            from supabase_db import get_supabase
-
-            client = get_supabase()
-            if client:
-                result = client.table("users").select("*").eq("id", user_id).execute()
-                if result.data and len(result.data) > 0:
-                    user_doc = result.data[0]
-
-        except Exception as e:
-            logger.error(f"Failed to fetch user from Supabase: {e}")
-            # Continue to MongoDB fallback
-
-    # MongoDB fallback (if Supabase disabled or failed)
-    if not user_doc:
-        user_doc = await db.users.find_one({"id": user_id})
+    user_doc = await user_cache.get_profile(user_id, lambda: _fetch_user(user_id))
 
     if not user_doc:
         raise HTTPException(
@@ -706,10 +725,11 @@ async def demo_login(request: Request, response: Response):
             "id": "default",
             "username": "demo_user",
             "email": "demo@example.com",
-            "hashed_password": get_password_hash("demo123"),
+            "hashed_password": await get_password_hash_async("demo123"),
             "is_active": True,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat(),
+            "search_grams": user_search.search_grams("demo_user", "demo@example.com"),
         }
         await db.users.insert_one(user_doc)
 
@@ -778,14 +798,16 @@ async def enhanced_signup(
         )
 
     # Hash password once for both databases
-    hashed_password = get_password_hash(signup_data.password)
+    hashed_password = await get_password_hash_async(signup_data.password)
 
     # Derive username from email (first part before @)
     username = signup_data.email.split("@")[0] + "_" + user_id[:8]
 
     if USE_SUPABASE:
         # Check if email already exists in Supabase
-        existing_user = supabase_db.get_user_by_email(signup_data.email)
+        existing_user = await user_lookup.find_user(
+            supabase_db, email=signup_data.email
+        )
         if existing_user:
             logger.warning(
                 "Enhanced signup failed - email already exists (Supabase) | "
@@ -807,7 +829,7 @@ async def enhanced_signup(
             "is_active": True,
         }
 
-        created_user = supabase_db.create_user(user_doc)
+        created_user = await supabase_db.create_user(user_doc)
 
         # Store business intelligence data
         bi_doc = {
@@ -838,40 +860,34 @@ async def enhanced_signup(
         }
 
         try:
-            supabase_db.insert_business_intelligence(bi_doc)
+            await supabase_db.insert_business_intelligence(bi_doc)
         except Exception as e:
             logger.warning(f"Failed to store business intelligence data: {e}")
 
-        # PARALLEL WRITE: Also write to MongoDB
+        # PARALLEL WRITE: MongoDB copies are applied by the outbox replicator
         if PARALLEL_WRITE:
-            try:
-                mongo_user_doc = {
-                    "id": user_id,
-                    "username": username,
-                    "email": signup_data.email,
-                    "hashed_password": hashed_password,
-                    "is_active": True,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "supabase_id": user_id,
-                }
-                await db.users.insert_one(mongo_user_doc)
-
+            mongo_user_doc = {
+                "id": user_id,
+                "username": username,
+                "email": signup_data.email,
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+                "search_grams": user_search.search_grams(username, signup_data.email),
+                "supabase_id": user_id,
+            }
+            await replication_outbox.enqueue(
+                replication_outbox.insert("users", user_id, mongo_user_doc),
                 # Store BI data in MongoDB as well
-                mongo_bi_doc = bi_doc.copy()
-                await db.business_intelligence.insert_one(mongo_bi_doc)
-
-                logger.info(
-                    f"✅ Parallel write to MongoDB successful for user: {user_id}"
-                )
-            except Exception as e:
-                logger.warning(
-                    f"⚠️  Parallel MongoDB write failed for user {user_id}: {e}"
-                )
+                replication_outbox.insert("business_intelligence", user_id, bi_doc),
+            )
 
     else:
         # MongoDB path (fallback)
-        existing_user = await db.users.find_one({"email": signup_data.email})
+        existing_user = await user_lookup.find_user(
+            user_lookup.MongoUsers(db), email=signup_data.email
+        )
 
         if existing_user:
             logger.warning(
@@ -894,10 +910,12 @@ async def enhanced_signup(
             "is_active": True,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat(),
+            "search_grams": user_search.search_grams(username, signup_data.email),
         }
 
         try:
             await db.users.insert_one(user_doc)
+            user_lookup.invalidate(email=signup_data.email, username=username)
         except pymongo.errors.DuplicateKeyError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -7,10 +7,12 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from auth import create_access_token, get_password_hash
+from auth import create_access_token, get_password_hash_async
 from db import get_typed_db
+from services import bi_export, insights, replication_outbox, user_search
 from supabase_db import db as supabase_db
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
 
 logger = logging.getLogger(__name__)
@@ -115,7 +117,7 @@ async def enhanced_signup(request: EnhancedSignupRequest) -> Dict:
             password_to_hash = request.password
             if len(password_to_hash.encode('utf-8')) > 72:
                 password_to_hash = password_to_hash[:72]
-            password_hash = get_password_hash(password_to_hash)
+            password_hash = await get_password_hash_async(password_to_hash)
         except Exception as e:
             logger.error(f"Password hashing failed: {e}")
             raise HTTPException(
@@ -135,6 +137,7 @@ async def enhanced_signup(request: EnhancedSignupRequest) -> Dict:
             "trial_active": True,
             "trial_type": request.trialType or "free",
             "trial_start_date": datetime.utcnow().isoformat(),
+            "search_grams": user_search.search_grams(username, request.email),
 
             # Business intelligence data
             "business_profile": {
@@ -194,7 +197,7 @@ async def enhanced_signup(request: EnhancedSignupRequest) -> Dict:
             supabase_user_data = {
                 "username": username,
                 "email": request.email,
-                "password_hash": get_password_hash(request.password),
+                "password_hash": password_hash,
                 "full_name": request.fullName,
                 "phone": request.phone,
                 "is_active": True,
@@ -274,17 +277,18 @@ async def enhanced_signup(request: EnhancedSignupRequest) -> Dict:
                 }
             })
 
-        # PARALLEL WRITE: Also write to MongoDB during migration
+        # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
         if USE_SUPABASE and PARALLEL_WRITE:
-            try:
-                # Convert Supabase UUID to string for MongoDB
-                user_data["supabase_id"] = user_id
-                result = db["users"].insert_one(user_data)
-                mongo_id = str(result.inserted_id)
-                logger.info(f"✅ Parallel write to MongoDB: {mongo_id}")
-            except Exception as e:
-                logger.warning(f"⚠️  Parallel MongoDB write failed: {e}")
-                # Don't fail the request if MongoDB write fails
+            # Convert Supabase UUID to string for MongoDB
+            user_data["supabase_id"] = user_id
+            await replication_outbox.enqueue(
+                replication_outbox.insert("users", user_id, user_data)
+            )
+
+        # Picked up by the next business insights snapshot
+        service = insights.get_service()
+        if service is not None:
+            service.signup_arrived()
 
         # Create access token
         access_token = create_access_token(
@@ -330,57 +334,24 @@ async def get_business_insights() -> Dict:
     This data is GOLD for investors, partners, and product decisions.
     """
 
+    service = insights.get_service()
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Insights store not configured"
+        )
+
     try:
-        # Aggregate data from all users
-        total_users = db["users"].count_documents({})
-
-        # Industry breakdown
-        industries = db["users"].aggregate([
-            {"$match": {"business_profile.industry": {"$ne": None}}},
-            {"$group": {
-                "_id": "$business_profile.industry",
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"count": -1}}
-        ])
-
-        # Revenue breakdown
-        revenue_ranges = db["users"].aggregate([
-            {"$match": {"marketplace_data.monthly_revenue": {"$ne": None}}},
-            {"$group": {
-                "_id": "$marketplace_data.monthly_revenue",
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"count": -1}}
-        ])
-
-        # Most used marketplaces
-        marketplace_usage = db["users"].aggregate([
-            {"$unwind": "$marketplace_data.current_marketplaces"},
-            {"$group": {
-                "_id": "$marketplace_data.current_marketplaces",
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"count": -1}}
-        ])
-
-        # Top challenges (product development insights)
-        challenges = db["users"].aggregate([
-            {"$match": {"marketplace_data.biggest_challenge": {"$ne": None}}},
-            {"$group": {
-                "_id": "$marketplace_data.biggest_challenge",
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"count": -1}}
-        ])
+        # Latest precomputed snapshot (refreshed in the background)
+        snapshot = await service.get()
 
         return {
-            "total_users": total_users,
-            "industries": list(industries),
-            "revenue_ranges": list(revenue_ranges),
-            "marketplace_usage": list(marketplace_usage),
-            "top_challenges": list(challenges),
-            "generated_at": datetime.utcnow().isoformat(),
+            "total_users": snapshot["total_users"],
+            "industries": snapshot["industries"],
+            "revenue_ranges": snapshot["revenue_ranges"],
+            "marketplace_usage": snapshot["marketplace_usage"],
+            "top_challenges": snapshot["top_challenges"],
+            "generated_at": snapshot["computed_at"].isoformat(),
         }
 
     except Exception as e:
@@ -392,7 +363,14 @@ async def get_business_insights() -> Dict:
 
 
 @router.get("/data-export")
-async def export_business_data() -> Dict:
+async def export_business_data(
+    format: str = Query("ndjson", description="ndjson, csv or parquet"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    event_type: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = Query(None, description="Resume after this row"),
+    limit: Optional[int] = Query(None, ge=1),
+) -> StreamingResponse:
     """
     Export anonymized business intelligence data.
     This endpoint can be used to:
@@ -400,25 +378,43 @@ async def export_business_data() -> Dict:
     2. Create investor presentations
     3. Sell anonymized data to market research firms
     4. Generate industry reports
-    """
 
-    try:
-        # Export anonymized aggregate data
-        all_data = list(db["business_intelligence"].find(
-            {},
-            {"_id": 0, "user_id": 0}  # Remove identifying info
-        ))
+    Events are streamed in chunks (user ids removed); pass the ``cursor`` of
+    the last row received to resume an interrupted export.
+    """
 
-        return {
-            "data_points": len(all_data),
-            "data": all_data[:100],  # Limit to 100 for demo
-            "export_date": datetime.utcnow().isoformat(),
-            "note": "This is anonymized aggregate data safe for sharing"
-        }
+    source = bi_export.get_source()
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Export store not configured"
+        )
 
-    except Exception as e:
-        logger.error(f"Error exporting data: {e}")
+    try:
+        bi_export.check_format(format)
+        if cursor:
+            bi_export.decode_cursor(cursor)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Export failed"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
+
+    media_type, extension = bi_export.FORMATS[format]
+    return StreamingResponse(
+        bi_export.stream(
+            source,
+            format,
+            since=since,
+            until=until,
+            event_types=event_type,
+            cursor=cursor,
+            limit=limit,
+        ),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="business_intelligence.{extension}"'
+            )
+        },
+    )
@@ -26,7 +26,7 @@ from models import (
     ResponseTemplate,
     ResponseTemplateCreate,
 )
-from services import LeadService
+from services import LeadService, bi_events
 
 # Feature flags
 USE_SUPABASE = os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes")
@@ -241,8 +241,8 @@ async def create_message(
                             "is_spam": is_spam
                         }
                     }
-                    client.table("business_intelligence").insert(bi_data).execute()
-                    logger.info(f"Message logged to Supabase BI: {message_data['id']}")
+                    await bi_events.log(bi_data)
+                    logger.info(f"Message queued for Supabase BI: {message_data['id']}")
 
                     # PARALLEL WRITE: Also save to MongoDB
                     if PARALLEL_WRITE:
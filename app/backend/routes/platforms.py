@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from auth import get_optional_current_user
 from db import get_typed_db
 from models import PlatformAccount, PlatformAccountCreate
+from services import replication_outbox
 
 # Import datetime helpers from ads module
 from .ads import deserialize_datetime_fields, serialize_datetime_fields
@@ -59,8 +60,8 @@ async def create_platform_account(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 # Insert into platform_connections table
                 connection_data = {
@@ -75,16 +76,14 @@ async def create_platform_account(
                         "last_used": doc.get("last_used")
                     }
                 }
-                result = client.table("platform_connections").insert(connection_data).execute()
+                result = await client.table("platform_connections").insert(connection_data).execute()
                 logger.info(f"Platform connection created in Supabase: {account.platform} for user {user_id}")
 
-                # PARALLEL WRITE: Also write to MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db["platform_accounts"].insert_one(doc)
-                        logger.info(f"✅ Parallel write to MongoDB successful for platform account: {account.platform}")
-                    except Exception as e:
-                        logger.warning(f"⚠️  Parallel MongoDB write failed for platform account {account.platform}: {e}")
+                    await replication_outbox.enqueue(
+                        replication_outbox.insert("platform_accounts", f"{user_id}:{account.platform}", doc)
+                    )
         except Exception as e:
             logger.error(f"Platform account creation failed (Supabase): {e}")
             raise HTTPException(status_code=500, detail="Failed to create platform account")
@@ -107,8 +106,8 @@ async def get_platform_accounts(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 query = client.table("platform_connections").select("*").eq("user_id", user_id).eq("is_active", True)
 
@@ -116,7 +115,7 @@ async def get_platform_accounts(
                     query = query.eq("platform", platform)
 
                 query = query.order("created_at", desc=True)
-                result = query.execute()
+                result = await query.execute()
 
                 # Convert Supabase platform_connections to PlatformAccount format
                 for conn in result.data:
@@ -165,10 +164,10 @@ async def get_platform_account(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
-                result = client.table("platform_connections").select("*").eq("id", account_id).eq("user_id", user_id).execute()
+                result = await client.table("platform_connections").select("*").eq("id", account_id).eq("user_id", user_id).execute()
                 if result.data and len(result.data) > 0:
                     conn = result.data[0]
                     metadata = conn.get("metadata", {})
@@ -213,8 +212,8 @@ async def update_account_status(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 # Update is_active based on status
                 is_active = status == "active"
@@ -224,13 +223,13 @@ async def update_account_status(
                 }
 
                 # Also update metadata status
-                current_conn = client.table("platform_connections").select("metadata").eq("id", account_id).eq("user_id", user_id).execute()
+                current_conn = await client.table("platform_connections").select("metadata").eq("id", account_id).eq("user_id", user_id).execute()
                 if current_conn.data:
                     metadata = current_conn.data[0].get("metadata", {})
                     metadata["status"] = status
                     update_data["metadata"] = metadata
 
-                result = client.table("platform_connections").update(update_data).eq("id", account_id).eq("user_id", user_id).execute()
+                result = await client.table("platform_connections").update(update_data).eq("id", account_id).eq("user_id", user_id).execute()
 
                 if result.data and len(result.data) > 0:
                     conn = result.data[0]
@@ -248,16 +247,16 @@ async def update_account_status(
                     updated_account = PlatformAccount(**account_data)
                     logger.info(f"Updated platform account status in Supabase: {account_id} to {status}")
 
-                    # PARALLEL WRITE: Also update in MongoDB
+                    # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                     if PARALLEL_WRITE:
-                        try:
-                            await db["platform_accounts"].update_one(
+                        await replication_outbox.enqueue(
+                            replication_outbox.update(
+                                "platform_accounts",
+                                f"{user_id}:{conn['platform']}",
                                 {"id": account_id, "user_id": user_id},
                                 {"$set": {"status": status}},
                             )
-                            logger.info(f"✅ Parallel write to MongoDB successful for account status update: {account_id}")
-                        except Exception as e:
-                            logger.warning(f"⚠️  Parallel MongoDB write failed for account status update {account_id}: {e}")
+                        )
 
                     return updated_account
                 else:
@@ -301,29 +300,29 @@ async def delete_platform_account(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 # Soft delete by setting is_active=false
                 update_data = {
                     "is_active": False,
                     "updated_at": datetime.now(timezone.utc).isoformat()
                 }
-                result = client.table("platform_connections").update(update_data).eq("id", account_id).eq("user_id", user_id).execute()
+                result = await client.table("platform_connections").update(update_data).eq("id", account_id).eq("user_id", user_id).execute()
 
                 if result.data and len(result.data) > 0:
                     logger.info(f"Soft-deleted platform account in Supabase: {account_id}")
 
-                    # PARALLEL WRITE: Also soft-delete in MongoDB
+                    # PARALLEL WRITE: MongoDB soft-delete is applied by the outbox replicator
                     if PARALLEL_WRITE:
-                        try:
-                            await db["platform_accounts"].update_one(
+                        await replication_outbox.enqueue(
+                            replication_outbox.update(
+                                "platform_accounts",
+                                f"{user_id}:{result.data[0]['platform']}",
                                 {"id": account_id, "user_id": user_id},
                                 {"$set": {"status": "inactive"}},
                             )
-                            logger.info(f"✅ Parallel write to MongoDB successful for account deletion: {account_id}")
-                        except Exception as e:
-                            logger.warning(f"⚠️  Parallel MongoDB write failed for account deletion {account_id}: {e}")
+                        )
 
                     return {"message": "Account deleted successfully"}
                 else:
@@ -533,10 +532,10 @@ async def get_connected_platforms(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
-                result = client.table("platform_connections").select("*").eq("user_id", user_id).eq("is_active", True).execute()
+                result = await client.table("platform_connections").select("*").eq("user_id", user_id).eq("is_active", True).execute()
 
                 for conn in result.data:
                     platform_data = {
@@ -592,11 +591,11 @@ async def connect_platform(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 # Check if connection already exists
-                existing = client.table("platform_connections").select("*").eq("user_id", user_id).eq("platform", platform).execute()
+                existing = await client.table("platform_connections").select("*").eq("user_id", user_id).eq("platform", platform).execute()
 
                 if existing.data:
                     # Update existing connection
@@ -604,7 +603,7 @@ async def connect_platform(
                         "is_active": True,
                         "updated_at": datetime.now(timezone.utc).isoformat()
                     }
-                    client.table("platform_connections").update(update_data).eq("user_id", user_id).eq("platform", platform).execute()
+                    await client.table("platform_connections").update(update_data).eq("user_id", user_id).eq("platform", platform).execute()
                     connection_id = existing.data[0]["id"]
                 else:
                     # Create new connection
@@ -614,30 +613,30 @@ async def connect_platform(
                         "is_active": True,
                         "metadata": {"status": "connecting"}
                     }
-                    result = client.table("platform_connections").insert(connection_data).execute()
+                    result = await client.table("platform_connections").insert(connection_data).execute()
                     connection_id = result.data[0]["id"]
 
                 logger.info(f"Platform connection initiated in Supabase: {platform} for user {user_id}")
 
-                # PARALLEL WRITE: Also update/create in MongoDB
+                # PARALLEL WRITE: MongoDB upsert is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        account_data = {
-                            "id": connection_id,
-                            "user_id": user_id,
-                            "platform": platform,
-                            "account_name": f"{platform}_user",
-                            "account_email": f"user@{platform}.com",
-                            "status": "active"
-                        }
-                        await db["platform_accounts"].update_one(
+                    account_data = {
+                        "id": connection_id,
+                        "user_id": user_id,
+                        "platform": platform,
+                        "account_name": f"{platform}_user",
+                        "account_email": f"user@{platform}.com",
+                        "status": "active"
+                    }
+                    await replication_outbox.enqueue(
+                        replication_outbox.update(
+                            "platform_accounts",
+                            f"{user_id}:{platform}",
                             {"user_id": user_id, "platform": platform},
                             {"$set": account_data},
                             upsert=True
                         )
-                        logger.info(f"✅ Parallel write to MongoDB successful for platform connect: {platform}")
-                    except Exception as e:
-                        logger.warning(f"⚠️  Parallel MongoDB write failed for platform connect {platform}: {e}")
+                    )
 
                 return {
                     "success": True,
@@ -684,29 +683,29 @@ async def disconnect_platform(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 # Soft disconnect by setting is_active=false
                 update_data = {
                     "is_active": False,
                     "updated_at": datetime.now(timezone.utc).isoformat()
                 }
-                result = client.table("platform_connections").update(update_data).eq("user_id", user_id).eq("platform", platform).execute()
+                result = await client.table("platform_connections").update(update_data).eq("user_id", user_id).eq("platform", platform).execute()
 
                 if result.data and len(result.data) > 0:
                     logger.info(f"Platform disconnected in Supabase: {platform} for user {user_id}")
 
-                    # PARALLEL WRITE: Also disconnect in MongoDB
+                    # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                     if PARALLEL_WRITE:
-                        try:
-                            await db["platform_accounts"].update_one(
+                        await replication_outbox.enqueue(
+                            replication_outbox.update(
+                                "platform_accounts",
+                                f"{user_id}:{platform}",
                                 {"user_id": user_id, "platform": platform},
                                 {"$set": {"status": "inactive"}},
                             )
-                            logger.info(f"✅ Parallel write to MongoDB successful for platform disconnect: {platform}")
-                        except Exception as e:
-                            logger.warning(f"⚠️  Parallel MongoDB write failed for platform disconnect {platform}: {e}")
+                        )
 
                     return {
                         "success": True,
@@ -750,29 +749,29 @@ async def sync_platform_data(
     if USE_SUPABASE:
         # --- SUPABASE PATH (PRIMARY) ---
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
+            from supabase_db import get_async_supabase
+            client = get_async_supabase()
             if client:
                 # Update last_sync timestamp
                 update_data = {
                     "last_sync": datetime.now(timezone.utc).isoformat(),
                     "updated_at": datetime.now(timezone.utc).isoformat()
                 }
-                result = client.table("platform_connections").update(update_data).eq("user_id", user_id).eq("platform", platform).execute()
+                result = await client.table("platform_connections").update(update_data).eq("user_id", user_id).eq("platform", platform).execute()
 
                 if result.data and len(result.data) > 0:
                     logger.info(f"Platform sync initiated in Supabase: {platform} for user {user_id}")
 
-                    # PARALLEL WRITE: Also update in MongoDB
+                    # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                     if PARALLEL_WRITE:
-                        try:
-                            await db["platform_accounts"].update_one(
+                        await replication_outbox.enqueue(
+                            replication_outbox.update(
+                                "platform_accounts",
+                                f"{user_id}:{platform}",
                                 {"user_id": user_id, "platform": platform},
                                 {"$set": {"last_used": datetime.now(timezone.utc)}},
                             )
-                            logger.info(f"✅ Parallel write to MongoDB successful for platform sync: {platform}")
-                        except Exception as e:
-                            logger.warning(f"⚠️  Parallel MongoDB write failed for platform sync {platform}: {e}")
+                        )
 
                     return {
                         "success": True,
@@ -14,6 +14,7 @@ from auth import get_current_user
 from db import get_typed_db
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel, Field
+from services import bi_events, replication_outbox, user_cache
 
 # Feature flags
 USE_SUPABASE = os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes")
@@ -479,20 +480,16 @@ async def handle_payment_succeeded(payment_intent: Dict[str, Any]) -> None:
                         "stripe_data": payment_intent,
                     },
                 }
-                client.table("business_intelligence").insert(bi_data).execute()
+                await bi_events.log(bi_data)
                 logger.info(f"Payment success logged to Supabase BI for user {user_id}")
 
-                # PARALLEL WRITE: Also save to MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.payments.insert_one(payment_data)
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for payment: {payment_intent['id']}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for payment {payment_intent['id']}: {e}"
+                    await replication_outbox.enqueue(
+                        replication_outbox.insert(
+                            "payments", payment_intent["id"], payment_data
                         )
+                    )
         except Exception as e:
             logger.error(f"Failed to log payment success to Supabase: {e}")
     else:
@@ -536,20 +533,16 @@ async def handle_payment_failed(payment_intent: Dict[str, Any]) -> None:
                         "stripe_data": payment_intent,
                     },
                 }
-                client.table("business_intelligence").insert(bi_data).execute()
+                await bi_events.log(bi_data)
                 logger.info(f"Payment failure logged to Supabase BI for user {user_id}")
 
-                # PARALLEL WRITE: Also save to MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.payments.insert_one(payment_data)
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for failed payment: {payment_intent['id']}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for failed payment {payment_intent['id']}: {e}"
+                    await replication_outbox.enqueue(
+                        replication_outbox.insert(
+                            "payments", payment_intent["id"], payment_data
                         )
+                    )
         except Exception as e:
             logger.error(f"Failed to log payment failure to Supabase: {e}")
     else:
@@ -593,6 +586,7 @@ async def handle_subscription_created(subscription: Dict[str, Any]) -> None:
                         "updated_at": datetime.now(timezone.utc).isoformat(),
                     }
                 ).eq("id", user_id).execute()
+                await user_cache.invalidate(user_id)
 
                 # Log to business intelligence
                 bi_data = {
@@ -600,22 +594,18 @@ async def handle_subscription_created(subscription: Dict[str, Any]) -> None:
                     "event_type": "subscription_created",
                     "event_data": subscription_data,
                 }
-                client.table("business_intelligence").insert(bi_data).execute()
+                await bi_events.log(bi_data)
                 logger.info(
                     f"Subscription created and logged to Supabase for user {user_id}"
                 )
 
-                # PARALLEL WRITE: Also save to MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.subscriptions.insert_one(subscription_data)
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for subscription: {subscription_id}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for subscription {subscription_id}: {e}"
+                    await replication_outbox.enqueue(
+                        replication_outbox.insert(
+                            "subscriptions", subscription_id, subscription_data
                         )
+                    )
         except Exception as e:
             logger.error(f"Failed to handle subscription creation in Supabase: {e}")
     else:
@@ -655,10 +645,12 @@ async def handle_subscription_updated(subscription: Dict[str, Any]) -> None:
 
                 logger.info(f"Subscription updated logged: {subscription_id}")
 
-                # PARALLEL WRITE: Also update in MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.subscriptions.update_one(
+                    await replication_outbox.enqueue(
+                        replication_outbox.update(
+                            "subscriptions",
+                            subscription_id,
                             {"subscription_id": subscription_id},
                             {
                                 "$set": {
@@ -669,13 +661,7 @@ async def handle_subscription_updated(subscription: Dict[str, Any]) -> None:
                                 }
                             },
                         )
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for subscription update: {subscription_id}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for subscription update {subscription_id}: {e}"
-                        )
+                    )
         except Exception as e:
             logger.error(f"Failed to handle subscription update in Supabase: {e}")
     else:
@@ -714,20 +700,16 @@ async def handle_subscription_deleted(subscription: Dict[str, Any]) -> None:
                 }
                 logger.info(f"Subscription deleted logged: {subscription_id}")
 
-                # PARALLEL WRITE: Also update in MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.subscriptions.update_one(
+                    await replication_outbox.enqueue(
+                        replication_outbox.update(
+                            "subscriptions",
+                            subscription_id,
                             {"subscription_id": subscription_id},
                             {"$set": {"status": "canceled"}},
                         )
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for subscription deletion: {subscription_id}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for subscription deletion {subscription_id}: {e}"
-                        )
+                    )
         except Exception as e:
             logger.error(f"Failed to handle subscription deletion in Supabase: {e}")
     else:
@@ -762,20 +744,16 @@ async def handle_invoice_paid(invoice: Dict[str, Any]) -> None:
                 }
                 logger.info(f"Invoice paid logged: {subscription_id}")
 
-                # PARALLEL WRITE: Also update in MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.subscriptions.update_one(
+                    await replication_outbox.enqueue(
+                        replication_outbox.update(
+                            "subscriptions",
+                            subscription_id,
                             {"subscription_id": subscription_id},
                             {"$set": {"last_payment_status": "paid"}},
                         )
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for invoice paid: {subscription_id}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for invoice paid {subscription_id}: {e}"
-                        )
+                    )
         except Exception as e:
             logger.error(f"Failed to handle invoice paid in Supabase: {e}")
     else:
@@ -811,20 +789,16 @@ async def handle_invoice_failed(invoice: Dict[str, Any]) -> None:
                 }
                 logger.warning(f"Invoice failed logged: {subscription_id}")
 
-                # PARALLEL WRITE: Also update in MongoDB
+                # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
                 if PARALLEL_WRITE:
-                    try:
-                        await db.subscriptions.update_one(
+                    await replication_outbox.enqueue(
+                        replication_outbox.update(
+                            "subscriptions",
+                            subscription_id,
                             {"subscription_id": subscription_id},
                             {"$set": {"last_payment_status": "failed"}},
                         )
-                        logger.info(
-                            f"✅ Parallel write to MongoDB successful for invoice failed: {subscription_id}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️  Parallel MongoDB write failed for invoice failed {subscription_id}: {e}"
-                        )
+                    )
         except Exception as e:
             logger.error(f"Failed to handle invoice failed in Supabase: {e}")
     else:
@@ -9,11 +9,12 @@ import os
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, EmailStr
 
-from auth import User, get_current_user_with_fallback, get_password_hash
+from auth import User, get_current_user_with_fallback, get_password_hash_async
 from db import get_typed_db
+from services import replication_outbox, user_cache, user_lookup, user_search
 from supabase_db import db as supabase_db
 
 logger = logging.getLogger(__name__)
@@ -52,6 +53,12 @@ class UserResponse(BaseModel):
     trial_type: Optional[str] = None
 
 
+class UserSearchResponse(BaseModel):
+    """One page of user search results."""
+    users: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+
 # --- Helper Functions ---
 
 def _get_user_from_supabase(user_id: str) -> Optional[Dict[str, Any]]:
@@ -114,33 +121,24 @@ async def get_user_by_id(
             detail="Not authorized to view this user"
         )
 
-    user_doc = None
-
-    if USE_SUPABASE:
-        # --- SUPABASE PATH (PRIMARY) ---
-        user_doc = _get_user_from_supabase(user_id)
-
-        if not user_doc:
-            logger.warning(f"User not found in Supabase: {user_id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-    else:
+    async def load_user():
+        if USE_SUPABASE:
+            # --- SUPABASE PATH (PRIMARY) ---
+            return _get_user_from_supabase(user_id)
         # --- MONGODB PATH (FALLBACK) ---
-        user_doc = await db.users.find_one({"id": user_id})
+        return await db.users.find_one({"id": user_id})
 
-        if not user_doc:
-            logger.warning(f"User not found in MongoDB: {user_id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
+    # Read-through profile cache (password hashes are never cached)
+    user_doc = await user_cache.get_profile(user_id, load_user)
 
-    # Remove password hash from response
-    user_doc.pop("password_hash", None)
-    user_doc.pop("hashed_password", None)
-    user_doc.pop("_id", None)
+    if not user_doc:
+        logger.warning(
+            f"User not found in {'Supabase' if USE_SUPABASE else 'MongoDB'}: {user_id}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
 
     return UserResponse(**user_doc)
 
@@ -178,7 +176,7 @@ async def update_user(
     if user_update.phone is not None:
         update_data["phone"] = user_update.phone
     if user_update.password is not None:
-        update_data["password_hash"] = get_password_hash(user_update.password)
+        update_data["password_hash"] = await get_password_hash_async(user_update.password)
         update_data["hashed_password"] = update_data["password_hash"]  # MongoDB compatibility
     if user_update.is_active is not None and is_admin:
         # Only admins can change active status
@@ -197,18 +195,21 @@ async def update_user(
                     detail="User not found"
                 )
 
+            await user_cache.invalidate(user_id)
             logger.info(f"User updated in Supabase: {user_id}")
 
-            # PARALLEL WRITE: Also update in MongoDB
+            # PARALLEL WRITE: MongoDB copy is applied by the outbox replicator
             if PARALLEL_WRITE:
-                try:
-                    await db.users.update_one(
-                        {"id": user_id},
-                        {"$set": update_data}
+                replica_update = dict(update_data)
+                if "email" in update_data:
+                    replica_update["search_grams"] = user_search.search_grams(
+                        updated_user.get("username"), updated_user.get("email")
+                    )
+                await replication_outbox.enqueue(
+                    replication_outbox.update(
+                        "users", user_id, {"id": user_id}, {"$set": replica_update}
                     )
-                    logger.info(f"✅ Parallel write to MongoDB successful for user: {user_id}")
-                except Exception as e:
-                    logger.warning(f"⚠️  Parallel MongoDB write failed for user {user_id}: {e}")
+                )
 
         except HTTPException:
             raise
@@ -232,8 +233,22 @@ async def update_user(
                     detail="User not found"
                 )
 
+            user_lookup.invalidate(
+                user_id,
+                email=update_data.get("email"),
+                username=update_data.get("username")
+            )
+            await user_cache.invalidate(user_id)
+
             # Fetch updated user
             updated_user = await db.users.find_one({"id": user_id})
+            if "email" in update_data:
+                await db.users.update_one(
+                    {"id": user_id},
+                    {"$set": {"search_grams": user_search.search_grams(
+                        updated_user.get("username"), updated_user.get("email")
+                    )}}
+                )
             logger.info(f"User updated in MongoDB: {user_id}")
 
         except HTTPException:
@@ -284,21 +299,22 @@ async def delete_user(
                     detail="User not found"
                 )
 
+            await user_cache.invalidate(user_id)
             logger.info(f"User soft-deleted in Supabase: {user_id}")
 
-            # PARALLEL WRITE: Also delete in MongoDB
+            # PARALLEL WRITE: MongoDB soft-delete is applied by the outbox replicator
             if PARALLEL_WRITE:
-                try:
-                    await db.users.update_one(
+                await replication_outbox.enqueue(
+                    replication_outbox.update(
+                        "users",
+                        user_id,
                         {"id": user_id},
                         {"$set": {
                             "is_active": False,
                             "updated_at": datetime.now(timezone.utc).isoformat()
                         }}
                     )
-                    logger.info(f"✅ Parallel write to MongoDB successful for user deletion: {user_id}")
-                except Exception as e:
-                    logger.warning(f"⚠️  Parallel MongoDB write failed for user deletion {user_id}: {e}")
+                )
 
         except HTTPException:
             raise
@@ -325,6 +341,8 @@ async def delete_user(
                     detail="User not found"
                 )
 
+            user_lookup.invalidate(user_id)
+            await user_cache.invalidate(user_id)
             logger.info(f"User soft-deleted in MongoDB: {user_id}")
 
         except HTTPException:
@@ -342,15 +360,17 @@ async def delete_user(
     }
 
 
-@router.get("/search/query", response_model=List[UserResponse])
+@router.get("/search/query", response_model=UserSearchResponse)
 async def search_users(
-    q: Optional[str] = None,
-    limit: int = 20,
+    q: Optional[str] = Query(None, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     current_user=Depends(get_current_user_with_fallback)
 ):
     """Search users by username or email (admin only).
 
-    Supports both Supabase (primary) and MongoDB (fallback).
+    Results are ranked by relevance (exact match, then trigram similarity) and
+    paged with ``cursor``. Supports both Supabase (primary) and MongoDB (fallback).
     """
     user_data, current_user_id = current_user
 
@@ -362,59 +382,30 @@ async def search_users(
             detail="Admin access required"
         )
 
-    users: list = []
-
-    if USE_SUPABASE:
-        # --- SUPABASE PATH (PRIMARY) ---
+    if cursor:
         try:
-            from supabase_db import get_supabase
-            client = get_supabase()
-            if client:
-                query = client.table("users").select("*").limit(limit)
-
-                if q:
-                    # Search in username or email
-                    query = query.or_(f"username.ilike.%{q}%,email.ilike.%{q}%")
-
-                result = query.execute()
-                users = result.data if result.data else []
-
-            logger.info(f"User search in Supabase: {len(users)} results for query: {q}")
-
-        except Exception as e:
-            logger.error(f"User search failed (Supabase): {e}")
+            user_search.decode_cursor(cursor)
+        except ValueError as e:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Search failed"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
             )
-    else:
-        # --- MONGODB PATH (FALLBACK) ---
-        try:
-            query_filter = {}
-            if q:
-                query_filter = {
-                    "$or": [
-                        {"username": {"$regex": q, "$options": "i"}},
-                        {"email": {"$regex": q, "$options": "i"}}
-                    ]
-                }
-
-            cursor = db.users.find(query_filter).limit(limit)
-            users = await cursor.to_list(length=limit)
 
-            logger.info(f"User search in MongoDB: {len(users)} results for query: {q}")
+    backend = user_search.get_backend()
+    if backend is None:
+        return UserSearchResponse(users=[])
 
-        except Exception as e:
-            logger.error(f"User search failed (MongoDB): {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Search failed"
-            )
-
-    # Remove sensitive data
-    for user in users:
-        user.pop("password_hash", None)
-        user.pop("hashed_password", None)
-        user.pop("_id", None)
+    try:
+        users, next_cursor = await user_search.search(backend, q, limit, cursor)
+        logger.info(f"User search: {len(users)} results for query: {q}")
+    except Exception as e:
+        logger.error(f"User search failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Search failed"
+        )
 
-    return [UserResponse(**user) for user in users]
+    return UserSearchResponse(
+        users=[UserResponse(**user) for user in users],
+        next_cursor=next_cursor
+    )
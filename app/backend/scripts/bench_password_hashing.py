@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput with inline vs pooled password verification.
+
+Runs simulated logins (a user lookup of --latency-ms, then a password check)
+from concurrent asyncio tasks, the way FastAPI runs async route handlers:
+
+- inline: verify_password() on the event loop, which stalls every other task
+- pool:   verify_password_async() in the bounded PasswordHasher pool
+
+Besides throughput and latency it reports the longest event loop stall, seen
+by a ticker task that should wake every 5 ms.
+
+Usage (from app/backend):
+    python scripts/bench_password_hashing.py --requests 200 --concurrency 50 --workers 4
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from passlib.context import CryptContext
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import auth  # noqa: E402
+from auth import PasswordHasher  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+async def run(check, requests: int, concurrency: int, latency: float):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - before - 0.005)
+
+    async def one():
+        async with gate:
+            await asyncio.sleep(latency)  # user lookup
+            assert await check()
+        latencies.append(time.perf_counter() - start)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return elapsed, latencies, max(stalls, default=0.0)
+
+
+def report(name: str, elapsed: float, latencies, stall: float, requests: int):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:6s} {requests / elapsed:8.1f} logins/s  "
+        f"p95 {p95 * 1000:8.1f} ms  "
+        f"max loop stall {stall * 1000:8.1f} ms"
+    )
+
+
+async def main_async(args) -> int:
+    auth.pwd_context = CryptContext(
+        schemes=[args.scheme], **{f"{args.scheme}__default_rounds": args.rounds}
+    )
+    try:
+        hashed = auth.get_password_hash(PASSWORD)
+    except Exception as e:
+        print(f"Cannot hash with {args.scheme}: {e}", file=sys.stderr)
+        return 2
+
+    async def inline():
+        return auth.verify_password(PASSWORD, hashed)
+
+    hasher = PasswordHasher(
+        workers=args.workers, max_queue=args.requests, kind=args.executor
+    )
+
+    async def pooled():
+        return await hasher.run(auth.verify_password, PASSWORD, hashed)
+
+    # Warm the pool so worker start-up is not measured
+    await asyncio.gather(*(pooled() for _ in range(args.workers)))
+
+    latency = args.latency_ms / 1000
+    print(
+        f"{args.requests} logins, concurrency {args.concurrency}, "
+        f"{args.scheme} rounds {args.rounds}, {args.workers} {args.executor} workers"
+    )
+    elapsed, latencies, stall = await run(
+        inline, args.requests, args.concurrency, latency
+    )
+    report("inline", elapsed, latencies, stall, args.requests)
+    elapsed, latencies, stall = await run(
+        pooled, args.requests, args.concurrency, latency
+    )
+    report("pool", elapsed, latencies, stall, args.requests)
+    print(f"pool stats: {hasher.stats()}")
+    hasher.shutdown()
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=auth.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--scheme", default="bcrypt")
+    parser.add_argument("--rounds", type=int, default=12)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
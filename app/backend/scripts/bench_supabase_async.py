@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark SupabaseDB vs AsyncSupabaseDB under concurrent requests.
+
+Starts a local PostgREST stand-in (uvicorn) that answers every query after a
+fixed delay, then issues the same lookups from concurrent asyncio tasks, the
+way FastAPI runs async route handlers:
+
+- sync:  SupabaseDB, whose blocking .execute() stalls the event loop
+- async: AsyncSupabaseDB on the shared keep-alive connection pool
+
+Usage (from app/backend):
+    python scripts/bench_supabase_async.py --requests 200 --concurrency 50 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from supabase import create_client  # noqa: E402
+from supabase_db import (  # noqa: E402
+    AsyncSupabaseDB,
+    SupabaseDB,
+    create_async_postgrest,
+)
+
+SERVICE_KEY = "bench-service-key"
+
+
+def postgrest_standin(latency: float) -> Starlette:
+    async def table(request):
+        await asyncio.sleep(latency)
+        email = request.query_params.get("email", "eq.user@example.com")[3:]
+        return JSONResponse([{"id": "user-1", "email": email, "is_active": True}])
+
+    return Starlette(routes=[Route("/rest/v1/{table}", table, methods=["GET"])])
+
+
+def start_server(app: Starlette, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run(lookup, requests: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with gate:
+            await lookup(f"user{i}@example.com")
+        # Measured from submission, as a caller would see it: a task stuck behind
+        # a blocked event loop has not even started running yet
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, elapsed: float, latencies, requests: int) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:6s} {requests / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  total {elapsed:6.2f}s"
+    )
+
+
+async def main_async(args) -> None:
+    url = f"http://127.0.0.1:{args.port}"
+
+    sync_db = SupabaseDB()
+    sync_db.client = create_client(url, SERVICE_KEY)
+
+    async def sync_lookup(email):
+        # What the routes did before: a blocking call inside an async handler
+        return sync_db.get_user_by_email(email)
+
+    async_db = AsyncSupabaseDB(create_async_postgrest(url, SERVICE_KEY))
+
+    # Warm both connection pools
+    await sync_lookup("warmup@example.com")
+    await async_db.get_user_by_email("warmup@example.com")
+
+    print(
+        f"requests: {args.requests}, concurrency: {args.concurrency}, "
+        f"server latency: {args.latency_ms} ms"
+    )
+    elapsed, latencies = await run(sync_lookup, args.requests, args.concurrency)
+    report("sync", elapsed, latencies, args.requests)
+    elapsed, latencies = await run(
+        async_db.get_user_by_email, args.requests, args.concurrency
+    )
+    report("async", elapsed, latencies, args.requests)
+
+    await async_db.client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    server = start_server(postgrest_standin(args.latency_ms / 1000), args.port)
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
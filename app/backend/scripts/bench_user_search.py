@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Benchmark trigram user search against the old unanchored scans.
+
+MongoDB: seeds --users synthetic users (with search_grams) into a scratch
+database, builds the search index and trigram counts, then times each query
+with the old case-insensitive $regex filter and with MongoUserSearch:
+
+- exact username, username prefix, misspelt username, infix, email domain and
+  a term no user has (the worst case for the regex scan)
+
+Supabase/Postgres: --sql prints a psql script that seeds the same number of
+users inside a transaction (rolled back at the end), then times ILIKE against
+search_users(). Run it against a local Supabase with the migrations applied.
+
+Usage (from app/backend):
+    MONGO_URL=mongodb://localhost:27017 python scripts/bench_user_search.py --users 1000000
+    python scripts/bench_user_search.py --sql --users 1000000 | psql "$DATABASE_URL"
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.user_search import MongoUserSearch, search_grams  # noqa: E402
+
+FIRST = (
+    "sam alex jordan taylor morgan casey riley jamie avery quinn drew blake "
+    "cameron dakota emerson finley harper hayden jesse kai logan parker reese "
+    "rowan sage skyler spencer sydney tatum"
+).split()
+LAST = (
+    "smith johnson williams brown jones garcia miller davis rodriguez martinez "
+    "hernandez lopez gonzalez wilson anderson thomas moore jackson martin lee "
+    "perez thompson white harris clark lewis walker hall young allen"
+).split()
+DOMAINS = ("gmail.com", "yahoo.com", "outlook.com", "icloud.com", "example.com")
+
+
+def make_user(i: int) -> dict:
+    """Deterministic synthetic user number ``i``"""
+    first = FIRST[i % len(FIRST)]
+    last = LAST[(i // len(FIRST)) % len(LAST)]
+    username = f"{first}{last}{i}"
+    return {
+        "id": f"u{i:08d}",
+        "username": username,
+        "email": f"{first}.{last}{i}@{DOMAINS[i % len(DOMAINS)]}",
+        "is_active": True,
+    }
+
+
+def queries(users: int) -> dict[str, str]:
+    i = random.Random(7).randrange(users)
+    username = make_user(i)["username"]
+    typo = username[:2] + username[3] + username[2] + username[4:]
+    return {
+        "exact": username,
+        "prefix": username[:8],
+        "typo": typo,
+        "infix": username[3:9],
+        "domain": "icloud",
+        "absent": "zzqxv",
+    }
+
+
+async def seed(db, users: int, batch_size: int) -> None:
+    await db.users.drop()
+    await db.user_search_grams.drop()
+    for start in range(0, users, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, users)):
+            user = make_user(i)
+            user["search_grams"] = search_grams(user["username"], user["email"])
+            batch.append(user)
+        await db.users.insert_many(batch, ordered=False)
+    await db.users.create_index("id", unique=True)
+
+
+async def timed(fn, repeat: int) -> tuple[float, int]:
+    samples = []
+    found = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = len(await fn())
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), found
+
+
+async def main_async(args) -> int:
+    uri = os.environ.get("MONGO_URL")
+    if not uri:
+        print("MONGO_URL environment variable is not set", file=sys.stderr)
+        return 2
+    mongo = AsyncIOMotorClient(uri, serverSelectionTimeoutMS=5000)
+    db = mongo[args.db]
+    try:
+        if not args.reuse:
+            start = time.perf_counter()
+            await seed(db, args.users, args.batch_size)
+            print(f"seeded {args.users} users in {time.perf_counter() - start:.1f}s")
+        search = MongoUserSearch(db)
+        start = time.perf_counter()
+        await search.ensure_indexes()
+        grams = await search.refresh_gram_counts()
+        print(f"index + {grams} trigram counts in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':8s} {'term':24s} {'regex ms':>10s} {'trigram ms':>11s}  hits")
+        for name, term in queries(args.users).items():
+
+            async def regex():
+                legacy = {
+                    "$or": [
+                        {"username": {"$regex": term, "$options": "i"}},
+                        {"email": {"$regex": term, "$options": "i"}},
+                    ]
+                }
+                return await db.users.find(legacy).limit(args.limit).to_list(args.limit)
+
+            async def trigram():
+                return await search.search(term, args.limit)
+
+            regex_s, regex_hits = await timed(regex, args.repeat)
+            trigram_s, trigram_hits = await timed(trigram, args.repeat)
+            print(
+                f"{name:8s} {term:24s} {regex_s * 1000:10.1f} {trigram_s * 1000:11.1f}"
+                f"  {regex_hits}/{trigram_hits}"
+            )
+        return 0
+    finally:
+        if not args.keep:
+            await mongo.drop_database(args.db)
+        mongo.close()
+
+
+def sql_script(users: int, limit: int) -> str:
+    first = ",".join(f"'{name}'" for name in FIRST)
+    last = ",".join(f"'{name}'" for name in LAST)
+    domains = ",".join(f"'{domain}'" for domain in DOMAINS)
+    lines = [
+        "\\set ON_ERROR_STOP on",
+        "begin;",
+        "-- users.id references auth.users; skip FK triggers for the scratch rows",
+        "set local session_replication_role = replica;",
+        "insert into public.users (id, username, email)",
+        "select extensions.uuid_generate_v4(),",
+        f"  (array[{first}])[1 + g % {len(FIRST)}]"
+        f" || (array[{last}])[1 + (g / {len(FIRST)}) % {len(LAST)}] || g,",
+        f"  (array[{first}])[1 + g % {len(FIRST)}]"
+        f" || '.' || (array[{last}])[1 + (g / {len(FIRST)}) % {len(LAST)}] || g"
+        f" || '@' || (array[{domains}])[1 + g % {len(DOMAINS)}]",
+        f"from generate_series(0, {users - 1}) g;",
+        "analyze public.users;",
+        "\\timing on",
+    ]
+    for name, term in queries(users).items():
+        pattern = f"%{term}%"
+        lines += [
+            f"\\echo {name}: {term}",
+            "select count(*) from (select id from public.users"
+            f" where username ilike '{pattern}' or email ilike '{pattern}'"
+            f" limit {limit}) legacy;",
+            f"select count(*) from public.search_users('{term}', {limit});",
+        ]
+    lines.append("rollback;")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--db", default="bench_user_search")
+    parser.add_argument(
+        "--reuse", action="store_true", help="Search an already seeded --db"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch database afterwards"
+    )
+    parser.add_argument(
+        "--sql", action="store_true", help="Print the Postgres benchmark for psql"
+    )
+    args = parser.parse_args()
+    if args.sql:
+        print(sql_script(args.users, args.limit))
+        return
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
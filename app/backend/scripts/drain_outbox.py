@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Drain the PARALLEL_WRITE replication outbox into MongoDB.
+
+Applies pending outbox records (MONGO_URL / DB_NAME) until none remain, then
+prints the backlog and lag. Use it before switching reads to MongoDB, after a
+MongoDB outage, or with --status to only report the backlog.
+
+Usage (from app/backend):
+    python scripts/drain_outbox.py [--timeout 300] [--status]
+
+Exits 0 when the outbox is empty, 1 when records remain (backing off or
+parked as dead), 2 when Supabase or MongoDB is not configured.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import certifi
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.replication_outbox import OutboxReplicator  # noqa: E402
+from supabase_db import close_async_supabase, get_async_supabase  # noqa: E402
+
+
+async def main_async(args) -> int:
+    client = get_async_supabase()
+    if client is None:
+        print("SUPABASE_URL / SUPABASE_SERVICE_KEY are not set", file=sys.stderr)
+        return 2
+    uri = os.environ.get("MONGO_URL")
+    if not uri:
+        print("MONGO_URL environment variable is not set", file=sys.stderr)
+        return 2
+
+    client_opts = {"serverSelectionTimeoutMS": 5000}
+    if "mongodb+srv" in uri:
+        client_opts.update({"tls": True, "tlsCAFile": certifi.where()})
+    mongo = AsyncIOMotorClient(uri, **client_opts)
+    try:
+        replicator = OutboxReplicator(
+            client=client, secondary=mongo[os.environ.get("DB_NAME", "crosspostme")]
+        )
+        if args.status:
+            stats = await replicator.refresh_lag()
+        else:
+            stats = await replicator.drain(timeout=args.timeout)
+        print(json.dumps(stats, indent=2, default=str))
+        return 0 if not stats["pending"] and not stats["dead"] else 1
+    finally:
+        mongo.close()
+        await close_async_supabase()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=300.0,
+        help="Give up after this many seconds (records backing off are waited for)",
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Only report backlog and lag"
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
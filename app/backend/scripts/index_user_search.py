@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Build the MongoDB user search index.
+
+Creates the users.search_grams index, stores search_grams on users that lack
+it (every user with --rebuild) and recounts trigrams in user_search_grams.
+Run it once before serving search from MongoDB, and after bulk imports. The
+Supabase trigram indexes come with the 20251205000000_user_search migration.
+
+Usage (from app/backend):
+    python scripts/index_user_search.py [--rebuild] [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import certifi
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.user_search import MongoUserSearch  # noqa: E402
+
+
+async def main_async(args) -> int:
+    uri = os.environ.get("MONGO_URL")
+    if not uri:
+        print("MONGO_URL environment variable is not set", file=sys.stderr)
+        return 2
+
+    client_opts = {"serverSelectionTimeoutMS": 5000}
+    if "mongodb+srv" in uri:
+        client_opts.update({"tls": True, "tlsCAFile": certifi.where()})
+    mongo = AsyncIOMotorClient(uri, **client_opts)
+    try:
+        search = MongoUserSearch(mongo[os.environ.get("DB_NAME", "crosspostme")])
+        start = time.perf_counter()
+        await search.ensure_indexes()
+        updated = await search.backfill(
+            batch_size=args.batch_size, rebuild=args.rebuild
+        )
+        print(f"Indexed {updated} users in {time.perf_counter() - start:.1f}s")
+        return 0
+    finally:
+        mongo.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Recompute search_grams for every user, not only missing ones",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
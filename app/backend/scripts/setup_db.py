@@ -114,6 +114,27 @@ async def setup_ads_indexes(db) -> None:
         background=True,
     )
 
+    # Listing list for analytics: newest first, paginated
+    await db.ads.create_index(
+        [("user_id", 1), ("created_at", -1), ("id", -1)],
+        name="ads_user_created_idx",
+        background=True,
+    )
+
+    # Listing analytics: posted ads for a batch of listings within a date range
+    await db.posted_ads.create_index(
+        [("ad_id", 1), ("posted_at", 1)],
+        name="posted_ads_ad_posted_idx",
+        background=True,
+    )
+
+    # Platform analytics: a user's posted ads within a date range
+    await db.posted_ads.create_index(
+        [("user_id", 1), ("posted_at", 1)],
+        name="posted_ads_user_posted_idx",
+        background=True,
+    )
+
     logger.info("Ads indexes created")
 
 
@@ -14,6 +14,7 @@ from pydantic import BaseModel, ConfigDict, Field
 
 # Import route modules
 from routes import ads, ai, auth, diagrams, platform_oauth, platforms
+from services.health import build_monitor
 from starlette.middleware.cors import CORSMiddleware
 
 ROOT_DIR = Path(__file__).parent
@@ -30,6 +31,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background dependency checks served by /api/health and /api/ready
+health_monitor = build_monitor(
+    db, use_supabase=os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes")
+)
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -86,25 +92,53 @@ async def get_status_checks() -> list[StatusCheck]:
 async def health_check() -> Dict[str, Any]:
     """Readiness/liveness health endpoint.
 
-    Returns basic application status and performs a quick DB connectivity
-    check via db.validate_connection(). This endpoint is safe to call from
-    a load balancer or platform readiness probe.
+    Returns the cached dependency state kept by the background health
+    monitor (services.health): per store, whether its last check passed, how
+    old that check is and rolling latency percentiles and error rate. No
+    database query runs on the request path, so this is safe to call from a
+    load balancer or platform readiness probe at any rate.
     """
     from datetime import datetime, timezone
 
-    # Perform a lightweight DB connectivity check. db.validate_connection()
-    # already emits helpful warnings on failure; here we return a JSON
-    # payload for human/monitoring consumption. When HEALTH_DEBUG=true is
-    # set in the environment we include additional TLS/SSL diagnostic info.
-    # Validate_connection should return a bool-like value
-    db_ok: bool = await db.validate_connection()
-
+    # When HEALTH_DEBUG=true is set in the environment we include additional
+    # TLS/SSL diagnostic info.
+    snapshot = health_monitor.snapshot()
     payload: Dict[str, Any] = {
-        "status": "ok" if db_ok else "unhealthy",
+        "status": snapshot["status"],
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "db_connected": bool(db_ok),
+        "db_connected": health_monitor.ready(),
+        "dependencies": snapshot["dependencies"],
     }
 
+    # Outbox backlog and lag for PARALLEL_WRITE (when the replicator runs here)
+    from services.replication_outbox import get_replicator
+
+    replicator = get_replicator()
+    if replicator is not None:
+        payload["replication"] = replicator.stats()
+
+    # Buffered analytics events, including how many were dropped under load
+    from services.bi_events import get_writer
+
+    writer = get_writer()
+    if writer.running:
+        payload["bi_events"] = writer.stats()
+
+    # Password hashing pool load (queue depth shows login bursts backing up)
+    from auth import get_password_hasher
+
+    payload["password_hashing"] = get_password_hasher().stats()
+
+    # Identifier cache in front of login/register user lookups
+    from services.user_lookup import get_cache
+
+    payload["user_lookup_cache"] = get_cache().stats()
+
+    # Read-through profile cache (hit rate covers both the local and Redis tiers)
+    from services import user_cache
+
+    payload["user_profile_cache"] = user_cache.get_cache().stats()
+
     # Optional debug info included only when explicitly enabled via env var
     # to avoid leaking internal cert paths in production logs.
     try:
@@ -138,11 +172,11 @@ async def health_check() -> Dict[str, Any]:
 async def readiness_probe() -> Response:
     """Simple readiness endpoint suitable for platform probes.
 
-    Returns HTTP 200 when the application is ready (DB ping successful).
-    Returns HTTP 503 when the DB is unreachable.
+    Returns HTTP 200 when the application is ready (the latest background
+    check of every required store passed and is not stale).
+    Returns HTTP 503 when a required store is unreachable or not yet checked.
     """
-    db_ok = await db.validate_connection()
-    if db_ok:
+    if health_monitor.ready():
         return Response(content="ready", status_code=200)
     # Unhealthy
     raise HTTPException(status_code=503, detail="unavailable")
@@ -200,12 +234,67 @@ async def lifespan(app: FastAPI):
             await initialize_auth_indexes()
         except Exception as e:
             logger.warning(f"Could not initialize auth indexes: {e}")
+
+        # Unique contact key index that deduplicates concurrent lead creation
+        from services import LeadService
+
+        await LeadService(db).ensure_indexes()
     else:
         logger.info("Database not configured. Running in limited mode.")
 
+    # Probe the backing stores in the background for /api/health and /api/ready
+    health_monitor.start()
+
+    # Batch business_intelligence inserts in the background
+    from services.bi_events import start_writer, stop_writer
+
+    await start_writer()
+
+    # Apply PARALLEL_WRITE MongoDB copies recorded in the replication outbox
+    from services.replication_outbox import start_replicator, stop_replicator
+
+    if os.getenv("PARALLEL_WRITE", "true").lower() in ("true", "1", "yes"):
+        try:
+            await start_replicator()
+        except Exception as e:
+            logger.warning(f"Could not start outbox replicator: {e}")
+
+    # Keep the business insights snapshot fresh
+    from services.insights import start_refresher, stop_refresher
+
+    try:
+        await start_refresher()
+    except Exception as e:
+        logger.warning(f"Could not start business insights refresher: {e}")
+
     try:
         yield
     finally:
+        from supabase_db import close_async_supabase
+
+        try:
+            await stop_refresher()
+        except Exception as e:
+            logger.warning(f"Error stopping business insights refresher: {e}")
+        try:
+            await stop_replicator()
+        except Exception as e:
+            logger.warning(f"Error stopping outbox replicator: {e}")
+        try:
+            await stop_writer()
+        except Exception as e:
+            logger.warning(f"Error draining business intelligence events: {e}")
+        await health_monitor.stop()
+        from auth import shutdown_password_hasher
+
+        shutdown_password_hasher()
+        from services.user_cache import close_cache
+
+        await close_cache()
+        try:
+            await close_async_supabase()
+        except Exception as e:
+            logger.warning(f"Error closing async Supabase client: {e}")
         if hasattr(db, "close"):
             try:
                 db.close()
@@ -0,0 +1,328 @@
+"""Business intelligence event buffer - batches business_intelligence inserts
+Request handlers call record()/log() and return immediately; BIEventWriter
+flushes the buffer to Supabase with one bulk insert per batch, when it holds
+BI_EVENT_BATCH_SIZE events or its oldest event is BI_EVENT_FLUSH_INTERVAL_SECONDS
+old. The buffer is bounded: while the store is slow it fills up, and once full
+new events are dropped and counted instead of slowing requests down.
+
+A batch the store rejects outright (a bad uuid, a row that cannot be
+serialised) is split until the offending rows are isolated; those are dropped
+and counted as rejected and the rest is written. A batch that keeps failing for
+other reasons is retried at most BI_EVENT_MAX_ATTEMPTS times.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+BI_TABLE = "business_intelligence"
+
+BI_EVENT_BATCH_SIZE = int(os.getenv("BI_EVENT_BATCH_SIZE", "500"))
+BI_EVENT_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv("BI_EVENT_FLUSH_INTERVAL_SECONDS", "1")
+)
+BI_EVENT_BUFFER_MAX = int(os.getenv("BI_EVENT_BUFFER_MAX", "10000"))
+BI_EVENT_RETRY_MAX_SECONDS = float(os.getenv("BI_EVENT_RETRY_MAX_SECONDS", "30"))
+BI_EVENT_DRAIN_TIMEOUT_SECONDS = float(
+    os.getenv("BI_EVENT_DRAIN_TIMEOUT_SECONDS", "10")
+)
+BI_EVENT_MAX_ATTEMPTS = int(os.getenv("BI_EVENT_MAX_ATTEMPTS", "10"))
+
+# SQLSTATE classes for rows Postgres will never accept: data exceptions (22),
+# integrity violations (23), and syntax errors or undefined columns (42)
+_REJECTED_SQLSTATE_CLASSES = ("22", "23", "42")
+
+
+def _default_client():
+    from supabase_db import get_async_supabase
+
+    return get_async_supabase()
+
+
+def _is_rejection(error: Exception) -> bool:
+    """True if retrying the same rows cannot succeed"""
+    if isinstance(error, (TypeError, ValueError)):
+        # Row could not be serialised to JSON
+        return True
+    if not isinstance(error, APIError):
+        return False
+    code = error.code
+    if isinstance(code, int):
+        # postgrest falls back to the HTTP status when the body is not JSON
+        return 400 <= code < 500 and code not in (408, 429)
+    code = str(code or "")
+    # PGRST1xx are malformed request errors
+    return code.startswith("PGRST1") or code[:2] in _REJECTED_SQLSTATE_CLASSES
+
+
+class BIEventWriter:
+    """Bounded in-process buffer of business_intelligence rows"""
+
+    def __init__(
+        self,
+        client: Any = None,
+        batch_size: int = BI_EVENT_BATCH_SIZE,
+        flush_interval: float = BI_EVENT_FLUSH_INTERVAL_SECONDS,
+        max_buffer: int = BI_EVENT_BUFFER_MAX,
+        max_attempts: int = BI_EVENT_MAX_ATTEMPTS,
+    ):
+        """Initialize the writer
+
+        Args:
+            client: AsyncPostgrestClient to write to (default: shared client)
+            batch_size: Events per bulk insert; a full batch is flushed right away
+            flush_interval: Seconds an event may wait for its batch to fill
+            max_buffer: Buffered events kept while the store is slow; more are dropped
+            max_attempts: Failed writes of one batch before it is dropped
+
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_attempts = max_attempts
+        # Consecutive failed writes of the batch at the front of the buffer
+        self._attempts = 0
+        # record() may be called from threadpool handlers, hence the lock
+        self._lock = threading.Lock()
+        self._buffer: deque[tuple[float, dict]] = deque()
+        self._wake: asyncio.Event | None = None
+        self._stop_event: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._stats = {"written": 0, "dropped": 0, "rejected": 0, "failed_batches": 0}
+        self._last_flush_at: str | None = None
+        self._last_error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    def stats(self) -> dict[str, Any]:
+        """Buffered events and counters since start"""
+        return {
+            "buffered": len(self._buffer),
+            **self._stats,
+            "last_flush_at": self._last_flush_at,
+            "last_error": self._last_error,
+        }
+
+    def record(self, event: dict) -> bool:
+        """Buffer one business_intelligence row without waiting for the store.
+
+        Returns False when the writer is not running, so the caller can insert
+        the row itself. A full buffer drops the event (counted in ``dropped``)
+        and still returns True.
+        """
+        if not self.running:
+            return False
+        row = dict(event)
+        # Keep the event time rather than the (later) insert time
+        row.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._stats["dropped"] += 1
+                return True
+            self._buffer.append((time.monotonic(), row))
+            full = len(self._buffer) == self.batch_size
+        if full:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def _take_batch(self) -> list[dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft()[1] for _ in range(count)]
+
+    def _requeue(self, batch: list[dict]) -> None:
+        """Put a failed batch back at the front, dropping what no longer fits"""
+        now = time.monotonic()
+        with self._lock:
+            room = max(self.max_buffer - len(self._buffer), 0)
+            kept = batch[:room]
+            self._stats["dropped"] += len(batch) - len(kept)
+            self._buffer.extendleft((now, row) for row in reversed(kept))
+
+    async def _write(self, batch: list[dict]) -> None:
+        await self.client.table(BI_TABLE).insert(
+            batch, returning="minimal", default_to_null=False
+        ).execute()
+
+    async def _write_batch(self, batch: list[dict]) -> int:
+        """Write a batch, splitting it to drop the rows the store rejects.
+
+        Any other failure puts the unwritten rows back at the front of the
+        buffer and is raised, unless the batch has used up its attempts.
+        """
+        written = 0
+        parts = [batch]
+        while parts:
+            part = parts.pop(0)
+            try:
+                await self._write(part)
+            except Exception as e:
+                if _is_rejection(e):
+                    if len(part) > 1:
+                        middle = len(part) // 2
+                        parts[:0] = [part[:middle], part[middle:]]
+                        continue
+                    self._stats["rejected"] += 1
+                    self._last_error = str(e)
+                    logger.warning(
+                        f"⚠️  Dropped {part[0].get('event_type')} business "
+                        f"intelligence event rejected by the store: {e}"
+                    )
+                    continue
+                unwritten = [row for rows in [part, *parts] for row in rows]
+                self._attempts += 1
+                if self._attempts >= self.max_attempts:
+                    self._attempts = 0
+                    self._stats["dropped"] += len(unwritten)
+                    logger.warning(
+                        f"⚠️  Dropped {len(unwritten)} business intelligence "
+                        f"events after {self.max_attempts} failed writes"
+                    )
+                else:
+                    self._requeue(unwritten)
+                raise
+            written += len(part)
+            self._stats["written"] += len(part)
+        self._attempts = 0
+        return written
+
+    async def flush(self) -> int:
+        """Write everything buffered now. Returns the number of rows written."""
+        written = 0
+        while self._buffer:
+            written += await self._write_batch(self._take_batch())
+            self._last_flush_at = datetime.now(timezone.utc).isoformat()
+        return written
+
+    def _due(self) -> float | None:
+        """Seconds until the oldest buffered event must be flushed (None if empty)"""
+        with self._lock:
+            if not self._buffer:
+                return None
+            if len(self._buffer) >= self.batch_size:
+                return 0.0
+            oldest = self._buffer[0][0]
+        return max(oldest + self.flush_interval - time.monotonic(), 0.0)
+
+    async def _wait(self, event: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        retry_delay = 0.0
+        while not self._stopping:
+            if retry_delay:
+                # Back off without reacting to full batches; only stop cuts it short
+                await self._wait(self._stop_event, retry_delay)
+            else:
+                due = self._due()
+                if due != 0.0:
+                    self._wake.clear()
+                    await self._wait(
+                        self._wake, self.flush_interval if due is None else due
+                    )
+                    continue
+            if self._stopping:
+                break
+            try:
+                # One batch at a time: the store sets the pace, the bound on the
+                # buffer keeps memory in check meanwhile
+                await self.flush()
+                retry_delay = 0.0
+            except Exception as e:
+                self._stats["failed_batches"] += 1
+                self._last_error = str(e)
+                retry_delay = min(
+                    max(retry_delay * 2, self.flush_interval),
+                    BI_EVENT_RETRY_MAX_SECONDS,
+                )
+                logger.warning(
+                    f"⚠️  Business intelligence flush failed, retrying in "
+                    f"{retry_delay:.1f}s: {e}"
+                )
+
+    def start(self) -> None:
+        """Start flushing in the background (call from the running event loop)"""
+        if self._task is not None:
+            return
+        if self.client is None:
+            self.client = _default_client()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stop_event = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = BI_EVENT_DRAIN_TIMEOUT_SECONDS) -> None:
+        """Stop accepting events and drain the buffer (call on shutdown)"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._stop_event.set()
+        self._wake.set()
+        task, self._task = self._task, None
+        await task
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except Exception as e:
+            lost = len(self._buffer)
+            self._buffer.clear()
+            self._stats["dropped"] += lost
+            logger.warning(
+                f"⚠️  Dropped {lost} business intelligence events on shutdown: {e}"
+            )
+
+
+_writer = BIEventWriter()
+
+
+def get_writer() -> BIEventWriter:
+    return _writer
+
+
+def record(event: dict) -> bool:
+    """Buffer a business_intelligence row on the shared writer (see BIEventWriter.record)"""
+    return _writer.record(event)
+
+
+async def log(event: dict) -> None:
+    """Buffer a business_intelligence row, or insert it now if the writer is not running"""
+    if _writer.record(event):
+        return
+    client = _default_client()
+    if client is None:
+        return
+    try:
+        await client.table(BI_TABLE).insert(event).execute()
+    except Exception as e:
+        logger.warning(f"Failed to log {event.get('event_type')} event: {e}")
+
+
+async def start_writer() -> BIEventWriter | None:
+    """Start the shared writer (call on startup)"""
+    if _default_client() is None:
+        logger.info("Supabase not configured; business intelligence buffer not started")
+        return None
+    _writer.start()
+    return _writer
+
+
+async def stop_writer() -> None:
+    """Drain and stop the shared writer (call on shutdown)"""
+    await _writer.stop()
@@ -0,0 +1,352 @@
+"""Business intelligence export - streams anonymized events as NDJSON, CSV or Parquet
+Events are read in keyset-ordered chunks of BI_EXPORT_CHUNK_SIZE (a single
+server-side cursor on MongoDB, timestamp/id pages on Supabase) and each chunk is
+encoded and sent before the next is fetched, so memory use does not grow with
+the table. Every row carries a ``cursor`` token; passing the last one received
+resumes an interrupted export right after that row.
+"""
+
+import base64
+import csv
+import importlib.util
+import io
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterable
+
+logger = logging.getLogger(__name__)
+
+BI_EXPORT_CHUNK_SIZE = int(os.getenv("BI_EXPORT_CHUNK_SIZE", "1000"))
+
+TABLE = "business_intelligence"
+# user_id is never exported
+COLUMNS = ("event_type", "timestamp", "event_data", "cursor")
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def encode_cursor(timestamp: str, event_id: str) -> str:
+    raw = json.dumps([timestamp, event_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[str, str]:
+    """(timestamp, id) of the row a cursor points at; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        timestamp, event_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("Invalid export cursor") from e
+    if not isinstance(timestamp, str) or not isinstance(event_id, str):
+        raise ValueError("Invalid export cursor")
+    return timestamp, event_id
+
+
+def _iso(value: Any) -> str:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    return str(value)
+
+
+class SupabaseExportSource:
+    """Keyset pages of business_intelligence ordered by (timestamp, id)"""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def chunks(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        event_types: list[str] | None = None,
+        after: tuple[str, str] | None = None,
+        chunk_size: int = BI_EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list[dict]]:
+        while True:
+            query = self.client.table(TABLE).select(
+                "id,event_type,event_data,timestamp"
+            )
+            if since is not None:
+                query = query.gte("timestamp", since.isoformat())
+            if until is not None:
+                query = query.lt("timestamp", until.isoformat())
+            if event_types:
+                query = query.in_("event_type", event_types)
+            if after is not None:
+                timestamp, event_id = after
+                query = query.or_(
+                    f'timestamp.gt."{timestamp}",'
+                    f'and(timestamp.eq."{timestamp}",id.gt.{event_id})'
+                )
+            result = (
+                await query.order("timestamp").order("id").limit(chunk_size).execute()
+            )
+            rows = result.data or []
+            if not rows:
+                return
+            yield [
+                {
+                    "event_type": row["event_type"],
+                    "timestamp": row["timestamp"],
+                    "event_data": row.get("event_data"),
+                    "cursor": encode_cursor(row["timestamp"], row["id"]),
+                }
+                for row in rows
+            ]
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+
+# Fields of an enhanced-signup document that are not part of its payload
+_ENVELOPE = ("_id", "_ts", "user_id", "event_type", "timestamp", "created_at")
+
+
+class MongoExportSource:
+    """One server-side cursor over business_intelligence, read in batches
+
+    Event rows carry ``timestamp`` and a ``data``/``event_data`` payload; the
+    enhanced-signup documents written by routes/auth.py only have
+    ``created_at`` and keep their answers at the top level. Both are ordered,
+    filtered and resumed on one normalized time, ``timestamp`` or else
+    ``created_at``, stored as an ISO string.
+    """
+
+    def __init__(self, db: Any):
+        self.db = db
+
+    @staticmethod
+    def _payload(doc: dict) -> Any:
+        if "event_data" in doc:
+            return doc["event_data"]
+        if "data" in doc:
+            return doc["data"]
+        return {k: v for k, v in doc.items() if k not in _ENVELOPE}
+
+    async def chunks(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        event_types: list[str] | None = None,
+        after: tuple[str, str] | None = None,
+        chunk_size: int = BI_EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list[dict]]:
+        from bson import ObjectId
+
+        # Rows with neither field have nothing to order or resume on
+        window: dict[str, Any] = {"$ne": None}
+        if since is not None:
+            window["$gte"] = (
+                since.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+            )
+        if until is not None:
+            window["$lt"] = (
+                until.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+            )
+        conditions: list[dict] = [{"_ts": window}]
+        if event_types:
+            conditions.append({"event_type": {"$in": event_types}})
+        if after is not None:
+            timestamp, event_id = after
+            last_id = ObjectId(event_id) if ObjectId.is_valid(event_id) else event_id
+            conditions.append(
+                {
+                    "$or": [
+                        {"_ts": {"$gt": timestamp}},
+                        {"_ts": timestamp, "_id": {"$gt": last_id}},
+                    ]
+                }
+            )
+        pipeline = [
+            {"$project": {"user_id": 0}},
+            {"$addFields": {"_ts": {"$ifNull": ["$timestamp", "$created_at"]}}},
+            {"$match": {"$and": conditions}},
+            {"$sort": {"_ts": 1, "_id": 1}},
+        ]
+        cursor = self.db[TABLE].aggregate(
+            pipeline, allowDiskUse=True, batchSize=chunk_size
+        )
+        chunk: list[dict] = []
+        async for doc in cursor:
+            timestamp = doc["_ts"]
+            chunk.append(
+                {
+                    # Documents without a type are enhanced-signup answers
+                    "event_type": doc.get("event_type", "enhanced_signup"),
+                    "timestamp": _iso(timestamp),
+                    "event_data": self._payload(doc),
+                    # The value the resume condition compares against
+                    "cursor": encode_cursor(_iso(timestamp), str(doc["_id"])),
+                }
+            )
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _ndjson(rows: Iterable[dict]) -> bytes:
+    return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+
+
+class _CSVEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(COLUMNS)
+
+    def encode(self, rows: Iterable[dict]) -> bytes:
+        for row in rows:
+            self._writer.writerow(
+                [
+                    row["event_type"],
+                    row["timestamp"],
+                    json.dumps(row["event_data"], default=str),
+                    row["cursor"],
+                ]
+            )
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands over what ParquetWriter wrote so far"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class _ParquetEncoder:
+    """One row group per chunk, flushed to the response as it is written"""
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("event_type", pa.string()),
+                ("timestamp", pa.timestamp("us", tz="UTC")),
+                ("event_data", pa.string()),
+                ("cursor", pa.string()),
+            ]
+        )
+        self._sink = _Sink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema)
+
+    def encode(self, rows: list[dict]) -> bytes:
+        table = self._pa.Table.from_pydict(
+            {
+                "event_type": [row["event_type"] for row in rows],
+                "timestamp": [
+                    datetime.fromisoformat(row["timestamp"].replace("Z", "+00:00"))
+                    for row in rows
+                ],
+                "event_data": [
+                    json.dumps(row["event_data"], default=str) for row in rows
+                ],
+                "cursor": [row["cursor"] for row in rows],
+            },
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
+
+
+def check_format(fmt: str) -> None:
+    """ValueError for an unknown format or a missing Parquet dependency"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "parquet":
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ValueError("Parquet export requires pyarrow")
+
+
+async def stream(
+    source: Any,
+    fmt: str = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    event_types: list[str] | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    chunk_size: int = BI_EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Encoded export body, one piece per chunk read from ``source``"""
+    check_format(fmt)
+    after = decode_cursor(cursor) if cursor else None
+    encoder: Any = None
+    if fmt == "csv":
+        encoder = _CSVEncoder()
+    elif fmt == "parquet":
+        encoder = _ParquetEncoder()
+
+    sent = 0
+    chunks = source.chunks(
+        since=since,
+        until=until,
+        event_types=event_types,
+        after=after,
+        chunk_size=min(chunk_size, limit) if limit else chunk_size,
+    )
+    try:
+        async for rows in chunks:
+            if limit is not None:
+                rows = rows[: limit - sent]
+            sent += len(rows)
+            data = encoder.encode(rows) if encoder else _ndjson(rows)
+            if data:
+                yield data
+            if limit is not None and sent >= limit:
+                break
+    finally:
+        await chunks.aclose()
+    if fmt == "csv" and sent == 0:
+        # Header only
+        yield encoder.encode([])
+    if fmt == "parquet":
+        yield encoder.close()
+    logger.info(f"Business intelligence export: {sent} rows as {fmt}")
+
+
+def get_source() -> Any:
+    """Export source on the primary store (None when no store is configured)"""
+    if os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes"):
+        from supabase_db import get_async_supabase
+
+        client = get_async_supabase()
+        return SupabaseExportSource(client) if client is not None else None
+    from db import get_typed_db
+
+    return MongoExportSource(get_typed_db())
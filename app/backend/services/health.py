@@ -0,0 +1,234 @@
+"""Health monitor - background dependency probing for /api/health and /api/ready
+Each backing store is pinged on its own interval by a background task, which
+keeps the last result and a rolling window of latencies and failures. Probe
+endpoints read the cached state, so load balancer traffic never reaches the
+databases.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "5"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "3"))
+HEALTH_WINDOW_SIZE = int(os.getenv("HEALTH_WINDOW_SIZE", "120"))
+# A result older than this many intervals no longer counts as healthy
+HEALTH_STALE_INTERVALS = float(os.getenv("HEALTH_STALE_INTERVALS", "3"))
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+class DependencyProbe:
+    """Periodic check of one dependency with a rolling window of results"""
+
+    def __init__(
+        self,
+        name: str,
+        check: Callable[[], Awaitable[Any]],
+        interval: float = HEALTH_PROBE_INTERVAL_SECONDS,
+        timeout: float = HEALTH_PROBE_TIMEOUT_SECONDS,
+        required: bool = True,
+        window: int = HEALTH_WINDOW_SIZE,
+    ):
+        """Initialize the probe
+
+        Args:
+            name: Dependency name shown in the health payload
+            check: Coroutine function that raises (or returns False) when unhealthy
+            interval: Seconds between checks
+            timeout: Seconds before a check counts as failed
+            required: Whether /api/ready depends on this dependency
+            window: Number of recent checks kept for latency and error rate
+
+        """
+        self.name = name
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.required = required
+        self._samples: deque[tuple[bool, float]] = deque(maxlen=window)
+        self.ok: bool | None = None
+        self.last_error: str | None = None
+        self.checked_at: float | None = None
+        self.checked_at_iso: str | None = None
+
+    async def probe(self) -> bool:
+        """Run the check once and record the result"""
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.check(), self.timeout)
+            ok, error = result is not False, None
+            if not ok:
+                error = "check failed"
+        except asyncio.TimeoutError:
+            ok, error = False, f"timed out after {self.timeout:g}s"
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+        latency = time.perf_counter() - started
+        self._samples.append((ok, latency))
+        if ok != self.ok:
+            log = logger.info if ok else logger.warning
+            log(
+                f"Health: {self.name} is {'up' if ok else 'down'}"
+                + (f": {error}" if error else "")
+            )
+        self.ok = ok
+        self.last_error = error
+        self.checked_at = time.monotonic()
+        self.checked_at_iso = datetime.now(timezone.utc).isoformat()
+        return ok
+
+    def age(self) -> float | None:
+        if self.checked_at is None:
+            return None
+        return time.monotonic() - self.checked_at
+
+    def stale(self) -> bool:
+        age = self.age()
+        return age is None or age > self.interval * HEALTH_STALE_INTERVALS
+
+    def healthy(self) -> bool:
+        return bool(self.ok) and not self.stale()
+
+    def snapshot(self) -> dict[str, Any]:
+        latencies = sorted(latency for _, latency in self._samples)
+        failures = sum(1 for ok, _ in self._samples if not ok)
+        age = self.age()
+        return {
+            "ok": self.ok,
+            "required": self.required,
+            "stale": self.stale(),
+            "checked_at": self.checked_at_iso,
+            "age_seconds": None if age is None else round(age, 3),
+            "last_error": self.last_error,
+            "samples": len(latencies),
+            "error_rate": round(failures / len(latencies), 4) if latencies else None,
+            "latency_ms": (
+                {
+                    f"p{pct}": round(_percentile(latencies, pct) * 1000, 2)
+                    for pct in (50, 95, 99)
+                }
+                if latencies
+                else None
+            ),
+        }
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await self.probe()
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+class HealthMonitor:
+    """Runs one DependencyProbe task per backing store"""
+
+    def __init__(self):
+        self.probes: dict[str, DependencyProbe] = {}
+        self._stop: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, probe: DependencyProbe) -> None:
+        self.probes[probe.name] = probe
+
+    def ready(self) -> bool:
+        """True when every required dependency passed its latest, fresh check"""
+        required = [p for p in self.probes.values() if p.required]
+        return bool(required) and all(p.healthy() for p in required)
+
+    def status(self) -> str:
+        if not self.probes:
+            return "unconfigured"
+        if all(p.ok is None for p in self.probes.values()):
+            return "starting"
+        if not self.ready():
+            return "unhealthy"
+        if not all(p.healthy() for p in self.probes.values()):
+            return "degraded"
+        return "ok"
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "status": self.status(),
+            "dependencies": {
+                name: probe.snapshot() for name, probe in self.probes.items()
+            },
+        }
+
+    def start(self) -> None:
+        """Start probing in the background (call on startup)"""
+        if self._tasks:
+            return
+        self._stop = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(probe.run(self._stop)) for probe in self.probes.values()
+        ]
+
+    async def stop(self) -> None:
+        """Stop probing (call on shutdown)"""
+        if not self._tasks:
+            return
+        self._stop.set()
+        tasks, self._tasks = self._tasks, []
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _check_supabase() -> None:
+    from supabase_db import get_async_supabase
+
+    client = get_async_supabase()
+    if client is None:
+        raise RuntimeError("Supabase client not configured")
+    await client.table("users").select("id").limit(1).execute()
+
+
+def build_monitor(mongo_db: Any = None, use_supabase: bool = True) -> HealthMonitor:
+    """Monitor for the configured stores.
+
+    Supabase is probed when configured; MongoDB when ``mongo_db`` exposes
+    ``validate_connection()``. MongoDB is only required for readiness when it
+    is the primary store (USE_SUPABASE off).
+    """
+    from supabase_db import SUPABASE_SERVICE_KEY, SUPABASE_URL
+
+    monitor = HealthMonitor()
+    if use_supabase and SUPABASE_URL and SUPABASE_SERVICE_KEY:
+        monitor.add(
+            DependencyProbe(
+                "supabase",
+                _check_supabase,
+                interval=float(
+                    os.getenv(
+                        "HEALTH_SUPABASE_INTERVAL_SECONDS",
+                        str(HEALTH_PROBE_INTERVAL_SECONDS),
+                    )
+                ),
+            )
+        )
+    if callable(getattr(mongo_db, "validate_connection", None)):
+        monitor.add(
+            DependencyProbe(
+                "mongodb",
+                mongo_db.validate_connection,
+                interval=float(
+                    os.getenv(
+                        "HEALTH_MONGO_INTERVAL_SECONDS",
+                        str(HEALTH_PROBE_INTERVAL_SECONDS),
+                    )
+                ),
+                required=not use_supabase,
+            )
+        )
+    return monitor
@@ -0,0 +1,335 @@
+"""Business insights snapshots - precomputed signup breakdowns
+A snapshot holds every breakdown served by /api/auth/business-insights
+(industries, revenue ranges, marketplaces, challenges, total users). It is
+computed in one pass (business_insights() on Supabase, a $facet on MongoDB),
+stored with its timestamp and served from a TTL cache. Each store keeps only
+the latest snapshot, overwritten in place by every refresh. Refreshes are
+incremental: only signups created after the snapshot's high-water mark are
+counted and merged in, with a full recompute every INSIGHTS_FULL_REFRESH_SECONDS
+to pick up edited or deleted profiles (and rows committed late).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS = "business_insights_snapshots"
+# Key of the one snapshot row/document each store keeps
+SNAPSHOT_ID = "latest"
+BREAKDOWNS = ("industries", "revenue_ranges", "marketplace_usage", "top_challenges")
+
+INSIGHTS_CACHE_TTL_SECONDS = float(os.getenv("INSIGHTS_CACHE_TTL_SECONDS", "60"))
+INSIGHTS_REFRESH_SECONDS = float(os.getenv("INSIGHTS_REFRESH_SECONDS", "300"))
+INSIGHTS_FULL_REFRESH_SECONDS = float(
+    os.getenv("INSIGHTS_FULL_REFRESH_SECONDS", "3600")
+)
+# Rows newer than this are left to the next refresh, so a signup still being
+# committed with an earlier created_at is not skipped by the high-water mark
+INSIGHTS_COMMIT_LAG_SECONDS = float(os.getenv("INSIGHTS_COMMIT_LAG_SECONDS", "5"))
+# New signups trigger an incremental refresh after this quiet period
+INSIGHTS_SIGNUP_DEBOUNCE_SECONDS = float(
+    os.getenv("INSIGHTS_SIGNUP_DEBOUNCE_SECONDS", "10")
+)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse(value: Any) -> datetime | None:
+    """Timezone-aware UTC datetime from an ISO string or a (naive) BSON date"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def merge_breakdowns(base: dict, delta: dict) -> dict:
+    """Add the counts of an incremental result to a snapshot's counts"""
+    merged = {"total_users": base.get("total_users", 0) + delta.get("total_users", 0)}
+    for name in BREAKDOWNS:
+        counts: dict[Any, int] = {}
+        for item in [*base.get(name, []), *delta.get(name, [])]:
+            counts[item["_id"]] = counts.get(item["_id"], 0) + item["count"]
+        merged[name] = [
+            {"_id": key, "count": count}
+            for key, count in sorted(counts.items(), key=lambda kv: -kv[1])
+        ]
+    return merged
+
+
+class SupabaseInsightsStore:
+    """Snapshots computed by business_insights() and kept in Supabase"""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def compute(self, until: datetime, since: datetime | None = None) -> dict:
+        result = await self.client.rpc(
+            "business_insights",
+            {
+                "p_since": since.isoformat() if since else None,
+                "p_until": until.isoformat(),
+            },
+        ).execute()
+        return dict(result.data or {})
+
+    async def latest(self) -> dict | None:
+        result = (
+            await self.client.table(SNAPSHOTS)
+            .select("*")
+            .eq("id", SNAPSHOT_ID)
+            .limit(1)
+            .execute()
+        )
+        if not result.data:
+            return None
+        row = result.data[0]
+        return {
+            **row["data"],
+            "computed_at": _parse(row["computed_at"]),
+            "full_computed_at": _parse(row["full_computed_at"]),
+            "high_water": _parse(row["high_water"]),
+        }
+
+    async def save(self, snapshot: dict) -> None:
+        await self.client.table(SNAPSHOTS).upsert(
+            {
+                "id": SNAPSHOT_ID,
+                "computed_at": snapshot["computed_at"].isoformat(),
+                "full_computed_at": snapshot["full_computed_at"].isoformat(),
+                "high_water": snapshot["high_water"].isoformat(),
+                "data": {k: snapshot[k] for k in ("total_users", *BREAKDOWNS)},
+            },
+            on_conflict="id",
+            returning="minimal",
+        ).execute()
+
+
+class MongoInsightsStore:
+    """Snapshots computed with one $facet over users and kept in MongoDB"""
+
+    def __init__(self, db: Any):
+        self.db = db
+
+    @staticmethod
+    def _breakdown(field: str, unwind: bool = False) -> list[dict]:
+        stages: list[dict] = [{"$unwind": f"${field}"}] if unwind else []
+        stages.append({"$match": {field: {"$ne": None}}})
+        stages.append({"$group": {"_id": f"${field}", "count": {"$sum": 1}}})
+        stages.append({"$sort": {"count": -1}})
+        return stages
+
+    @staticmethod
+    def _stored(value: datetime) -> str:
+        # created_at is stored as a naive UTC ISO string
+        return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+    async def compute(self, until: datetime, since: datetime | None = None) -> dict:
+        window = {"$lte": self._stored(until)}
+        if since is not None:
+            window["$gt"] = self._stored(since)
+        pipeline: list[dict] = [{"$match": {"created_at": window}}]
+        pipeline.append(
+            {
+                "$facet": {
+                    "total_users": [{"$count": "count"}],
+                    "industries": self._breakdown("business_profile.industry"),
+                    "revenue_ranges": self._breakdown(
+                        "marketplace_data.monthly_revenue"
+                    ),
+                    "marketplace_usage": self._breakdown(
+                        "marketplace_data.current_marketplaces", unwind=True
+                    ),
+                    "top_challenges": self._breakdown(
+                        "marketplace_data.biggest_challenge"
+                    ),
+                }
+            }
+        )
+        facets = (await self.db["users"].aggregate(pipeline).to_list(1))[0]
+        total = facets["total_users"]
+        return {
+            "total_users": total[0]["count"] if total else 0,
+            **{name: facets[name] for name in BREAKDOWNS},
+        }
+
+    async def latest(self) -> dict | None:
+        snapshot = await self.db[SNAPSHOTS].find_one({"_id": SNAPSHOT_ID}, {"_id": 0})
+        if snapshot is None:
+            return None
+        for key in ("computed_at", "full_computed_at", "high_water"):
+            snapshot[key] = _parse(snapshot.get(key))
+        return snapshot
+
+    async def save(self, snapshot: dict) -> None:
+        await self.db[SNAPSHOTS].replace_one(
+            {"_id": SNAPSHOT_ID}, dict(snapshot), upsert=True
+        )
+
+
+class InsightsService:
+    """Serves the latest snapshot from a TTL cache and keeps snapshots fresh"""
+
+    def __init__(
+        self,
+        store: Any,
+        cache_ttl: float = INSIGHTS_CACHE_TTL_SECONDS,
+        refresh_interval: float = INSIGHTS_REFRESH_SECONDS,
+        full_refresh_interval: float = INSIGHTS_FULL_REFRESH_SECONDS,
+        signup_debounce: float = INSIGHTS_SIGNUP_DEBOUNCE_SECONDS,
+    ):
+        self.store = store
+        self.cache_ttl = cache_ttl
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.signup_debounce = signup_debounce
+        self._cached: dict | None = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+        self._signups = asyncio.Event()
+
+    async def get(self) -> dict:
+        """Latest snapshot; computed now only if none has been stored yet"""
+        if (
+            self._cached is not None
+            and time.monotonic() - self._cached_at < self.cache_ttl
+        ):
+            return self._cached
+        async with self._lock:
+            if (
+                self._cached is not None
+                and time.monotonic() - self._cached_at < self.cache_ttl
+            ):
+                return self._cached
+            snapshot = await self.store.latest()
+            if snapshot is None:
+                snapshot = await self._refresh(None)
+            self._cache(snapshot)
+            return snapshot
+
+    def _cache(self, snapshot: dict) -> None:
+        self._cached = snapshot
+        self._cached_at = time.monotonic()
+
+    async def _refresh(self, latest: dict | None, full: bool = False) -> dict:
+        # Millisecond precision so the stored timestamps (BSON dates on MongoDB)
+        # round-trip exactly and no row is counted twice across refreshes
+        now = _now()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        until = now - timedelta(milliseconds=round(INSIGHTS_COMMIT_LAG_SECONDS * 1000))
+        if (
+            full
+            or latest is None
+            or (now - latest["full_computed_at"]).total_seconds()
+            >= self.full_refresh_interval
+        ):
+            snapshot = {**await self.store.compute(until), "full_computed_at": now}
+        else:
+            delta = await self.store.compute(until, since=latest["high_water"])
+            snapshot = {
+                **merge_breakdowns(latest, delta),
+                "full_computed_at": latest["full_computed_at"],
+            }
+        snapshot["computed_at"] = now
+        snapshot["high_water"] = until
+        await self.store.save(snapshot)
+        return snapshot
+
+    async def refresh(self, full: bool = False) -> dict:
+        """Compute and store a new snapshot (incremental unless ``full``)"""
+        async with self._lock:
+            snapshot = await self._refresh(await self.store.latest(), full=full)
+            self._cache(snapshot)
+            return snapshot
+
+    async def refresh_if_due(self) -> dict | None:
+        """Refresh unless another worker stored a snapshot within the interval"""
+        latest = await self.store.latest()
+        if latest is not None and not self._signups.is_set():
+            age = (_now() - latest["computed_at"]).total_seconds()
+            if age < self.refresh_interval:
+                return None
+        self._signups.clear()
+        return await self.refresh()
+
+    def signup_arrived(self) -> None:
+        """Note a new signup so the next snapshot is taken soon"""
+        self._signups.set()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Refresh every refresh_interval, or shortly after new signups"""
+        while not stop.is_set():
+            try:
+                await self.refresh_if_due()
+            except Exception as e:
+                logger.warning(f"Business insights refresh failed: {e}")
+            waiters = [
+                asyncio.ensure_future(stop.wait()),
+                asyncio.ensure_future(self._signups.wait()),
+            ]
+            await asyncio.wait(
+                waiters,
+                timeout=self.refresh_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for waiter in waiters:
+                waiter.cancel()
+            if self._signups.is_set() and not stop.is_set():
+                # Let a burst of signups land before recomputing
+                try:
+                    await asyncio.wait_for(stop.wait(), self.signup_debounce)
+                except asyncio.TimeoutError:
+                    pass
+
+
+_service: InsightsService | None = None
+_task: asyncio.Task | None = None
+_stop: asyncio.Event | None = None
+
+
+def get_service() -> InsightsService | None:
+    """Shared service on the primary store (None when no store is configured)"""
+    global _service
+
+    if _service is None:
+        if os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes"):
+            from supabase_db import get_async_supabase
+
+            client = get_async_supabase()
+            if client is None:
+                return None
+            _service = InsightsService(SupabaseInsightsStore(client))
+        else:
+            from db import get_typed_db
+
+            _service = InsightsService(MongoInsightsStore(get_typed_db()))
+    return _service
+
+
+async def start_refresher() -> None:
+    """Start the periodic snapshot job (call on startup)"""
+    global _task, _stop
+
+    service = get_service()
+    if service is None or _task is not None:
+        return
+    _stop = asyncio.Event()
+    _task = asyncio.create_task(service.run(_stop))
+
+
+async def stop_refresher() -> None:
+    """Stop the periodic snapshot job (call on shutdown)"""
+    global _task
+
+    if _task is None:
+        return
+    task, _task = _task, None
+    _stop.set()
+    await asyncio.gather(task, return_exceptions=True)
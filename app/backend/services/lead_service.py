@@ -8,8 +8,16 @@ import uuid
 from datetime import datetime
 from typing import Any
 
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 logger = logging.getLogger(__name__)
 
+# Most fuzzy (same email domain) candidates scored per incoming message
+FUZZY_CANDIDATE_LIMIT = 100
+# Shorter digit strings are not treated as phone numbers
+MIN_PHONE_DIGITS = 7
+
 # Precompiled regex for strict domain validation
 # - Each label: 1-63 chars, starts/ends with alphanumeric, can contain hyphens in middle
 # - Labels separated by single dots (no consecutive dots)
@@ -37,12 +45,14 @@ class LeadService:
 
     async def find_or_create_lead(self, message_data: dict) -> str | None:
         """Find existing lead or create a new one from message data.
-        Uses ordered matching strategy with compound indexes.
+        Resolves the sender with one $or query over the normalized contact keys
+        (ranked in Python) and creates leads with an upsert on a unique
+        contact key, so concurrent messages from one sender share a lead.
 
         Matching Strategy (in order of priority):
-        1. Exact match: (user_id, platform, contact_email)
-        2. Exact match: (user_id, platform, contact_phone)
-        3. Fuzzy match: (user_id, platform, contact_name + contact_email) with confidence score
+        1. Exact match: (user_id, platform, contact_email_key)
+        2. Exact match: (user_id, platform, contact_phone_key)
+        3. Fuzzy match: same email domain, name + email confidence >= 0.8
 
         Args:
             message_data: Dictionary containing message information
@@ -54,68 +64,23 @@ class LeadService:
         try:
             user_id = message_data.get("user_id")
             platform = message_data.get("platform")
-            sender_email = message_data.get("sender_email")
-            sender_phone = message_data.get("sender_phone")
-            sender_name = message_data.get("sender_name")
 
             if not user_id or not platform:
                 logger.warning("Missing user_id or platform in message_data")
                 return None
 
-            # Strategy 1: Exact email match (highest priority)
-            if sender_email:
-                existing_lead = await self.db.leads.find_one(
-                    {
-                        "user_id": user_id,
-                        "platform": platform,
-                        "contact_email": sender_email,
-                    },
-                )
-
-                if existing_lead:
-                    logger.info(f"Found existing lead by email: {existing_lead['id']}")
-                    lead_id = str(existing_lead["id"]) if existing_lead.get("id") else None
-                    await self._update_lead_last_contact(
-                        lead_id,
-                        message_data,
-                    )
-                    return lead_id
-
-            # Strategy 2: Exact phone match
-            if sender_phone:
-                existing_lead = await self.db.leads.find_one(
-                    {
-                        "user_id": user_id,
-                        "platform": platform,
-                        "contact_phone": sender_phone,
-                    },
-                )
-
-                if existing_lead:
-                    logger.info(f"Found existing lead by phone: {existing_lead['id']}")
-                    lead_id = str(existing_lead["id"]) if existing_lead.get("id") else None
-                    await self._update_lead_last_contact(
-                        lead_id,
-                        message_data,
-                    )
-                    return lead_id
-
-            # Strategy 3: Fuzzy match by name + email (if both available)
-            if sender_name and sender_email:
-                confidence_score, fuzzy_lead = await self._fuzzy_match_lead(
-                    user_id,
-                    platform,
-                    sender_name,
-                    sender_email,
-                )
+            existing_lead = await self._resolve_lead(
+                user_id,
+                platform,
+                message_data.get("sender_email"),
+                message_data.get("sender_phone"),
+                message_data.get("sender_name"),
+            )
 
-                if fuzzy_lead and confidence_score >= 0.8:  # 80% confidence threshold
-                    logger.info(
-                        f"Found existing lead by fuzzy match (confidence: {confidence_score}): {fuzzy_lead['id']}",
-                    )
-                    lead_id = str(fuzzy_lead["id"]) if fuzzy_lead.get("id") else None
-                    await self._update_lead_last_contact(lead_id, message_data)
-                    return lead_id
+            if existing_lead:
+                lead_id = str(existing_lead["id"]) if existing_lead.get("id") else None
+                await self._update_lead_last_contact(lead_id, message_data)
+                return lead_id
 
             # No match found - create new lead
             lead_id = await self._create_new_lead(message_data)
@@ -126,6 +91,133 @@ class LeadService:
             logger.error(f"Error in find_or_create_lead: {e}", exc_info=True)
             return None
 
+    async def _resolve_lead(
+        self,
+        user_id: str,
+        platform: str,
+        email: str | None,
+        phone: str | None,
+        name: str | None,
+    ) -> dict[Any, Any] | None:
+        """Best matching lead for a sender, fetched with a single query
+
+        Candidates are leads sharing the sender's email or phone (normalized,
+        or verbatim for leads stored before contact keys existed) or, when a
+        name is given, the email domain. The database ranks exact email over
+        exact phone matches; domain candidates are scored in Python with
+        _calculate_match_confidence (a score of 0.8 needs the same domain).
+
+        """
+        keys = self._contact_keys(email, phone)
+        conditions: list[dict] = []
+        # Nested $cond: 0 = email match, 1 = phone match, 2 = fuzzy candidate
+        rank: Any = 2
+
+        if phone:
+            phone_match = [{"contact_phone": phone}]
+            if keys.get("contact_phone_key"):
+                phone_match.append({"contact_phone_key": keys["contact_phone_key"]})
+            conditions += phone_match
+            rank = {"$cond": [self._any_equal(phone_match), 1, rank]}
+
+        if email:
+            email_match = [{"contact_email": email}]
+            if keys.get("contact_email_key"):
+                email_match.append({"contact_email_key": keys["contact_email_key"]})
+            conditions += email_match
+            rank = {"$cond": [self._any_equal(email_match), 0, rank]}
+
+        if name and keys.get("contact_email_domain"):
+            conditions.append({"contact_email_domain": keys["contact_email_domain"]})
+
+        if not conditions:
+            return None
+
+        candidates = await self.db.leads.aggregate(
+            [
+                {"$match": {"user_id": user_id, "platform": platform, "$or": conditions}},
+                {"$addFields": {"_rank": rank}},
+                {"$sort": {"_rank": 1, "created_at": 1}},
+                {"$limit": FUZZY_CANDIDATE_LIMIT},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "id": 1,
+                        "contact_name": 1,
+                        "contact_email": 1,
+                        "_rank": 1,
+                    },
+                },
+            ],
+        ).to_list(FUZZY_CANDIDATE_LIMIT)
+
+        best_match = None
+        best_score = 0.0
+
+        for lead in candidates:
+            if lead["_rank"] < 2:
+                match_type = "email" if lead["_rank"] == 0 else "phone"
+                logger.info(f"Found existing lead by {match_type}: {lead.get('id')}")
+                return lead
+
+            score = self._calculate_match_confidence(
+                name or "",
+                email or "",
+                lead.get("contact_name") or "",
+                lead.get("contact_email") or "",
+            )
+
+            if score > best_score:
+                best_score = score
+                best_match = lead
+
+        if best_match and best_score >= 0.8:  # 80% confidence threshold
+            logger.info(
+                f"Found existing lead by fuzzy match (confidence: {best_score}): {best_match.get('id')}",
+            )
+            return best_match
+
+        return None
+
+    @staticmethod
+    def _any_equal(conditions: list[dict]) -> dict:
+        """Aggregation expression true when any {field: value} condition holds"""
+        return {
+            "$or": [
+                {"$eq": [f"${field}", value]}
+                for condition in conditions
+                for field, value in condition.items()
+            ],
+        }
+
+    def _contact_keys(self, email: str | None, phone: str | None) -> dict[str, str]:
+        """Normalized contact fields stored on leads and used for matching
+
+        Examples:
+            (" John@Example.COM ", "+1 (555) 123-4567") -> {
+                "contact_email_key": "john@example.com",
+                "contact_email_domain": "example.com",
+                "contact_phone_key": "15551234567",
+            }
+
+        """
+        keys = {}
+
+        if email and isinstance(email, str):
+            email_key = email.strip().lower()
+            if email_key.count("@") == 1:
+                keys["contact_email_key"] = email_key
+                domain = self._extract_email_domain(email_key)
+                if domain:
+                    keys["contact_email_domain"] = domain
+
+        if phone and isinstance(phone, str):
+            digits = re.sub(r"\D", "", phone)
+            if len(digits) >= MIN_PHONE_DIGITS:
+                keys["contact_phone_key"] = digits
+
+        return keys
+
     async def update_lead_from_message(self, lead_id: str, message_data: dict) -> bool:
         """Update an existing lead with information from a new message
 
@@ -156,11 +248,17 @@ class LeadService:
                 "contact_email",
             ):
                 update_fields["contact_email"] = message_data["sender_email"]
+                update_fields.update(
+                    self._contact_keys(message_data["sender_email"], None),
+                )
 
             if message_data.get("sender_phone") and not existing_lead.get(
                 "contact_phone",
             ):
                 update_fields["contact_phone"] = message_data["sender_phone"]
+                update_fields.update(
+                    self._contact_keys(None, message_data["sender_phone"]),
+                )
 
             if message_data.get("sender_name") and not existing_lead.get(
                 "contact_name",
@@ -210,11 +308,19 @@ class LeadService:
     async def _create_new_lead(self, message_data: dict) -> str:
         """Create a new lead from message data
 
+        Leads with an email or phone are upserted on their unique contact key:
+        if another message from the same sender created the lead first, this
+        message is added to that lead instead.
+
         Returns:
-            Lead ID of the newly created lead
+            Lead ID of the new (or concurrently created) lead
 
         """
         lead_id = f"lead_{uuid.uuid4().hex}_{message_data['platform']}"
+        keys = self._contact_keys(
+            message_data.get("sender_email"),
+            message_data.get("sender_phone"),
+        )
 
         lead_data = {
             "id": lead_id,
@@ -224,6 +330,7 @@ class LeadService:
             "contact_name": message_data.get("sender_name"),
             "contact_email": message_data.get("sender_email"),
             "contact_phone": message_data.get("sender_phone"),
+            **keys,
             "interest_level": "medium",  # Default for inquiries
             "status": "new",
             "source_message_id": message_data["id"],
@@ -237,59 +344,48 @@ class LeadService:
             "tags": ["auto-created", "inquiry"],
         }
 
-        await self.db.leads.insert_one(lead_data)
-        return lead_id
-
-    async def _fuzzy_match_lead(
-        self,
-        user_id: str,
-        platform: str,
-        name: str,
-        email: str,
-    ) -> tuple[float, dict[Any, Any] | None]:
-        """Perform fuzzy matching on leads by name and email similarity
-
-        Args:
-            user_id: User ID
-            platform: Platform name
-            name: Contact name to match
-            email: Contact email to match
+        if keys.get("contact_email_key"):
+            contact_key = f"email:{keys['contact_email_key']}"
+        elif keys.get("contact_phone_key"):
+            contact_key = f"phone:{keys['contact_phone_key']}"
+        else:
+            # Name-only senders cannot be deduplicated
+            await self.db.leads.insert_one(lead_data)
+            return lead_id
 
-        Returns:
-            Tuple of (confidence_score, lead_document or None)
-            confidence_score is between 0.0 and 1.0
+        key_filter = {
+            "user_id": lead_data["user_id"],
+            "platform": lead_data["platform"],
+            "contact_key": contact_key,
+        }
+        update = {
+            "$setOnInsert": {
+                field: value
+                for field, value in lead_data.items()
+                if field not in key_filter and field not in ("last_contact_at", "message_ids")
+            },
+            "$set": {"last_contact_at": lead_data["last_contact_at"]},
+            "$addToSet": {"message_ids": message_data["id"]},
+        }
 
-        """
         try:
-            # Find leads with similar names on the same platform
-            potential_leads = await self.db.leads.find(
-                {
-                    "user_id": user_id,
-                    "platform": platform,
-                    "contact_name": {"$exists": True, "$ne": None},
-                },
-            ).to_list(100)
-
-            best_match = None
-            best_score = 0.0
-
-            for lead in potential_leads:
-                score = self._calculate_match_confidence(
-                    name,
-                    email,
-                    lead.get("contact_name", ""),
-                    lead.get("contact_email", ""),
-                )
-
-                if score > best_score:
-                    best_score = score
-                    best_match = lead
+            lead = await self.db.leads.find_one_and_update(
+                key_filter,
+                update,
+                upsert=True,
+                projection={"_id": 0, "id": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lost the insert race for this contact key; now it matches
+            lead = await self.db.leads.find_one_and_update(
+                key_filter,
+                update,
+                projection={"_id": 0, "id": 1},
+                return_document=ReturnDocument.AFTER,
+            )
 
-            return best_score, best_match
-
-        except Exception as e:
-            logger.error(f"Error in fuzzy matching: {e}", exc_info=True)
-            return 0.0, None
+        return str(lead["id"])
 
     def _calculate_match_confidence(
         self,
@@ -394,6 +490,28 @@ class LeadService:
         Should be called during application startup or migration
         """
         try:
+            # One lead per normalized contact (guards concurrent creation);
+            # partial, so name-only and pre-existing leads are not constrained
+            await self.db.leads.create_index(
+                [("user_id", 1), ("platform", 1), ("contact_key", 1)],
+                name="leads_contact_key_unique_idx",
+                unique=True,
+                partialFilterExpression={"contact_key": {"$type": "string"}},
+                background=True,
+            )
+
+            # Normalized email/phone and email domain lookups
+            for field, name in (
+                ("contact_email_key", "leads_email_key_idx"),
+                ("contact_phone_key", "leads_phone_key_idx"),
+                ("contact_email_domain", "leads_email_domain_idx"),
+            ):
+                await self.db.leads.create_index(
+                    [("user_id", 1), ("platform", 1), (field, 1)],
+                    name=name,
+                    background=True,
+                )
+
             # Compound index for exact email matching
             await self.db.leads.create_index(
                 [("user_id", 1), ("platform", 1), ("contact_email", 1)],
@@ -408,13 +526,6 @@ class LeadService:
                 background=True,
             )
 
-            # Index for fuzzy name matching
-            await self.db.leads.create_index(
-                [("user_id", 1), ("platform", 1), ("contact_name", 1)],
-                name="leads_name_match_idx",
-                background=True,
-            )
-
             logger.info("Lead service indexes ensured")
 
         except Exception as e:
@@ -0,0 +1,399 @@
+"""Replication outbox - moves PARALLEL_WRITE secondary writes off the request path
+Handlers record the MongoDB write in Supabase (replication_outbox) next to their
+primary write; OutboxReplicator applies the records to MongoDB in batches, in
+order per entity, with retries and backoff.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from bson import json_util
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = "replication_outbox"
+CLAIM_FUNCTION = "claim_replication_batch"
+
+OUTBOX_REPLICATOR_ENABLED = os.getenv("OUTBOX_REPLICATOR_ENABLED", "true").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+# Entities claimed per batch (all of an entity's pending records come along)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "2"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "600"))
+OUTBOX_LAG_REFRESH_SECONDS = float(os.getenv("OUTBOX_LAG_REFRESH_SECONDS", "15"))
+
+_DUPLICATE_KEY = 11000
+
+
+def insert(collection: str, entity_id: Any, document: dict) -> dict:
+    """Outbox record for ``db.<collection>.insert_one(document)``"""
+    return _record(collection, entity_id, "insert", {"document": document})
+
+
+def update(
+    collection: str,
+    entity_id: Any,
+    filter: dict,
+    update: dict,
+    upsert: bool = False,
+) -> dict:
+    """Outbox record for ``db.<collection>.update_one(filter, update, upsert=...)``"""
+    return _record(
+        collection,
+        entity_id,
+        "update",
+        {"filter": filter, "update": update, "upsert": upsert},
+    )
+
+
+def _record(collection: str, entity_id: Any, op: str, payload: dict) -> dict:
+    return {
+        "entity_key": f"{collection}:{entity_id}",
+        "collection": collection,
+        "op": op,
+        # Extended JSON, so datetimes and other BSON types survive jsonb
+        "payload": json.loads(json_util.dumps(payload)),
+    }
+
+
+def _operation(record: dict) -> InsertOne | UpdateOne:
+    payload = json_util.loads(json.dumps(record["payload"]))
+    if record["op"] == "insert":
+        return InsertOne(payload["document"])
+    if record["op"] == "update":
+        return UpdateOne(
+            payload["filter"], payload["update"], upsert=payload.get("upsert", False)
+        )
+    raise ValueError(f"Unknown outbox operation: {record['op']}")
+
+
+def _default_client():
+    from supabase_db import get_async_supabase
+
+    return get_async_supabase()
+
+
+def _default_secondary():
+    from db import get_typed_db
+
+    return get_typed_db()
+
+
+async def enqueue(*records: dict) -> None:
+    """Record secondary writes for the replicator in one insert.
+
+    Never raises: if the outbox cannot be written the records are applied to
+    MongoDB inline instead, as handlers did before the outbox existed.
+    """
+    if not records:
+        return
+    client = _default_client()
+    try:
+        if client is None:
+            raise RuntimeError("Supabase client not configured")
+        await client.table(OUTBOX_TABLE).insert(list(records)).execute()
+        return
+    except Exception as e:
+        logger.warning(f"⚠️  Outbox enqueue failed, writing to MongoDB inline: {e}")
+
+    secondary = _default_secondary()
+    for record in records:
+        try:
+            await secondary[record["collection"]].bulk_write([_operation(record)])
+        except Exception as e:
+            logger.warning(
+                f"⚠️  Parallel MongoDB write failed for {record['entity_key']}: {e}"
+            )
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class OutboxReplicator:
+    """Applies outbox records to the secondary store"""
+
+    def __init__(
+        self,
+        client: Any = None,
+        secondary: Any = None,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS,
+        lease_seconds: int = OUTBOX_LEASE_SECONDS,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        """Initialize the replicator
+
+        Args:
+            client: AsyncPostgrestClient holding the outbox (default: shared client)
+            secondary: MongoDB database the records are applied to (default: get_typed_db())
+            batch_size: Entities claimed per batch
+            poll_interval: Seconds to wait when the outbox is empty
+            lease_seconds: How long a claim is held before another worker may retry it
+            max_attempts: Failures after which a record is parked as ``dead``
+
+        """
+        self.client = client if client is not None else _default_client()
+        self.secondary = secondary if secondary is not None else _default_secondary()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stats: dict[str, Any] = {
+            "applied": 0,
+            "retried": 0,
+            "parked": 0,
+            "pending": None,
+            "dead": None,
+            "lag_seconds": None,
+            "last_batch_at": None,
+            "last_error": None,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Counters since start plus the last measured backlog and lag"""
+        return dict(self._stats)
+
+    async def refresh_lag(self) -> dict[str, Any]:
+        """Measure pending records and the age of the oldest one"""
+        table = self.client.table(OUTBOX_TABLE)
+        pending = (
+            await table.select("created_at", count="exact")
+            .eq("status", "pending")
+            .order("id")
+            .limit(1)
+            .execute()
+        )
+        dead = (
+            await self.client.table(OUTBOX_TABLE)
+            .select("id", count="exact")
+            .eq("status", "dead")
+            .limit(1)
+            .execute()
+        )
+        lag = None
+        if pending.data:
+            oldest = _parse_timestamp(pending.data[0]["created_at"])
+            lag = max((self.clock() - oldest).total_seconds(), 0.0)
+        self._stats.update(
+            pending=pending.count or 0,
+            dead=dead.count or 0,
+            lag_seconds=lag,
+        )
+        return self.stats()
+
+    async def _claim(self) -> list[dict]:
+        result = await self.client.rpc(
+            CLAIM_FUNCTION,
+            {
+                "p_worker": self.worker_id,
+                "p_limit": self.batch_size,
+                "p_lease_seconds": self.lease_seconds,
+            },
+        ).execute()
+        return sorted(result.data or [], key=lambda r: r["id"])
+
+    async def _apply(
+        self, collection: str, records: list[dict]
+    ) -> tuple[list[dict], list[tuple[dict, str]], list[dict]]:
+        """Apply one collection's records with ordered bulk writes.
+
+        Returns (applied, failed with error, released). When a record fails,
+        the later records of its entity are released unapplied so they are
+        retried after it; other entities carry on.
+        """
+        applied: list[dict] = []
+        failed: list[tuple[dict, str]] = []
+        released: list[dict] = []
+        remaining = records
+        while remaining:
+            try:
+                ops = [_operation(r) for r in remaining]
+                await self.secondary[collection].bulk_write(ops, ordered=True)
+                applied.extend(remaining)
+                break
+            except BulkWriteError as e:
+                error = e.details["writeErrors"][0]
+                index = error["index"]
+                applied.extend(remaining[:index])
+                record, rest = remaining[index], remaining[index + 1 :]
+                if error.get("code") == _DUPLICATE_KEY and record["op"] == "insert":
+                    # Already replicated (e.g. a lease expired mid-batch)
+                    applied.append(record)
+                    remaining = rest
+                    continue
+                failed.append((record, error.get("errmsg", "write error")))
+                blocked = record["entity_key"]
+                released.extend(r for r in rest if r["entity_key"] == blocked)
+                remaining = [r for r in rest if r["entity_key"] != blocked]
+            except Exception as e:
+                # Secondary unreachable or record unusable: retry all of them later
+                failed.extend((r, str(e) or type(e).__name__) for r in remaining)
+                break
+        return applied, failed, released
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(
+            OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_SECONDS
+        )
+        return delay * random.uniform(0.8, 1.2)
+
+    async def run_once(self) -> int:
+        """Claim and apply one batch. Returns the number of records claimed."""
+        records = await self._claim()
+        if not records:
+            return 0
+
+        by_collection: dict[str, list[dict]] = defaultdict(list)
+        for record in records:
+            by_collection[record["collection"]].append(record)
+
+        applied: list[dict] = []
+        failed: list[tuple[dict, str]] = []
+        released: list[dict] = []
+        for collection, group in by_collection.items():
+            a, f, r = await self._apply(collection, group)
+            applied.extend(a)
+            failed.extend(f)
+            released.extend(r)
+
+        table = self.client.table
+        if applied:
+            await table(OUTBOX_TABLE).delete().in_(
+                "id", [r["id"] for r in applied]
+            ).execute()
+        if released:
+            await table(OUTBOX_TABLE).update(
+                {"leased_by": None, "leased_until": None}
+            ).in_("id", [r["id"] for r in released]).execute()
+        for record, error in failed:
+            attempts = record["attempts"] + 1
+            dead = attempts >= self.max_attempts
+            available_at = self.clock() + timedelta(seconds=self._retry_delay(attempts))
+            await table(OUTBOX_TABLE).update(
+                {
+                    "attempts": attempts,
+                    "last_error": error[:1000],
+                    "status": "dead" if dead else "pending",
+                    "available_at": available_at.isoformat(),
+                    "leased_by": None,
+                    "leased_until": None,
+                }
+            ).eq("id", record["id"]).execute()
+            if dead:
+                logger.error(
+                    f"Outbox record {record['id']} ({record['entity_key']}) parked "
+                    f"after {attempts} attempts: {error}"
+                )
+            else:
+                logger.warning(
+                    f"⚠️  Outbox record {record['id']} ({record['entity_key']}) "
+                    f"failed (attempt {attempts}): {error}"
+                )
+            self._stats["parked" if dead else "retried"] += 1
+            self._stats["last_error"] = error
+
+        self._stats["applied"] += len(applied)
+        self._stats["last_batch_at"] = self.clock().isoformat()
+        return len(records)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Replicate until ``stop`` is set"""
+        next_lag_refresh = 0.0
+        while not stop.is_set():
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                logger.warning(f"Outbox replication batch failed: {e}")
+                self._stats["last_error"] = str(e)
+                claimed = 0
+            if time.monotonic() >= next_lag_refresh:
+                next_lag_refresh = time.monotonic() + OUTBOX_LAG_REFRESH_SECONDS
+                try:
+                    await self.refresh_lag()
+                except Exception as e:
+                    logger.warning(f"Could not measure outbox lag: {e}")
+            if claimed == 0:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self, timeout: float | None = None) -> dict[str, Any]:
+        """Apply batches until no pending records remain or ``timeout`` passes.
+
+        Records backing off after a failure are waited for, so a drain only
+        finishes early when the secondary accepts everything.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            claimed = await self.run_once()
+            if claimed:
+                continue
+            stats = await self.refresh_lag()
+            if not stats["pending"]:
+                return stats
+            if deadline is not None and time.monotonic() >= deadline:
+                return stats
+            await asyncio.sleep(self.poll_interval)
+
+
+_replicator: OutboxReplicator | None = None
+_task: asyncio.Task | None = None
+_stop: asyncio.Event | None = None
+
+
+def get_replicator() -> OutboxReplicator | None:
+    """The replicator started by start_replicator(), if any"""
+    return _replicator
+
+
+async def start_replicator() -> OutboxReplicator | None:
+    """Start the background replicator (call on startup)"""
+    global _replicator, _task, _stop
+
+    if _task is not None or not OUTBOX_REPLICATOR_ENABLED:
+        return _replicator
+    if _default_client() is None:
+        logger.info("Supabase not configured; outbox replicator not started")
+        return None
+    _replicator = OutboxReplicator()
+    _stop = asyncio.Event()
+    _task = asyncio.create_task(_replicator.run(_stop))
+    logger.info(f"Outbox replicator started ({_replicator.worker_id})")
+    return _replicator
+
+
+async def stop_replicator() -> None:
+    """Stop the background replicator after its current batch (call on shutdown)"""
+    global _task
+
+    if _task is None:
+        return
+    task, _task = _task, None
+    _stop.set()
+    try:
+        await asyncio.wait_for(task, OUTBOX_LEASE_SECONDS)
+    except asyncio.TimeoutError:
+        # Unfinished records are retried by the next worker once the lease lapses
+        task.cancel()
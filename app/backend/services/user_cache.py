@@ -0,0 +1,200 @@
+"""User profile cache - read-through cache for user rows
+Profile reads (GET /api/users/{id}, /api/auth/me) go through a per-process LRU
+with a short TTL, backed by an optional Redis tier shared by all workers
+(USER_CACHE_REDIS_URL). Password hashes are stripped before caching. Handlers
+that write a user invalidate both tiers; a load that races an invalidation is
+returned but not cached.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+USER_CACHE_REDIS_URL = os.getenv("USER_CACHE_REDIS_URL", "")
+USER_CACHE_REDIS_TTL_SECONDS = int(os.getenv("USER_CACHE_REDIS_TTL_SECONDS", "300"))
+USER_CACHE_REDIS_TIMEOUT_SECONDS = float(
+    os.getenv("USER_CACHE_REDIS_TIMEOUT_SECONDS", "0.2")
+)
+
+REDIS_PREFIX = "user:profile:"
+# Never cached (and never sent to Redis)
+SECRET_FIELDS = ("password_hash", "hashed_password", "_id")
+
+
+def _sanitize(profile: dict) -> dict:
+    return {k: v for k, v in profile.items() if k not in SECRET_FIELDS}
+
+
+class ProfileCache:
+    """In-process LRU with TTL in front of an optional Redis tier"""
+
+    def __init__(
+        self,
+        ttl: float = USER_CACHE_TTL_SECONDS,
+        max_entries: int = USER_CACHE_SIZE,
+        redis: Any = None,
+        redis_ttl: int = USER_CACHE_REDIS_TTL_SECONDS,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def _local(self, user_id: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            profile, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return profile
+
+    def _store(self, user_id: str, profile: dict, generation: int) -> bool:
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._entries[user_id] = (profile, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    async def _redis_get(self, user_id: str) -> dict | None:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(REDIS_PREFIX + user_id)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"User cache Redis read failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def get(
+        self, user_id: str, loader: Callable[[], Awaitable[dict | None]]
+    ) -> dict | None:
+        """Cached profile of ``user_id``, loading it with ``loader()`` on a miss.
+
+        Returns a copy without password fields; missing users are not cached.
+        """
+        profile = self._local(user_id)
+        if profile is not None:
+            self.hits += 1
+            return dict(profile)
+
+        generation = self._generation
+        profile = await self._redis_get(user_id)
+        if profile is not None:
+            self.redis_hits += 1
+            self._store(user_id, profile, generation)
+            return dict(profile)
+
+        self.misses += 1
+        loaded = await loader()
+        if loaded is None:
+            return None
+        profile = _sanitize(dict(loaded))
+        if self._store(user_id, profile, generation) and self.redis is not None:
+            try:
+                await self.redis.set(
+                    REDIS_PREFIX + user_id,
+                    json.dumps(profile, default=str),
+                    ex=self.redis_ttl,
+                )
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"User cache Redis write failed: {e}")
+        return dict(profile)
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop ``user_id`` from both tiers (call after writing the user)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(REDIS_PREFIX + user_id)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"User cache Redis invalidation failed: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "redis": self.redis is not None,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                round((self.hits + self.redis_hits) / lookups, 4) if lookups else None
+            ),
+            "redis_errors": self.redis_errors,
+        }
+
+
+_cache: ProfileCache | None = None
+
+
+def _redis_client() -> Any:
+    if not USER_CACHE_REDIS_URL:
+        return None
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        logger.warning("USER_CACHE_REDIS_URL is set but redis is not installed")
+        return None
+    return redis.from_url(
+        USER_CACHE_REDIS_URL,
+        socket_timeout=USER_CACHE_REDIS_TIMEOUT_SECONDS,
+        socket_connect_timeout=USER_CACHE_REDIS_TIMEOUT_SECONDS,
+    )
+
+
+def get_cache() -> ProfileCache:
+    """Shared profile cache (with Redis when USER_CACHE_REDIS_URL is set)"""
+    global _cache
+
+    if _cache is None:
+        _cache = ProfileCache(redis=_redis_client())
+    return _cache
+
+
+async def get_profile(
+    user_id: str, loader: Callable[[], Awaitable[dict | None]]
+) -> dict | None:
+    return await get_cache().get(user_id, loader)
+
+
+async def invalidate(user_id: str) -> None:
+    await get_cache().invalidate(user_id)
+
+
+async def close_cache() -> None:
+    """Close the Redis connection pool (call on shutdown)"""
+    global _cache
+
+    if _cache is not None and _cache.redis is not None:
+        try:
+            await _cache.redis.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing user cache Redis client: {e}")
+    _cache = None
@@ -0,0 +1,195 @@
+"""User lookup - combined email/username query with an identifier cache
+Login and registration find users by email and/or username in one indexed
+query (``or=(email.eq.x,username.eq.y)`` on Supabase, ``$or`` on MongoDB). The
+identifier -> user id result is cached briefly, including negative entries for
+identifiers with no user, so repeated logins for unknown accounts (credential
+stuffing) are answered without a database query. Writes to users invalidate
+the affected entries; positive entries are re-checked against the record they
+resolve to, so a rename on another worker is never served from a stale entry.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+USER_LOOKUP_TTL_SECONDS = float(os.getenv("USER_LOOKUP_TTL_SECONDS", "60"))
+USER_LOOKUP_NEGATIVE_TTL_SECONDS = float(
+    os.getenv("USER_LOOKUP_NEGATIVE_TTL_SECONDS", "10")
+)
+USER_LOOKUP_CACHE_SIZE = int(os.getenv("USER_LOOKUP_CACHE_SIZE", "10000"))
+
+IDENTIFIERS = ("email", "username")
+# Cached value for an identifier that matched no user
+MISSING = ""
+
+
+class IdentifierCache:
+    """LRU of (field, value) -> user id with separate positive/negative TTLs"""
+
+    def __init__(
+        self,
+        ttl: float = USER_LOOKUP_TTL_SECONDS,
+        negative_ttl: float = USER_LOOKUP_NEGATIVE_TTL_SECONDS,
+        max_entries: int = USER_LOOKUP_CACHE_SIZE,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._by_user: dict[str, set[tuple[str, str]]] = {}
+        # Sync SupabaseDB methods invalidate from worker threads
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; lookups that raced one do not cache
+        self.generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> str | None:
+        """Cached user id, MISSING for a known-absent user, None if not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires = entry
+            if expires <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def set(
+        self, key: tuple[str, str], user_id: str, generation: int | None = None
+    ) -> None:
+        ttl = self.ttl if user_id else self.negative_ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._drop(key)
+            self._entries[key] = (user_id, time.monotonic() + ttl)
+            if user_id:
+                self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(
+        self,
+        user_id: str | None = None,
+        email: str | None = None,
+        username: str | None = None,
+    ) -> None:
+        """Forget every identifier of ``user_id`` and the given identifiers"""
+        with self._lock:
+            self.generation += 1
+            if user_id:
+                for key in list(self._by_user.get(str(user_id), ())):
+                    self._drop(key)
+            for key in _keys(email, username):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry and entry[0]:
+            keys = self._by_user.get(entry[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry[0]]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+def _keys(email: str | None, username: str | None) -> list[tuple[str, str]]:
+    return [
+        (field, value)
+        for field, value in zip(IDENTIFIERS, (email, username))
+        if value is not None
+    ]
+
+
+class MongoUsers:
+    """find_users()/get_user_by_id() over a MongoDB users collection"""
+
+    def __init__(self, db: Any):
+        self.db = db
+
+    async def find_users(
+        self, email: str | None = None, username: str | None = None
+    ) -> list[dict]:
+        conditions = [{field: value} for field, value in _keys(email, username)]
+        return await self.db.users.find({"$or": conditions}).to_list(len(conditions))
+
+    async def get_user_by_id(self, user_id: str) -> dict | None:
+        return await self.db.users.find_one({"id": user_id})
+
+
+_cache = IdentifierCache()
+
+
+def get_cache() -> IdentifierCache:
+    return _cache
+
+
+def invalidate(
+    user_id: str | None = None,
+    email: str | None = None,
+    username: str | None = None,
+) -> None:
+    """Call after a user is created, updated or deleted"""
+    _cache.invalidate(user_id=user_id, email=email, username=username)
+
+
+async def find_user(
+    users: Any, email: str | None = None, username: str | None = None
+) -> dict | None:
+    """The user with this email or username (email match first), or None.
+
+    ``users`` provides ``find_users(email, username)`` (one combined query,
+    raising on errors) and ``get_user_by_id(user_id)``: AsyncSupabaseDB or
+    MongoUsers.
+    """
+    keys = _keys(email, username)
+    if not keys:
+        return None
+    cached = [_cache.get(key) for key in keys]
+    if all(user_id == MISSING for user_id in cached):
+        _cache.negative_hits += 1
+        return None
+    for key, user_id in zip(keys, cached):
+        if not user_id:
+            continue
+        user = await users.get_user_by_id(user_id)
+        if user is not None and user.get(key[0]) == key[1]:
+            _cache.hits += 1
+            return user
+        _cache.invalidate(user_id=user_id)
+        break
+
+    _cache.misses += 1
+    generation = _cache.generation
+    matches = await users.find_users(email=email, username=username)
+    found = None
+    for key in keys:
+        user = next((u for u in matches if u.get(key[0]) == key[1]), None)
+        if user is None:
+            _cache.set(key, MISSING, generation)
+        elif user.get("id"):
+            _cache.set(key, str(user["id"]), generation)
+        found = found or user
+    return found
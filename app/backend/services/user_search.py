@@ -0,0 +1,263 @@
+"""User search - trigram-indexed, relevance-ranked user search
+Replaces unanchored ILIKE/$regex scans over users. On Supabase, search_users()
+uses pg_trgm GIN indexes on username and email. On MongoDB every user stores
+the trigrams of its username and email in ``search_grams`` (multikey index)
+and ``user_search_grams`` holds how many users have each trigram.
+
+A Mongo match needs USER_SEARCH_MIN_SIMILARITY of the query's trigrams, or
+all of its unpadded trigrams (the term appears inside a word). Any such user
+contains one of the query's (n - needed + 1) rarest trigrams or its rarest
+unpadded one, so only those are probed in the index; the counts only steer
+which trigrams are probed, so stale counts cost speed, never results. Results
+are ranked by score (exact username/email match first, then similarity) and
+paged with a (score, id) cursor.
+"""
+
+import base64
+import json
+import logging
+import math
+import os
+import re
+from typing import Any
+
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+USER_SEARCH_MIN_SIMILARITY = float(os.getenv("USER_SEARCH_MIN_SIMILARITY", "0.6"))
+
+GRAM_COUNTS = "user_search_grams"
+# Words as pg_trgm splits them: runs of letters and digits
+_WORD = re.compile(r"[^\W_]+")
+_HIDDEN = {"_id": 0, "password_hash": 0, "hashed_password": 0, "search_grams": 0}
+
+
+def trigrams(*values: Any) -> set[str]:
+    """pg_trgm-style trigrams: lowercased words padded with two leading and
+    one trailing space"""
+    grams: set[str] = set()
+    for value in values:
+        if not value:
+            continue
+        for word in _WORD.findall(str(value).lower()):
+            padded = f"  {word} "
+            grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def search_grams(username: str | None, email: str | None) -> list[str]:
+    """``search_grams`` value for a MongoDB user document"""
+    return sorted(trigrams(username, email))
+
+
+def _shared(grams: Any) -> dict:
+    """Expression counting the user's search_grams found in ``grams`` (the
+    stored grams are distinct, so this is the intersection size)"""
+    return {
+        "$size": {
+            "$filter": {
+                "input": "$search_grams",
+                "cond": {"$in": ["$$this", sorted(grams)]},
+            }
+        }
+    }
+
+
+def encode_cursor(score: float, user_id: str) -> str:
+    raw = json.dumps([score, user_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[float, str]:
+    """(score, id) of the row a cursor points at; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        score, user_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("Invalid search cursor") from e
+    if not isinstance(score, (int, float)) or not isinstance(user_id, str):
+        raise ValueError("Invalid search cursor")
+    return float(score), user_id
+
+
+class SupabaseUserSearch:
+    """Search through search_users() and its trigram indexes"""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def search(
+        self, query: str | None, limit: int, after: tuple[float, str] | None = None
+    ) -> list[tuple[float, dict]]:
+        result = await self.client.rpc(
+            "search_users",
+            {
+                "p_query": query,
+                "p_limit": limit,
+                "p_after_score": after[0] if after else None,
+                "p_after_id": after[1] if after else None,
+            },
+        ).execute()
+        return [(row["score"], row["user"]) for row in result.data or []]
+
+
+class MongoUserSearch:
+    """Search over the ``search_grams`` multikey index"""
+
+    def __init__(self, db: Any, min_similarity: float = USER_SEARCH_MIN_SIMILARITY):
+        self.db = db
+        self.min_similarity = min_similarity
+
+    async def ensure_indexes(self) -> None:
+        await self.db.users.create_index(
+            [("search_grams", 1)], name="users_search_grams_idx", background=True
+        )
+
+    async def backfill(self, batch_size: int = 1000, rebuild: bool = False) -> int:
+        """Store ``search_grams`` on users missing it (all users with
+        ``rebuild``), then recount trigrams. Returns the number of users
+        updated."""
+        query = {} if rebuild else {"search_grams": {"$exists": False}}
+        cursor = self.db.users.find(query, {"_id": 1, "username": 1, "email": 1})
+        updated = 0
+        batch: list[UpdateOne] = []
+        async for user in cursor:
+            grams = search_grams(user.get("username"), user.get("email"))
+            batch.append(
+                UpdateOne({"_id": user["_id"]}, {"$set": {"search_grams": grams}})
+            )
+            if len(batch) >= batch_size:
+                await self.db.users.bulk_write(batch, ordered=False)
+                updated += len(batch)
+                batch = []
+        if batch:
+            await self.db.users.bulk_write(batch, ordered=False)
+            updated += len(batch)
+        await self.refresh_gram_counts()
+        return updated
+
+    async def refresh_gram_counts(self) -> int:
+        """Recount users per trigram (run after bulk imports or a backfill)"""
+        counts = await self.db.users.aggregate(
+            [
+                {"$unwind": "$search_grams"},
+                {"$group": {"_id": "$search_grams", "users": {"$sum": 1}}},
+            ],
+            allowDiskUse=True,
+        ).to_list(None)
+        if counts:
+            await self.db[GRAM_COUNTS].bulk_write(
+                [ReplaceOne({"_id": c["_id"]}, c, upsert=True) for c in counts],
+                ordered=False,
+            )
+        await self.db[GRAM_COUNTS].delete_many(
+            {"_id": {"$nin": [c["_id"] for c in counts]}}
+        )
+        return len(counts)
+
+    async def _gram_counts(self, grams: set[str]) -> dict[str, int]:
+        known = (
+            await self.db[GRAM_COUNTS].find({"_id": {"$in": list(grams)}}).to_list(None)
+        )
+        return {doc["_id"]: doc["users"] for doc in known}
+
+    @staticmethod
+    def probe(grams: set[str], counts: dict[str, int], needed: int) -> list[str]:
+        """Trigrams to look up: every user sharing ``needed`` of ``grams``, or
+        containing the term as a substring (all unpadded trigrams), has one"""
+        rarest = sorted(grams, key=lambda gram: (counts.get(gram, 0), gram))
+        probe = rarest[: len(grams) - needed + 1]
+        interior = [gram for gram in rarest if " " not in gram]
+        if interior and interior[0] not in probe:
+            probe.append(interior[0])
+        return probe
+
+    async def search(
+        self, query: str | None, limit: int, after: tuple[float, str] | None = None
+    ) -> list[tuple[float, dict]]:
+        term = (query or "").strip().lower()
+        grams = trigrams(term)
+        if not grams:
+            users = (
+                await self.db.users.find(
+                    {"id": {"$gt": after[1]}} if after else {}, _HIDDEN
+                )
+                .sort("id", 1)
+                .limit(limit)
+                .to_list(limit)
+            )
+            return [(0.0, user) for user in users]
+
+        needed = max(1, math.ceil(self.min_similarity * len(grams)))
+        probe = self.probe(grams, await self._gram_counts(grams), needed)
+        interior = sorted(gram for gram in grams if " " not in gram)
+        exact = {
+            "$or": [
+                {"$eq": [{"$toLower": {"$ifNull": ["$username", ""]}}, term]},
+                {"$eq": [{"$toLower": {"$ifNull": ["$email", ""]}}, term]},
+            ]
+        }
+        matched = [{"_shared": {"$gte": needed}}]
+        if interior:
+            matched.append({"_interior": len(interior)})
+        page: dict = {}
+        if after:
+            page = {
+                "$or": [
+                    {"_score": {"$lt": after[0]}},
+                    {"_score": after[0], "id": {"$gt": after[1]}},
+                ]
+            }
+        pipeline = [
+            {"$match": {"search_grams": {"$in": probe}}},
+            {
+                "$addFields": {
+                    "_shared": _shared(grams),
+                    "_interior": _shared(interior),
+                }
+            },
+            {"$match": {"$or": matched}},
+            {
+                "$addFields": {
+                    "_score": {
+                        "$add": [
+                            {"$cond": [exact, 1, 0]},
+                            {"$divide": ["$_shared", len(grams)]},
+                        ]
+                    }
+                }
+            },
+            {"$match": page},
+            {"$sort": {"_score": -1, "id": 1}},
+            {"$limit": limit},
+            {"$project": {**_HIDDEN, "_shared": 0, "_interior": 0}},
+        ]
+        users = await self.db.users.aggregate(pipeline).to_list(limit)
+        return [(user.pop("_score"), user) for user in users]
+
+
+async def search(
+    backend: Any, query: str | None, limit: int = 20, cursor: str | None = None
+) -> tuple[list[dict], str | None]:
+    """One page of matching users and the cursor of the next page (or None)"""
+    after = decode_cursor(cursor) if cursor else None
+    rows = await backend.search(query, limit + 1, after)
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        score, user = page[-1]
+        next_cursor = encode_cursor(score, str(user["id"]))
+    return [user for _, user in page], next_cursor
+
+
+def get_backend() -> Any:
+    """Search backend on the primary store (None when no store is configured)"""
+    if os.getenv("USE_SUPABASE", "true").lower() in ("true", "1", "yes"):
+        from supabase_db import get_async_supabase
+
+        client = get_async_supabase()
+        return SupabaseUserSearch(client) if client is not None else None
+    from db import get_typed_db
+
+    return MongoUserSearch(get_typed_db())
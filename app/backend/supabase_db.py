@@ -3,12 +3,18 @@ Supabase Database Connection
 Replaces MongoDB with PostgreSQL via Supabase
 """
 
+import copy
+import functools
 import logging
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
+import httpx
 from dotenv import load_dotenv
+from postgrest import AsyncPostgrestClient
+from services import bi_events, user_lookup
 from supabase import Client, create_client
 
 logger = logging.getLogger(__name__)
@@ -67,304 +73,388 @@ def get_supabase() -> Optional[Client]:
     return _supabase_client
 
 
-class SupabaseDB:
-    """Wrapper class for Supabase operations with error handling"""
+# Async PostgREST client (singleton) shared by AsyncSupabaseDB. All requests go
+# through one httpx connection pool, so connections are kept alive and reused
+# instead of paying a TCP/TLS handshake per query.
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(
+    os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30")
+)
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))
+
+_async_postgrest: Optional[AsyncPostgrestClient] = None
+
+
+def create_async_postgrest(url: str, service_key: str) -> AsyncPostgrestClient:
+    """Build an async PostgREST client for a Supabase project URL."""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=SUPABASE_HTTP_TIMEOUT,
+        follow_redirects=True,
+    )
+    return AsyncPostgrestClient(
+        f"{url.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        },
+        http_client=http_client,
+    )
 
-    def __init__(self):
-        self.client = get_supabase()
-        if not self.client:
-            logger.warning(
-                "SupabaseDB initialized without client - operations will fail gracefully"
-            )
 
-    def _check_client(self):
-        """Check if client is available"""
-        if not self.client:
-            raise RuntimeError(
-                "Supabase client not initialized. Check SUPABASE_URL and SUPABASE_SERVICE_KEY"
-            )
+def get_async_supabase() -> Optional[AsyncPostgrestClient]:
+    """
+    Get async PostgREST client instance (singleton pattern)
 
-    async def validate_connection(self) -> bool:
-        """Validate Supabase connection"""
-        if not self.client:
-            return False
+    Query builders match the sync client (``client.table(...).select(...)``);
+    ``execute()`` must be awaited.
+
+    Returns:
+        Async PostgREST client or None if not configured
+    """
+    global _async_postgrest
+
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        return None
+
+    if _async_postgrest is None:
         try:
-            # Try a simple query to validate connection
-            self.client.table("users").select("count").eq("id", "nonexistent").execute()
-            return True
+            _async_postgrest = create_async_postgrest(
+                SUPABASE_URL, SUPABASE_SERVICE_KEY
+            )
+            logger.info("Async Supabase client initialized successfully")
         except Exception as e:
-            logger.error(f"Error validating Supabase connection: {e}")
-            return False
+            logger.error(f"Failed to initialize async Supabase client: {e}")
+            return None
+
+    return _async_postgrest
+
+
+async def close_async_supabase() -> None:
+    """Close the shared async client's connection pool (call on shutdown)"""
+    global _async_postgrest
+
+    if _async_postgrest is not None:
+        client, _async_postgrest = _async_postgrest, None
+        await client.aclose()
+        async_db.client = None
+
+
+def _or_value(value: str) -> str:
+    """Quote a value for a PostgREST or=() filter (commas, dots, parentheses)"""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _first(response: Any) -> Optional[Dict]:
+    return response.data[0] if response.data else None
+
+
+def _rows(response: Any) -> List[Dict]:
+    return response.data if response.data else []
+
+
+@dataclass
+class _Op:
+    """One database operation: the request to execute and how to handle its
+    response or failure. Built once in _SupabaseQueries, run by each wrapper."""
+
+    query: Any
+    error: Optional[str] = None
+    result: Callable[[Any], Any] = _first
+    default: Any = None
+    reraise: bool = False
+    # Side effect once the request succeeded (cache invalidation, logging)
+    then: Optional[Callable[[], None]] = None
+
+    def finish(self, response: Any) -> Any:
+        if self.then is not None:
+            self.then()
+        return self.result(response)
+
+    def fail(self, e: Exception) -> Any:
+        if self.error:
+            logger.error(f"{self.error}: {e}")
+        if self.reraise:
+            raise e
+        return copy.copy(self.default)
+
+
+def _operation(build: Callable[..., _Op]) -> Callable[..., Any]:
+    """Public method running the _Op that ``build`` returns on ``self._run``:
+    a plain call on SupabaseDB, a coroutine on AsyncSupabaseDB"""
+
+    @functools.wraps(build)
+    def method(self, *args, **kwargs):
+        return self._run(build(self, *args, **kwargs))
+
+    return method
+
+
+class _SupabaseQueries:
+    """Queries and result handling shared by SupabaseDB and AsyncSupabaseDB.
+
+    Each operation builds the PostgREST request and describes its result and
+    error handling as an _Op; the subclasses only differ in how ``_run``
+    executes it (blocking, or awaited on the shared async client).
+    """
+
+    client: Any
+
+    def _check_client(self):
+        raise NotImplementedError
+
+    def _client(self) -> Any:
+        self._check_client()
+        return self.client
 
     # ==================== USERS ====================
 
+    @_operation
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("users").select("*").eq("email", email).execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error getting user by email: {e}")
-            return None
+        return _Op(
+            self._client().table("users").select("*").eq("email", email),
+            error="Error getting user by email",
+        )
 
+    @_operation
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """Get user by username"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("users")
-                .select("*")
-                .eq("username", username)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error getting user by username: {e}")
-            return None
-
+        return _Op(
+            self._client().table("users").select("*").eq("username", username),
+            error="Error getting user by username",
+        )
+
+    @_operation
+    def find_users(
+        self, email: Optional[str] = None, username: Optional[str] = None
+    ) -> List[Dict]:
+        """Users matching the email or the username, in one query.
+
+        Raises on errors, so a failed lookup is never mistaken for "no user".
+        """
+        conditions = [
+            f"{field}.eq.{_or_value(value)}"
+            for field, value in (("email", email), ("username", username))
+            if value is not None
+        ]
+        return _Op(
+            self._client()
+            .table("users")
+            .select("*")
+            .or_(",".join(conditions))
+            .limit(len(conditions)),
+            result=lambda response: response.data or [],
+            reraise=True,
+        )
+
+    @_operation
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("users").select("*").eq("id", user_id).execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error getting user by ID: {e}")
-            return None
+        return _Op(
+            self._client().table("users").select("*").eq("id", user_id),
+            error="Error getting user by ID",
+        )
 
+    @_operation
     def create_user(self, user_data: Dict) -> Optional[Dict]:
         """Create new user"""
-        self._check_client()
-        try:
-            response = self.client.table("users").insert(user_data).execute()
+
+        def created():
+            user_lookup.invalidate(
+                email=user_data.get("email"), username=user_data.get("username")
+            )
             logger.info(f"User created: {user_data.get('email')}")
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error creating user: {e}")
-            raise
 
+        return _Op(
+            self._client().table("users").insert(user_data),
+            error="Error creating user",
+            reraise=True,
+            then=created,
+        )
+
+    @_operation
     def update_user(self, user_id: str, updates: Dict) -> Optional[Dict]:
         """Update user"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("users").update(updates).eq("id", user_id).execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error updating user: {e}")
-            return None
-
+        return _Op(
+            self._client().table("users").update(updates).eq("id", user_id),
+            error="Error updating user",
+            then=lambda: user_lookup.invalidate(
+                user_id, email=updates.get("email"), username=updates.get("username")
+            ),
+        )
+
+    @_operation
     def delete_user(self, user_id: str) -> bool:
         """Delete user (soft delete by setting is_active=false)"""
-        self._check_client()
-        try:
-            self.client.table("users").update({"is_active": False}).eq(
-                "id", user_id
-            ).execute()
-            return True
-        except Exception as e:
-            logger.error(f"Error deleting user: {e}")
-            return False
+        return _Op(
+            self._client()
+            .table("users")
+            .update({"is_active": False})
+            .eq("id", user_id),
+            error="Error deleting user",
+            result=lambda response: True,
+            default=False,
+            then=lambda: user_lookup.invalidate(user_id),
+        )
 
     # ==================== BUSINESS PROFILES ====================
 
+    @_operation
     def create_business_profile(self, profile_data: Dict) -> Optional[Dict]:
         """Create business profile"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("user_business_profiles")
-                .insert(profile_data)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error creating business profile: {e}")
-            raise
+        return _Op(
+            self._client().table("user_business_profiles").insert(profile_data),
+            error="Error creating business profile",
+            reraise=True,
+        )
 
+    @_operation
     def get_business_profile(self, user_id: str) -> Optional[Dict]:
         """Get business profile"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("user_business_profiles")
-                .select("*")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error getting business profile: {e}")
-            return None
-
+        return _Op(
+            self._client()
+            .table("user_business_profiles")
+            .select("*")
+            .eq("user_id", user_id),
+            error="Error getting business profile",
+        )
+
+    @_operation
     def update_business_profile(self, user_id: str, updates: Dict) -> Optional[Dict]:
         """Update business profile"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("user_business_profiles")
-                .update(updates)
-                .eq("user_id", user_id)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error updating business profile: {e}")
-            return None
+        return _Op(
+            self._client()
+            .table("user_business_profiles")
+            .update(updates)
+            .eq("user_id", user_id),
+            error="Error updating business profile",
+        )
 
     # ==================== LISTINGS ====================
 
+    @_operation
     def create_listing(self, listing_data: Dict) -> Optional[Dict]:
         """Create listing"""
-        self._check_client()
-        try:
-            response = self.client.table("listings").insert(listing_data).execute()
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error creating listing: {e}")
-            raise
+        return _Op(
+            self._client().table("listings").insert(listing_data),
+            error="Error creating listing",
+            reraise=True,
+        )
 
+    @_operation
     def get_listing(self, listing_id: str) -> Optional[Dict]:
         """Get listing by ID"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("listings").select("*").eq("id", listing_id).execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error getting listing: {e}")
-            return None
+        return _Op(
+            self._client().table("listings").select("*").eq("id", listing_id),
+            error="Error getting listing",
+        )
 
+    @_operation
     def get_user_listings(
         self, user_id: str, status: Optional[str] = None
     ) -> List[Dict]:
         """Get all listings for user"""
-        self._check_client()
-        try:
-            query = self.client.table("listings").select("*").eq("user_id", user_id)
-            if status:
-                query = query.eq("status", status)
-            response = query.order("created_at", desc=True).execute()
-            return response.data if response.data else []
-        except Exception as e:
-            logger.error(f"Error getting user listings: {e}")
-            return []
-
+        query = self._client().table("listings").select("*").eq("user_id", user_id)
+        if status:
+            query = query.eq("status", status)
+        return _Op(
+            query.order("created_at", desc=True),
+            error="Error getting user listings",
+            result=_rows,
+            default=[],
+        )
+
+    @_operation
     def update_listing(self, listing_id: str, updates: Dict) -> Optional[Dict]:
         """Update listing"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("listings")
-                .update(updates)
-                .eq("id", listing_id)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error updating listing: {e}")
-            return None
+        return _Op(
+            self._client().table("listings").update(updates).eq("id", listing_id),
+            error="Error updating listing",
+        )
 
+    @_operation
     def delete_listing(self, listing_id: str) -> bool:
         """Delete listing"""
-        self._check_client()
-        try:
-            self.client.table("listings").delete().eq("id", listing_id).execute()
-            return True
-        except Exception as e:
-            logger.error(f"Error deleting listing: {e}")
-            return False
+        return _Op(
+            self._client().table("listings").delete().eq("id", listing_id),
+            error="Error deleting listing",
+            result=lambda response: True,
+            default=False,
+        )
 
     # ==================== PLATFORM CONNECTIONS ====================
 
+    @_operation
     def get_platform_connections(self, user_id: str) -> List[Dict]:
         """Get all platform connections for user"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("platform_connections")
-                .select("*")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            return response.data if response.data else []
-        except Exception as e:
-            logger.error(f"Error getting platform connections: {e}")
-            return []
-
+        return _Op(
+            self._client()
+            .table("platform_connections")
+            .select("*")
+            .eq("user_id", user_id),
+            error="Error getting platform connections",
+            result=_rows,
+            default=[],
+        )
+
+    @_operation
     def get_platform_connection(self, user_id: str, platform: str) -> Optional[Dict]:
         """Get specific platform connection"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("platform_connections")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("platform", platform)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error getting platform connection: {e}")
-            return None
-
+        return _Op(
+            self._client()
+            .table("platform_connections")
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("platform", platform),
+            error="Error getting platform connection",
+        )
+
+    @_operation
     def upsert_platform_connection(self, connection_data: Dict) -> Optional[Dict]:
         """Create or update platform connection"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("platform_connections")
-                .upsert(connection_data)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error upserting platform connection: {e}")
-            raise
+        return _Op(
+            self._client().table("platform_connections").upsert(connection_data),
+            error="Error upserting platform connection",
+            reraise=True,
+        )
 
     # ==================== BUSINESS INTELLIGENCE ====================
 
+    @_operation
     def log_event(
         self, user_id: str, event_type: str, event_data: Dict
     ) -> Optional[Dict]:
-        """Log business intelligence event"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("business_intelligence")
-                .insert(
-                    {
-                        "user_id": user_id,
-                        "event_type": event_type,
-                        "event_data": event_data,
-                    }
-                )
-                .execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error logging event: {e}")
-            return None
-
+        """Log business intelligence event
+
+        Buffered for a batched insert when the event writer is running, in
+        which case the event is returned as queued (without a database id).
+        """
+        event = {"user_id": user_id, "event_type": event_type, "event_data": event_data}
+        if bi_events.record(event):
+            return _Op(None, result=lambda response: event)
+        return _Op(
+            self._client().table("business_intelligence").insert(event),
+            error="Error logging event",
+        )
+
+    @_operation
     def insert_business_intelligence(self, bi_data: Dict) -> Optional[Dict]:
         """Insert business intelligence data during signup"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("business_intelligence").insert(bi_data).execute()
-            )
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"Error inserting business intelligence: {e}")
-            return None
+        return _Op(
+            self._client().table("business_intelligence").insert(bi_data),
+            error="Error inserting business intelligence",
+        )
 
+    @_operation
     def get_events(
         self,
         user_id: Optional[str] = None,
@@ -372,97 +462,174 @@ class SupabaseDB:
         limit: int = 100,
     ) -> List[Dict]:
         """Get business intelligence events"""
-        self._check_client()
-        try:
-            query = self.client.table("business_intelligence").select("*")
-            if user_id:
-                query = query.eq("user_id", user_id)
-            if event_type:
-                query = query.eq("event_type", event_type)
-            response = query.order("timestamp", desc=True).limit(limit).execute()
-            return response.data if response.data else []
-        except Exception as e:
-            logger.error(f"Error getting events: {e}")
-            return []
+        query = self._client().table("business_intelligence").select("*")
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if event_type:
+            query = query.eq("event_type", event_type)
+        return _Op(
+            query.order("timestamp", desc=True).limit(limit),
+            error="Error getting events",
+            result=_rows,
+            default=[],
+        )
 
     # ==================== ANALYTICS ====================
 
+    @_operation
     def get_industry_stats(self) -> List[Dict]:
         """Get industry breakdown (uses view)"""
-        self._check_client()
-        try:
-            response = self.client.table("industry_breakdown").select("*").execute()
-            return response.data if response.data else []
-        except Exception as e:
-            logger.error(f"Error getting industry stats: {e}")
-            return []
-
+        return _Op(
+            self._client().table("industry_breakdown").select("*"),
+            error="Error getting industry stats",
+            result=_rows,
+            default=[],
+        )
+
+    @_operation
     def get_user_stats(self, limit: int = 100) -> List[Dict]:
         """Get user statistics (uses view)"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("user_stats").select("*").limit(limit).execute()
-            )
-            return response.data if response.data else []
-        except Exception as e:
-            logger.error(f"Error getting user stats: {e}")
-            return []
-
+        return _Op(
+            self._client().table("user_stats").select("*").limit(limit),
+            error="Error getting user stats",
+            result=_rows,
+            default=[],
+        )
+
+    @_operation
     def get_revenue_breakdown(self) -> Dict[str, int]:
         """Get revenue breakdown by range"""
-        self._check_client()
-        try:
-            response = (
-                self.client.table("user_business_profiles")
-                .select("monthly_revenue")
-                .execute()
-            )
-
-            breakdown = {}
-            for row in response.data:
-                revenue = row.get("monthly_revenue", "unknown")
-                breakdown[revenue] = breakdown.get(revenue, 0) + 1
-
-            return breakdown
-        except Exception as e:
-            logger.error(f"Error getting revenue breakdown: {e}")
-            return {}
+        # Grouped in the database instead of fetching every profile
+        return _Op(
+            self._client().rpc("business_insights", {}),
+            error="Error getting revenue breakdown",
+            result=lambda response: {
+                row["_id"]: row["count"]
+                for row in (response.data or {}).get("revenue_ranges", [])
+            },
+            default={},
+        )
 
     # ==================== ANALYTICS TRACKING ====================
 
+    @_operation
     def track_listing_view(self, listing_id: str, user_id: str, platform: str):
         """Track listing view"""
-        self._check_client()
-        try:
-            # Upsert analytics record
-            self.client.rpc(
+        # Upsert analytics record
+        return _Op(
+            self._client().rpc(
                 "increment_listing_views",
                 {"listing_id": listing_id, "platform_name": platform},
-            ).execute()
-        except Exception as e:
-            logger.error(f"Error tracking view: {e}")
+            ),
+            error="Error tracking view",
+            result=lambda response: None,
+        )
 
     # ==================== UTILITY METHODS ====================
 
+    @_operation
     def execute_raw_sql(self, sql: str, params: Optional[Dict] = None) -> Any:
         """Execute raw SQL query (use with caution)"""
-        self._check_client()
+        return _Op(
+            self._client().rpc("execute_sql", {"query": sql, "params": params or {}}),
+            error="Error executing raw SQL",
+            result=lambda response: response.data,
+            reraise=True,
+        )
+
+
+class SupabaseDB(_SupabaseQueries):
+    """Wrapper class for Supabase operations with error handling"""
+
+    def __init__(self):
+        self.client = get_supabase()
+        if not self.client:
+            logger.warning(
+                "SupabaseDB initialized without client - operations will fail gracefully"
+            )
+
+    def _check_client(self):
+        """Check if client is available"""
+        if not self.client:
+            raise RuntimeError(
+                "Supabase client not initialized. Check SUPABASE_URL and SUPABASE_SERVICE_KEY"
+            )
+
+    def _run(self, op: _Op) -> Any:
+        if op.query is None:
+            return op.result(None)
+        try:
+            return op.finish(op.query.execute())
+        except Exception as e:
+            return op.fail(e)
+
+    async def validate_connection(self) -> bool:
+        """Validate Supabase connection"""
+        if not self.client:
+            return False
+        try:
+            # Try a simple query to validate connection
+            self.client.table("users").select("count").eq("id", "nonexistent").execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error validating Supabase connection: {e}")
+            return False
+
+
+class AsyncSupabaseDB(_SupabaseQueries):
+    """Async counterpart of SupabaseDB for use from async routes.
+
+    Same methods and error handling as SupabaseDB, but every query is awaited on
+    the shared async client so the event loop is not blocked by HTTP round trips.
+    """
+
+    def __init__(self, client: Optional[AsyncPostgrestClient] = None):
+        self.client = client
+
+    def _check_client(self):
+        """Check if client is available, creating the shared one on first use"""
+        if not self.client:
+            self.client = get_async_supabase()
+        if not self.client:
+            raise RuntimeError(
+                "Supabase client not initialized. Check SUPABASE_URL and SUPABASE_SERVICE_KEY"
+            )
+
+    async def _run(self, op: _Op) -> Any:
+        if op.query is None:
+            return op.result(None)
         try:
-            response = self.client.rpc(
-                "execute_sql", {"query": sql, "params": params or {}}
-            ).execute()
-            return response.data
+            return op.finish(await op.query.execute())
         except Exception as e:
-            logger.error(f"Error executing raw SQL: {e}")
-            raise
+            return op.fail(e)
+
+    async def validate_connection(self) -> bool:
+        """Validate Supabase connection"""
+        try:
+            self._check_client()
+            await (
+                self.client.table("users")
+                .select("count")
+                .eq("id", "nonexistent")
+                .execute()
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error validating Supabase connection: {e}")
+            return False
 
 
 # Global instance
 db = SupabaseDB()
+async_db = AsyncSupabaseDB()
 
 
 # Export convenience function
 def get_db() -> SupabaseDB:
     """Get database instance"""
     return db
+
+
+def get_async_db() -> AsyncSupabaseDB:
+    """Get async database instance"""
+    return async_db
@@ -0,0 +1,247 @@
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import HTTPException, Response
+from postgrest import AsyncPostgrestClient
+from routes import analytics
+from routes.ads import serialize_datetime_fields
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def _when(day):
+    return datetime(2025, 1, day, 12, tzinfo=timezone.utc)
+
+
+async def _seed_mongo():
+    db = mongomock_motor.AsyncMongoMockClient()["analytics_test"]
+    await db.ads.insert_many(
+        [
+            {
+                "id": f"ad{i}",
+                "user_id": "u1",
+                "title": f"Ad {i}",
+                "platforms": ["ebay", "facebook"],
+                "created_at": _when(i + 1),
+            }
+            for i in range(5)
+        ]
+        + [{"id": "other", "user_id": "u2", "title": "Other", "created_at": _when(1)}]
+    )
+    await db.posted_ads.insert_many(
+        [
+            {"ad_id": "ad4", "platform": "ebay", "posted_at": _when(10), "views": 10, "clicks": 2, "leads": 1},
+            {"ad_id": "ad4", "platform": "facebook", "posted_at": _when(11), "views": 5, "clicks": 3, "leads": 0},
+            # Outside the requested range
+            {"ad_id": "ad4", "platform": "ebay", "posted_at": _when(25), "views": 100, "clicks": 0, "leads": 0},
+            {"ad_id": "ad3", "platform": "ebay", "posted_at": _when(10), "views": 4, "clicks": 1, "leads": 1},
+        ]
+    )
+    return db
+
+
+@pytest.mark.unit
+async def test_mongo_path_groups_totals_in_one_query(monkeypatch):
+    db = await _seed_mongo()
+    calls = []
+    collection_type = type(db.posted_ads)
+    aggregate = collection_type.aggregate
+
+    def counting_aggregate(self, *args, **kwargs):
+        calls.append(self.name)
+        return aggregate(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "aggregate", counting_aggregate)
+    monkeypatch.setattr(analytics, "USE_SUPABASE", False)
+    monkeypatch.setattr(analytics, "get_typed_db", lambda: db)
+
+    response = Response()
+    rows = await analytics.get_listing_analytics(
+        response, "2025-01-01", "2025-01-20", None, 1, 2, user_id="u1"
+    )
+
+    assert [r["listing_id"] for r in rows] == ["ad4", "ad3"]
+    assert (rows[0]["views"], rows[0]["clicks"], rows[0]["leads"]) == (15, 5, 1)
+    assert rows[1]["views"] == 4
+    assert calls == ["posted_ads"]
+    assert response.headers["X-Total-Count"] == "5"
+
+    rows = await analytics.get_listing_analytics(
+        Response(), "2025-01-01", "2025-01-20", "ebay", 1, 2, user_id="u1"
+    )
+    assert rows[0]["views"] == 10
+
+
+@pytest.mark.unit
+async def test_mongo_path_matches_posted_at_stored_as_iso_strings(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["analytics_iso_test"]
+    await db.ads.insert_one(
+        {"id": "ad1", "user_id": "u1", "title": "Ad", "created_at": _when(1)}
+    )
+    posted = [
+        # serialize_datetime_fields output, other UTC spellings and a BSON date
+        ("ebay", serialize_datetime_fields({"at": _when(10)}, ["at"])["at"], 1),
+        ("ebay", "2025-01-20T23:59:59.500000", 2),
+        ("facebook", "2025-01-01T00:00:00Z", 4),
+        ("facebook", _when(15), 8),
+        # Outside 2025-01-01..2025-01-20
+        ("ebay", "2025-01-21T00:00:00+00:00", 100),
+        ("ebay", "2024-12-31T23:59:59+00:00", 100),
+    ]
+    await db.posted_ads.insert_many(
+        [
+            {
+                "ad_id": "ad1",
+                "user_id": "u1",
+                "platform": platform,
+                "posted_at": posted_at,
+                "views": views,
+                "clicks": 0,
+                "leads": 0,
+            }
+            for platform, posted_at, views in posted
+        ]
+    )
+    monkeypatch.setattr(analytics, "USE_SUPABASE", False)
+    monkeypatch.setattr(analytics, "get_typed_db", lambda: db)
+
+    listings = await analytics.get_listing_analytics(
+        Response(), "2025-01-01", "2025-01-20", None, 1, 50, user_id="u1"
+    )
+    platforms = await analytics.get_platform_analytics(
+        "2025-01-01", "2025-01-20", user_id="u1"
+    )
+
+    assert listings[0]["views"] == 15
+    assert {p["platform"]: (p["total_posts"], p["total_views"]) for p in platforms} == {
+        "ebay": (2, 3),
+        "facebook": (2, 12),
+    }
+
+
+@pytest.mark.unit
+async def test_supabase_path_uses_a_single_rpc(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "listing_id": "l1",
+                    "title": "Bike",
+                    "status": "active",
+                    "created_at": "2025-01-02T00:00:00+00:00",
+                    "views": 20,
+                    "clicks": 5,
+                    "leads": 2,
+                    "total_count": 41,
+                }
+            ],
+        )
+
+    client = AsyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(analytics, "USE_SUPABASE", True)
+    monkeypatch.setattr("supabase_db.get_async_supabase", lambda: client)
+
+    response = Response()
+    rows = await analytics.get_listing_analytics(
+        response, "2025-01-01", "2025-01-31", None, 3, 20, user_id="u1"
+    )
+
+    assert len(requests) == 1
+    assert requests[0].url.path == "/rest/v1/rpc/listing_analytics"
+    params = json.loads(requests[0].content)
+    assert params["p_offset"] == 40 and params["p_limit"] == 20
+    assert params["p_end"].startswith("2025-02-01")
+    assert rows[0]["listing_id"] == "l1"
+    assert rows[0]["conversion_rate"] == 25.0
+    assert response.headers["X-Total-Count"] == "41"
+    await client.aclose()
+
+
+@pytest.mark.unit
+async def test_supabase_page_past_the_end_still_reports_the_total(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/rpc/listing_analytics"):
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, headers={"content-range": "*/41"})
+
+    client = AsyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(analytics, "USE_SUPABASE", True)
+    monkeypatch.setattr("supabase_db.get_async_supabase", lambda: client)
+
+    response = Response()
+    rows = await analytics.get_listing_analytics(
+        response, "2025-01-01", "2025-01-31", None, 5, 20, user_id="u1"
+    )
+
+    assert rows == []
+    assert response.headers["X-Total-Count"] == "41"
+    count = requests[1]
+    assert count.method == "HEAD"
+    assert count.url.path == "/rest/v1/listings"
+    assert count.url.params["user_id"] == "eq.u1"
+    assert "count=exact" in count.headers["prefer"]
+    await client.aclose()
+
+
+@pytest.mark.unit
+async def test_invalid_dates_are_rejected():
+    with pytest.raises(HTTPException) as exc:
+        await analytics.get_listing_analytics(
+            Response(), "2025-02-01", "2025-01-01", None, 1, 50, user_id="u1"
+        )
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.unit
+async def test_platform_analytics_merges_daily_rollup(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200,
+            json=[
+                {"platform": "ebay", "posts": 2, "views": 10, "clicks": 1, "leads": 1},
+                {"platform": "facebook", "posts": 1, "views": 7, "clicks": 2, "leads": 0},
+                {"platform": "ebay", "posts": 2, "views": 5, "clicks": 0, "leads": 1},
+            ],
+        )
+
+    client = AsyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(analytics, "USE_SUPABASE", True)
+    monkeypatch.setattr("supabase_db.get_async_supabase", lambda: client)
+
+    rows = await analytics.get_platform_analytics("2025-01-01", "2025-01-31", user_id="u1")
+
+    [request] = requests
+    assert request.url.path == "/rest/v1/platform_daily_stats"
+    assert request.url.params["user_id"] == "eq.u1"
+    assert request.url.params.get_list("day") == ["gte.2025-01-01", "lt.2025-02-01"]
+    assert rows[0] == {
+        "platform": "ebay",
+        "total_posts": 4,
+        "total_views": 15,
+        "total_clicks": 1,
+        "total_leads": 2,
+        "success_rate": 50.0,
+    }
+    assert rows[1]["platform"] == "facebook"
+    await client.aclose()
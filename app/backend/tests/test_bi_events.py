@@ -0,0 +1,202 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from postgrest import AsyncPostgrestClient
+from services import bi_events
+from services.bi_events import BIEventWriter
+
+
+class Store:
+    """business_intelligence endpoint that records each insert request"""
+
+    def __init__(self, fail=0):
+        self.inserts = []
+        self.fail = fail
+        self.attempts = 0
+
+    def handler(self, request):
+        self.attempts += 1
+        if self.fail:
+            self.fail -= 1
+            return httpx.Response(503, json={"message": "unavailable"})
+        body = json.loads(request.content)
+        rows = body if isinstance(body, list) else [body]
+        if any(row["user_id"] == "not-a-uuid" for row in rows):
+            return httpx.Response(
+                400,
+                json={
+                    "code": "22P02",
+                    "message": 'invalid input syntax for type uuid: "not-a-uuid"',
+                },
+            )
+        self.inserts.append(request)
+        return httpx.Response(201)
+
+    def rows(self):
+        return [row for r in self.inserts for row in json.loads(r.content)]
+
+    def client(self):
+        return AsyncPostgrestClient(
+            "http://supabase.test/rest/v1",
+            headers={"apikey": "key", "Authorization": "Bearer key"},
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)),
+        )
+
+
+def _event(i):
+    return {"user_id": None, "event_type": "test", "event_data": {"i": i}}
+
+
+@pytest.mark.unit
+async def test_full_batch_is_written_in_one_insert():
+    store = Store()
+    writer = BIEventWriter(store.client(), batch_size=3, flush_interval=60)
+    writer.start()
+
+    for i in range(3):
+        assert writer.record(_event(i)) is True
+    await asyncio.sleep(0.05)
+
+    assert len(store.inserts) == 1
+    request = store.inserts[0]
+    assert request.url.path == "/rest/v1/business_intelligence"
+    assert "return=minimal" in request.headers["prefer"]
+    assert "missing=default" in request.headers["prefer"]
+    assert [r["event_data"]["i"] for r in store.rows()] == [0, 1, 2]
+    assert all(r["timestamp"] for r in store.rows())
+    await writer.stop()
+
+
+@pytest.mark.unit
+async def test_partial_batch_is_written_after_flush_interval():
+    store = Store()
+    writer = BIEventWriter(store.client(), batch_size=100, flush_interval=0.05)
+    writer.start()
+
+    writer.record(_event(1))
+    await asyncio.sleep(0.01)
+    assert store.inserts == []
+    await asyncio.sleep(0.1)
+
+    assert len(store.rows()) == 1
+    assert writer.stats()["written"] == 1
+    await writer.stop()
+
+
+@pytest.mark.unit
+async def test_full_buffer_drops_and_counts_events():
+    store = Store()
+    writer = BIEventWriter(
+        store.client(), batch_size=100, flush_interval=60, max_buffer=2
+    )
+    writer.start()
+
+    for i in range(5):
+        writer.record(_event(i))
+
+    stats = writer.stats()
+    assert stats["buffered"] == 2
+    assert stats["dropped"] == 3
+    await writer.stop()
+    assert len(store.rows()) == 2
+
+
+@pytest.mark.unit
+async def test_failed_flush_keeps_events_for_retry():
+    store = Store(fail=1)
+    writer = BIEventWriter(store.client(), batch_size=2, flush_interval=0.02)
+    writer.start()
+
+    writer.record(_event(1))
+    writer.record(_event(2))
+    await asyncio.sleep(0.1)
+
+    assert writer.stats()["failed_batches"] == 1
+    assert [r["event_data"]["i"] for r in store.rows()] == [1, 2]
+    assert writer.stats()["dropped"] == 0
+    await writer.stop()
+
+
+@pytest.mark.unit
+async def test_rejected_rows_are_dropped_and_the_rest_written():
+    store = Store()
+    writer = BIEventWriter(store.client(), batch_size=8, flush_interval=0.02)
+    writer.start()
+
+    for i in range(8):
+        writer.record({**_event(i), "user_id": "not-a-uuid"} if i == 5 else _event(i))
+    # Not serialisable: fails before the request is sent
+    writer.record({**_event(8), "event_data": {"at": object()}})
+    await asyncio.sleep(0.1)
+    writer.record(_event(9))
+    await asyncio.sleep(0.1)
+
+    assert [r["event_data"]["i"] for r in store.rows()] == [0, 1, 2, 3, 4, 6, 7, 9]
+    stats = writer.stats()
+    assert (stats["rejected"], stats["dropped"], stats["failed_batches"]) == (2, 0, 0)
+    assert stats["buffered"] == 0
+    await writer.stop()
+
+
+@pytest.mark.unit
+async def test_batch_is_dropped_after_max_attempts():
+    store = Store(fail=3)
+    writer = BIEventWriter(
+        store.client(), batch_size=2, flush_interval=0.01, max_attempts=3
+    )
+    writer.start()
+
+    writer.record(_event(1))
+    writer.record(_event(2))
+    await asyncio.sleep(0.15)
+    writer.record(_event(3))
+    await writer.stop()
+
+    assert store.attempts == 4
+    assert writer.stats()["dropped"] == 2
+    assert [r["event_data"]["i"] for r in store.rows()] == [3]
+
+
+@pytest.mark.unit
+async def test_stop_drains_buffer_and_stops_accepting():
+    store = Store()
+    writer = BIEventWriter(store.client(), batch_size=100, flush_interval=60)
+    writer.start()
+    for i in range(3):
+        writer.record(_event(i))
+
+    await writer.stop()
+
+    assert len(store.rows()) == 3
+    assert writer.record(_event(4)) is False
+
+
+@pytest.mark.unit
+async def test_log_inserts_directly_when_writer_not_running(monkeypatch):
+    store = Store()
+    monkeypatch.setattr(bi_events, "_default_client", store.client)
+
+    await bi_events.log(_event(1))
+
+    assert len(store.inserts) == 1
+    assert json.loads(store.inserts[0].content)["event_type"] == "test"
+
+
+@pytest.mark.unit
+async def test_log_event_is_buffered_when_writer_runs(monkeypatch):
+    from supabase_db import AsyncSupabaseDB
+
+    store = Store()
+    writer = BIEventWriter(store.client(), batch_size=100, flush_interval=60)
+    monkeypatch.setattr(bi_events, "_writer", writer)
+    writer.start()
+
+    db = AsyncSupabaseDB(store.client())
+    event = await db.log_event("u1", "signup", {"plan": "trial"})
+
+    assert event["event_type"] == "signup"
+    assert store.inserts == []
+    await writer.stop()
+    assert store.rows()[0]["user_id"] == "u1"
@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from postgrest import AsyncPostgrestClient
+from services import bi_export
+from services.bi_export import MongoExportSource, SupabaseExportSource
+
+
+def _events(n):
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "user_id": "u1",
+            "event_type": "signup" if i % 2 else "upgrade",
+            "event_data": {"i": i},
+            "timestamp": f"2025-01-01T00:00:{i // 3:02d}+00:00",
+        }
+        for i in range(n)
+    ]
+
+
+class Table:
+    """business_intelligence endpoint that records each page request"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        params = request.url.params
+        rows = sorted(self.rows, key=lambda r: (r["timestamp"], r["id"]))
+        if "or" in params:
+            # Only the keyset condition is interpreted here
+            parts = params["or"].split('"')
+            after = (parts[1], parts[-1].removeprefix(",id.gt.").rstrip(")"))
+            rows = [r for r in rows if (r["timestamp"], r["id"]) > after]
+        limit = int(params.get("limit", len(rows)))
+        columns = params["select"].split(",")
+        return httpx.Response(
+            200, json=[{c: r[c] for c in columns} for r in rows[:limit]]
+        )
+
+    def client(self):
+        return AsyncPostgrestClient(
+            "http://supabase.test/rest/v1",
+            headers={"apikey": "key", "Authorization": "Bearer key"},
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)),
+        )
+
+
+async def _body(source, fmt="ndjson", **kwargs):
+    return b"".join([piece async for piece in bi_export.stream(source, fmt, **kwargs)])
+
+
+def _ndjson(body):
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+@pytest.mark.unit
+async def test_supabase_export_pages_by_keyset():
+    table = Table(_events(7))
+    source = SupabaseExportSource(table.client())
+
+    rows = _ndjson(await _body(source, chunk_size=3))
+
+    assert [r["event_data"]["i"] for r in rows] == list(range(7))
+    assert all("user_id" not in r for r in rows)
+    assert len(table.requests) == 3
+    first, second = table.requests[:2]
+    assert first.url.params["limit"] == "3"
+    assert "or" not in first.url.params
+    assert second.url.params["or"].startswith(
+        '(timestamp.gt."2025-01-01T00:00:00+00:00"'
+    )
+
+
+@pytest.mark.unit
+async def test_supabase_export_applies_filters():
+    table = Table(_events(3))
+    source = SupabaseExportSource(table.client())
+
+    await _body(
+        source,
+        since=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        until=datetime(2025, 2, 1, tzinfo=timezone.utc),
+        event_types=["signup", "upgrade"],
+    )
+
+    params = table.requests[0].url.params
+    assert params.get_list("timestamp") == [
+        "gte.2025-01-01T00:00:00+00:00",
+        "lt.2025-02-01T00:00:00+00:00",
+    ]
+    assert params["event_type"] == "in.(signup,upgrade)"
+    assert params["order"] == "timestamp.asc,id.asc"
+
+
+@pytest.mark.unit
+async def test_cursor_resumes_after_last_row():
+    table = Table(_events(7))
+    source = SupabaseExportSource(table.client())
+    first = _ndjson(await _body(source, limit=4, chunk_size=3))
+
+    rest = _ndjson(await _body(source, cursor=first[-1]["cursor"]))
+
+    assert [r["event_data"]["i"] for r in first] == [0, 1, 2, 3]
+    assert [r["event_data"]["i"] for r in rest] == [4, 5, 6]
+
+
+@pytest.mark.unit
+async def test_mongo_export_streams_one_cursor_in_chunks():
+    db = AsyncMongoMockClient()["export_test"]
+    await db.business_intelligence.insert_many(
+        [
+            {
+                "user_id": "u1",
+                "event_type": "enhanced_signup",
+                "timestamp": f"2025-01-0{day}T00:00:00",
+                "data": {"day": day},
+            }
+            for day in range(1, 6)
+        ]
+    )
+    source = MongoExportSource(db)
+
+    chunks = [c async for c in source.chunks(chunk_size=2)]
+    resumed = [
+        c
+        async for c in source.chunks(
+            since=datetime(2025, 1, 2, tzinfo=timezone.utc),
+            after=bi_export.decode_cursor(chunks[1][0]["cursor"]),
+        )
+    ]
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert chunks[0][0]["event_data"] == {"day": 1}
+    assert "user_id" not in chunks[0][0]
+    assert [r["event_data"]["day"] for r in resumed[0]] == [4, 5]
+
+
+@pytest.mark.unit
+async def test_mongo_export_orders_signup_documents_by_created_at():
+    pq = pytest.importorskip("pyarrow.parquet")
+    db = AsyncMongoMockClient()["export_signup_test"]
+    # Shape written by /api/auth/enhanced-signup: no timestamp or payload field
+    await db.business_intelligence.insert_many(
+        [
+            {
+                "user_id": f"u{i}",
+                "businessName": f"Shop {i}",
+                "industry": "retail",
+                "created_at": f"2025-01-0{i}T00:00:00+00:00",
+            }
+            for i in (3, 1, 2)
+        ]
+        + [
+            {
+                "user_id": "u9",
+                "event_type": "upgrade",
+                "timestamp": "2025-01-01T12:00:00",
+                "data": {"plan": "pro"},
+            }
+        ]
+    )
+    source = MongoExportSource(db)
+
+    rows = _ndjson(await _body(source))
+    resumed = _ndjson(await _body(source, cursor=rows[1]["cursor"]))
+    parquet = pq.ParquetFile(io.BytesIO(await _body(source, "parquet")))
+
+    assert [r["timestamp"][:13] for r in rows] == [
+        "2025-01-01T00",
+        "2025-01-01T12",
+        "2025-01-02T00",
+        "2025-01-03T00",
+    ]
+    assert rows[0]["event_type"] == "enhanced_signup"
+    assert rows[0]["event_data"] == {"businessName": "Shop 1", "industry": "retail"}
+    assert rows[1]["event_data"] == {"plan": "pro"}
+    assert resumed == rows[2:]
+    assert parquet.metadata.num_rows == 4
+
+
+@pytest.mark.unit
+async def test_csv_export_writes_header_once():
+    source = SupabaseExportSource(Table(_events(5)).client())
+
+    pieces = [p async for p in bi_export.stream(source, "csv", chunk_size=2)]
+    rows = list(csv.DictReader(io.StringIO(b"".join(pieces).decode())))
+
+    assert len(pieces) == 3
+    assert pieces[0].startswith(b"event_type,timestamp,event_data,cursor")
+    assert not pieces[1].startswith(b"event_type")
+    assert [json.loads(r["event_data"])["i"] for r in rows] == list(range(5))
+
+
+@pytest.mark.unit
+async def test_parquet_export_writes_a_row_group_per_chunk():
+    pq = pytest.importorskip("pyarrow.parquet")
+    source = SupabaseExportSource(Table(_events(5)).client())
+
+    body = await _body(source, "parquet", chunk_size=2)
+    parquet = pq.ParquetFile(io.BytesIO(body))
+
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == list(bi_export.COLUMNS)
+    assert [json.loads(d)["i"] for d in table.column("event_data").to_pylist()] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+    ]
+
+
+@pytest.mark.unit
+def test_endpoint_streams_export_and_rejects_bad_input(monkeypatch):
+    from routes import enhanced_signup
+
+    table = Table(_events(2))
+    monkeypatch.setattr(
+        bi_export, "get_source", lambda: SupabaseExportSource(table.client())
+    )
+    app = FastAPI()
+    app.include_router(enhanced_signup.router)
+    client = TestClient(app)
+
+    resp = client.get("/api/auth/data-export", params={"format": "csv"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert "business_intelligence.csv" in resp.headers["content-disposition"]
+    assert len(resp.text.splitlines()) == 3
+
+    assert client.get("/api/auth/data-export?format=xml").status_code == 400
+    assert client.get("/api/auth/data-export?cursor=!!").status_code == 400
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from services import health
+from services.health import DependencyProbe, HealthMonitor
+
+
+def _probe(name="supabase", results=(True,), delay=0.0, **kwargs):
+    calls = {"count": 0}
+    results = list(results)
+
+    async def check():
+        calls["count"] += 1
+        await asyncio.sleep(delay)
+        result = results.pop(0) if results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    probe = DependencyProbe(name, check, **kwargs)
+    probe.calls = calls
+    return probe
+
+
+@pytest.mark.unit
+async def test_probe_tracks_latency_and_error_rate():
+    probe = _probe(results=[True, RuntimeError("boom"), True, True], interval=60)
+    for _ in range(4):
+        await probe.probe()
+
+    snapshot = probe.snapshot()
+    assert snapshot["ok"] is True
+    assert snapshot["samples"] == 4
+    assert snapshot["error_rate"] == 0.25
+    assert set(snapshot["latency_ms"]) == {"p50", "p95", "p99"}
+    assert snapshot["stale"] is False
+    assert snapshot["last_error"] is None
+
+
+@pytest.mark.unit
+async def test_slow_check_fails_on_timeout():
+    probe = _probe(delay=0.2, timeout=0.01)
+
+    assert await probe.probe() is False
+    assert "timed out" in probe.snapshot()["last_error"]
+
+
+@pytest.mark.unit
+async def test_stale_result_is_not_ready():
+    monitor = HealthMonitor()
+    probe = _probe(interval=0.01)
+    monitor.add(probe)
+    assert monitor.status() == "starting"
+    assert monitor.ready() is False
+
+    await probe.probe()
+    assert monitor.ready() is True
+    assert monitor.status() == "ok"
+
+    await asyncio.sleep(0.05)
+    assert probe.snapshot()["stale"] is True
+    assert monitor.ready() is False
+
+
+@pytest.mark.unit
+async def test_optional_dependency_only_degrades():
+    monitor = HealthMonitor()
+    monitor.add(_probe("supabase"))
+    monitor.add(_probe("mongodb", results=[False], required=False))
+    for probe in monitor.probes.values():
+        await probe.probe()
+
+    assert monitor.ready() is True
+    assert monitor.status() == "degraded"
+
+
+@pytest.mark.unit
+async def test_background_probing_runs_per_dependency_interval():
+    monitor = HealthMonitor()
+    fast = _probe("supabase", interval=0.01)
+    slow = _probe("mongodb", interval=10)
+    monitor.add(fast)
+    monitor.add(slow)
+
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+    assert fast.calls["count"] > 2
+    assert slow.calls["count"] == 1
+
+
+@pytest.mark.unit
+def test_endpoints_serve_cached_state(monkeypatch):
+    import server
+
+    monitor = HealthMonitor()
+    probe = _probe(results=[RuntimeError("down")])
+    monitor.add(probe)
+    monkeypatch.setattr(server, "health_monitor", monitor)
+    client = TestClient(server.app)
+
+    resp = client.get("/api/health")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "starting"
+    assert client.get("/api/ready").status_code == 503
+
+    asyncio.run(probe.probe())
+    body = client.get("/api/health").json()
+    assert body["status"] == "unhealthy"
+    assert body["dependencies"]["supabase"]["last_error"] == "down"
+
+    asyncio.run(probe.probe())
+    assert client.get("/api/ready").status_code == 200
+    # Probe endpoints never run the check themselves
+    assert probe.calls["count"] == 2
+
+
+@pytest.mark.unit
+def test_build_monitor_probes_configured_stores(monkeypatch):
+    monkeypatch.setattr("supabase_db.SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setattr("supabase_db.SUPABASE_SERVICE_KEY", "key")
+
+    class Mongo:
+        async def validate_connection(self):
+            return True
+
+    monitor = health.build_monitor(Mongo(), use_supabase=True)
+
+    assert monitor.probes["supabase"].required is True
+    assert monitor.probes["mongodb"].required is False
+    assert set(health.build_monitor(object(), use_supabase=False).probes) == set()
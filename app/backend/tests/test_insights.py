@@ -0,0 +1,208 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from postgrest import AsyncPostgrestClient
+from services import insights
+from services.insights import (
+    InsightsService,
+    MongoInsightsStore,
+    SupabaseInsightsStore,
+    merge_breakdowns,
+)
+
+
+def _user(
+    industry="retail", revenue="0-1k", marketplaces=("ebay",), challenge=None, age=1
+):
+    created = datetime.now(timezone.utc) - timedelta(seconds=age)
+    return {
+        "created_at": created.replace(tzinfo=None).isoformat(),
+        "business_profile": {"industry": industry},
+        "marketplace_data": {
+            "monthly_revenue": revenue,
+            "current_marketplaces": list(marketplaces),
+            "biggest_challenge": challenge,
+        },
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(insights, "INSIGHTS_COMMIT_LAG_SECONDS", 0)
+    return AsyncMongoMockClient()["insights_test"]
+
+
+class CountingStore(MongoInsightsStore):
+    def __init__(self, db):
+        super().__init__(db)
+        self.computes = []
+        self.latest_calls = 0
+
+    async def compute(self, until, since=None):
+        self.computes.append(since)
+        return await super().compute(until, since=since)
+
+    async def latest(self):
+        self.latest_calls += 1
+        return await super().latest()
+
+
+@pytest.mark.unit
+def test_merge_adds_counts_and_resorts():
+    base = {
+        "total_users": 3,
+        "industries": [{"_id": "retail", "count": 2}, {"_id": "art", "count": 1}],
+    }
+    delta = {"total_users": 2, "industries": [{"_id": "art", "count": 2}]}
+
+    merged = merge_breakdowns(base, delta)
+
+    assert merged["total_users"] == 5
+    assert merged["industries"] == [
+        {"_id": "art", "count": 3},
+        {"_id": "retail", "count": 2},
+    ]
+    assert merged["top_challenges"] == []
+
+
+@pytest.mark.unit
+async def test_mongo_compute_runs_all_breakdowns_in_one_facet(db):
+    await db.users.insert_many(
+        [
+            _user(marketplaces=("ebay", "etsy"), challenge="time"),
+            _user(revenue=None),
+            _user(industry="art"),
+        ]
+    )
+
+    result = await MongoInsightsStore(db).compute(datetime.now(timezone.utc))
+
+    assert result["total_users"] == 3
+    assert result["industries"] == [
+        {"_id": "retail", "count": 2},
+        {"_id": "art", "count": 1},
+    ]
+    assert result["revenue_ranges"] == [{"_id": "0-1k", "count": 2}]
+    assert result["marketplace_usage"][0] == {"_id": "ebay", "count": 3}
+    assert result["top_challenges"] == [{"_id": "time", "count": 1}]
+
+
+@pytest.mark.unit
+async def test_refresh_counts_only_new_signups(db):
+    await db.users.insert_one(_user())
+    store = CountingStore(db)
+    service = InsightsService(store, cache_ttl=60, full_refresh_interval=3600)
+
+    first = await service.refresh()
+    await db.users.insert_many(
+        [_user(industry="art", age=0), _user(industry="art", age=0)]
+    )
+    await asyncio.sleep(0.01)
+    second = await service.refresh()
+
+    assert store.computes == [None, first["high_water"]]
+    assert second["total_users"] == 3
+    assert second["industries"][0] == {"_id": "art", "count": 2}
+    assert second["full_computed_at"] == first["full_computed_at"]
+    # Each refresh overwrites the one stored snapshot
+    assert await db[insights.SNAPSHOTS].count_documents({}) == 1
+    assert (await service.store.latest())["total_users"] == 3
+
+
+@pytest.mark.unit
+async def test_old_snapshot_is_recomputed_in_full(db):
+    await db.users.insert_one(_user())
+    store = CountingStore(db)
+    service = InsightsService(store, full_refresh_interval=3600)
+    first = await service.refresh()
+    # An edited profile is only picked up by a full recompute
+    await db.users.update_many({}, {"$set": {"business_profile.industry": "art"}})
+    await db[insights.SNAPSHOTS].update_many(
+        {},
+        {"$set": {"full_computed_at": first["full_computed_at"] - timedelta(hours=2)}},
+    )
+
+    second = await service.refresh()
+
+    assert store.computes == [None, None]
+    assert second["industries"] == [{"_id": "art", "count": 1}]
+
+
+@pytest.mark.unit
+async def test_get_serves_cached_snapshot_within_ttl(db):
+    await db.users.insert_one(_user())
+    store = CountingStore(db)
+    service = InsightsService(store, cache_ttl=60)
+
+    first = await service.get()
+    await db.users.insert_one(_user())
+    second = await service.get()
+
+    assert second is first
+    assert second["total_users"] == 1
+    assert store.latest_calls == 1
+    assert len(store.computes) == 1
+
+
+@pytest.mark.unit
+async def test_refresh_if_due_waits_for_interval_or_signups(db):
+    store = CountingStore(db)
+    service = InsightsService(store, refresh_interval=300)
+    await service.refresh()
+
+    assert await service.refresh_if_due() is None
+
+    service.signup_arrived()
+    assert await service.refresh_if_due() is not None
+    assert len(store.computes) == 2
+
+
+@pytest.mark.unit
+async def test_supabase_store_uses_rpc_window_and_minimal_insert():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/rpc/business_insights"):
+            return httpx.Response(
+                200,
+                json={
+                    "total_users": 4,
+                    "industries": [{"_id": "retail", "count": 4}],
+                    "revenue_ranges": [],
+                    "marketplace_usage": [],
+                    "top_challenges": [],
+                },
+            )
+        return httpx.Response(201)
+
+    client = AsyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        headers={"apikey": "key", "Authorization": "Bearer key"},
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    service = InsightsService(SupabaseInsightsStore(client))
+    latest = {
+        "total_users": 1,
+        "industries": [{"_id": "retail", "count": 1}],
+        "full_computed_at": datetime.now(timezone.utc),
+        "high_water": datetime(2025, 1, 1, tzinfo=timezone.utc),
+    }
+
+    snapshot = await service._refresh(latest)
+
+    rpc, insert = requests
+    assert json.loads(rpc.content)["p_since"] == "2025-01-01T00:00:00+00:00"
+    assert snapshot["total_users"] == 5
+    assert insert.url.path == "/rest/v1/business_insights_snapshots"
+    assert insert.url.params["on_conflict"] == "id"
+    assert "resolution=merge-duplicates" in insert.headers["prefer"]
+    assert "return=minimal" in insert.headers["prefer"]
+    assert json.loads(insert.content)["id"] == insights.SNAPSHOT_ID
+    assert json.loads(insert.content)["data"]["industries"] == [
+        {"_id": "retail", "count": 5}
+    ]
@@ -0,0 +1,168 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+from services.lead_service import LeadService
+
+
+class Leads:
+    """leads collection proxy recording which methods the service calls"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.collection, name)
+
+
+@pytest.fixture
+async def service():
+    db = AsyncMongoMockClient()["lead_resolution_test"]
+    service = LeadService(db)
+    await service.ensure_indexes()
+    service.db = SimpleNamespace(leads=Leads(db.leads))
+    return service
+
+
+def _message(message_id, **sender):
+    return {
+        "id": message_id,
+        "user_id": "user_1",
+        "platform": "craigslist",
+        "ad_id": "ad_1",
+        "message_text": "Is this still available?",
+        "received_at": "2025-12-05T10:00:00",
+        **sender,
+    }
+
+
+@pytest.mark.unit
+async def test_sender_is_resolved_with_one_query(service):
+    first = await service.find_or_create_lead(
+        _message("m1", sender_email="Test@Example.com", sender_name="Test User"),
+    )
+    service.db.leads.calls.clear()
+
+    second = await service.find_or_create_lead(
+        _message("m2", sender_email=" test@example.COM ", sender_phone="555 123 4567"),
+    )
+
+    assert second == first
+    assert service.db.leads.calls == ["aggregate", "update_one"]
+    lead = await service.db.leads.find_one({"id": first})
+    assert lead["contact_key"] == "email:test@example.com"
+    assert lead["message_ids"] == ["m1", "m2"]
+
+
+@pytest.mark.unit
+async def test_phone_numbers_match_in_any_format(service):
+    first = await service.find_or_create_lead(
+        _message("m1", sender_phone="+1 (555) 123-4567"),
+    )
+
+    assert (
+        await service.find_or_create_lead(_message("m2", sender_phone="15551234567"))
+        == first
+    )
+    # Too short to be a phone number: no key, no deduplication
+    assert await service.find_or_create_lead(_message("m3", sender_phone="12")) != first
+
+
+@pytest.mark.unit
+async def test_email_match_outranks_phone_match(service):
+    by_phone = await service.find_or_create_lead(
+        _message("m1", sender_email="a@example.com", sender_phone="5550001111"),
+    )
+    by_email = await service.find_or_create_lead(
+        _message("m2", sender_email="b@example.com")
+    )
+
+    resolved = await service.find_or_create_lead(
+        _message("m3", sender_email="b@example.com", sender_phone="5550001111"),
+    )
+
+    assert by_phone != by_email
+    assert resolved == by_email
+
+
+@pytest.mark.unit
+async def test_fuzzy_match_needs_same_domain_and_name(service):
+    lead_id = await service.find_or_create_lead(
+        _message("m1", sender_email="john.doe@acme.com", sender_name="John Doe"),
+    )
+
+    same = await service.find_or_create_lead(
+        _message("m2", sender_email="jdoe@acme.com", sender_name="john doe"),
+    )
+    other_domain = await service.find_or_create_lead(
+        _message("m3", sender_email="jdoe@other.com", sender_name="John Doe"),
+    )
+
+    assert same == lead_id
+    assert other_domain != lead_id
+
+
+@pytest.mark.unit
+async def test_leads_without_contact_keys_still_match(service):
+    await service.db.leads.insert_one(
+        {
+            "id": "lead_legacy",
+            "user_id": "user_1",
+            "platform": "craigslist",
+            "contact_email": "old@example.com",
+            "message_ids": ["m0"],
+        },
+    )
+
+    assert (
+        await service.find_or_create_lead(
+            _message("m1", sender_email="old@example.com")
+        )
+        == "lead_legacy"
+    )
+
+
+@pytest.mark.unit
+async def test_concurrent_messages_share_one_lead(service):
+    lead_ids = await asyncio.gather(
+        *(
+            service.find_or_create_lead(
+                _message(f"m{i}", sender_email="burst@example.com")
+            )
+            for i in range(5)
+        ),
+    )
+
+    assert len(set(lead_ids)) == 1
+    lead = await service.db.leads.find_one({"id": lead_ids[0]})
+    assert sorted(lead["message_ids"]) == [f"m{i}" for i in range(5)]
+    assert await service.db.leads.count_documents({}) == 1
+
+
+@pytest.mark.unit
+async def test_lost_insert_race_joins_the_winning_lead(service, monkeypatch):
+    leads = service.db.leads.collection
+    upsert = leads.find_one_and_update
+
+    async def racing(key_filter, update, **kwargs):
+        if kwargs.get("upsert"):
+            # Another worker inserts the lead between resolution and upsert
+            await leads.insert_one(
+                {**key_filter, "id": "lead_winner", "message_ids": ["m0"]}
+            )
+            raise DuplicateKeyError("E11000 duplicate key")
+        return await upsert(key_filter, update, **kwargs)
+
+    monkeypatch.setattr(leads, "find_one_and_update", racing)
+
+    lead_id = await service.find_or_create_lead(
+        _message("m1", sender_email="race@example.com")
+    )
+
+    assert lead_id == "lead_winner"
+    lead = await leads.find_one({"id": "lead_winner"})
+    assert lead["message_ids"] == ["m0", "m1"]
@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import auth
+import pytest
+from auth import PasswordHasher
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from passlib.hash import md5_crypt
+from services import user_lookup
+
+
+@pytest.fixture
+def context(monkeypatch):
+    """Cheap pwd_context; md5_crypt stands in for an outdated scheme"""
+    context = CryptContext(
+        schemes=["pbkdf2_sha256", "md5_crypt"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=1000,
+    )
+    monkeypatch.setattr(auth, "pwd_context", context)
+    monkeypatch.setattr(auth, "_password_hasher", None)
+    return context
+
+
+@pytest.mark.unit
+async def test_hashing_does_not_block_event_loop():
+    hasher = PasswordHasher(workers=2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(ticker(), hasher.run(time.sleep, 0.1))
+    hasher.shutdown()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert max(gaps) < 0.05
+
+
+@pytest.mark.unit
+async def test_concurrency_is_capped_and_queue_depth_tracked():
+    hasher = PasswordHasher(workers=2, max_queue=10)
+    peak = 0
+
+    def work():
+        nonlocal peak
+        peak = max(peak, hasher.active)
+        time.sleep(0.02)
+
+    await asyncio.gather(*(hasher.run(work) for _ in range(6)))
+    stats = hasher.stats()
+    hasher.shutdown()
+
+    assert peak == 2
+    assert stats["max_queued"] == 4
+    assert stats["completed"] == 6
+    assert stats["queued"] == 0
+    assert stats["queue_wait_ms_p95"] > 0
+
+
+@pytest.mark.unit
+async def test_full_queue_rejects_with_503():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    results = await asyncio.gather(
+        *(hasher.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+    )
+    hasher.shutdown()
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert [r.status_code for r in rejected] == [503]
+    assert hasher.stats()["rejected"] == 1
+
+
+@pytest.mark.unit
+async def test_verify_and_update_rehashes_outdated_hashes(context):
+    current = await auth.get_password_hash_async("correct horse")
+    outdated = md5_crypt.hash("correct horse")
+
+    assert await auth.verify_and_update_password_async("correct horse", current) == (
+        True,
+        None,
+    )
+    assert await auth.verify_and_update_password_async("wrong", outdated) == (
+        False,
+        None,
+    )
+    valid, new_hash = await auth.verify_and_update_password_async(
+        "correct horse", outdated
+    )
+    assert valid is True
+    assert new_hash.startswith("$pbkdf2-sha256$1000$")
+    assert auth.verify_password("correct horse", new_hash)
+
+
+@pytest.mark.unit
+async def test_changed_rounds_trigger_rehash(context, monkeypatch):
+    old = context.hash("correct horse")
+    monkeypatch.setattr(
+        auth,
+        "pwd_context",
+        context.copy(
+            pbkdf2_sha256__default_rounds=2000, pbkdf2_sha256__min_rounds=2000
+        ),
+    )
+
+    valid, new_hash = auth.verify_and_update_password("correct horse", old)
+
+    assert valid is True
+    assert new_hash.startswith("$pbkdf2-sha256$2000$")
+
+
+@pytest.mark.unit
+def test_login_stores_rehashed_password(context, monkeypatch):
+    from routes import auth as auth_routes
+
+    class Users:
+        def __init__(self):
+            self.updates = []
+            self.doc = {
+                "id": "u1",
+                "username": "sam",
+                "email": "sam@example.com",
+                "is_active": True,
+                "password_hash": md5_crypt.hash("correct horse"),
+            }
+
+        async def find_users(self, email=None, username=None):
+            return [dict(self.doc)] if username == "sam" else []
+
+        async def get_user_by_id(self, user_id):
+            return dict(self.doc) if user_id == "u1" else None
+
+        async def update_user(self, user_id, updates):
+            self.updates.append((user_id, updates))
+            self.doc.update(updates)
+            return self.doc
+
+    users = Users()
+    monkeypatch.setattr(user_lookup, "_cache", user_lookup.IdentifierCache())
+    monkeypatch.setattr(auth_routes, "supabase_db", users)
+    monkeypatch.setattr(auth_routes, "USE_SUPABASE", True)
+    monkeypatch.setattr(auth_routes, "PARALLEL_WRITE", False)
+    app = FastAPI()
+    app.include_router(auth_routes.router)
+    client = TestClient(app)
+    credentials = {"username": "sam", "password": "correct horse"}
+
+    assert client.post("/api/auth/login", json=credentials).status_code == 200
+    assert client.post("/api/auth/login", json=credentials).status_code == 200
+
+    # Rehashed once; the second login finds the current scheme
+    assert len(users.updates) == 1
+    user_id, updates = users.updates[0]
+    assert user_id == "u1"
+    assert updates["password_hash"].startswith("$pbkdf2-sha256$")
+    wrong = {"username": "sam", "password": "nope"}
+    assert client.post("/api/auth/login", json=wrong).status_code == 401
@@ -0,0 +1,264 @@
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from postgrest import AsyncPostgrestClient
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from services import replication_outbox
+from services.replication_outbox import OutboxReplicator
+
+
+class FakeOutbox:
+    """In-memory replication_outbox table behind a PostgREST MockTransport"""
+
+    def __init__(self, records):
+        self.rows = []
+        for i, record in enumerate(records, start=1):
+            self.rows.append(
+                {
+                    **record,
+                    "id": i,
+                    "status": "pending",
+                    "attempts": 0,
+                    "last_error": None,
+                    "leased_by": None,
+                    "created_at": "2025-12-03T10:00:00+00:00",
+                }
+            )
+
+    def _ids(self, request):
+        value = request.url.params.get("id", "")
+        if value.startswith("in.("):
+            return {int(v) for v in value[4:-1].split(",")}
+        return {int(value[3:])}
+
+    def handler(self, request):
+        path = request.url.path
+        if path.endswith("/rpc/claim_replication_batch"):
+            worker = json.loads(request.content)["p_worker"]
+            claimed = [
+                r for r in self.rows if r["status"] == "pending" and not r["leased_by"]
+            ]
+            for r in claimed:
+                r["leased_by"] = worker
+            return httpx.Response(200, json=claimed)
+        if request.method == "DELETE":
+            ids = self._ids(request)
+            self.rows = [r for r in self.rows if r["id"] not in ids]
+            return httpx.Response(204)
+        if request.method == "PATCH":
+            ids = self._ids(request)
+            for r in self.rows:
+                if r["id"] in ids:
+                    r.update(json.loads(request.content))
+            return httpx.Response(204)
+        if request.method == "POST":
+            body = json.loads(request.content)
+            self.__init__([*self.rows, *body])
+            return httpx.Response(201)
+        status = request.url.params["status"][3:]
+        rows = [r for r in self.rows if r["status"] == status]
+        return httpx.Response(
+            200,
+            json=rows[:1],
+            headers={"Content-Range": f"0-0/{len(rows)}"},
+        )
+
+    def client(self):
+        return AsyncPostgrestClient(
+            "http://supabase.test/rest/v1",
+            headers={"apikey": "key", "Authorization": "Bearer key"},
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)),
+        )
+
+
+class Secondary:
+    """mongomock database whose bulk_write runs ops one by one, like the server
+
+    (mongomock's own bulk API does not accept current pymongo operations)
+    """
+
+    def __init__(self):
+        self.db = AsyncMongoMockClient()["test"]
+
+    def __getattr__(self, name):
+        return self[name]
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+
+        async def bulk_write(ops, ordered=True):
+            for index, op in enumerate(ops):
+                try:
+                    if isinstance(op, InsertOne):
+                        await collection.insert_one(op._doc)
+                    else:
+                        await collection.update_one(
+                            op._filter, op._doc, upsert=op._upsert
+                        )
+                except Exception as e:
+                    code = getattr(e, "code", None)
+                    error = {"index": index, "code": code, "errmsg": str(e)}
+                    raise BulkWriteError({"writeErrors": [error]})
+
+        collection.bulk_write = bulk_write
+        return collection
+
+
+def _replicator(outbox, mongo):
+    return OutboxReplicator(
+        client=outbox.client(),
+        secondary=mongo,
+        clock=lambda: datetime(2025, 12, 3, 10, 0, 30, tzinfo=timezone.utc),
+    )
+
+
+@pytest.mark.unit
+async def test_records_are_applied_in_order_and_removed():
+    mongo = Secondary()
+    created = datetime(2025, 12, 1, tzinfo=timezone.utc)
+    outbox = FakeOutbox(
+        [
+            replication_outbox.insert("users", "u1", {"id": "u1", "created": created}),
+            replication_outbox.update(
+                "users", "u1", {"id": "u1"}, {"$set": {"is_active": False}}
+            ),
+            replication_outbox.update(
+                "subscriptions",
+                "sub_1",
+                {"subscription_id": "sub_1"},
+                {"$set": {"status": "active"}},
+                upsert=True,
+            ),
+        ]
+    )
+    replicator = _replicator(outbox, mongo)
+
+    assert await replicator.run_once() == 3
+
+    user = await mongo.users.find_one({"id": "u1"})
+    assert user["is_active"] is False
+    assert user["created"].replace(tzinfo=timezone.utc) == created
+    assert await mongo.subscriptions.count_documents({"status": "active"}) == 1
+    assert outbox.rows == []
+    assert replicator.stats()["applied"] == 3
+
+
+@pytest.mark.unit
+async def test_failed_record_holds_back_its_entity_only():
+    mongo = Secondary()
+    outbox = FakeOutbox(
+        [
+            replication_outbox.update(
+                "users", "u1", {"id": "u1"}, {"$bogus": {}}, upsert=True
+            ),
+            replication_outbox.insert("users", "u1", {"id": "u1"}),
+            replication_outbox.insert("users", "u2", {"id": "u2"}),
+        ]
+    )
+    replicator = _replicator(outbox, mongo)
+
+    await replicator.run_once()
+
+    assert await mongo.users.count_documents({"id": "u2"}) == 1
+    assert await mongo.users.count_documents({"id": "u1"}) == 0
+    failed, held = outbox.rows
+    assert failed["attempts"] == 1 and failed["last_error"]
+    assert failed["available_at"] > "2025-12-03T10:00:30"
+    assert held["attempts"] == 0 and held["leased_by"] is None
+    assert replicator.stats()["retried"] == 1
+
+
+@pytest.mark.unit
+async def test_duplicate_insert_counts_as_applied():
+    mongo = Secondary()
+    await mongo.payments.create_index("payment_intent_id", unique=True)
+    await mongo.payments.insert_one({"payment_intent_id": "pi_1"})
+    outbox = FakeOutbox(
+        [
+            replication_outbox.insert(
+                "payments", "pi_1", {"payment_intent_id": "pi_1"}
+            ),
+            replication_outbox.insert(
+                "payments", "pi_2", {"payment_intent_id": "pi_2"}
+            ),
+        ]
+    )
+
+    await _replicator(outbox, mongo).run_once()
+
+    assert outbox.rows == []
+    assert await mongo.payments.count_documents({}) == 2
+
+
+@pytest.mark.unit
+async def test_record_is_parked_after_max_attempts():
+    mongo = Secondary()
+    outbox = FakeOutbox(
+        [
+            replication_outbox.update(
+                "users", "u1", {"id": "u1"}, {"$bogus": {}}, upsert=True
+            )
+        ]
+    )
+    outbox.rows[0]["attempts"] = 9
+    replicator = _replicator(outbox, mongo)
+
+    await replicator.run_once()
+
+    assert outbox.rows[0]["status"] == "dead"
+    stats = await replicator.refresh_lag()
+    assert stats["pending"] == 0 and stats["dead"] == 1
+
+
+@pytest.mark.unit
+async def test_drain_reports_lag_and_empties_outbox():
+    mongo = Secondary()
+    outbox = FakeOutbox([replication_outbox.insert("users", "u1", {"id": "u1"})])
+    replicator = _replicator(outbox, mongo)
+
+    stats = await replicator.refresh_lag()
+    assert stats["pending"] == 1
+    assert stats["lag_seconds"] == 30.0
+
+    stats = await replicator.drain(timeout=5)
+    assert stats["pending"] == 0 and stats["lag_seconds"] is None
+    assert await mongo.users.count_documents({}) == 1
+
+
+@pytest.mark.unit
+async def test_enqueue_writes_inline_without_outbox(monkeypatch):
+    mongo = Secondary()
+    monkeypatch.setattr(replication_outbox, "_default_client", lambda: None)
+    monkeypatch.setattr(replication_outbox, "_default_secondary", lambda: mongo)
+
+    await replication_outbox.enqueue(
+        replication_outbox.insert("users", "u1", {"id": "u1"})
+    )
+
+    assert await mongo.users.count_documents({"id": "u1"}) == 1
+
+
+@pytest.mark.unit
+async def test_enqueue_inserts_all_records_in_one_request(monkeypatch):
+    outbox = FakeOutbox([])
+    requests = []
+    client = outbox.client()
+    client.session._transport = httpx.MockTransport(
+        lambda r: requests.append(r) or outbox.handler(r)
+    )
+    monkeypatch.setattr(replication_outbox, "_default_client", lambda: client)
+
+    await replication_outbox.enqueue(
+        replication_outbox.insert("users", "u1", {"id": "u1"}),
+        replication_outbox.insert("business_intelligence", "u1", {"user_id": "u1"}),
+    )
+
+    assert len(requests) == 1
+    assert [r["entity_key"] for r in outbox.rows] == [
+        "users:u1",
+        "business_intelligence:u1",
+    ]
@@ -0,0 +1,89 @@
+import httpx
+import pytest
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from supabase_db import AsyncSupabaseDB, SupabaseDB
+
+
+def _db(handler):
+    client = AsyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        headers={"apikey": "key", "Authorization": "Bearer key"},
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return AsyncSupabaseDB(client)
+
+
+@pytest.mark.unit
+async def test_get_user_by_email_queries_postgrest():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[{"id": "u1", "email": "a@example.com"}])
+
+    db = _db(handler)
+    user = await db.get_user_by_email("a@example.com")
+
+    assert user == {"id": "u1", "email": "a@example.com"}
+    assert seen[0].url.path == "/rest/v1/users"
+    assert seen[0].url.params["email"] == "eq.a@example.com"
+    assert seen[0].headers["apikey"] == "key"
+    await db.client.aclose()
+
+
+@pytest.mark.unit
+async def test_errors_are_handled_like_the_sync_wrapper():
+    def handler(request):
+        return httpx.Response(500, json={"message": "boom", "code": "XX000"})
+
+    db = _db(handler)
+    assert await db.get_user_by_id("u1") is None
+    assert await db.get_user_listings("u1") == []
+    with pytest.raises(Exception):
+        await db.create_user({"id": "u1"})
+    await db.client.aclose()
+
+
+@pytest.mark.unit
+async def test_unconfigured_client_raises(monkeypatch):
+    monkeypatch.setattr("supabase_db.get_async_supabase", lambda: None)
+    db = AsyncSupabaseDB()
+    with pytest.raises(RuntimeError):
+        await db.get_user_by_email("a@example.com")
+
+
+@pytest.mark.unit
+async def test_sync_and_async_wrappers_send_the_same_requests(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path, str(request.url.params)))
+        if request.url.path.endswith("/rpc/business_insights"):
+            return httpx.Response(
+                200, json={"revenue_ranges": [{"_id": "0-1k", "count": 3}]}
+            )
+        return httpx.Response(200, json=[{"id": "l1"}])
+
+    monkeypatch.setattr("supabase_db.get_supabase", lambda: None)
+    sync_db = SupabaseDB()
+    sync_db.client = SyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    async_db = _db(handler)
+
+    sync_results = [
+        sync_db.get_user_listings("u1", status="active"),
+        sync_db.delete_user("u1"),
+        sync_db.get_revenue_breakdown(),
+    ]
+    sync_requests, seen[:] = list(seen), []
+    async_results = [
+        await async_db.get_user_listings("u1", status="active"),
+        await async_db.delete_user("u1"),
+        await async_db.get_revenue_breakdown(),
+    ]
+
+    assert async_results == sync_results == [[{"id": "l1"}], True, {"0-1k": 3}]
+    assert seen == sync_requests
+    await async_db.client.aclose()
@@ -0,0 +1,135 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from services import user_cache
+from services.user_cache import ProfileCache
+
+SAM = {
+    "id": "u1",
+    "username": "sam",
+    "email": "sam@example.com",
+    "password_hash": "$pbkdf2-sha256$secret",
+    "hashed_password": "$pbkdf2-sha256$secret",
+}
+
+
+class Loader:
+    def __init__(self, doc):
+        self.doc = doc
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return dict(self.doc) if self.doc else None
+
+
+@pytest.mark.unit
+async def test_profiles_are_served_from_cache_without_secrets():
+    cache = ProfileCache(ttl=60)
+    load = Loader(SAM)
+
+    first = await cache.get("u1", load)
+    first["email"] = "changed@example.com"
+    second = await cache.get("u1", load)
+
+    assert load.calls == 1
+    assert second["email"] == "sam@example.com"
+    assert "password_hash" not in second and "hashed_password" not in second
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.unit
+async def test_entries_expire_and_missing_users_are_not_cached():
+    cache = ProfileCache(ttl=0)
+    load = Loader(SAM)
+    await cache.get("u1", load)
+    await cache.get("u1", load)
+    assert load.calls == 2
+
+    missing = Loader(None)
+    cache = ProfileCache(ttl=60)
+    assert await cache.get("u2", missing) is None
+    assert await cache.get("u2", missing) is None
+    assert missing.calls == 2
+
+
+@pytest.mark.unit
+async def test_redis_tier_is_shared_and_invalidated():
+    redis = fakeredis.FakeAsyncRedis()
+    worker_a = ProfileCache(ttl=60, redis=redis)
+    worker_b = ProfileCache(ttl=60, redis=redis)
+    load = Loader(SAM)
+
+    await worker_a.get("u1", load)
+    assert (await worker_b.get("u1", load))["username"] == "sam"
+    assert load.calls == 1
+    assert worker_b.stats()["redis_hits"] == 1
+    assert b"secret" not in await redis.get("user:profile:u1")
+
+    await worker_a.invalidate("u1")
+    assert await redis.get("user:profile:u1") is None
+    load.doc = dict(SAM, username="samuel")
+    assert (await worker_a.get("u1", load))["username"] == "samuel"
+
+
+@pytest.mark.unit
+async def test_redis_failures_fall_through_to_loader():
+    class Down:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+        async def set(self, key, value, ex=None):
+            raise ConnectionError("redis down")
+
+    cache = ProfileCache(ttl=60, redis=Down())
+    load = Loader(SAM)
+
+    assert (await cache.get("u1", load))["id"] == "u1"
+    assert load.calls == 1
+    assert cache.stats()["redis_errors"] == 2
+
+
+@pytest.mark.unit
+async def test_load_racing_an_invalidation_is_not_cached():
+    cache = ProfileCache(ttl=60)
+
+    async def racing():
+        # The user is updated while the read is in flight
+        await cache.invalidate("u1")
+        return dict(SAM)
+
+    await cache.get("u1", racing)
+
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.unit
+def test_update_route_invalidates_cached_profile(monkeypatch):
+    from auth import User, get_current_user_with_fallback
+    from routes import users as users_routes
+
+    db = AsyncMongoMockClient()["user_cache_test"]
+    asyncio.run(db.users.insert_one(dict(SAM)))
+    monkeypatch.setattr(users_routes, "db", db)
+    monkeypatch.setattr(users_routes, "USE_SUPABASE", False)
+    cache = ProfileCache(ttl=60)
+    monkeypatch.setattr(user_cache, "_cache", cache)
+    app = FastAPI()
+    app.include_router(users_routes.router)
+    app.dependency_overrides[get_current_user_with_fallback] = lambda: (
+        User(id="u1", username="sam", email="sam@example.com"),
+        "u1",
+    )
+    client = TestClient(app)
+
+    assert client.get("/api/users/u1").json()["full_name"] is None
+    assert client.get("/api/users/u1").status_code == 200
+    assert cache.stats()["misses"] == 1
+
+    assert client.put("/api/users/u1", json={"full_name": "Sam"}).status_code == 200
+    assert client.get("/api/users/u1").json()["full_name"] == "Sam"
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,173 @@
+import json
+import re
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from postgrest import AsyncPostgrestClient
+from services import user_lookup
+from services.user_lookup import IdentifierCache, MongoUsers
+from supabase_db import AsyncSupabaseDB
+
+
+class Users:
+    """users endpoint supporting or=(...eq...), id=eq., insert and update"""
+
+    def __init__(self, *rows):
+        self.rows = [dict(r) for r in rows]
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        params = request.url.params
+        if request.method == "POST":
+            row = json.loads(request.content)
+            self.rows.append(row)
+            return httpx.Response(201, json=[row])
+        if "or" in params:
+            conditions = [
+                (field, re.sub(r"\\(.)", r"\1", value))
+                for field, value in re.findall(
+                    r'(\w+)\.eq\."((?:[^"\\]|\\.)*)"', params["or"]
+                )
+            ]
+            match = [r for r in self.rows if any(r.get(f) == v for f, v in conditions)]
+        else:
+            user_id = params["id"].removeprefix("eq.")
+            match = [r for r in self.rows if r["id"] == user_id]
+        if request.method == "PATCH":
+            for row in match:
+                row.update(json.loads(request.content))
+        return httpx.Response(200, json=match)
+
+    def db(self):
+        return AsyncSupabaseDB(
+            AsyncPostgrestClient(
+                "http://supabase.test/rest/v1",
+                headers={"apikey": "key", "Authorization": "Bearer key"},
+                http_client=httpx.AsyncClient(
+                    transport=httpx.MockTransport(self.handler)
+                ),
+            )
+        )
+
+
+SAM = {"id": "u1", "email": "sam@example.com", "username": "sam"}
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = IdentifierCache(ttl=60, negative_ttl=60)
+    monkeypatch.setattr(user_lookup, "_cache", cache)
+    return cache
+
+
+@pytest.mark.unit
+async def test_email_and_username_checked_in_one_query():
+    users = Users(SAM)
+
+    found = await user_lookup.find_user(
+        users.db(), email="other@example.com", username="sam"
+    )
+
+    assert found["id"] == "u1"
+    assert len(users.requests) == 1
+    assert (
+        users.requests[0].url.params["or"]
+        == '(email.eq."other@example.com",username.eq."sam")'
+    )
+
+
+@pytest.mark.unit
+async def test_or_filter_values_are_quoted():
+    users = Users({"id": "u2", "email": "x@example.com", "username": 'a,b)"c'})
+
+    found = await user_lookup.find_user(users.db(), username='a,b)"c')
+
+    assert found["id"] == "u2"
+    assert users.requests[0].url.params["or"] == '(username.eq."a,b)\\"c")'
+
+
+@pytest.mark.unit
+async def test_unknown_identifiers_are_negatively_cached(cache):
+    users = Users(SAM)
+    db = users.db()
+
+    for _ in range(5):
+        assert await user_lookup.find_user(db, username="mallory") is None
+
+    assert len(users.requests) == 1
+    assert cache.stats()["negative_hits"] == 4
+
+
+@pytest.mark.unit
+async def test_negative_entries_expire(cache):
+    cache.negative_ttl = 0
+    users = Users()
+    db = users.db()
+
+    await user_lookup.find_user(db, username="sam")
+    await user_lookup.find_user(db, username="sam")
+
+    assert len(users.requests) == 2
+
+
+@pytest.mark.unit
+async def test_cached_id_is_checked_against_the_record():
+    users = Users(SAM)
+    db = users.db()
+    await user_lookup.find_user(db, username="sam")
+
+    assert (await user_lookup.find_user(db, username="sam"))["id"] == "u1"
+    assert users.requests[-1].url.params["id"] == "eq.u1"
+
+    # Renamed behind this worker's back: the entry no longer matches
+    users.rows[0]["username"] = "samuel"
+    assert await user_lookup.find_user(db, username="sam") is None
+    assert "or" in users.requests[-1].url.params
+
+
+@pytest.mark.unit
+async def test_writes_invalidate_entries():
+    users = Users(SAM)
+    db = users.db()
+    assert await user_lookup.find_user(db, username="alex") is None
+    await user_lookup.find_user(db, username="sam")
+
+    await db.create_user({"id": "u2", "email": "alex@example.com", "username": "alex"})
+    assert (await user_lookup.find_user(db, username="alex"))["id"] == "u2"
+
+    await db.update_user("u1", {"username": "samuel"})
+    requests = len(users.requests)
+    assert await user_lookup.find_user(db, username="sam") is None
+    assert "or" in users.requests[requests].url.params
+
+
+@pytest.mark.unit
+async def test_lookup_racing_a_write_is_not_cached(cache):
+    class Racing:
+        async def find_users(self, email=None, username=None):
+            # A signup lands while the query is in flight
+            user_lookup.invalidate(username=username)
+            return []
+
+        async def get_user_by_id(self, user_id):
+            return None
+
+    assert await user_lookup.find_user(Racing(), username="alex") is None
+    assert cache.get(("username", "alex")) is None
+
+
+@pytest.mark.unit
+async def test_mongo_lookup_uses_or_query():
+    db = AsyncMongoMockClient()["lookup_test"]
+    await db.users.insert_many(
+        [dict(SAM), {"id": "u2", "email": "a@x.io", "username": "a"}]
+    )
+    users = MongoUsers(db)
+
+    found = await user_lookup.find_user(users, email="a@x.io", username="sam")
+
+    assert found["id"] == "u2"
+    assert user_lookup.get_cache().get(("username", "sam")) == "u1"
+    assert await user_lookup.find_user(users, username="nobody") is None
@@ -0,0 +1,192 @@
+import json
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from postgrest import AsyncPostgrestClient
+from pymongo import ReplaceOne
+from services import user_search
+from services.user_search import MongoUserSearch, SupabaseUserSearch
+
+
+class Database:
+    """mongomock database whose bulk_write runs ops one by one
+
+    (mongomock's own bulk API does not accept current pymongo operations)
+    """
+
+    def __init__(self, name):
+        self.db = AsyncMongoMockClient()[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+
+        async def bulk_write(ops, ordered=True):
+            for op in ops:
+                if isinstance(op, ReplaceOne):
+                    await collection.replace_one(op._filter, op._doc, upsert=op._upsert)
+                else:
+                    await collection.update_one(op._filter, op._doc, upsert=op._upsert)
+
+        collection.bulk_write = bulk_write
+        return collection
+
+
+def _user(i, username, email=None):
+    email = email or f"{username}@example.com"
+    return {
+        "id": f"u{i:03d}",
+        "username": username,
+        "email": email,
+        "password_hash": "secret",
+        "search_grams": user_search.search_grams(username, email),
+    }
+
+
+@pytest.fixture
+async def db():
+    db = Database("user_search_test")
+    await db.users.insert_many(
+        [
+            _user(1, "samuel"),
+            _user(2, "sam"),
+            _user(3, "samantha"),
+            _user(4, "alex", "sam@mail.io"),
+            _user(5, "jordan"),
+        ]
+        + [_user(10 + i, f"sammy{i}") for i in range(10)]
+    )
+    return db
+
+
+@pytest.mark.unit
+def test_trigrams_follow_pg_trgm_padding():
+    assert user_search.trigrams("Sam") == {"  s", " sa", "sam", "am "}
+    assert user_search.trigrams("a.b") == {"  a", " a ", "  b", " b "}
+    assert user_search.trigrams(None, "") == set()
+
+
+@pytest.mark.unit
+async def test_mongo_search_ranks_exact_matches_first(db):
+    search = MongoUserSearch(db)
+    await search.refresh_gram_counts()
+
+    rows = await search.search("Sam", 5)
+
+    scores = [score for score, _ in rows]
+    assert scores == sorted(scores, reverse=True)
+    assert {rows[0][1]["id"], rows[1][1]["id"]} == {"u002", "u004"}
+    assert all(
+        "password_hash" not in user and "search_grams" not in user for _, user in rows
+    )
+    assert "u005" not in [user["id"] for _, user in rows]
+
+
+@pytest.mark.unit
+async def test_mongo_search_tolerates_typos(db):
+    rows = await MongoUserSearch(db).search("samantah", 5)
+
+    assert rows[0][1]["username"] == "samantha"
+
+
+@pytest.mark.unit
+def test_probe_uses_rarest_trigrams():
+    grams = user_search.trigrams("jordan")
+    counts = {gram: 100 for gram in grams} | {"rda": 1, "  j": 2, "ord": 3}
+
+    # 7 trigrams, 6 needed: any match contains one of the 2 rarest
+    assert MongoUserSearch.probe(grams, counts, 6) == ["rda", "  j"]
+    # Substring matches contain "rda" too; otherwise the rarest unpadded joins
+    counts["rda"] = 100
+    assert MongoUserSearch.probe(grams, counts, 6) == ["  j", "ord"]
+    counts["ord"] = 1
+    assert MongoUserSearch.probe(grams, counts, 6) == ["ord", "  j"]
+
+
+@pytest.mark.unit
+async def test_mongo_search_matches_infix_terms(db):
+    search = MongoUserSearch(db)
+    await search.refresh_gram_counts()
+
+    rows = await search.search("mant", 5)
+
+    assert [user["username"] for _, user in rows] == ["samantha"]
+
+
+@pytest.mark.unit
+async def test_cursor_pages_cover_every_match_once(db):
+    backend = MongoUserSearch(db)
+    seen = []
+    cursor = None
+    while True:
+        users, cursor = await user_search.search(backend, "sammy", 3, cursor)
+        seen += [user["id"] for user in users]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert set(seen) >= {f"u{10 + i:03d}" for i in range(10)}
+
+
+@pytest.mark.unit
+async def test_backfill_adds_grams_and_counts():
+    db = Database("user_search_backfill")
+    await db.users.insert_many(
+        [{"id": "u1", "username": "sam", "email": "sam@x.io"}, _user(2, "alex")]
+    )
+    search = MongoUserSearch(db)
+
+    assert await search.backfill() == 1
+
+    user = await db.users.find_one({"id": "u1"})
+    assert user["search_grams"] == user_search.search_grams("sam", "sam@x.io")
+    counts = await db.user_search_grams.find_one({"_id": "sam"})
+    assert counts["users"] == 1
+    assert (await search.search("sam", 5))[0][1]["id"] == "u1"
+
+
+@pytest.mark.unit
+async def test_supabase_search_calls_rpc_with_cursor():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200,
+            json=[
+                {"score": 1.6666666, "user": {"id": "a", "username": "sam"}},
+                {"score": 0.5, "user": {"id": "b", "username": "samuel"}},
+            ],
+        )
+
+    client = AsyncPostgrestClient(
+        "http://supabase.test/rest/v1",
+        headers={"apikey": "key", "Authorization": "Bearer key"},
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    cursor = user_search.encode_cursor(2.0, "z")
+
+    users, next_cursor = await user_search.search(
+        SupabaseUserSearch(client), "sam", 1, cursor
+    )
+
+    assert requests[0].url.path == "/rest/v1/rpc/search_users"
+    assert json.loads(requests[0].content) == {
+        "p_query": "sam",
+        "p_limit": 2,
+        "p_after_score": 2.0,
+        "p_after_id": "z",
+    }
+    assert [user["id"] for user in users] == ["a"]
+    assert user_search.decode_cursor(next_cursor) == (1.6666666, "a")
+
+
+@pytest.mark.unit
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        user_search.decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        user_search.decode_cursor(user_search.encode_cursor("x", "a"))
@@ -0,0 +1,80 @@
+--
+-- Listing analytics in one round trip
+-- get_listing_analytics used to fetch a user's listings and then query
+-- posted_ads once per listing. listing_analytics() returns one page of the
+-- user's listings with their posted_ads totals for a date range instead.
+--
+
+-- Metric counters written by the platform pollers (PostedAd.views/clicks/leads)
+alter table "public"."posted_ads" add column if not exists "views" bigint not null default 0;
+alter table "public"."posted_ads" add column if not exists "clicks" bigint not null default 0;
+alter table "public"."posted_ads" add column if not exists "leads" bigint not null default 0;
+
+create index if not exists "posted_ads_ad_id_posted_at_idx"
+  on "public"."posted_ads" ("ad_id", "posted_at");
+create index if not exists "listings_user_id_created_at_idx"
+  on "public"."listings" ("user_id", "created_at" desc);
+
+-- One page of a user's listings (newest first) with posted_ads totals for
+-- posts made in [p_start, p_end), optionally for one platform.
+-- total_count is the number of listings across all pages.
+create or replace function listing_analytics(
+  p_user_id uuid,
+  p_start timestamp with time zone,
+  p_end timestamp with time zone,
+  p_platform text default null,
+  p_limit integer default 50,
+  p_offset integer default 0
+)
+returns table (
+  listing_id uuid,
+  title text,
+  status text,
+  created_at timestamp with time zone,
+  views bigint,
+  clicks bigint,
+  leads bigint,
+  total_count bigint
+)
+language sql
+stable
+security definer set search_path = public
+as $$
+  with page as (
+    select l.id, l.title, l.status, l.created_at, count(*) over () as total_count
+    from "public"."listings" l
+    where l.user_id = p_user_id
+    order by l.created_at desc, l.id desc
+    limit p_limit offset p_offset
+  ),
+  totals as (
+    select
+      pa.ad_id,
+      sum(pa.views)::bigint as views,
+      sum(pa.clicks)::bigint as clicks,
+      sum(pa.leads)::bigint as leads
+    from "public"."posted_ads" pa
+    where pa.ad_id in (select id from page)
+      and pa.posted_at >= p_start
+      and pa.posted_at < p_end
+      and (p_platform is null or pa.platform = p_platform)
+    group by pa.ad_id
+  )
+  select
+    page.id,
+    page.title,
+    page.status,
+    page.created_at,
+    coalesce(totals.views, 0),
+    coalesce(totals.clicks, 0),
+    coalesce(totals.leads, 0),
+    page.total_count
+  from page
+  left join totals on totals.ad_id = page.id
+  order by page.created_at desc, page.id desc;
+$$;
+
+-- Called by the backend with the service role only; it takes the user id as an
+-- argument, so it must not be callable through the public API roles.
+revoke execute on function listing_analytics(uuid, timestamp with time zone, timestamp with time zone, text, integer, integer) from public, anon, authenticated;
+grant execute on function listing_analytics(uuid, timestamp with time zone, timestamp with time zone, text, integer, integer) to service_role;
@@ -0,0 +1,163 @@
+--
+-- Per-user, per-platform, per-day posted_ads rollup
+-- get_platform_analytics used to read every row of posted_ads into the API to
+-- group it by platform. platform_daily_stats keeps those totals per user,
+-- platform and UTC day, maintained by triggers on posted_ads, so the endpoint
+-- reads at most (platforms x days) small rows.
+--
+
+-- posted_ads rows carry their owner so the rollup can be keyed by user
+alter table "public"."posted_ads" add column if not exists "user_id" uuid;
+
+update "public"."posted_ads" pa
+set user_id = coalesce(
+  (select a.user_id from "public"."ads" a where a.id = pa.ad_id),
+  (select l.user_id from "public"."listings" l where l.id = pa.ad_id)
+)
+where pa.user_id is null;
+
+create index if not exists "posted_ads_user_id_posted_at_idx"
+  on "public"."posted_ads" ("user_id", "posted_at");
+
+create or replace function public.set_posted_ad_user_id()
+returns trigger
+language plpgsql
+security definer set search_path = public
+as $$
+begin
+  if new.user_id is null then
+    new.user_id := coalesce(
+      (select a.user_id from public.ads a where a.id = new.ad_id),
+      (select l.user_id from public.listings l where l.id = new.ad_id)
+    );
+  end if;
+  return new;
+end;
+$$;
+
+create trigger posted_ads_set_user_id
+  before insert on "public"."posted_ads"
+  for each row execute procedure public.set_posted_ad_user_id();
+
+create table "public"."platform_daily_stats" (
+    "user_id" uuid not null,
+    "platform" text not null,
+    "day" date not null,
+    "posts" bigint not null default 0,
+    "views" bigint not null default 0,
+    "clicks" bigint not null default 0,
+    "leads" bigint not null default 0,
+    "updated_at" timestamp with time zone not null default now()
+);
+
+alter table "public"."platform_daily_stats" enable row level security;
+alter table "public"."platform_daily_stats" add constraint "platform_daily_stats_pkey" primary key ("user_id", "day", "platform");
+
+-- Allow users to view their own rollup
+create policy "Users can view their own platform stats." on "public"."platform_daily_stats"
+  for select using (auth.uid() = user_id);
+
+create or replace function public.bump_platform_daily_stats(
+  p_user_id uuid,
+  p_platform text,
+  p_day date,
+  p_posts bigint,
+  p_views bigint,
+  p_clicks bigint,
+  p_leads bigint
+)
+returns void
+language sql
+security definer set search_path = public
+as $$
+  insert into public.platform_daily_stats as s (user_id, platform, day, posts, views, clicks, leads)
+  values (p_user_id, p_platform, p_day, p_posts, p_views, p_clicks, p_leads)
+  on conflict (user_id, day, platform) do update set
+    posts = s.posts + excluded.posts,
+    views = s.views + excluded.views,
+    clicks = s.clicks + excluded.clicks,
+    leads = s.leads + excluded.leads,
+    updated_at = now();
+$$;
+
+-- Applies each posted_ads change as a delta: the old row's contribution is
+-- removed and the new row's added (a single upsert when the key is unchanged)
+create or replace function public.rollup_posted_ads()
+returns trigger
+language plpgsql
+security definer set search_path = public
+as $$
+declare
+  old_day date;
+  new_day date;
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    old_day := (old.posted_at at time zone 'UTC')::date;
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    new_day := (new.posted_at at time zone 'UTC')::date;
+  end if;
+
+  if tg_op = 'UPDATE'
+    and old.user_id is not distinct from new.user_id
+    and old.platform = new.platform
+    and old_day = new_day then
+    if new.views <> old.views or new.clicks <> old.clicks or new.leads <> old.leads then
+      if new.user_id is not null then
+        perform public.bump_platform_daily_stats(
+          new.user_id, new.platform, new_day, 0,
+          new.views - old.views, new.clicks - old.clicks, new.leads - old.leads
+        );
+      end if;
+    end if;
+    return null;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') and old.user_id is not null then
+    perform public.bump_platform_daily_stats(
+      old.user_id, old.platform, old_day, -1, -old.views, -old.clicks, -old.leads
+    );
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') and new.user_id is not null then
+    perform public.bump_platform_daily_stats(
+      new.user_id, new.platform, new_day, 1, new.views, new.clicks, new.leads
+    );
+  end if;
+  return null;
+end;
+$$;
+
+create trigger posted_ads_rollup
+  after insert or update or delete on "public"."posted_ads"
+  for each row execute procedure public.rollup_posted_ads();
+
+-- Recomputes the rollup from posted_ads (backfill, or repair after drift).
+-- Pass a user id to rebuild a single user.
+create or replace function public.rebuild_platform_daily_stats(p_user_id uuid default null)
+returns void
+language sql
+security definer set search_path = public
+as $$
+  delete from public.platform_daily_stats
+  where p_user_id is null or user_id = p_user_id;
+
+  insert into public.platform_daily_stats (user_id, platform, day, posts, views, clicks, leads)
+  select
+    user_id,
+    platform,
+    (posted_at at time zone 'UTC')::date,
+    count(*),
+    coalesce(sum(views), 0),
+    coalesce(sum(clicks), 0),
+    coalesce(sum(leads), 0)
+  from public.posted_ads
+  where user_id is not null
+    and (p_user_id is null or user_id = p_user_id)
+  group by user_id, platform, (posted_at at time zone 'UTC')::date;
+$$;
+
+revoke execute on function public.bump_platform_daily_stats(uuid, text, date, bigint, bigint, bigint, bigint) from public, anon, authenticated;
+revoke execute on function public.rebuild_platform_daily_stats(uuid) from public, anon, authenticated;
+grant execute on function public.rebuild_platform_daily_stats(uuid) to service_role;
+
+select public.rebuild_platform_daily_stats();
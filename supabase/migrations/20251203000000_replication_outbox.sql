@@ -0,0 +1,74 @@
+--
+-- Replication outbox for PARALLEL_WRITE
+-- Writes that must also reach the secondary store (MongoDB) are recorded here
+-- by the request path, and a background replicator applies them in batches.
+-- Records for the same entity are applied in id order: an entity is only
+-- claimed when none of its records is leased or backing off.
+--
+
+create table "public"."replication_outbox" (
+    "id" bigserial primary key,
+    "entity_key" text not null,
+    "collection" text not null,
+    "op" text not null,
+    "payload" jsonb not null,
+    "status" text not null default 'pending',
+    "attempts" integer not null default 0,
+    "last_error" text,
+    "available_at" timestamp with time zone not null default now(),
+    "leased_by" text,
+    "leased_until" timestamp with time zone,
+    "created_at" timestamp with time zone not null default now()
+);
+
+-- Service role only; no policies, so API roles cannot read or write it
+alter table "public"."replication_outbox" enable row level security;
+
+create index "replication_outbox_pending_idx"
+  on "public"."replication_outbox" ("status", "entity_key", "id");
+
+-- Lease up to p_limit entities (all of their pending records) for one worker.
+-- The advisory lock serializes concurrent claimers per entity, and the lease
+-- check inside the update stops a second worker from taking records that were
+-- added after another worker's lease.
+create or replace function public.claim_replication_batch(
+  p_worker text,
+  p_limit integer default 100,
+  p_lease_seconds integer default 60
+)
+returns setof public.replication_outbox
+language plpgsql
+security definer set search_path = public
+as $$
+declare
+  k text;
+begin
+  for k in
+    select o.entity_key
+    from public.replication_outbox o
+    where o.status = 'pending'
+    group by o.entity_key
+    having max(o.available_at) <= now()
+      and max(coalesce(o.leased_until, '-infinity')) < now()
+    order by min(o.id)
+    limit p_limit
+  loop
+    if pg_try_advisory_xact_lock(hashtext('replication_outbox:' || k)) then
+      return query
+        update public.replication_outbox o
+        set leased_by = p_worker,
+            leased_until = now() + make_interval(secs => p_lease_seconds)
+        where o.entity_key = k
+          and o.status = 'pending'
+          and not exists (
+            select 1 from public.replication_outbox l
+            where l.entity_key = k and l.leased_until >= now()
+          )
+        returning o.*;
+    end if;
+  end loop;
+end;
+$$;
+
+revoke execute on function public.claim_replication_batch(text, integer, integer) from public, anon, authenticated;
+grant execute on function public.claim_replication_batch(text, integer, integer) to service_role;
@@ -0,0 +1,90 @@
+--
+-- Business insights snapshots
+-- get_business_insights ran one aggregation per breakdown on every call and
+-- get_revenue_breakdown counted every profile row in Python. business_insights()
+-- computes all breakdowns in one grouped query; the API keeps the latest result
+-- in business_insights_snapshots and serves it from a cache.
+--
+
+-- Collected by the enhanced signup form
+alter table "public"."user_business_profiles" add column if not exists "biggest_challenge" text;
+alter table "public"."user_business_profiles" add column if not exists "current_marketplaces" text[] not null default '{}';
+
+create index if not exists "user_business_profiles_created_at_idx"
+  on "public"."user_business_profiles" ("created_at");
+create index if not exists "users_created_at_idx"
+  on "public"."users" ("created_at");
+
+-- Only the latest snapshot is kept: each refresh upserts the row with id 'latest'
+create table "public"."business_insights_snapshots" (
+    "id" text primary key default 'latest',
+    "computed_at" timestamp with time zone not null default now(),
+    "full_computed_at" timestamp with time zone not null,
+    "high_water" timestamp with time zone not null,
+    "data" jsonb not null
+);
+
+-- Service role only; no policies
+alter table "public"."business_insights_snapshots" enable row level security;
+
+-- All breakdowns in one pass over the profiles (grouping sets), as
+-- [{"_id": value, "count": n}] lists sorted by count, for rows created in
+-- (p_since, p_until]. An incremental refresh passes the previous snapshot's
+-- p_until as p_since and adds the counts.
+create or replace function public.business_insights(
+  p_since timestamp with time zone default null,
+  p_until timestamp with time zone default now()
+)
+returns jsonb
+language sql
+stable
+security definer set search_path = public
+as $$
+  with profiles as (
+    select industry, monthly_revenue, biggest_challenge, current_marketplaces, created_at
+    from public.user_business_profiles
+    where (p_since is null or created_at > p_since) and created_at <= p_until
+  ),
+  grouped as (
+    select
+      grouping(industry) as by_industry,
+      grouping(monthly_revenue) as by_revenue,
+      grouping(biggest_challenge) as by_challenge,
+      industry,
+      monthly_revenue,
+      biggest_challenge,
+      count(*) as n
+    from profiles
+    group by grouping sets ((industry), (monthly_revenue), (biggest_challenge))
+  ),
+  marketplaces as (
+    select m.marketplace, count(*) as n
+    from profiles p, unnest(p.current_marketplaces) as m(marketplace)
+    group by m.marketplace
+  )
+  select jsonb_build_object(
+    'total_users', (
+      select count(*) from public.users u
+      where (p_since is null or u.created_at > p_since) and u.created_at <= p_until
+    ),
+    'industries', coalesce((
+      select jsonb_agg(jsonb_build_object('_id', industry, 'count', n) order by n desc)
+      from grouped where by_industry = 0 and industry is not null
+    ), '[]'::jsonb),
+    'revenue_ranges', coalesce((
+      select jsonb_agg(jsonb_build_object('_id', monthly_revenue, 'count', n) order by n desc)
+      from grouped where by_revenue = 0 and monthly_revenue is not null
+    ), '[]'::jsonb),
+    'top_challenges', coalesce((
+      select jsonb_agg(jsonb_build_object('_id', biggest_challenge, 'count', n) order by n desc)
+      from grouped where by_challenge = 0 and biggest_challenge is not null
+    ), '[]'::jsonb),
+    'marketplace_usage', coalesce((
+      select jsonb_agg(jsonb_build_object('_id', marketplace, 'count', n) order by n desc)
+      from marketplaces
+    ), '[]'::jsonb)
+  );
+$$;
+
+revoke execute on function public.business_insights(timestamp with time zone, timestamp with time zone) from public, anon, authenticated;
+grant execute on function public.business_insights(timestamp with time zone, timestamp with time zone) to service_role;
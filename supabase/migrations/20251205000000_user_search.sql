@@ -0,0 +1,77 @@
+--
+-- Indexed user search
+-- /api/users/search/query filtered with unanchored ILIKE '%q%' on username and
+-- email, a sequential scan of users. Trigram GIN indexes on the lowercased
+-- columns serve both fuzzy (word similarity) and substring matches;
+-- search_users() ranks the matches and pages them with a (score, id) cursor.
+--
+
+create extension if not exists "pg_trgm" with schema "extensions";
+
+create index if not exists "users_username_trgm_idx"
+  on "public"."users" using gin (lower("username") "extensions"."gin_trgm_ops");
+create index if not exists "users_email_trgm_idx"
+  on "public"."users" using gin (lower("email") "extensions"."gin_trgm_ops");
+
+-- Users whose username or email contains p_query or is similar to it
+-- (word_similarity above pg_trgm.word_similarity_threshold, 0.6 by default),
+-- as (score, user row without password hashes). Exact matches score 1 extra;
+-- rows are ordered by score desc, id. Pass the last row's score and id for
+-- the next page. Without p_query every user is listed by id (score 0).
+create or replace function public.search_users(
+  p_query text default null,
+  p_limit integer default 20,
+  p_after_score real default null,
+  p_after_id uuid default null
+)
+returns table ("score" real, "user" jsonb)
+language plpgsql
+stable
+security definer set search_path = public, extensions
+as $$
+declare
+  v_term text := lower(nullif(btrim(p_query), ''));
+  v_pattern text;
+  v_limit integer := least(greatest(coalesce(p_limit, 20), 1), 1000);
+begin
+  if v_term is null then
+    return query
+      select 0::real, to_jsonb(u) - 'password_hash' - 'hashed_password'
+      from public.users u
+      where p_after_id is null or u.id > p_after_id
+      order by u.id
+      limit v_limit;
+    return;
+  end if;
+
+  v_pattern := '%' || replace(replace(replace(v_term, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+  -- Each condition is answered by one of the trigram indexes (BitmapOr)
+  return query
+    select m.score, to_jsonb(m) - 'score' - 'password_hash' - 'hashed_password'
+    from (
+      select
+        u.*,
+        (
+          (coalesce(lower(u.username) = v_term, false) or lower(u.email) = v_term)::int
+          + greatest(
+              coalesce(word_similarity(v_term, lower(u.username)), 0),
+              word_similarity(v_term, lower(u.email))
+            )
+        )::real as score
+      from public.users u
+      where v_term <% lower(u.username)
+        or v_term <% lower(u.email)
+        or lower(u.username) like v_pattern
+        or lower(u.email) like v_pattern
+    ) m
+    where p_after_id is null
+      or m.score < p_after_score
+      or (m.score = p_after_score and m.id > p_after_id)
+    order by m.score desc, m.id
+    limit v_limit;
+end;
+$$;
+
+revoke execute on function public.search_users(text, integer, real, uuid) from public, anon, authenticated;
+grant execute on function public.search_users(text, integer, real, uuid) to service_role;